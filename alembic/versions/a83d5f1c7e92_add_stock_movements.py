@@ -0,0 +1,81 @@
+"""add_stock_movements
+
+Revision ID: a83d5f1c7e92
+Revises: f5c1d9e3a720
+Create Date: 2026-10-18 18:12:47.610395
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a83d5f1c7e92'
+down_revision: Union[str, None] = 'f5c1d9e3a720'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('average_cost', sa.Numeric(precision=15, scale=4), server_default='0', nullable=False, comment='Costo promedio ponderado (lo mantiene el libro de movimientos)'))
+    op.add_column('products', sa.Column('inventory_value', sa.Numeric(precision=15, scale=4), server_default='0', nullable=False, comment='Valor del inventario a costo promedio'))
+    op.create_index('ix_products_low_stock', 'products', ['name'], unique=False, postgresql_where=sa.text('manage_inventory AND current_stock <= min_stock'))
+    op.create_index('ix_products_reorder', 'products', ['name'], unique=False, postgresql_where=sa.text('manage_inventory AND current_stock <= reorder_point'))
+
+    op.create_table('stock_movements',
+    sa.Column('product_id', sa.UUID(), nullable=False),
+    sa.Column('movement_type', sa.Enum('IN', 'OUT', 'ADJUSTMENT', 'REVERSAL', name='stockmovementtype'), nullable=False),
+    sa.Column('movement_date', sa.Date(), nullable=False),
+    sa.Column('journal_entry_id', sa.UUID(), nullable=True),
+    sa.Column('journal_entry_line_id', sa.UUID(), nullable=True),
+    sa.Column('quantity', sa.Numeric(precision=15, scale=4), nullable=False, comment='Cantidad con signo: positiva entra, negativa sale'),
+    sa.Column('unit_cost', sa.Numeric(precision=15, scale=4), nullable=False),
+    sa.Column('total_cost', sa.Numeric(precision=15, scale=4), nullable=False, comment='Valor con signo del movimiento'),
+    sa.Column('balance_quantity', sa.Numeric(precision=15, scale=4), nullable=False, comment='Stock del producto después del movimiento'),
+    sa.Column('average_cost', sa.Numeric(precision=15, scale=4), nullable=False, comment='Costo promedio después del movimiento'),
+    sa.Column('reference', sa.String(length=100), nullable=True),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['journal_entry_id'], ['journal_entries.id'], name=op.f('fk_stock_movements_journal_entry_id_journal_entries'), ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['journal_entry_line_id'], ['journal_entry_lines.id'], name=op.f('fk_stock_movements_journal_entry_line_id_journal_entry_lines'), ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], name=op.f('fk_stock_movements_product_id_products'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_stock_movements'))
+    )
+    op.create_index(op.f('ix_stock_movements_id'), 'stock_movements', ['id'], unique=False)
+    op.create_index(op.f('ix_stock_movements_journal_entry_id'), 'stock_movements', ['journal_entry_id'], unique=False)
+    op.create_index('ix_stock_movements_product_history', 'stock_movements', ['product_id', 'created_at'], unique=False)
+
+    # Valorar el stock existente al precio de compra y abrir el libro con ese saldo
+    op.execute("""
+        UPDATE products
+        SET average_cost = purchase_price,
+            inventory_value = current_stock * purchase_price
+        WHERE manage_inventory
+    """)
+    op.execute("""
+        INSERT INTO stock_movements
+            (id, product_id, movement_type, movement_date, quantity, unit_cost, total_cost,
+             balance_quantity, average_cost, reference, created_at, updated_at)
+        SELECT gen_random_uuid(), id, 'ADJUSTMENT'::stockmovementtype, current_date,
+               current_stock, purchase_price, current_stock * purchase_price,
+               current_stock, purchase_price, 'Saldo inicial', now(), now()
+        FROM products
+        WHERE manage_inventory AND current_stock <> 0
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_stock_movements_product_history', table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_journal_entry_id'), table_name='stock_movements')
+    op.drop_index(op.f('ix_stock_movements_id'), table_name='stock_movements')
+    op.drop_table('stock_movements')
+    sa.Enum(name='stockmovementtype').drop(op.get_bind(), checkfirst=True)
+    op.drop_index('ix_products_reorder', table_name='products', postgresql_where=sa.text('manage_inventory AND current_stock <= reorder_point'))
+    op.drop_index('ix_products_low_stock', table_name='products', postgresql_where=sa.text('manage_inventory AND current_stock <= min_stock'))
+    op.drop_column('products', 'inventory_value')
+    op.drop_column('products', 'average_cost')
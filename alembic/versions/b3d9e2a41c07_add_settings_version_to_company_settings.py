@@ -0,0 +1,35 @@
+"""add_settings_version_to_company_settings
+
+Revision ID: b3d9e2a41c07
+Revises: 1fc80a76374f
+Create Date: 2026-10-18 10:12:31.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d9e2a41c07'
+down_revision: Union[str, None] = '1fc80a76374f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Version counter used to invalidate the in-memory settings cache across workers
+    op.add_column('company_settings', sa.Column(
+        'settings_version',
+        sa.Integer(),
+        server_default='1',
+        nullable=False,
+        comment="Versión de la configuración para invalidar cachés"
+    ))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('company_settings', 'settings_version')
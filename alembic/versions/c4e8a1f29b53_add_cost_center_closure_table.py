@@ -0,0 +1,59 @@
+"""add_cost_center_closure_table
+
+Revision ID: c4e8a1f29b53
+Revises: b3d9e2a41c07
+Create Date: 2026-10-18 14:05:47.318920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a1f29b53'
+down_revision: Union[str, None] = 'b3d9e2a41c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cost_center_closure',
+    sa.Column('ancestor_id', sa.UUID(), nullable=False),
+    sa.Column('descendant_id', sa.UUID(), nullable=False),
+    sa.Column('depth', sa.Integer(), nullable=False, comment='Distancia entre ancestro y descendiente (0 = mismo nodo)'),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['ancestor_id'], ['cost_centers.id'], name=op.f('fk_cost_center_closure_ancestor_id_cost_centers'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['descendant_id'], ['cost_centers.id'], name=op.f('fk_cost_center_closure_descendant_id_cost_centers'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_cost_center_closure')),
+    sa.UniqueConstraint('ancestor_id', 'descendant_id', name='uq_cost_center_closure_pair')
+    )
+    op.create_index(op.f('ix_cost_center_closure_ancestor_id'), 'cost_center_closure', ['ancestor_id'], unique=False)
+    op.create_index(op.f('ix_cost_center_closure_descendant_id'), 'cost_center_closure', ['descendant_id'], unique=False)
+    op.create_index(op.f('ix_cost_center_closure_id'), 'cost_center_closure', ['id'], unique=False)
+
+    # Poblar la clausura a partir de parent_id (el propio nodo con profundidad 0)
+    op.execute("""
+        WITH RECURSIVE tree (ancestor_id, descendant_id, depth) AS (
+            SELECT id, id, 0 FROM cost_centers
+            UNION ALL
+            SELECT tree.ancestor_id, child.id, tree.depth + 1
+            FROM tree
+            JOIN cost_centers child ON child.parent_id = tree.descendant_id
+        )
+        INSERT INTO cost_center_closure (id, ancestor_id, descendant_id, depth, created_at, updated_at)
+        SELECT gen_random_uuid(), ancestor_id, descendant_id, depth, now(), now()
+        FROM tree
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cost_center_closure_id'), table_name='cost_center_closure')
+    op.drop_index(op.f('ix_cost_center_closure_descendant_id'), table_name='cost_center_closure')
+    op.drop_index(op.f('ix_cost_center_closure_ancestor_id'), table_name='cost_center_closure')
+    op.drop_table('cost_center_closure')
@@ -0,0 +1,61 @@
+"""add_cost_center_monthly_actuals
+
+Revision ID: d7f3b2c94e10
+Revises: c4e8a1f29b53
+Create Date: 2026-10-18 15:22:09.871342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7f3b2c94e10'
+down_revision: Union[str, None] = 'c4e8a1f29b53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('cost_center_monthly_actuals',
+    sa.Column('cost_center_id', sa.UUID(), nullable=False),
+    sa.Column('account_type', postgresql.ENUM('ASSET', 'LIABILITY', 'EQUITY', 'INCOME', 'EXPENSE', 'COST', name='accounttype', create_type=False), nullable=False),
+    sa.Column('period', sa.Date(), nullable=False, comment='Primer día del mes'),
+    sa.Column('total_debits', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('total_credits', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['cost_center_id'], ['cost_centers.id'], name=op.f('fk_cost_center_monthly_actuals_cost_center_id_cost_centers'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_cost_center_monthly_actuals')),
+    sa.UniqueConstraint('cost_center_id', 'account_type', 'period', name='uq_cost_center_monthly_actuals_key')
+    )
+    op.create_index(op.f('ix_cost_center_monthly_actuals_cost_center_id'), 'cost_center_monthly_actuals', ['cost_center_id'], unique=False)
+    op.create_index(op.f('ix_cost_center_monthly_actuals_id'), 'cost_center_monthly_actuals', ['id'], unique=False)
+    op.create_index(op.f('ix_cost_center_monthly_actuals_period'), 'cost_center_monthly_actuals', ['period'], unique=False)
+
+    # Poblar la instantánea con los asientos contabilizados existentes
+    op.execute("""
+        INSERT INTO cost_center_monthly_actuals
+            (id, cost_center_id, account_type, period, total_debits, total_credits, created_at, updated_at)
+        SELECT gen_random_uuid(), lines.cost_center_id, accounts.account_type,
+               date_trunc('month', entries.entry_date)::date,
+               sum(lines.debit_amount), sum(lines.credit_amount), now(), now()
+        FROM journal_entry_lines lines
+        JOIN journal_entries entries ON entries.id = lines.journal_entry_id
+        JOIN accounts ON accounts.id = lines.account_id
+        WHERE entries.status = 'POSTED' AND lines.cost_center_id IS NOT NULL
+        GROUP BY lines.cost_center_id, accounts.account_type, date_trunc('month', entries.entry_date)::date
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_cost_center_monthly_actuals_period'), table_name='cost_center_monthly_actuals')
+    op.drop_index(op.f('ix_cost_center_monthly_actuals_id'), table_name='cost_center_monthly_actuals')
+    op.drop_index(op.f('ix_cost_center_monthly_actuals_cost_center_id'), table_name='cost_center_monthly_actuals')
+    op.drop_table('cost_center_monthly_actuals')
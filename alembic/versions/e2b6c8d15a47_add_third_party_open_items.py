@@ -0,0 +1,110 @@
+"""add_third_party_open_items
+
+Revision ID: e2b6c8d15a47
+Revises: d7f3b2c94e10
+Create Date: 2026-10-18 16:48:31.504217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c8d15a47'
+down_revision: Union[str, None] = 'd7f3b2c94e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('third_party_open_items',
+    sa.Column('third_party_id', sa.UUID(), nullable=False),
+    sa.Column('item_type', sa.Enum('RECEIVABLE', 'PAYABLE', name='openitemtype'), nullable=False),
+    sa.Column('invoice_id', sa.UUID(), nullable=True),
+    sa.Column('payment_id', sa.UUID(), nullable=True),
+    sa.Column('document_number', sa.String(length=50), nullable=False),
+    sa.Column('document_date', sa.Date(), nullable=False),
+    sa.Column('due_date', sa.Date(), nullable=False),
+    sa.Column('residual_amount', sa.Numeric(precision=15, scale=2), nullable=False, comment='Saldo pendiente; negativo para notas de crédito y pagos sin aplicar'),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['invoice_id'], ['invoices.id'], name=op.f('fk_third_party_open_items_invoice_id_invoices'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['payment_id'], ['payments.id'], name=op.f('fk_third_party_open_items_payment_id_payments'), ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['third_party_id'], ['third_parties.id'], name=op.f('fk_third_party_open_items_third_party_id_third_parties'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_third_party_open_items')),
+    sa.UniqueConstraint('invoice_id', name=op.f('uq_third_party_open_items_invoice_id')),
+    sa.UniqueConstraint('payment_id', name=op.f('uq_third_party_open_items_payment_id'))
+    )
+    op.create_index(op.f('ix_third_party_open_items_id'), 'third_party_open_items', ['id'], unique=False)
+    op.create_index(op.f('ix_third_party_open_items_third_party_id'), 'third_party_open_items', ['third_party_id'], unique=False)
+    op.create_index('ix_third_party_open_items_aging', 'third_party_open_items', ['item_type', 'due_date'], unique=False)
+
+    op.create_table('third_party_open_balances',
+    sa.Column('third_party_id', sa.UUID(), nullable=False),
+    sa.Column('receivable_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('payable_amount', sa.Numeric(precision=15, scale=2), nullable=False),
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['third_party_id'], ['third_parties.id'], name=op.f('fk_third_party_open_balances_third_party_id_third_parties'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_third_party_open_balances')),
+    sa.UniqueConstraint('third_party_id', name=op.f('uq_third_party_open_balances_third_party_id'))
+    )
+    op.create_index(op.f('ix_third_party_open_balances_id'), 'third_party_open_balances', ['id'], unique=False)
+
+    # Poblar las partidas con las facturas y pagos contabilizados existentes
+    op.execute("""
+        INSERT INTO third_party_open_items
+            (id, third_party_id, item_type, invoice_id, document_number, document_date,
+             due_date, residual_amount, created_at, updated_at)
+        SELECT gen_random_uuid(), third_party_id,
+               CASE WHEN invoice_type = 'SUPPLIER_INVOICE' THEN 'PAYABLE' ELSE 'RECEIVABLE' END::openitemtype,
+               id, number, invoice_date, due_date,
+               CASE WHEN invoice_type = 'CREDIT_NOTE' THEN -outstanding_amount ELSE outstanding_amount END,
+               now(), now()
+        FROM invoices
+        WHERE status IN ('POSTED', 'PARTIALLY_PAID', 'OVERDUE', 'PAID') AND outstanding_amount > 0
+    """)
+    op.execute("""
+        INSERT INTO third_party_open_items
+            (id, third_party_id, item_type, payment_id, document_number, document_date,
+             due_date, residual_amount, created_at, updated_at)
+        SELECT gen_random_uuid(), payments.third_party_id,
+               CASE WHEN payments.payment_type = 'SUPPLIER_PAYMENT' THEN 'PAYABLE' ELSE 'RECEIVABLE' END::openitemtype,
+               payments.id, payments.number, payments.payment_date, payments.payment_date,
+               -(payments.amount - coalesce(allocations.amount, 0)), now(), now()
+        FROM payments
+        LEFT JOIN (
+            SELECT payment_id, sum(amount) AS amount FROM payment_invoices GROUP BY payment_id
+        ) allocations ON allocations.payment_id = payments.id
+        WHERE payments.payment_type IN ('CUSTOMER_PAYMENT', 'SUPPLIER_PAYMENT')
+          AND payments.status IN ('POSTED', 'RECONCILED')
+          AND payments.third_party_id IS NOT NULL
+          AND payments.amount - coalesce(allocations.amount, 0) > 0
+    """)
+    op.execute("""
+        INSERT INTO third_party_open_balances
+            (id, third_party_id, receivable_amount, payable_amount, created_at, updated_at)
+        SELECT gen_random_uuid(), third_parties.id,
+               coalesce(sum(items.residual_amount) FILTER (WHERE items.item_type = 'RECEIVABLE'), 0),
+               coalesce(sum(items.residual_amount) FILTER (WHERE items.item_type = 'PAYABLE'), 0),
+               now(), now()
+        FROM third_parties
+        LEFT JOIN third_party_open_items items ON items.third_party_id = third_parties.id
+        GROUP BY third_parties.id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_third_party_open_balances_id'), table_name='third_party_open_balances')
+    op.drop_table('third_party_open_balances')
+    op.drop_index('ix_third_party_open_items_aging', table_name='third_party_open_items')
+    op.drop_index(op.f('ix_third_party_open_items_third_party_id'), table_name='third_party_open_items')
+    op.drop_index(op.f('ix_third_party_open_items_id'), table_name='third_party_open_items')
+    op.drop_table('third_party_open_items')
+    sa.Enum(name='openitemtype').drop(op.get_bind(), checkfirst=True)
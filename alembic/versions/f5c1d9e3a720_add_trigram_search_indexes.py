@@ -0,0 +1,50 @@
+"""add_trigram_search_indexes
+
+Revision ID: f5c1d9e3a720
+Revises: e2b6c8d15a47
+Create Date: 2026-10-18 17:36:12.093458
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1d9e3a720'
+down_revision: Union[str, None] = 'e2b6c8d15a47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Deben coincidir con los documentos de app/utils/search.py
+SEARCH_INDEXES = {
+    'ix_products_search_trgm': (
+        'products', ['code', 'name', 'description', 'barcode', 'sku']
+    ),
+    'ix_third_parties_search_trgm': (
+        'third_parties', ['code', 'name', 'commercial_name', 'document_number']
+    ),
+    'ix_journal_entries_search_trgm': (
+        'journal_entries', ['number', 'description', 'reference']
+    ),
+}
+
+
+def _document(columns) -> str:
+    return "lower(" + " || ' ' || ".join(f"coalesce({column}, '')" for column in columns) + ")"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    for index_name, (table, columns) in SEARCH_INDEXES.items():
+        op.execute(
+            f"CREATE INDEX {index_name} ON {table} USING gin ({_document(columns)} gin_trgm_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for index_name in SEARCH_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {index_name}")
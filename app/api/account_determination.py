@@ -4,10 +4,12 @@ Provides endpoints for account determination preview and modification
 """
 from typing import Dict, List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from decimal import Decimal
 
-from app.database import get_db
+from app.api.deps import get_db
 from app.models.payment import Payment
 from app.models.invoice import Invoice
 from app.models.account import Account
@@ -43,14 +45,14 @@ router = APIRouter()
 async def get_payment_account_suggestions(
     payment_id: str,
     request: PaymentAccountDeterminationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene sugerencias de cuentas para un pago específico
     """
     try:
         # Buscar el pago
-        payment = db.query(Payment).filter(Payment.id == payment_id).first()
+        payment = await _get_payment(db, payment_id)
         if not payment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -61,13 +63,13 @@ async def get_payment_account_suggestions(
         service = AccountDeterminationService(db)
         
         # Determinar cuentas
-        accounts = service.determine_accounts_for_payment(payment)
+        accounts = await service.determine_accounts_for_payment(payment)
         
         # Convertir a esquemas de respuesta
         suggestions = _convert_payment_accounts_to_suggestions(accounts)
         
         # Generar preview del asiento contable
-        journal_entry_lines = service.get_payment_journal_entry_preview(payment)
+        journal_entry_lines = await service.get_payment_journal_entry_preview(payment)
         journal_entry_preview = _convert_payment_journal_entry_preview(payment, journal_entry_lines)
         
         return PaymentAccountDeterminationResponse(
@@ -99,14 +101,14 @@ async def get_payment_account_suggestions(
 async def get_invoice_account_suggestions(
     invoice_id: str,
     request: InvoiceAccountDeterminationRequest,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene sugerencias de cuentas para una factura específica
     """
     try:
         # Buscar la factura
-        invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        invoice = await _get_invoice(db, invoice_id)
         if not invoice:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -117,13 +119,13 @@ async def get_invoice_account_suggestions(
         service = AccountDeterminationService(db)
         
         # Determinar cuentas
-        accounts = service.determine_accounts_for_invoice(invoice)
+        accounts = await service.determine_accounts_for_invoice(invoice)
         
         # Convertir a esquemas de respuesta
         suggestions = _convert_invoice_accounts_to_suggestions(accounts)
         
         # Generar preview del asiento contable
-        journal_entry_lines = service.get_invoice_journal_entry_preview(invoice)
+        journal_entry_lines = await service.get_invoice_journal_entry_preview(invoice)
         journal_entry_preview = _convert_invoice_journal_entry_preview(invoice, journal_entry_lines)
         
         return InvoiceAccountDeterminationResponse(
@@ -154,14 +156,14 @@ async def get_invoice_account_suggestions(
 )
 async def get_payment_account_summary(
     payment_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene un resumen de la determinación de cuentas para un pago
     """
     try:
         # Buscar el pago
-        payment = db.query(Payment).filter(Payment.id == payment_id).first()
+        payment = await _get_payment(db, payment_id)
         if not payment:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -172,7 +174,7 @@ async def get_payment_account_summary(
         service = AccountDeterminationService(db)
         
         # Determinar cuentas
-        accounts = service.determine_accounts_for_payment(payment)
+        accounts = await service.determine_accounts_for_payment(payment)
         
         # Generar resumen
         summary = _generate_payment_account_summary(payment, accounts)
@@ -199,14 +201,14 @@ async def get_payment_account_summary(
 )
 async def get_invoice_account_summary(
     invoice_id: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """
     Obtiene un resumen de la determinación de cuentas para una factura
     """
     try:
         # Buscar la factura
-        invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        invoice = await _get_invoice(db, invoice_id)
         if not invoice:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -217,7 +219,7 @@ async def get_invoice_account_summary(
         service = AccountDeterminationService(db)
         
         # Determinar cuentas
-        accounts = service.determine_accounts_for_invoice(invoice)
+        accounts = await service.determine_accounts_for_invoice(invoice)
         
         # Generar resumen
         summary = _generate_invoice_account_summary(invoice, accounts)
@@ -240,6 +242,25 @@ async def get_invoice_account_summary(
 # FUNCIONES AUXILIARES
 # ===============================
 
+async def _get_payment(db: AsyncSession, payment_id: str) -> Optional[Payment]:
+    """Obtiene el pago con el tercero cargado (lo usan las descripciones del preview)"""
+    result = await db.execute(
+        select(Payment).options(joinedload(Payment.third_party)).where(Payment.id == payment_id)
+    )
+    return result.scalar_one_or_none()
+
+
+async def _get_invoice(db: AsyncSession, invoice_id: str) -> Optional[Invoice]:
+    """Obtiene la factura con tercero y líneas cargados para la determinación de cuentas"""
+    result = await db.execute(
+        select(Invoice).options(
+            joinedload(Invoice.third_party),
+            selectinload(Invoice.lines)
+        ).where(Invoice.id == invoice_id)
+    )
+    return result.scalar_one_or_none()
+
+
 def _convert_payment_accounts_to_suggestions(accounts: Dict) -> PaymentAccountSuggestions:
     """Convierte las cuentas determinadas a esquemas de sugerencias"""
     
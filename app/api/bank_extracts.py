@@ -7,9 +7,10 @@ from typing import Optional, List
 from datetime import date
 from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from fastapi import status as http_status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.database import get_db
 from app.models.bank_extract import BankExtractStatus
 from app.schemas.bank_extract import (
     BankExtractCreate, BankExtractUpdate, BankExtractResponse,
@@ -20,7 +21,7 @@ from app.schemas.bank_extract import (
 )
 from app.services.bank_extract_service import BankExtractService
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, get_db
 from app.models.user import User
 
 router = APIRouter()
@@ -30,7 +31,7 @@ router = APIRouter()
 async def import_bank_extract(
     extract_data: BankExtractImport,
     file: Optional[UploadFile] = File(None),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -51,7 +52,7 @@ async def import_bank_extract(
             if not extract_data.file_name:
                 extract_data.file_name = file.filename
         
-        return service.import_bank_extract(extract_data, current_user.id, file_content)
+        return await service.import_bank_extract(extract_data, current_user.id, file_content)
         
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -60,9 +61,9 @@ async def import_bank_extract(
 
 
 @router.post("/", response_model=BankExtractResponse, status_code=http_status.HTTP_201_CREATED)
-def create_bank_extract(
+async def create_bank_extract(
     extract_data: BankExtractCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -72,7 +73,7 @@ def create_bank_extract(
     """
     try:
         service = BankExtractService(db)
-        return service.create_extract(extract_data, current_user.id)
+        return await service.create_extract(extract_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except (ValidationError, BusinessRuleError) as e:
@@ -80,14 +81,14 @@ def create_bank_extract(
 
 
 @router.get("/", response_model=BankExtractListResponse)
-def get_bank_extracts(
+async def get_bank_extracts(
     account_id: Optional[uuid.UUID] = Query(None, description="Filter by account ID"),
     status: Optional[BankExtractStatus] = Query(None, description="Filter by extract status"),
     date_from: Optional[date] = Query(None, description="Filter extracts from this date"),
     date_to: Optional[date] = Query(None, description="Filter extracts to this date"),
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -97,7 +98,7 @@ def get_bank_extracts(
     """
     try:
         service = BankExtractService(db)
-        return service.get_extracts(
+        return await service.get_extracts(
             account_id=account_id,
             status=status,
             date_from=date_from,
@@ -110,23 +111,23 @@ def get_bank_extracts(
 
 
 @router.get("/{extract_id}", response_model=BankExtractResponse)
-def get_bank_extract(
+async def get_bank_extract(
     extract_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener extracto bancario por ID"""
     try:
         service = BankExtractService(db)
-        return service.get_extract(extract_id)
+        return await service.get_extract(extract_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.get("/{extract_id}/with-lines", response_model=BankExtractWithLines)
-def get_bank_extract_with_lines(
+async def get_bank_extract_with_lines(
     extract_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -136,16 +137,16 @@ def get_bank_extract_with_lines(
     """
     try:
         service = BankExtractService(db)
-        return service.get_extract_with_lines(extract_id)
+        return await service.get_extract_with_lines(extract_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.post("/{extract_id}/lines", response_model=BankExtractLineResponse, status_code=http_status.HTTP_201_CREATED)
-def add_extract_line(
+async def add_extract_line(
     extract_id: uuid.UUID,
     line_data: BankExtractLineCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -155,7 +156,7 @@ def add_extract_line(
     """
     try:
         service = BankExtractService(db)
-        return service.add_extract_line(extract_id, line_data, current_user.id)
+        return await service.add_extract_line(extract_id, line_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -163,9 +164,9 @@ def add_extract_line(
 
 
 @router.post("/{extract_id}/validate", response_model=BankExtractValidation)
-def validate_bank_extract(
+async def validate_bank_extract(
     extract_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -176,15 +177,15 @@ def validate_bank_extract(
     """
     try:
         service = BankExtractService(db)
-        return service.validate_extract(extract_id)
+        return await service.validate_extract(extract_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.post("/{extract_id}/start-reconciliation", response_model=BankExtractResponse)
-def start_reconciliation_process(
+async def start_reconciliation_process(
     extract_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -197,7 +198,7 @@ def start_reconciliation_process(
     """
     try:
         service = BankExtractService(db)
-        return service.start_reconciliation_process(extract_id)
+        return await service.start_reconciliation_process(extract_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -205,9 +206,9 @@ def start_reconciliation_process(
 
 
 @router.post("/{extract_id}/close", response_model=BankExtractResponse)
-def close_bank_extract(
+async def close_bank_extract(
     extract_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -220,7 +221,7 @@ def close_bank_extract(
     """
     try:
         service = BankExtractService(db)
-        return service.close_extract(extract_id, current_user.id)
+        return await service.close_extract(extract_id, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -228,11 +229,11 @@ def close_bank_extract(
 
 
 @router.get("/summary/statistics", response_model=BankExtractSummary)
-def get_bank_extract_summary(
+async def get_bank_extract_summary(
     account_id: Optional[uuid.UUID] = Query(None, description="Filter by account ID"),
     date_from: Optional[date] = Query(None, description="Filter extracts from this date"),
     date_to: Optional[date] = Query(None, description="Filter extracts to this date"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -245,15 +246,15 @@ def get_bank_extract_summary(
         from app.models.bank_extract import BankExtract, BankExtractLine
         from decimal import Decimal
         
-        query = db.query(BankExtract)
+        query = select(BankExtract).options(selectinload(BankExtract.extract_lines))
         if account_id:
-            query = query.filter(BankExtract.account_id == account_id)
+            query = query.where(BankExtract.account_id == account_id)
         if date_from:
-            query = query.filter(BankExtract.statement_date >= date_from)
+            query = query.where(BankExtract.statement_date >= date_from)
         if date_to:
-            query = query.filter(BankExtract.statement_date <= date_to)
+            query = query.where(BankExtract.statement_date <= date_to)
             
-        extracts = query.all()
+        extracts = (await db.execute(query)).scalars().all()
         
         total_lines = sum(len(e.extract_lines) for e in extracts)
         reconciled_lines = sum(
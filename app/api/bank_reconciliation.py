@@ -6,7 +6,7 @@ import uuid
 from typing import List, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query
 from fastapi import status as http_status
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.api.deps import get_current_user, get_db
 from app.models.user import User
@@ -27,7 +27,7 @@ router = APIRouter()
 @router.post("/", response_model=BankReconciliationResponse, status_code=http_status.HTTP_201_CREATED)
 async def create_reconciliation(
     reconciliation_data: BankReconciliationCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -46,7 +46,7 @@ async def create_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliation = service.create_reconciliation(reconciliation_data, current_user.id)
+        reconciliation = await service.create_reconciliation(reconciliation_data, current_user.id)
         return reconciliation
     except (NotFoundError, ValidationError, BusinessRuleError) as e:
         raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -61,7 +61,7 @@ async def list_reconciliations(
     status: Optional[str] = Query(None, description="Filter by reconciliation status"),
     account_id: Optional[uuid.UUID] = Query(None, description="Filter by account ID"),
     extract_id: Optional[uuid.UUID] = Query(None, description="Filter by bank extract ID"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -81,7 +81,7 @@ async def list_reconciliations(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliations = service.list_reconciliations(
+        reconciliations = await service.list_reconciliations(
             skip=skip,
             limit=limit,
             status=status,
@@ -96,7 +96,7 @@ async def list_reconciliations(
 @router.get("/{reconciliation_id}", response_model=BankReconciliationResponse)
 async def get_reconciliation(
     reconciliation_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -115,7 +115,7 @@ async def get_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliation = service.get_reconciliation(reconciliation_id)
+        reconciliation = await service.get_reconciliation(reconciliation_id)
         return reconciliation
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -127,7 +127,7 @@ async def get_reconciliation(
 async def update_reconciliation(
     reconciliation_id: uuid.UUID,
     reconciliation_data: BankReconciliationUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -147,7 +147,7 @@ async def update_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliation = service.update_reconciliation(reconciliation_id, reconciliation_data, current_user.id)
+        reconciliation = await service.update_reconciliation(reconciliation_id, reconciliation_data, current_user.id)
         return reconciliation
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -160,7 +160,7 @@ async def update_reconciliation(
 @router.delete("/{reconciliation_id}", status_code=http_status.HTTP_204_NO_CONTENT)
 async def delete_reconciliation(
     reconciliation_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -176,7 +176,7 @@ async def delete_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        service.delete_reconciliation(reconciliation_id, current_user.id)
+        await service.delete_reconciliation(reconciliation_id, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -188,7 +188,7 @@ async def delete_reconciliation(
 @router.post("/auto-reconcile", response_model=BankReconciliationAutoResponse)
 async def auto_reconcile(
     auto_request: BankReconciliationAutoRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -207,7 +207,7 @@ async def auto_reconcile(
     """
     try:
         service = BankReconciliationService(db)
-        result = service.auto_reconcile(
+        result = await service.auto_reconcile(
             extract_id=auto_request.extract_id,
             account_id=auto_request.account_id,
             tolerance_amount=auto_request.tolerance_amount,
@@ -224,7 +224,7 @@ async def auto_reconcile(
 @router.post("/{reconciliation_id}/confirm", response_model=BankReconciliationResponse)
 async def confirm_reconciliation(
     reconciliation_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -243,7 +243,7 @@ async def confirm_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliation = service.confirm_reconciliation(reconciliation_id, current_user.id)
+        reconciliation = await service.confirm_reconciliation(reconciliation_id, current_user.id)
         return reconciliation
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -256,7 +256,7 @@ async def confirm_reconciliation(
 @router.post("/{reconciliation_id}/cancel", response_model=BankReconciliationResponse)
 async def cancel_reconciliation(
     reconciliation_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -275,7 +275,7 @@ async def cancel_reconciliation(
     """
     try:
         service = BankReconciliationService(db)
-        reconciliation = service.cancel_reconciliation(reconciliation_id, current_user.id)
+        reconciliation = await service.cancel_reconciliation(reconciliation_id, current_user.id)
         return reconciliation
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -13,6 +13,7 @@ import jwt
 from app.core.settings import settings
 from app.database import get_async_db
 from app.models.user import User, UserRole
+from app.services.principal_cache import principal_cache
 
 # Security scheme
 security = HTTPBearer()
@@ -44,13 +45,22 @@ async def get_current_user(
     except jwt.PyJWTError:
         raise credentials_exception
     
+    user_uuid = uuid.UUID(user_id)
+    
+    # Usuarios recientes se resuelven desde la caché por proceso, sin consulta
+    user = principal_cache.get(user_uuid)
+    if user is not None:
+        return user
+    
     # Get user from database
-    result = await db.execute(select(User).where(User.id == uuid.UUID(user_id)))
+    generation = principal_cache.generation
+    result = await db.execute(select(User).where(User.id == user_uuid))
     user = result.scalar_one_or_none()
     
     if user is None:
         raise credentials_exception
     
+    principal_cache.put(user, generation)
     return user
 
 
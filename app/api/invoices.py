@@ -8,9 +8,10 @@ from datetime import date, datetime
 from decimal import Decimal
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import status as http_status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
-from app.database import get_db
 from app.models.invoice import Invoice, InvoiceStatus, InvoiceType
 from app.schemas.invoice import (
     InvoiceCreate, InvoiceUpdate, InvoiceResponse,
@@ -25,17 +26,18 @@ from app.schemas.invoice import (
     BulkOperationResult, InvoiceDeleteValidation
 )
 from app.services.invoice_service import InvoiceService
-from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
-from app.api.deps import get_current_user
+from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError, raise_validation_error
+from app.utils.responses import model_response
+from app.api.deps import get_current_user, get_db
 from app.models.user import User
 
 router = APIRouter()
 
 
 @router.post("/", response_model=InvoiceWithLines, status_code=http_status.HTTP_201_CREATED)
-def create_invoice(
+async def create_invoice(
     invoice_data: InvoiceCreateWithLines,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -53,7 +55,7 @@ def create_invoice(
     """
     try:
         service = InvoiceService(db)
-        return service.create_invoice_with_lines(invoice_data, current_user.id)
+        return await service.create_invoice_with_lines(invoice_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except (ValidationError, BusinessRuleError) as e:
@@ -61,9 +63,9 @@ def create_invoice(
 
 
 @router.post("/legacy", response_model=InvoiceResponse, status_code=http_status.HTTP_201_CREATED)
-def create_invoice_legacy(
+async def create_invoice_legacy(
     invoice_data: InvoiceCreateLegacy,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -91,7 +93,7 @@ def create_invoice_legacy(
         new_data = InvoiceCreate(**new_data_dict)
         
         service = InvoiceService(db)
-        return service.create_invoice(new_data, current_user.id)
+        return await service.create_invoice(new_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except (ValidationError, BusinessRuleError) as e:
@@ -99,9 +101,9 @@ def create_invoice_legacy(
 
 
 @router.post("/header-only", response_model=InvoiceResponse, status_code=http_status.HTTP_201_CREATED)
-def create_invoice_header_only(
+async def create_invoice_header_only(
     invoice_data: InvoiceCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -114,7 +116,7 @@ def create_invoice_header_only(
     """
     try:
         service = InvoiceService(db)
-        return service.create_invoice(invoice_data, current_user.id)
+        return await service.create_invoice(invoice_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except (ValidationError, BusinessRuleError) as e:
@@ -122,9 +124,9 @@ def create_invoice_header_only(
 
 
 @router.post("/with-lines-alt", response_model=InvoiceWithLines, status_code=http_status.HTTP_201_CREATED)
-def create_invoice_with_lines(
+async def create_invoice_with_lines(
     invoice_data: InvoiceCreateWithLines,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -134,7 +136,7 @@ def create_invoice_with_lines(
     """
     try:
         service = InvoiceService(db)
-        return service.create_invoice_with_lines(invoice_data, current_user.id)
+        return await service.create_invoice_with_lines(invoice_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except (ValidationError, BusinessRuleError) as e:
@@ -142,7 +144,7 @@ def create_invoice_with_lines(
 
 
 @router.get("/", response_model=InvoiceListResponse)
-def get_invoices(
+async def get_invoices(
     # Parámetros de paginación
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=1000, description="Page size"),
@@ -171,11 +173,12 @@ def get_invoices(
     # Ordenamiento
     sort_by: Optional[str] = Query("invoice_date", description="Field to sort by (invoice_date, number, total_amount, status, created_at, due_date)"),
     sort_order: Optional[str] = Query("desc", description="Sort order (asc, desc)"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor (empty for the first page); ignores page"),
     
     # Parámetro legacy para compatibilidad
     customer_id: Optional[uuid.UUID] = Query(None, description="Filter by customer ID (legacy, use third_party_id)"),
     
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -209,6 +212,10 @@ def get_invoices(
     - sort_by: Campo de ordenamiento (por defecto: invoice_date)
     - sort_order: Dirección (asc/desc, por defecto: desc)
     
+    **Paginación por cursor:**
+    - cursor: vacío para la primera página; luego el `next_cursor` de la respuesta
+      (hasta que sea nulo). No usa OFFSET y el total es una estimación
+    
     **Ejemplos de uso:**
     - `/invoices?invoice_number=FAC-001` - Buscar facturas que contengan "FAC-001"
     - `/invoices?date_from=2024-01-01&date_to=2024-12-31` - Facturas del año 2024
@@ -223,7 +230,7 @@ def get_invoices(
         # Usar third_party_id si se proporciona, sino customer_id (legacy)
         filter_third_party_id = third_party_id or customer_id
         
-        return service.get_invoices(
+        invoices = await service.get_invoices(
             skip=skip,
             limit=size,
             third_party_id=filter_third_party_id,
@@ -240,8 +247,13 @@ def get_invoices(
             currency_code=currency_code,
             created_by_id=created_by_id,
             sort_by=sort_by,
-            sort_order=sort_order
+            sort_order=sort_order,
+            cursor=cursor
         )
+        # Ya validado por el servicio: se serializa una sola vez con pydantic-core
+        return model_response(invoices)
+    except ValidationError as e:
+        raise_validation_error(str(e))
     except Exception as e:
         raise HTTPException(status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
@@ -251,10 +263,10 @@ def get_invoices(
 # ================================
 
 @router.post("/bulk/validate", response_model=dict)
-def validate_bulk_operation(
+async def validate_bulk_operation(
     operation: str = Query(..., description="Operation to validate: post, cancel, reset, delete"),
     invoice_ids: List[uuid.UUID] = Query(..., description="List of invoice IDs to validate"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -269,7 +281,7 @@ def validate_bulk_operation(
                               detail="Maximum 100 invoices per validation")
         
         service = InvoiceService(db)
-        return service.validate_bulk_operation(invoice_ids, operation)
+        return await service.validate_bulk_operation(invoice_ids, operation)
         
     except ValueError as e:
         raise HTTPException(status_code=http_status.HTTP_400_BAD_REQUEST, detail=str(e))
@@ -278,9 +290,9 @@ def validate_bulk_operation(
 
 
 @router.post("/bulk/post", response_model=BulkOperationResult)
-def bulk_post_invoices(
+async def bulk_post_invoices(
     request_data: BulkInvoicePostRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -302,7 +314,7 @@ def bulk_post_invoices(
     """
     try:
         service = InvoiceService(db)
-        result = service.bulk_post_invoices(
+        result = await service.bulk_post_invoices(
             invoice_ids=request_data.invoice_ids,
             posted_by_id=current_user.id,
             posting_date=request_data.posting_date,
@@ -320,9 +332,9 @@ def bulk_post_invoices(
 
 
 @router.post("/bulk/cancel", response_model=BulkOperationResult)
-def bulk_cancel_invoices(
+async def bulk_cancel_invoices(
     request_data: BulkInvoiceCancelRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -345,7 +357,7 @@ def bulk_cancel_invoices(
     """
     try:
         service = InvoiceService(db)
-        result = service.bulk_cancel_invoices(
+        result = await service.bulk_cancel_invoices(
             invoice_ids=request_data.invoice_ids,
             cancelled_by_id=current_user.id,
             reason=request_data.reason,
@@ -361,9 +373,9 @@ def bulk_cancel_invoices(
 
 
 @router.post("/bulk/reset-to-draft", response_model=BulkOperationResult)
-def bulk_reset_invoices_to_draft(
+async def bulk_reset_invoices_to_draft(
     request_data: BulkInvoiceResetToDraftRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -387,7 +399,7 @@ def bulk_reset_invoices_to_draft(
     """
     try:
         service = InvoiceService(db)
-        result = service.bulk_reset_to_draft_invoices(
+        result = await service.bulk_reset_to_draft_invoices(
             invoice_ids=request_data.invoice_ids,
             reset_by_id=current_user.id,
             reason=request_data.reason,
@@ -404,9 +416,9 @@ def bulk_reset_invoices_to_draft(
 
 
 @router.delete("/bulk/delete", response_model=BulkOperationResult)
-def bulk_delete_invoices(
+async def bulk_delete_invoices(
     request_data: BulkInvoiceDeleteRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -429,7 +441,7 @@ def bulk_delete_invoices(
     """
     try:
         service = InvoiceService(db)
-        result = service.bulk_delete_invoices(
+        result = await service.bulk_delete_invoices(
             invoice_ids=request_data.invoice_ids,
             deleted_by_id=current_user.id,
             reason=request_data.reason
@@ -449,23 +461,23 @@ def bulk_delete_invoices(
 
 
 @router.get("/{invoice_id}", response_model=InvoiceResponse)
-def get_invoice(
+async def get_invoice(
     invoice_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """Obtener factura por ID"""
     try:
         service = InvoiceService(db)
-        return service.get_invoice(invoice_id)
+        return await service.get_invoice(invoice_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.get("/{invoice_id}/with-lines", response_model=InvoiceWithLines)
-def get_invoice_with_lines(
+async def get_invoice_with_lines(
     invoice_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -475,16 +487,16 @@ def get_invoice_with_lines(
     """
     try:
         service = InvoiceService(db)
-        return service.get_invoice_with_lines(invoice_id)
+        return await service.get_invoice_with_lines(invoice_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.put("/{invoice_id}", response_model=InvoiceResponse)
-def update_invoice(
+async def update_invoice(
     invoice_id: uuid.UUID,
     invoice_data: InvoiceUpdate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -494,7 +506,7 @@ def update_invoice(
     """
     try:
         service = InvoiceService(db)
-        return service.update_invoice(invoice_id, invoice_data)
+        return await service.update_invoice(invoice_id, invoice_data)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -502,10 +514,10 @@ def update_invoice(
 
 
 @router.post("/{invoice_id}/lines", response_model=InvoiceLineResponse, status_code=http_status.HTTP_201_CREATED)
-def add_invoice_line(
+async def add_invoice_line(
     invoice_id: uuid.UUID,
     line_data: InvoiceLineCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -515,7 +527,7 @@ def add_invoice_line(
     """
     try:
         service = InvoiceService(db)
-        return service.add_invoice_line(invoice_id, line_data, current_user.id)
+        return await service.add_invoice_line(invoice_id, line_data, current_user.id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except BusinessRuleError as e:
@@ -523,9 +535,9 @@ def add_invoice_line(
 
 
 @router.post("/{invoice_id}/calculate-totals", response_model=InvoiceResponse)
-def calculate_invoice_totals(
+async def calculate_invoice_totals(
     invoice_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -535,16 +547,16 @@ def calculate_invoice_totals(
     """
     try:
         service = InvoiceService(db)
-        return service.calculate_invoice_totals(invoice_id)
+        return await service.calculate_invoice_totals(invoice_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
 
 
 @router.post("/{invoice_id}/post", response_model=InvoiceResponse)
-def post_invoice(
+async def post_invoice(
     invoice_id: uuid.UUID,
     request_data: Optional[InvoicePostRequest] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -564,7 +576,7 @@ def post_invoice(
         service = InvoiceService(db)
         
         # Usar el método que implementa la lógica completa de Odoo
-        return service.post_invoice(invoice_id, current_user.id)
+        return await service.post_invoice(invoice_id, current_user.id)
         
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -573,10 +585,10 @@ def post_invoice(
 
 
 @router.post("/{invoice_id}/cancel", response_model=InvoiceResponse)
-def cancel_invoice(
+async def cancel_invoice(
     invoice_id: uuid.UUID,
     request_data: Optional[InvoiceCancelRequest] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -597,7 +609,7 @@ def cancel_invoice(
         if request_data:
             reason = request_data.reason
         
-        return service.cancel_invoice(invoice_id, current_user.id, reason)
+        return await service.cancel_invoice(invoice_id, current_user.id, reason)
         
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -606,9 +618,9 @@ def cancel_invoice(
 
 
 @router.post("/{invoice_id}/reset-to-draft", response_model=InvoiceResponse)
-def reset_invoice_to_draft(
+async def reset_invoice_to_draft(
     invoice_id: uuid.UUID,    request_data: Optional[InvoiceResetToDraftRequest] = None,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -635,7 +647,7 @@ def reset_invoice_to_draft(
         if request_data:
             reason = request_data.reason
         
-        return service.reset_to_draft(invoice_id, current_user.id, reason)
+        return await service.reset_to_draft(invoice_id, current_user.id, reason)
         
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
@@ -644,9 +656,9 @@ def reset_invoice_to_draft(
 
 
 @router.get("/{invoice_id}/workflow-status", response_model=dict)
-def get_invoice_workflow_status(
+async def get_invoice_workflow_status(
     invoice_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -660,7 +672,7 @@ def get_invoice_workflow_status(
     """
     try:
         service = InvoiceService(db)
-        invoice = service.get_invoice(invoice_id)
+        invoice = await service.get_invoice(invoice_id)
         
         # Definir transiciones válidas según el estado actual
         valid_transitions = []
@@ -696,13 +708,13 @@ def get_invoice_workflow_status(
 
 
 @router.get("/summary/statistics", response_model=InvoiceSummary)
-def get_invoice_summary(
+async def get_invoice_summary(
     customer_id: Optional[uuid.UUID] = Query(None, description="Filter by customer ID (legacy, use third_party_id)"),
     third_party_id: Optional[uuid.UUID] = Query(None, description="Filter by third party ID"),
     invoice_type: Optional[InvoiceType] = Query(None, description="Filter by invoice type"),
     date_from: Optional[date] = Query(None, description="Filter invoices from this date"),
     date_to: Optional[date] = Query(None, description="Filter invoices to this date"),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -717,21 +729,21 @@ def get_invoice_summary(
         from app.models.invoice import Invoice
         from decimal import Decimal
         
-        query = db.query(Invoice)
+        query = select(Invoice)
         
         # Usar third_party_id si se proporciona, sino customer_id (legacy)
         filter_third_party_id = third_party_id or customer_id
         
         if filter_third_party_id:
-            query = query.filter(Invoice.third_party_id == filter_third_party_id)
+            query = query.where(Invoice.third_party_id == filter_third_party_id)
         if invoice_type:
-            query = query.filter(Invoice.invoice_type == invoice_type)
+            query = query.where(Invoice.invoice_type == invoice_type)
         if date_from:
-            query = query.filter(Invoice.invoice_date >= date_from)
+            query = query.where(Invoice.invoice_date >= date_from)
         if date_to:
-            query = query.filter(Invoice.invoice_date <= date_to)
+            query = query.where(Invoice.invoice_date <= date_to)
             
-        invoices = query.all()
+        invoices = (await db.execute(query)).scalars().all()
         
         total_amount = Decimal(str(sum(i.total_amount or 0 for i in invoices)))
         paid_amount = Decimal(str(sum(i.paid_amount or 0 for i in invoices)))
@@ -785,9 +797,9 @@ def get_invoice_statuses():
 
 
 @router.get("/{invoice_id}/payment-schedule-preview", response_model=List[dict])
-def get_payment_schedule_preview(
+async def get_payment_schedule_preview(
     invoice_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -802,7 +814,7 @@ def get_payment_schedule_preview(
     """
     try:
         service = InvoiceService(db)
-        return service.get_payment_schedule_preview(invoice_id)
+        return await service.get_payment_schedule_preview(invoice_id)
     except NotFoundError as e:
         raise HTTPException(status_code=http_status.HTTP_404_NOT_FOUND, detail=str(e))
     except Exception as e:
@@ -810,9 +822,9 @@ def get_payment_schedule_preview(
 
 
 @router.get("/payment-terms/{payment_terms_id}/validate", response_model=dict)
-def validate_payment_terms(
+async def validate_payment_terms(
     payment_terms_id: uuid.UUID,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -823,7 +835,7 @@ def validate_payment_terms(
     """
     try:
         service = InvoiceService(db)
-        is_valid, errors = service.validate_payment_terms(payment_terms_id)
+        is_valid, errors = await service.validate_payment_terms(payment_terms_id)
         return {
             "is_valid": is_valid,
             "errors": errors
@@ -833,9 +845,9 @@ def validate_payment_terms(
 
 
 @router.post("/validate-deletion", response_model=List[InvoiceDeleteValidation])
-def validate_invoices_deletion(
+async def validate_invoices_deletion(
     invoice_ids: List[uuid.UUID],
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -853,7 +865,10 @@ def validate_invoices_deletion(
     for invoice_id in invoice_ids:
         try:
             # Buscar la factura
-            invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            result = await db.execute(
+                select(Invoice).options(selectinload(Invoice.lines)).where(Invoice.id == invoice_id)
+            )
+            invoice = result.scalar_one_or_none()
             
             if not invoice:
                 validations.append(InvoiceDeleteValidation(
@@ -886,7 +901,7 @@ def validate_invoices_deletion(
                 dependencies["journal_entry_id"] = str(invoice.journal_entry_id)
             
             # Verificar si tiene pagos aplicados
-            result = db.execute(text("""
+            result = await db.execute(text("""
                 SELECT COUNT(*) 
                 FROM payments p
                 INNER JOIN payment_lines pl ON p.id = pl.payment_id
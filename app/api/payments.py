@@ -20,7 +20,7 @@ from app.schemas.payment import (
 )
 from app.services.payment_service import PaymentService
 from app.services.payment_flow_service import PaymentFlowService
-from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
+from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError, raise_validation_error
 from app.api.deps import get_current_user
 from app.models.user import User
 from app.utils.logging import get_logger
@@ -513,6 +513,7 @@ async def get_payments(
     date_to: Optional[date] = Query(None, description="Filter payments to this date"),
     page: int = Query(1, ge=1, description="Page number"),
     size: int = Query(50, ge=1, le=100, description="Page size"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor (empty for the first page); ignores page"),
     db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -520,6 +521,8 @@ async def get_payments(
     Obtener lista de pagos con filtros
     
     Permite filtrar por cliente, estado, rango de fechas, etc.
+    Con `cursor` la paginación es por clave: se sigue `next_cursor` hasta que
+    sea nulo y el total es una estimación.
     """
     try:
         service = PaymentService(db)
@@ -529,8 +532,11 @@ async def get_payments(
             date_from=date_from,
             date_to=date_to,
             page=page,
-            size=size
+            size=size,
+            cursor=cursor
         )
+    except ValidationError as e:
+        raise_validation_error(str(e))
     except Exception as e:
         raise HTTPException(status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
 
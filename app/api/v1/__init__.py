@@ -3,10 +3,11 @@ API v1 router configuration.
 """
 from fastapi import APIRouter
 
+from app.core.settings import settings
 from app.api.v1 import (
     accounts, auth, users, journal_entries, reports, report_api, 
     export_templates, export, cost_centers, third_parties, cost_center_reports,
-    products, journals, generic_import, import_templates, chat, company_settings
+    products, journals, generic_import, import_templates, company_settings
 )
 from app.api import payment_terms, payments, invoices, bank_extracts, bank_reconciliation, nfe, account_determination
 from app.routers import currency
@@ -86,4 +87,7 @@ api_router.include_router(generic_import.router, prefix="/generic-import", tags=
 api_router.include_router(import_templates.router, prefix="/import", tags=["import-templates"])
 
 # AI Chat system - Multilingual chat with function calling
-api_router.include_router(chat.router, prefix="/ai", tags=["ai-chat"])
\ No newline at end of file
+# Opcional: los servicios de IA se importan en la primera petición
+if settings.AI_CHAT_ENABLED:
+    from app.api.v1 import chat
+    api_router.include_router(chat.router, prefix="/ai", tags=["ai-chat"])
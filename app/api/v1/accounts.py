@@ -17,6 +17,7 @@ from app.schemas.account import (
     BulkAccountDeleteResult, AccountDeleteValidation
 )
 from app.services.account_service import AccountService
+from app.utils.responses import model_response
 from app.utils.exceptions import (
     AccountNotFoundError, 
     AccountValidationError,
@@ -106,7 +107,7 @@ async def get_chart_of_accounts(
     Obtener el plan de cuentas completo organizado por tipo.
     """
     account_service = AccountService(db)
-    return await account_service.get_chart_of_accounts()
+    return model_response(await account_service.get_chart_of_accounts())
 
 
 @router.get("/stats", response_model=AccountStats)
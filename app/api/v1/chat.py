@@ -5,13 +5,21 @@ from fastapi import APIRouter, HTTPException
 import logging
 
 from app.schemas.chat import ChatRequest, ChatResponse, ChatHealthResponse
-from app.services.hybrid_chat_service import hybrid_chat_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
+def get_chat_service():
+    """
+    Servicio de chat importado en el primer uso, para que los workers que no
+    usan el chat no paguen la importación de los clientes de IA al arrancar
+    """
+    from app.services.hybrid_chat_service import hybrid_chat_service
+    return hybrid_chat_service
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     """
@@ -30,7 +38,7 @@ async def chat_endpoint(request: ChatRequest):
             raise HTTPException(status_code=400, detail="El mensaje no puede estar vacío")
         
         # Generar respuesta usando el servicio híbrido
-        response_data = await hybrid_chat_service.generate_response(request.message)
+        response_data = await get_chat_service().generate_response(request.message)
         
         return ChatResponse(**response_data)
         
@@ -52,7 +60,7 @@ async def chat_health():
     Retorna información sobre la disponibilidad de OpenAI y el sistema fallback
     """
     try:
-        health_data = hybrid_chat_service.get_health_status()
+        health_data = get_chat_service().get_health_status()
         return ChatHealthResponse(**health_data)
         
     except Exception as e:
@@ -80,7 +88,7 @@ async def test_chat():
         
         for message in test_messages:
             logger.info(f"Probando mensaje: {message}")
-            response_data = await hybrid_chat_service.generate_response(message)
+            response_data = await get_chat_service().generate_response(message)
             
             results.append({
                 "input": message,
@@ -91,7 +99,7 @@ async def test_chat():
         
         return {
             "test_results": results,
-            "system_health": hybrid_chat_service.get_health_status()
+            "system_health": get_chat_service().get_health_status()
         }
         
     except Exception as e:
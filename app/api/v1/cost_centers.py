@@ -73,6 +73,7 @@ async def get_cost_centers(
     is_root: Optional[bool] = Query(None, description="Filter by root nodes (cost centers without parent)"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor (empty for the first page); ignores skip"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> CostCenterListResponse:
@@ -90,13 +91,19 @@ async def get_cost_centers(
     )
     
     service = CostCenterService(db)
-    cost_centers_list = await service.get_cost_centers_list(filter_params, skip, limit)
+    try:
+        cost_centers_list = await service.get_cost_centers_list(filter_params, skip, limit, cursor)
+    except ValidationError as e:
+        raise_validation_error(str(e))
     
     return CostCenterListResponse(
         items=cost_centers_list.cost_centers,
         total=cost_centers_list.total,
         skip=skip,
-        limit=limit    )
+        limit=limit,
+        next_cursor=cost_centers_list.next_cursor,
+        total_is_estimate=cost_centers_list.total_is_estimate
+    )
 
 
 @router.get(
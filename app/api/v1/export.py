@@ -5,11 +5,11 @@ import uuid
 from typing import List, Optional, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Body
 from fastapi.responses import JSONResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.api.deps import get_current_active_user
-from app.database import get_db as get_sync_db
+from app.api.deps import get_current_active_user, get_db
 from app.models.user import User, UserRole
 from app.schemas.export_generic import (
     ExportRequest, ExportResponse, ExportFormat, TableName,
@@ -53,8 +53,8 @@ class ExportStatusResponse(BaseModel):
     summary="Get available tables for export",
     description="Returns list of all available tables that can be exported with their schemas"
 )
-def get_available_tables(
-    db: Session = Depends(get_sync_db),
+async def get_available_tables(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtiene todas las tablas disponibles para exportación"""
@@ -63,7 +63,7 @@ def get_available_tables(
         raise_insufficient_permissions()
     
     export_service = ExportService(db)
-    return export_service.get_available_tables()
+    return await export_service.get_available_tables()
 
 
 @router.get(
@@ -72,9 +72,9 @@ def get_available_tables(
     summary="Get table schema",
     description="Returns detailed schema information for a specific table"
 )
-def get_table_schema(
+async def get_table_schema(
     table_name: TableName,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtiene el schema detallado de una tabla específica"""
@@ -84,7 +84,7 @@ def get_table_schema(
     
     try:
         export_service = ExportService(db)
-        return export_service.get_table_schema(table_name)
+        return await export_service.get_table_schema(table_name)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -97,9 +97,9 @@ def get_table_schema(
     summary="Export specific records from any table",
     description="Export specific records by IDs from any available table in CSV, JSON, or XLSX format"
 )
-def export_data(
+async def export_data(
     request: SimpleExportRequest,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exporta registros específicos de cualquier tabla usando lista de IDs"""
@@ -138,7 +138,7 @@ def export_data(
         )
         
         export_service = ExportService(db)
-        result = export_service.export_data(export_request, current_user.id)
+        result = await export_service.export_data(export_request, current_user.id)
         
         # Determinar tipo de respuesta según formato
         if request.format == ExportFormat.JSON:
@@ -215,11 +215,11 @@ def get_export_formats(
     summary="Export specific users",
     description="Export specific users by IDs"
 )
-def export_users(
+async def export_users(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "usuarios",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de usuarios específicos"""
@@ -235,7 +235,7 @@ def export_users(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -243,11 +243,11 @@ def export_users(
     summary="Export specific accounts",
     description="Export specific accounts by IDs"
 )
-def export_accounts(
+async def export_accounts(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "plan_cuentas",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de cuentas específicas"""
@@ -264,7 +264,7 @@ def export_accounts(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -272,11 +272,11 @@ def export_accounts(
     summary="Export specific journal entries",
     description="Export specific journal entries by IDs"
 )
-def export_journal_entries(
+async def export_journal_entries(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "asientos_contables",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de asientos contables específicos"""
@@ -293,7 +293,7 @@ def export_journal_entries(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -301,11 +301,11 @@ def export_journal_entries(
     summary="Export specific payment terms",
     description="Export specific payment terms by IDs"
 )
-def export_payment_terms(
+async def export_payment_terms(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "condiciones_pago",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de condiciones de pago específicas"""
@@ -322,7 +322,7 @@ def export_payment_terms(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -330,11 +330,11 @@ def export_payment_terms(
     summary="Export specific cost centers",
     description="Export specific cost centers by IDs"
 )
-def export_cost_centers(
+async def export_cost_centers(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "centros_costo",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de centros de costo específicos"""
@@ -351,7 +351,7 @@ def export_cost_centers(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -359,11 +359,11 @@ def export_cost_centers(
     summary="Export specific products",
     description="Export specific products by IDs"
 )
-def export_products(
+async def export_products(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "productos",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de productos específicos"""
@@ -380,7 +380,7 @@ def export_products(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -388,11 +388,11 @@ def export_products(
     summary="Export specific third parties",
     description="Export specific third parties by IDs"
 )
-def export_third_parties(
+async def export_third_parties(
     format: ExportFormat,
     ids: List[str],
     file_name: Optional[str] = "terceros",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de terceros específicos"""
@@ -409,7 +409,7 @@ def export_third_parties(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.post(
@@ -417,9 +417,9 @@ def export_third_parties(
     summary="Advanced export with complex filters",
     description="Export data with advanced filtering options using request body"
 )
-def export_data_advanced(
+async def export_data_advanced(
     request: ExportRequest,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación avanzada con filtros complejos mediante request body"""
@@ -429,7 +429,7 @@ def export_data_advanced(
     
     try:
         export_service = ExportService(db)
-        result = export_service.export_data(request, current_user.id)
+        result = await export_service.export_data(request, current_user.id)
         
         # Determinar tipo de respuesta según formato
         if request.export_format == ExportFormat.JSON:
@@ -470,9 +470,9 @@ def export_data_advanced(
     summary="Bulk export multiple tables",
     description="Export data from multiple tables in a single request, optionally compressed in ZIP"
 )
-def export_bulk_data(
+async def export_bulk_data(
     request: BulkExportRequest,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación masiva de múltiples tablas"""
@@ -517,7 +517,7 @@ def export_bulk_data(
                 file_name=export_req.file_name
             )
             
-            result = export_service.export_data(full_request, current_user.id)
+            result = await export_service.export_data(full_request, current_user.id)
             results.append({
                 "table": export_req.table,
                 "format": export_req.format,
@@ -560,9 +560,9 @@ def export_bulk_data(
     summary="Get export status",
     description="Get the status of an export operation"
 )
-def get_export_status(
+async def get_export_status(
     export_id: str,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener el estado de una exportación"""
@@ -595,9 +595,9 @@ def get_export_status(
     summary="Download exported file",
     description="Download a previously generated export file"
 )
-def download_export_file(
+async def download_export_file(
     export_id: str,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Descargar un archivo de exportación generado previamente"""
@@ -627,8 +627,8 @@ def download_export_file(
     summary="Get export statistics",
     description="Get statistics about export operations"
 )
-def get_export_stats(
-    db: Session = Depends(get_sync_db),
+async def get_export_stats(
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Obtener estadísticas de exportaciones"""
@@ -668,9 +668,9 @@ def get_export_stats(
     summary="Validate export request",
     description="Validate an export request without executing it"
 )
-def validate_export_request(
+async def validate_export_request(
     request: SimpleExportRequest,
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Validar una solicitud de exportación sin ejecutarla"""
@@ -681,7 +681,7 @@ def validate_export_request(
     try:
         # Validar que la tabla existe
         export_service = ExportService(db)
-        table_schema = export_service.get_table_schema(request.table)
+        table_schema = await export_service.get_table_schema(request.table)
         
         # Validar que los IDs son válidos
         valid_ids = []
@@ -721,11 +721,11 @@ def validate_export_request(
     summary="Export products with query parameters",
     description="Export products using GET with query parameters for frontend compatibility"
 )
-def export_products_get(
+async def export_products_get(
     format: ExportFormat,
     ids: Optional[str] = None,  # Comma-separated IDs
     file_name: Optional[str] = "productos",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de productos usando GET con query parameters"""
@@ -743,7 +743,7 @@ def export_products_get(
     if not ids_list:
         # Obtener todos los IDs de productos activos (con límite)
         from app.models.product import Product
-        products = db.query(Product).limit(1000).all()  # Límite de seguridad
+        products = (await db.execute(select(Product).limit(1000))).scalars().all()  # Límite de seguridad
         ids_list = [str(product.id) for product in products]
     
     # Crear request simplificado
@@ -754,7 +754,7 @@ def export_products_get(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.get(
@@ -762,11 +762,11 @@ def export_products_get(
     summary="Export third parties with query parameters",
     description="Export third parties using GET with query parameters for frontend compatibility"
 )
-def export_third_parties_get(
+async def export_third_parties_get(
     format: ExportFormat,
     ids: Optional[str] = None,  # Comma-separated IDs
     file_name: Optional[str] = "terceros",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de terceros usando GET con query parameters"""
@@ -784,7 +784,7 @@ def export_third_parties_get(
     if not ids_list:
         # Obtener todos los IDs de terceros activos (con límite)
         from app.models.third_party import ThirdParty
-        third_parties = db.query(ThirdParty).limit(1000).all()  # Límite de seguridad
+        third_parties = (await db.execute(select(ThirdParty).limit(1000))).scalars().all()  # Límite de seguridad
         ids_list = [str(tp.id) for tp in third_parties]
     
     # Crear request simplificado
@@ -795,7 +795,7 @@ def export_third_parties_get(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.get(
@@ -803,11 +803,11 @@ def export_third_parties_get(
     summary="Export accounts with query parameters", 
     description="Export accounts using GET with query parameters for frontend compatibility"
 )
-def export_accounts_get(
+async def export_accounts_get(
     format: ExportFormat,
     ids: Optional[str] = None,  # Comma-separated IDs
     file_name: Optional[str] = "cuentas",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de cuentas usando GET con query parameters"""
@@ -825,7 +825,7 @@ def export_accounts_get(
     if not ids_list:
         # Obtener todos los IDs de cuentas activas (con límite)
         from app.models.account import Account
-        accounts = db.query(Account).limit(1000).all()  # Límite de seguridad
+        accounts = (await db.execute(select(Account).limit(1000))).scalars().all()  # Límite de seguridad
         ids_list = [str(account.id) for account in accounts]
     
     # Crear request simplificado
@@ -836,7 +836,7 @@ def export_accounts_get(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.get(
@@ -844,11 +844,11 @@ def export_accounts_get(
     summary="Export cost centers with query parameters",
     description="Export cost centers using GET with query parameters for frontend compatibility"
 )
-def export_cost_centers_get(
+async def export_cost_centers_get(
     format: ExportFormat,
     ids: Optional[str] = None,  # Comma-separated IDs
     file_name: Optional[str] = "centros_de_costo",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de centros de costo usando GET con query parameters"""
@@ -866,7 +866,7 @@ def export_cost_centers_get(
     if not ids_list:
         # Obtener todos los IDs de centros de costo activos (con límite)
         from app.models.cost_center import CostCenter
-        cost_centers = db.query(CostCenter).limit(1000).all()  # Límite de seguridad
+        cost_centers = (await db.execute(select(CostCenter).limit(1000))).scalars().all()  # Límite de seguridad
         ids_list = [str(cc.id) for cc in cost_centers]
     
     # Crear request simplificado
@@ -877,7 +877,7 @@ def export_cost_centers_get(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
 
 
 @router.get(
@@ -885,11 +885,11 @@ def export_cost_centers_get(
     summary="Export journal entries with query parameters",
     description="Export journal entries using GET with query parameters for frontend compatibility"
 )
-def export_journal_entries_get(
+async def export_journal_entries_get(
     format: ExportFormat,
     ids: Optional[str] = None,  # Comma-separated IDs
     file_name: Optional[str] = "asientos_contables",
-    db: Session = Depends(get_sync_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Exportación de asientos contables usando GET con query parameters"""
@@ -907,7 +907,7 @@ def export_journal_entries_get(
     if not ids_list:
         # Obtener todos los IDs de asientos contables (con límite)
         from app.models.journal_entry import JournalEntry
-        journal_entries = db.query(JournalEntry).limit(1000).all()  # Límite de seguridad
+        journal_entries = (await db.execute(select(JournalEntry).limit(1000))).scalars().all()  # Límite de seguridad
         ids_list = [str(je.id) for je in journal_entries]
     
     # Crear request simplificado
@@ -918,4 +918,4 @@ def export_journal_entries_get(
         file_name=file_name
     )
     
-    return export_data(request, db, current_user)
+    return await export_data(request, db, current_user)
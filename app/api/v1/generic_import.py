@@ -238,7 +238,17 @@ async def _create_entity_with_auto_fields(model_class, transformed_data: dict, d
             transformed_data['is_active'] = True
         if 'allows_direct_assignment' not in transformed_data:
             transformed_data['allows_direct_assignment'] = True
-    
+
+        new_record = model_class(**transformed_data)
+        db.add(new_record)
+        await db.flush()  # Para obtener el ID
+
+        # La jerarquía se consulta en la clausura: registrar el nuevo nodo bajo su padre
+        from app.services.cost_center_service import CostCenterService
+        await CostCenterService(db)._link_to_parent(new_record.id, new_record.parent_id)
+
+        return new_record
+
     elif model_name == "journals":
         # === IMPORTACIÓN DE DIARIOS CONTABLES ===
         # Aplicar valores por defecto
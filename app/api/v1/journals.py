@@ -17,8 +17,9 @@ from app.schemas.journal import (
 )
 from app.services.journal_service import (
     JournalService, JournalNotFoundError, JournalValidationError, 
-    JournalDuplicateError
+    JournalDuplicateError, journal_keyset
 )
+from app.utils.exceptions import ValidationError
 from app.utils.pagination import PagedResponse, create_paged_response
 
 router = APIRouter()
@@ -75,11 +76,15 @@ async def get_journals(
     limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros"),
     order_by: str = Query("name", description="Campo para ordenar"),
     order_dir: str = Query("asc", regex="^(asc|desc)$", description="Dirección del ordenamiento"),
+    cursor: Optional[str] = Query(None, description="Cursor de paginación por clave (vacío para la primera página); ignora skip"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """
     Obtener lista de diarios con filtros y paginación
+    
+    Con `cursor` la paginación es por clave: se sigue `next_cursor` hasta que
+    sea nulo y el total es una estimación.
     """
     try:
         journal_service = JournalService(db)
@@ -94,7 +99,8 @@ async def get_journals(
             skip=skip,
             limit=limit,
             order_by=order_by,
-            order_dir=order_dir
+            order_dir=order_dir,
+            cursor=cursor
         )
           # Convertir a JournalListItem manejando la serialización correctamente
         journals = []
@@ -114,15 +120,30 @@ async def get_journals(
             
             journals.append(JournalListItem(**journal_dict))
         
-        total = await journal_service.count_journals(filters)
+        if cursor is None:
+            total = await journal_service.count_journals(filters)
+            return create_paged_response(
+                items=journals,
+                total=total,
+                skip=skip,
+                limit=limit
+            )
         
+        total = await journal_service.count_journals(filters, estimate=True)
         return create_paged_response(
             items=journals,
             total=total,
-            skip=skip,
-            limit=limit
+            skip=0,
+            limit=limit,
+            next_cursor=journal_keyset(order_by, order_dir).next_cursor(journals_data, limit),
+            total_is_estimate=True
         )
         
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -3,10 +3,10 @@ from decimal import Decimal
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query
 from fastapi import status as http_status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.api.deps import get_current_user
-from app.database import get_db
+from app.api.deps import get_current_user, get_db
 from app.models.user import User
 from app.models.product import ProductType, ProductStatus, MeasurementUnit, TaxCategory, Product
 from app.models.journal_entry import JournalEntryLine
@@ -15,7 +15,8 @@ from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductRead, ProductSummary, ProductList,
     ProductFilter, ProductMovement, ProductStock, BulkProductOperation,
     BulkProductOperationResult, ProductStats, ProductResponse,
-    ProductDetailResponse, ProductListResponse, ProductDeleteValidation
+    ProductDetailResponse, ProductListResponse, ProductDeleteValidation,
+    StockMovementRead, BulkStockAdjustment
 )
 from app.services.product_service import ProductService
 from app.utils.exceptions import ValidationError
@@ -24,9 +25,9 @@ router = APIRouter()
 
 
 @router.post("/", response_model=ProductResponse, status_code=http_status.HTTP_201_CREATED)
-def create_product(
+async def create_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     product_in: ProductCreate,
     current_user: User = Depends(get_current_user)
 ):
@@ -47,7 +48,7 @@ def create_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.create_product(product_in, current_user.id)
+        product = await product_service.create_product(product_in, current_user.id)
         
         return ProductResponse(
             success=True,
@@ -67,9 +68,9 @@ def create_product(
 
 
 @router.get("/", response_model=ProductListResponse)
-def list_products(
+async def list_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     search: Optional[str] = Query(None, description="Buscar en código, nombre o descripción"),
     product_type: Optional[ProductType] = Query(None, description="Filtrar por tipo de producto"),
@@ -105,7 +106,7 @@ def list_products(
         )
         
         # Obtener productos filtrados
-        result = product_service.filter_products(filters, page, size)
+        result = await product_service.filter_products(filters, page, size)
         
         # Convertir a ProductSummary
         product_summaries = [
@@ -135,9 +136,9 @@ def list_products(
 
 
 @router.get("/search", response_model=List[ProductSummary])
-def search_products(
+async def search_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     q: str = Query(..., min_length=1, description="Término de búsqueda"),
     limit: int = Query(20, ge=1, le=1000, description="Límite de resultados")
@@ -147,7 +148,7 @@ def search_products(
     """
     try:
         product_service = ProductService(db)
-        products = product_service.search_products(q, limit)
+        products = await product_service.search_products(q, limit)
         
         return [ProductSummary.model_validate(product) for product in products]
     except Exception as e:
@@ -158,9 +159,9 @@ def search_products(
 
 
 @router.get("/active", response_model=List[ProductSummary])
-def get_active_products(
+async def get_active_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     limit: Optional[int] = Query(None, ge=1, le=1000, description="Límite de resultados")
 ):
@@ -169,7 +170,7 @@ def get_active_products(
     """
     try:
         product_service = ProductService(db)
-        products = product_service.get_active_products(limit)
+        products = await product_service.get_active_products(limit)
         
         return [ProductSummary.model_validate(product) for product in products]
     except Exception as e:
@@ -180,9 +181,9 @@ def get_active_products(
 
 
 @router.get("/low-stock", response_model=List[ProductStock])
-def get_low_stock_products(
+async def get_low_stock_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -190,7 +191,7 @@ def get_low_stock_products(
     """
     try:
         product_service = ProductService(db)
-        products = product_service.get_low_stock_products()
+        products = await product_service.get_low_stock_products()
         
         return [ProductStock.from_product(product) for product in products]
     except Exception as e:
@@ -201,9 +202,9 @@ def get_low_stock_products(
 
 
 @router.get("/need-reorder", response_model=List[ProductStock])
-def get_products_need_reorder(
+async def get_products_need_reorder(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -211,7 +212,7 @@ def get_products_need_reorder(
     """
     try:
         product_service = ProductService(db)
-        products = product_service.get_products_need_reorder()
+        products = await product_service.get_products_need_reorder()
         
         return [ProductStock.from_product(product) for product in products]
     except Exception as e:
@@ -222,9 +223,9 @@ def get_products_need_reorder(
 
 
 @router.get("/stats", response_model=ProductStats)
-def get_product_stats(
+async def get_product_stats(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -232,7 +233,7 @@ def get_product_stats(
     """
     try:
         product_service = ProductService(db)
-        return product_service.get_product_stats()
+        return await product_service.get_product_stats()
     except Exception as e:
         raise HTTPException(
             status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -241,9 +242,9 @@ def get_product_stats(
 
 
 @router.get("/code/{code}", response_model=ProductDetailResponse)
-def get_product_by_code(
+async def get_product_by_code(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     code: str
 ):
@@ -252,7 +253,7 @@ def get_product_by_code(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.get_product_by_code(code)
+        product = await product_service.get_product_by_code(code)
         
         if not product:
             raise HTTPException(
@@ -261,7 +262,7 @@ def get_product_by_code(
             )
         
         # Obtener movimientos recientes
-        movements = product_service.get_product_movements(product.id, limit=10)
+        movements = await product_service.get_product_movements(product.id, limit=10)
         
         # Convertir movimientos filtrando None
         converted_movements = []
@@ -291,9 +292,9 @@ def get_product_by_code(
 
 
 @router.get("/{product_id}", response_model=ProductDetailResponse)
-def get_product(
+async def get_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID
 ):
@@ -302,7 +303,7 @@ def get_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.get_by_id(product_id)
+        product = await product_service.get_by_id(product_id, load_accounts=True)
         
         if not product:
             raise HTTPException(
@@ -311,7 +312,7 @@ def get_product(
             )
         
         # Obtener movimientos recientes
-        movements = product_service.get_product_movements(product_id, limit=10)
+        movements = await product_service.get_product_movements(product_id, limit=10)
         
         # Convertir movimientos filtrando None
         converted_movements = []
@@ -341,9 +342,9 @@ def get_product(
 
 
 @router.put("/{product_id}", response_model=ProductResponse)
-def update_product(
+async def update_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID,
     product_in: ProductUpdate
@@ -353,7 +354,7 @@ def update_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.update_product(product_id, product_in, current_user.id)
+        product = await product_service.update_product(product_id, product_in, current_user.id)
         
         return ProductResponse(
             success=True,
@@ -373,9 +374,9 @@ def update_product(
 
 
 @router.post("/{product_id}/activate", response_model=ProductResponse)
-def activate_product(
+async def activate_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID
 ):
@@ -384,7 +385,7 @@ def activate_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.activate_product(product_id)
+        product = await product_service.activate_product(product_id)
         
         return ProductResponse(
             success=True,
@@ -404,9 +405,9 @@ def activate_product(
 
 
 @router.post("/{product_id}/deactivate", response_model=ProductResponse)
-def deactivate_product(
+async def deactivate_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID
 ):
@@ -415,7 +416,7 @@ def deactivate_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.deactivate_product(product_id)
+        product = await product_service.deactivate_product(product_id)
         
         return ProductResponse(
             success=True,
@@ -435,9 +436,9 @@ def deactivate_product(
 
 
 @router.post("/{product_id}/discontinue", response_model=ProductResponse)
-def discontinue_product(
+async def discontinue_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID
 ):
@@ -446,7 +447,7 @@ def discontinue_product(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.discontinue_product(product_id)
+        product = await product_service.discontinue_product(product_id)
         
         return ProductResponse(
             success=True,
@@ -466,9 +467,9 @@ def discontinue_product(
 
 
 @router.post("/{product_id}/stock/add", response_model=ProductResponse)
-def add_stock(
+async def add_stock(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID,
     quantity: float = Query(..., gt=0, description="Cantidad a agregar")
@@ -478,7 +479,7 @@ def add_stock(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.update_stock(product_id, Decimal(str(quantity)), "add")
+        product = await product_service.update_stock(product_id, Decimal(str(quantity)), "add")
         
         return ProductResponse(
             success=True,
@@ -498,9 +499,9 @@ def add_stock(
 
 
 @router.post("/{product_id}/stock/subtract", response_model=ProductResponse)
-def subtract_stock(
+async def subtract_stock(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID,
     quantity: float = Query(..., gt=0, description="Cantidad a restar")
@@ -510,7 +511,7 @@ def subtract_stock(
     """
     try:
         product_service = ProductService(db)
-        product = product_service.update_stock(product_id, Decimal(str(quantity)), "subtract")
+        product = await product_service.update_stock(product_id, Decimal(str(quantity)), "subtract")
         
         return ProductResponse(
             success=True,
@@ -529,10 +530,62 @@ def subtract_stock(
         )
 
 
+@router.post("/bulk-stock-update", response_model=BulkProductOperationResult)
+async def bulk_update_stock(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    adjustment: BulkStockAdjustment
+):
+    """
+    Ajustar el stock de varios productos en un solo lote
+    
+    Cantidades con signo: positivas entran (al costo indicado o al precio de
+    compra) y negativas salen al costo promedio. Si algún ajuste deja stock
+    negativo no se aplica ninguno.
+    """
+    try:
+        product_service = ProductService(db)
+        return await product_service.bulk_update_stock(adjustment)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno del servidor: {str(e)}"
+        )
+
+
+@router.get("/{product_id}/stock-movements", response_model=List[StockMovementRead])
+async def get_product_stock_movements(
+    *,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+    product_id: uuid.UUID,
+    limit: int = Query(50, ge=1, le=1000, description="Límite de resultados")
+):
+    """
+    Obtener el libro de movimientos de inventario del producto
+    (stock y costo promedio después de cada movimiento)
+    """
+    try:
+        product_service = ProductService(db)
+        movements = await product_service.get_stock_movements(product_id, limit)
+        return [StockMovementRead.model_validate(movement) for movement in movements]
+    except Exception as e:
+        raise HTTPException(
+            status_code=http_status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno del servidor: {str(e)}"
+        )
+
+
 @router.get("/{product_id}/movements", response_model=List[ProductMovement])
-def get_product_movements(
+async def get_product_movements(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID,
     limit: int = Query(50, ge=1, le=1000, description="Límite de resultados")
@@ -542,7 +595,7 @@ def get_product_movements(
     """
     try:
         product_service = ProductService(db)
-        movements = product_service.get_product_movements(product_id, limit)
+        movements = await product_service.get_product_movements(product_id, limit)
         
         result = []
         for movement in movements:
@@ -558,9 +611,9 @@ def get_product_movements(
 
 
 @router.post("/bulk-operation", response_model=BulkProductOperationResult)
-def bulk_product_operation(
+async def bulk_product_operation(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     operation_data: BulkProductOperation
 ):
@@ -574,7 +627,7 @@ def bulk_product_operation(
     """
     try:
         product_service = ProductService(db)
-        result = product_service.bulk_operation(operation_data)
+        result = await product_service.bulk_operation(operation_data)
         
         return result
     except Exception as e:
@@ -585,9 +638,9 @@ def bulk_product_operation(
 
 
 @router.post("/bulk-delete", response_model=BulkProductOperationResult)
-def bulk_delete_products(
+async def bulk_delete_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_ids: List[uuid.UUID]
 ):
@@ -608,7 +661,7 @@ def bulk_delete_products(
         
         for product_id in product_ids:
             try:
-                product = product_service.get_by_id(product_id)
+                product = await product_service.get_by_id(product_id)
                 if not product:
                     errors.append({
                         "id": product_id,
@@ -617,7 +670,7 @@ def bulk_delete_products(
                     continue
                 
                 # Intentar eliminar - el servicio ya valida las condiciones
-                success = product_service.delete_product(product_id)
+                success = await product_service.delete_product(product_id)
                 if success:
                     successful_deletions.append(product_id)
                 else:
@@ -648,9 +701,9 @@ def bulk_delete_products(
 
 
 @router.post("/validate-deletion", response_model=List[ProductDeleteValidation])
-def validate_products_for_deletion(
+async def validate_products_for_deletion(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_ids: List[uuid.UUID]
 ):
@@ -669,7 +722,7 @@ def validate_products_for_deletion(
         
         for product_id in product_ids:
             try:
-                product = product_service.get_by_id(product_id)
+                product = await product_service.get_by_id(product_id)
                 if not product:
                     validation_results.append(ProductDeleteValidation(
                         product_id=product_id,
@@ -685,9 +738,9 @@ def validate_products_for_deletion(
                 dependencies = {}
                 
                 # Verificar referencias en asientos contables (journal entries)
-                journal_entry_count = db.query(JournalEntryLine).filter(
-                    JournalEntryLine.product_id == product_id
-                ).count()
+                journal_entry_count = await db.scalar(
+                    select(func.count(JournalEntryLine.id)).where(JournalEntryLine.product_id == product_id)
+                ) or 0
                 
                 if journal_entry_count > 0:
                     blocking_reasons.append(f"Producto referenciado en {journal_entry_count} líneas de asientos contables")
@@ -695,7 +748,7 @@ def validate_products_for_deletion(
                 
                 # Verificar referencias en facturas (usando SQL directo si existe la tabla)
                 try:
-                    result = db.execute(text("SELECT COUNT(*) FROM invoice_lines WHERE product_id = :product_id"), 
+                    result = await db.execute(text("SELECT COUNT(*) FROM invoice_lines WHERE product_id = :product_id"), 
                                       {"product_id": str(product_id)})
                     invoice_line_count = result.scalar() or 0
                     if invoice_line_count > 0:
@@ -707,7 +760,7 @@ def validate_products_for_deletion(
                 
                 # Verificar referencias en órdenes de compra (usando SQL directo si existe la tabla)
                 try:
-                    result = db.execute(text("SELECT COUNT(*) FROM purchase_order_lines WHERE product_id = :product_id"), 
+                    result = await db.execute(text("SELECT COUNT(*) FROM purchase_order_lines WHERE product_id = :product_id"), 
                                       {"product_id": str(product_id)})
                     purchase_order_count = result.scalar() or 0
                     if purchase_order_count > 0:
@@ -764,9 +817,9 @@ def validate_products_for_deletion(
 
 
 @router.post("/bulk-deactivate", response_model=BulkProductOperationResult)
-def bulk_deactivate_products(
+async def bulk_deactivate_products(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_ids: List[uuid.UUID]
 ):
@@ -786,7 +839,7 @@ def bulk_deactivate_products(
         
         for product_id in product_ids:
             try:
-                product = product_service.get_by_id(product_id)
+                product = await product_service.get_by_id(product_id)
                 if not product:
                     errors.append({
                         "id": product_id,
@@ -799,7 +852,7 @@ def bulk_deactivate_products(
                     continue
                 
                 # Desactivar producto
-                updated_product = product_service.deactivate_product(product_id)
+                updated_product = await product_service.deactivate_product(product_id)
                 successful_operations.append(product_id)
                 
             except Exception as e:
@@ -824,9 +877,9 @@ def bulk_deactivate_products(
 
 
 @router.delete("/{product_id}", status_code=http_status.HTTP_204_NO_CONTENT)
-def delete_product(
+async def delete_product(
     *,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user),
     product_id: uuid.UUID
 ):
@@ -845,7 +898,7 @@ def delete_product(
         product_service = ProductService(db)
         
         # Verificar que el producto existe
-        product = product_service.get_by_id(product_id)
+        product = await product_service.get_by_id(product_id)
         if not product:
             raise HTTPException(
                 status_code=http_status.HTTP_404_NOT_FOUND,
@@ -854,7 +907,7 @@ def delete_product(
         
         # Eliminar el producto usando el método del servicio
         try:
-            success = product_service.delete_product(product_id)
+            success = await product_service.delete_product(product_id)
             
             if not success:
                 raise HTTPException(
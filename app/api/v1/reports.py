@@ -27,6 +27,7 @@ from app.utils.exceptions import (
     raise_validation_error,
     raise_insufficient_permissions
 )
+from app.utils.responses import model_response
 
 router = APIRouter()
 
@@ -133,7 +134,8 @@ async def get_trial_balance(
             include_zero_balances=include_zero_balances,
             company_name=company_name
         )
-        return trial_balance
+        # Ya validado por el servicio: se serializa una sola vez con pydantic-core
+        return model_response(trial_balance)
     except ReportGenerationError as e:
         raise_validation_error(str(e))
     except Exception as e:
@@ -173,7 +175,8 @@ async def get_general_ledger(
             account_type=account_type,
             company_name=company_name
         )
-        return general_ledger
+        # Ya validado por el servicio: se serializa una sola vez con pydantic-core
+        return model_response(general_ledger)
     except ReportGenerationError as e:
         raise_validation_error(str(e))
     except Exception as e:
@@ -11,12 +11,12 @@ from fastapi.responses import JSONResponse, Response
 
 from app.api.deps import get_db, get_current_active_user
 from app.models.user import User, UserRole
-from app.models.third_party import ThirdPartyType, DocumentType
+from app.models.third_party import ThirdPartyType, DocumentType, OpenItemType
 from app.schemas.third_party import (
     ThirdPartyCreate, ThirdPartyUpdate, ThirdPartyResponse, ThirdPartyDetailResponse,
     ThirdPartyListResponse, ThirdPartyList, ThirdPartyFilter, ThirdPartyStatement,
-    ThirdPartyBalance, ThirdPartyValidation, BulkThirdPartyOperation, ThirdPartyStats,
-    BulkThirdPartyDelete, BulkThirdPartyDeleteResult, ThirdPartyDeleteValidation
+    ThirdPartyBalance, ThirdPartyAging, ThirdPartyValidation, BulkThirdPartyOperation, ThirdPartyStats,
+    BulkThirdPartyDelete, BulkThirdPartyDeleteResult, ThirdPartyDeleteValidation, ThirdPartySummary
 )
 from app.services.third_party_service import ThirdPartyService
 from app.utils.exceptions import (
@@ -70,6 +70,7 @@ async def get_third_parties(
     country: Optional[str] = Query(None, description="Filter by country"),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(100, ge=1, le=1000, description="Maximum number of records to return"),
+    cursor: Optional[str] = Query(None, description="Keyset pagination cursor (empty for the first page); ignores skip"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> ThirdPartyListResponse:
@@ -84,13 +85,18 @@ async def get_third_parties(
     )
     
     service = ThirdPartyService(db)
-    third_parties_list = await service.get_third_parties_list(filter_params, skip, limit)
+    try:
+        third_parties_list = await service.get_third_parties_list(filter_params, skip, limit, cursor)
+    except ValidationError as e:
+        raise_validation_error(str(e))
     
     return ThirdPartyListResponse(
         items=third_parties_list.third_parties,
         total=third_parties_list.total,
         skip=skip,
-        limit=limit
+        limit=limit,
+        next_cursor=third_parties_list.next_cursor,
+        total_is_estimate=third_parties_list.total_is_estimate
     )
 
 
@@ -235,6 +241,27 @@ async def get_third_parties_by_type(
     return [ThirdPartyResponse.model_validate(tp) for tp in third_parties]
 
 
+@router.get(
+    "/search/autocomplete",
+    response_model=List[ThirdPartySummary],
+    summary="Search third parties",
+    description="Ranked search by code, name, commercial name or document number (prefix matches first)"
+)
+async def search_third_parties(
+    q: str = Query(..., min_length=1, description="Search term"),
+    limit: int = Query(20, ge=1, le=100, description="Maximum number of results"),
+    third_party_type: Optional[ThirdPartyType] = Query(None, description="Filter by third party type"),
+    active_only: bool = Query(True, description="Only active third parties"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> List[ThirdPartySummary]:
+    """Search third parties for autocomplete."""
+
+    service = ThirdPartyService(db)
+    third_parties = await service.search_third_parties(q, limit, third_party_type, active_only)
+    return [ThirdPartySummary.model_validate(tp) for tp in third_parties]
+
+
 @router.get(
     "/{third_party_id}/statement",
     response_model=ThirdPartyStatement,
@@ -279,6 +306,25 @@ async def get_third_party_balance(
         raise_not_found("Tercero no encontrado")
 
 
+@router.get(
+    "/aging/summary",
+    response_model=List[ThirdPartyAging],
+    summary="Get aging report",
+    description="Get open receivable and payable balances per third party in 0-30, 31-60, 61-90 and 90+ day buckets"
+)
+async def get_third_party_aging(
+    as_of_date: Optional[date] = Query(None, description="Reference date for ages (defaults to today)"),
+    item_type: Optional[OpenItemType] = Query(None, description="Receivable or payable items only"),
+    third_party_type: Optional[ThirdPartyType] = Query(None, description="Filter by third party type"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> List[ThirdPartyAging]:
+    """Get aging report for all third parties."""
+
+    service = ThirdPartyService(db)
+    return await service.get_aging_report(as_of_date, item_type, third_party_type)
+
+
 @router.get(
     "/{third_party_id}/validate",
     response_model=ThirdPartyValidation,
@@ -437,30 +483,21 @@ async def export_third_parties_advanced(
             file_name=file_name
         )
         
-        # Usar el servicio síncrono de exportación
-        from app.database import get_db as get_sync_db
-        from sqlalchemy.orm import Session
+        export_service = ExportService(db)
+        result = await export_service.export_data(export_request, current_user.id)
         
-        # Convertir a sesión síncrona para el servicio de exportación
-        sync_db = next(get_sync_db())
-        try:
-            export_service = ExportService(sync_db)
-            result = export_service.export_data(export_request, current_user.id)
-            
-            # Retornar según formato
-            if export_format == ExportFormat.JSON:
-                return JSONResponse(
-                    content=result.file_content,
-                    headers={"Content-Disposition": f"attachment; filename={result.file_name}"}
-                )
-            else:
-                return Response(
-                    content=result.file_content,
-                    media_type=result.content_type,
-                    headers={"Content-Disposition": f"attachment; filename={result.file_name}"}
-                )
-        finally:
-            sync_db.close()
+        # Retornar según formato
+        if export_format == ExportFormat.JSON:
+            return JSONResponse(
+                content=result.file_content,
+                headers={"Content-Disposition": f"attachment; filename={result.file_name}"}
+            )
+        else:
+            return Response(
+                content=result.file_content,
+                media_type=result.content_type,
+                headers={"Content-Disposition": f"attachment; filename={result.file_name}"}
+            )
             
     except Exception as e:
         raise HTTPException(
@@ -6,19 +6,32 @@ import asyncio
 from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
-from app.services.translation import translation_service
+from app.core.settings import settings
 # from app.services.hf_client import hf_client  # Comentado temporalmente
 
 logger = logging.getLogger(__name__)
 
 
 async def initialize_ai_services():
-    """Inicializa todos los servicios de IA necesarios"""
+    """
+    Inicializa los servicios de IA.
+    
+    Los servicios de chat y traducción se importan en el primer uso; sólo se
+    cargan al arrancar si AI_PRELOAD_ON_STARTUP está activo.
+    """
+    if not settings.AI_CHAT_ENABLED:
+        logger.info("ℹ️ Servicios de IA desactivados (AI_CHAT_ENABLED=False)")
+        return
+    
+    if not settings.AI_PRELOAD_ON_STARTUP:
+        logger.info("ℹ️ Servicios de IA se cargarán bajo demanda")
+        return
+    
     try:
         logger.info("🚀 Inicializando servicios de IA...")
         
-        # Los servicios de traducción se inicializan automáticamente
-        # al instanciar translation_service (patrón singleton)
+        from app.services.translation import translation_service
+        from app.services.hybrid_chat_service import hybrid_chat_service
         logger.info("✅ Servicios de traducción inicializados")
         
         # El cliente de HF se inicializa automáticamente
@@ -0,0 +1,238 @@
+"""
+Carga de datos iniciales (seed) versionada e idempotente.
+
+Crea tablas, usuario administrador, cuentas de impuestos por defecto y monedas.
+Se ejecuta una vez por despliegue (``python -m app.core.seed``) y deja una marca
+de versión en ``system_configuration``; los workers sólo verifican esa marca al
+arrancar. Un advisory lock de PostgreSQL evita que varios procesos ejecuten el
+seed en paralelo.
+"""
+import argparse
+import asyncio
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, text
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.database import AsyncSessionLocal, async_engine, create_async_db_and_tables
+from app.models.account import Account, AccountType, AccountCategory
+from app.models.audit import SystemConfiguration
+from app.models.user import User
+from app.services.company_settings_cache import company_settings_cache
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Incrementar cuando cambie el contenido del seed para que se vuelva a aplicar
+SEED_VERSION = 1
+
+SEED_VERSION_KEY = "system.seed_version"
+
+# Clave arbitraria para pg_advisory_lock (serializa seeds concurrentes)
+SEED_ADVISORY_LOCK_ID = 720_451_001
+
+
+def _default_tax_accounts() -> List[Dict[str, str]]:
+    """Cuentas de impuestos que deben existir por defecto"""
+    return [
+        {
+            "code": settings.DEFAULT_ICMS_ACCOUNT_CODE,
+            "name": settings.DEFAULT_ICMS_ACCOUNT_NAME,
+            "description": "Cuenta para control de ICMS por pagar/deducible"
+        },
+        {
+            "code": settings.DEFAULT_IPI_ACCOUNT_CODE,
+            "name": settings.DEFAULT_IPI_ACCOUNT_NAME,
+            "description": "Cuenta para control de IPI por pagar/deducible"
+        },
+        {
+            "code": settings.DEFAULT_PIS_ACCOUNT_CODE,
+            "name": settings.DEFAULT_PIS_ACCOUNT_NAME,
+            "description": "Cuenta para control de PIS por pagar/deducible"
+        },
+        {
+            "code": settings.DEFAULT_COFINS_ACCOUNT_CODE,
+            "name": settings.DEFAULT_COFINS_ACCOUNT_NAME,
+            "description": "Cuenta para control de COFINS por pagar/deducible"
+        }
+    ]
+
+
+async def get_seed_version(db: AsyncSession) -> Optional[int]:
+    """Versión de seed aplicada en la base de datos (None si nunca se aplicó)"""
+    value = await db.scalar(
+        select(SystemConfiguration.value).where(SystemConfiguration.key == SEED_VERSION_KEY)
+    )
+    if not value:
+        return None
+    return value.get("version")
+
+
+async def is_seed_current(db: AsyncSession) -> bool:
+    """Verifica si la base de datos tiene aplicada la versión actual del seed"""
+    try:
+        version = await get_seed_version(db)
+    except ProgrammingError:
+        # Base de datos nueva: system_configuration todavía no existe
+        await db.rollback()
+        return False
+    return version is not None and version >= SEED_VERSION
+
+
+async def _set_seed_version(db: AsyncSession) -> None:
+    """Registra la versión de seed aplicada"""
+    value = {
+        "version": SEED_VERSION,
+        "applied_at": datetime.now(timezone.utc).isoformat()
+    }
+    config = await db.scalar(
+        select(SystemConfiguration).where(SystemConfiguration.key == SEED_VERSION_KEY)
+    )
+    if config:
+        config.value = value
+    else:
+        db.add(SystemConfiguration(
+            key=SEED_VERSION_KEY,
+            value=value,
+            description="Versión de los datos iniciales aplicados",
+            category="system",
+            is_user_editable=False
+        ))
+    await db.commit()
+
+
+async def _ensure_tax_accounts(db: AsyncSession, admin_user: Optional[User]) -> int:
+    """Crea las cuentas de impuestos por defecto que falten (una sola consulta)"""
+    tax_accounts = _default_tax_accounts()
+    existing_codes = set(
+        (await db.execute(
+            select(Account.code).where(Account.code.in_([a["code"] for a in tax_accounts]))
+        )).scalars().all()
+    )
+
+    created = 0
+    now = datetime.now(timezone.utc)
+    for account_data in tax_accounts:
+        if account_data["code"] in existing_codes:
+            continue
+        db.add(Account(
+            code=account_data["code"],
+            name=account_data["name"],
+            description=account_data["description"],
+            account_type=AccountType.LIABILITY,
+            category=AccountCategory.TAXES,  # Categoría específica para impuestos
+            is_active=True,
+            allows_movements=True,
+            requires_third_party=False,
+            requires_cost_center=False,
+            allows_reconciliation=True,
+            created_by_id=admin_user.id if admin_user else None,
+            created_at=now,
+            updated_at=now
+        ))
+        created += 1
+
+    if created:
+        # Las cuentas de impuestos por defecto se resuelven desde la configuración
+        await company_settings_cache.bump_version(db)
+        await db.commit()
+        company_settings_cache.invalidate()
+    return created
+
+
+async def _apply_seed() -> Dict[str, Any]:
+    """Ejecuta todos los pasos del seed (cada uno es idempotente)"""
+    from app.services.auth_service import AuthService
+    from app.utils.currency_init import initialize_currencies
+    from scripts.data_import.import_world_currencies import run_currency_import
+
+    summary: Dict[str, Any] = {}
+
+    await create_async_db_and_tables()
+
+    async with AsyncSessionLocal() as db:
+        admin_user = await AuthService.ensure_default_admin_exists(db)
+        summary["admin_created"] = admin_user is not None
+
+        if admin_user is None:
+            admin_user = await db.scalar(
+                select(User).where(User.email == settings.DEFAULT_ADMIN_EMAIL)
+            )
+        summary["tax_accounts_created"] = await _ensure_tax_accounts(db, admin_user)
+
+    # Las monedas no deben impedir el arranque: se registra el error y no se
+    # marca la versión, así el próximo seed vuelve a intentarlo
+    try:
+        await initialize_currencies()
+        await run_currency_import()
+        summary["currencies"] = "ok"
+    except Exception as currency_error:
+        logger.warning(f"Error importando monedas, se reintentará en el próximo seed: {currency_error}")
+        summary["currencies"] = "error"
+        return summary
+
+    async with AsyncSessionLocal() as db:
+        await _set_seed_version(db)
+
+    return summary
+
+
+async def run_seed(force: bool = False) -> bool:
+    """
+    Aplica el seed si la base de datos no tiene la versión actual.
+
+    Returns:
+        True si se aplicó el seed, False si ya estaba al día
+    """
+    async with async_engine.connect() as lock_conn:
+        await lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": SEED_ADVISORY_LOCK_ID})
+        try:
+            if not force:
+                try:
+                    async with AsyncSessionLocal() as db:
+                        if await is_seed_current(db):
+                            logger.info(f"Seed versión {SEED_VERSION} ya aplicado")
+                            return False
+                except Exception:
+                    # Tablas aún no creadas: se crean en el propio seed
+                    pass
+
+            logger.info(f"Aplicando seed versión {SEED_VERSION}...")
+            summary = await _apply_seed()
+            logger.info(f"Seed versión {SEED_VERSION} aplicado: {summary}")
+            return True
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": SEED_ADVISORY_LOCK_ID})
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Carga de datos iniciales del sistema contable")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Aplicar el seed aunque la versión registrada esté al día"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Sólo verificar la versión aplicada (código de salida 1 si está desactualizada)"
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.check:
+            async with AsyncSessionLocal() as db:
+                version = await get_seed_version(db)
+            logger.info(f"Seed aplicado: {version} / requerido: {SEED_VERSION}")
+            raise SystemExit(0 if version is not None and version >= SEED_VERSION else 1)
+
+        await run_seed(force=args.force)
+    finally:
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -48,7 +48,27 @@ class BaseConfig(BaseSettings):
     DB_USER: str = "postgres"
     DB_PASSWORD: str = ""
     DB_NAME: str = "accounting_system"
-    
+    # Engine síncrono (psycopg2): solo lo usan migraciones y endpoints heredados.
+    # Se crea en el primer uso; desactivarlo evita abrir un segundo pool
+    SYNC_DB_ENGINE_ENABLED: bool = True
+
+    # Pool de conexiones, por worker y por engine: cada worker puede abrir hasta
+    # pool_size + max_overflow conexiones en cada engine
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    SYNC_DB_POOL_SIZE: int = 10
+    SYNC_DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # Espera máxima de un checkout
+    DB_POOL_RECYCLE_SECONDS: int = -1  # Reabrir conexiones más viejas que esto (-1: nunca)
+    DB_POOL_USE_LIFO: bool = False  # LIFO deja envejecer las conexiones sobrantes para que las recicle
+    # True: SELECT 1 en cada checkout. False: las conexiones caídas se detectan
+    # al fallar la sentencia y el pool se invalida (conviene con DB_POOL_RECYCLE_SECONDS)
+    DB_POOL_PRE_PING: bool = True
+    # asyncpg: sentencias preparadas en caché por conexión (driver y SQLAlchemy).
+    # Desactivar la reutilización para PgBouncer en modo transacción
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_PREPARED_STATEMENT_REUSE: bool = True
+
     # Configuración JWT
     SECRET_KEY: str = secrets.token_urlsafe(32)
     ALGORITHM: str = "HS256"
@@ -67,7 +87,30 @@ class BaseConfig(BaseSettings):
     # Configuración de paginación
     DEFAULT_PAGE_SIZE: int = 20
     MAX_PAGE_SIZE: int = 100
-    
+
+    # Datos iniciales: si la marca de versión está desactualizada al arrancar,
+    # aplicar el seed desde el worker (en producción se ejecuta como paso previo)
+    SEED_ON_STARTUP: bool = True
+
+    # Configuración de cachés en memoria (por proceso)
+    EXCHANGE_RATE_CACHE_TTL_SECONDS: int = 300
+    COMPANY_SETTINGS_CACHE_TTL_SECONDS: int = 300
+    COMPANY_SETTINGS_VERSION_CHECK_SECONDS: int = 5  # Cada cuánto verificar settings_version
+    AUTH_PRINCIPAL_CACHE_TTL_SECONDS: int = 30  # 0 desactiva la caché de usuarios autenticados
+    AUTH_PRINCIPAL_CACHE_MAX_ENTRIES: int = 1024
+    STATS_CACHE_TTL_SECONDS: int = 10  # 0 desactiva la caché de los endpoints *_stats
+    STATS_CACHE_MAX_ENTRIES: int = 256
+
+    # Hash de contraseñas: hilos dedicados (y operaciones simultáneas) por worker
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_SLOW_WAIT_SECONDS: float = 0.5  # Espera en cola que se registra como warning
+
+    # Instrumentación por request (tiempo, SQL, bloqueo del event loop) y /metrics
+    METRICS_ENABLED: bool = True
+    SERVER_TIMING_HEADER: bool = False  # Añadir cabecera Server-Timing a las respuestas
+    SLOW_QUERY_THRESHOLD_SECONDS: float = 0.2  # Sentencias más lentas se registran como warning
+    EVENT_LOOP_MONITOR_INTERVAL_SECONDS: float = 0.05
+
     # Configuración de email (opcional)
     SMTP_HOST: Optional[str] = None
     SMTP_PORT: Optional[int] = 587
@@ -94,6 +137,8 @@ class BaseConfig(BaseSettings):
     DEFAULT_COFINS_ACCOUNT_NAME: str = "COFINS sobre Vendas"
     
     # Configuración de IA (desactivada por defecto)
+    AI_CHAT_ENABLED: bool = True  # Registrar los endpoints /ai/chat
+    AI_PRELOAD_ON_STARTUP: bool = False  # Importar servicios de IA al arrancar en vez de en el primer uso
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-3.5-turbo"
     OPENAI_MAX_TOKENS: int = 1000
@@ -182,6 +227,9 @@ class ProductionConfig(BaseConfig):
     # Configuración más restrictiva para producción
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 4  # 4 horas en producción
     RATE_LIMIT_PER_MINUTE: int = 30  # Más restrictivo
+
+    # El seed se ejecuta una vez por despliegue (docker-entrypoint.sh)
+    SEED_ON_STARTUP: bool = False
     
     # CORS específico para producción
     BACKEND_CORS_ORIGINS: List[str] = []  # Debe ser configurado vía variables de entorno
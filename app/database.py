@@ -1,10 +1,15 @@
+import threading
+import uuid
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from typing import AsyncGenerator, Generator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import Any, AsyncGenerator, Dict, Generator, Optional
 
 from app.core.settings import settings
 from app.models.base import Base
+from app.utils.metrics import instrument_engine, instrumented_pool_class, pool_stats, registry
 
 # Crear URL asíncrona para PostgreSQL
 def get_async_database_url() -> str:
@@ -17,31 +22,84 @@ def get_async_database_url() -> str:
     return url
 
 
-# Sync engine para migraciones y operaciones síncronas
+def engine_options(pool_size: int, max_overflow: int) -> Dict[str, Any]:
+    """Opciones de pool comunes a ambos engines según la configuración"""
+    return {
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": settings.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": settings.DB_POOL_RECYCLE_SECONDS,
+        "pool_use_lifo": settings.DB_POOL_USE_LIFO,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "echo": settings.DEBUG  # SQL logging en debug
+    }
+
+
+def asyncpg_connect_args() -> Dict[str, Any]:
+    """
+    Caché de sentencias preparadas de asyncpg (``statement_cache_size``) y del
+    adaptador de SQLAlchemy (``prepared_statement_cache_size``). Sin reutilización
+    (PgBouncer en modo transacción) ambas van a 0 y cada sentencia preparada
+    lleva un nombre único para no chocar entre conexiones del servidor.
+    """
+    if not settings.DB_PREPARED_STATEMENT_REUSE:
+        return {
+            "statement_cache_size": 0,
+            "prepared_statement_cache_size": 0,
+            "prepared_statement_name_func": lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    return {
+        "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+    }
+
+
+# Sync engine para migraciones y operaciones síncronas. Se crea en el primer
+# uso: los servicios de la API trabajan con el engine asíncrono y no deben
+# mantener abierto un segundo pool de conexiones si nadie lo usa.
 sync_database_url = settings.SQLALCHEMY_DATABASE_URI.replace("postgresql+asyncpg", "postgresql+psycopg2")
-engine = create_engine(
-    sync_database_url,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG  # SQL logging en debug
-)
+_sync_engine: Optional[Engine] = None
+_sync_engine_lock = threading.Lock()
+
+
+def get_sync_engine() -> Engine:
+    """Engine síncrono, creado bajo demanda si está habilitado en la configuración"""
+    global _sync_engine
+    if _sync_engine is None:
+        if not settings.SYNC_DB_ENGINE_ENABLED:
+            raise RuntimeError("El engine síncrono está deshabilitado (SYNC_DB_ENGINE_ENABLED=False)")
+        with _sync_engine_lock:
+            if _sync_engine is None:
+                options = engine_options(settings.SYNC_DB_POOL_SIZE, settings.SYNC_DB_MAX_OVERFLOW)
+                if settings.METRICS_ENABLED:
+                    options["poolclass"] = instrumented_pool_class(QueuePool, "sync")
+                _sync_engine = create_engine(sync_database_url, **options)
+                if settings.METRICS_ENABLED:
+                    instrument_engine(_sync_engine)
+                    registry.register_stats(
+                        "db_pool_sync", "Pool del engine síncrono", lambda: pool_stats(_sync_engine.pool)
+                    )
+                SessionLocal.configure(bind=_sync_engine)
+    return _sync_engine
 
 # Async engine para operaciones asíncronas
 async_database_url = settings.SQLALCHEMY_DATABASE_URI.replace("postgresql+psycopg2", "postgresql+asyncpg")
+_async_options = engine_options(settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+if settings.METRICS_ENABLED:
+    _async_options["poolclass"] = instrumented_pool_class(AsyncAdaptedQueuePool, "async")
 async_engine = create_async_engine(
     async_database_url,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20,
-    echo=settings.DEBUG
+    connect_args=asyncpg_connect_args(),
+    **_async_options
 )
+if settings.METRICS_ENABLED:
+    instrument_engine(async_engine.sync_engine)
+    registry.register_stats("db_pool_async", "Pool del engine asíncrono", lambda: pool_stats(async_engine.pool))
 
 # Session makers
 SessionLocal = sessionmaker(
     autocommit=False, 
     autoflush=False, 
-    bind=engine,
     class_=Session
 )
 
@@ -57,6 +115,7 @@ AsyncSessionLocal = async_sessionmaker(
 # Dependency para FastAPI (síncrono)
 def get_db() -> Generator[Session, None, None]:
     """Dependency para obtener sesión de base de datos síncrona"""
+    get_sync_engine()
     db = SessionLocal()
     try:
         yield db
@@ -83,12 +142,12 @@ async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
 # Para crear las tablas
 def create_db_and_tables():
     """Crea todas las tablas en la base de datos"""
-    Base.metadata.create_all(bind=engine)
+    Base.metadata.create_all(bind=get_sync_engine())
 
 
 def drop_db_and_tables():
     """Elimina todas las tablas de la base de datos"""
-    Base.metadata.drop_all(bind=engine)
+    Base.metadata.drop_all(bind=get_sync_engine())
 
 
 async def create_async_db_and_tables() -> None:
@@ -1,16 +1,16 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from contextlib import asynccontextmanager
-from sqlalchemy import select, text
 
 from app.core.settings import settings
+from app.core.seed import SEED_VERSION, is_seed_current, run_seed
 from app.api.v1 import api_router
-from app.database import create_async_db_and_tables, AsyncSessionLocal
-from app.services.auth_service import AuthService
+from app.database import AsyncSessionLocal
+from app.utils.metrics import CONTENT_TYPE, InstrumentationMiddleware, loop_monitor, registry
+from app.utils.responses import ORJSONResponse
 from app.utils.schema_rebuild import rebuild_schemas
-from app.models.account import Account, AccountType, AccountCategory
-from datetime import datetime, timezone
+from app.utils.security import password_hasher
 import logging
 
 # AI Services
@@ -25,94 +25,23 @@ logging.basicConfig(
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Intentar crear las tablas de la base de datos
+    # Startup: los datos iniciales se cargan una vez por despliegue
+    # (python -m app.core.seed); aquí sólo se verifica la marca de versión
     try:
-        await create_async_db_and_tables()
-        print("✅ Conexión a base de datos establecida")
-        
         async with AsyncSessionLocal() as db:
-            try:
-                # Crear usuario administrador por defecto si no existe
-                admin_user = await AuthService.ensure_default_admin_exists(db)
-                if admin_user:
-                    print(f"✅ Usuario administrador por defecto creado: {admin_user.email}")
-                else:
-                    print("ℹ️ Usuario administrador ya existe")
-                
-                # Crear cuentas de impuestos por defecto
-                tax_accounts = [
-                    {
-                        "code": settings.DEFAULT_ICMS_ACCOUNT_CODE,
-                        "name": settings.DEFAULT_ICMS_ACCOUNT_NAME,
-                        "description": "Cuenta para control de ICMS por pagar/deducible"
-                    },
-                    {
-                        "code": settings.DEFAULT_IPI_ACCOUNT_CODE,
-                        "name": settings.DEFAULT_IPI_ACCOUNT_NAME,
-                        "description": "Cuenta para control de IPI por pagar/deducible"
-                    },
-                    {
-                        "code": settings.DEFAULT_PIS_ACCOUNT_CODE,
-                        "name": settings.DEFAULT_PIS_ACCOUNT_NAME,
-                        "description": "Cuenta para control de PIS por pagar/deducible"
-                    },
-                    {
-                        "code": settings.DEFAULT_COFINS_ACCOUNT_CODE,
-                        "name": settings.DEFAULT_COFINS_ACCOUNT_NAME,
-                        "description": "Cuenta para control de COFINS por pagar/deducible"
-                    }
-                ]
-                
-                created_accounts = []
-                for account_data in tax_accounts:
-                    # Verificar si la cuenta ya existe
-                    existing_account = await db.execute(
-                        select(Account).where(Account.code == account_data["code"])
-                    )
-                    if not existing_account.scalar_one_or_none():
-                        # Crear la cuenta
-                        new_account = Account(
-                            code=account_data["code"],
-                            name=account_data["name"],
-                            description=account_data["description"],
-                            account_type=AccountType.LIABILITY,
-                            category=AccountCategory.TAXES,  # Categoría específica para impuestos
-                            is_active=True,
-                            allows_movements=True,
-                            requires_third_party=False,
-                            requires_cost_center=False,
-                            allows_reconciliation=True,
-                            created_by_id=admin_user.id if admin_user else None,
-                            created_at=datetime.now(timezone.utc),
-                            updated_at=datetime.now(timezone.utc)
-                        )
-                        db.add(new_account)
-                        created_accounts.append(new_account)
-                
-                if created_accounts:
-                    await db.commit()
-                    print(f"✅ {len(created_accounts)} cuentas de impuestos creadas")
-                else:
-                    print("ℹ️ Todas las cuentas de impuestos ya existen")
-                
-                # Initialize default currencies
-                try:
-                    from app.utils.currency_init import initialize_currencies
-                    await initialize_currencies()
-                    print("✅ Monedas por defecto inicializadas")
-                except Exception as currency_error:
-                    print(f"⚠️ Error inicializando monedas por defecto: {currency_error}")
-                
-                # Import all world currencies if enabled
-                try:
-                    from scripts.data_import.import_world_currencies import run_currency_import
-                    await run_currency_import()
-                    print("✅ Importación de monedas mundiales completada")
-                except Exception as import_error:
-                    print(f"⚠️ Error importando monedas mundiales: {import_error}")
-                
-            except Exception as admin_error:
-                print(f"⚠️ Error al crear usuario administrador o cuentas: {admin_error}")
+            seed_current = await is_seed_current(db)
+        
+        if seed_current:
+            print(f"✅ Conexión a base de datos establecida (seed v{SEED_VERSION})")
+        elif settings.SEED_ON_STARTUP:
+            print("ℹ️ Seed desactualizado, aplicando datos iniciales...")
+            await run_seed()
+            print(f"✅ Datos iniciales aplicados (seed v{SEED_VERSION})")
+        else:
+            print(
+                f"⚠️ La base de datos no tiene el seed v{SEED_VERSION}. "
+                "Ejecute 'python -m app.core.seed' antes de servir tráfico"
+            )
     except Exception as db_error:
         print(f"⚠️ Error de conexión a base de datos: {db_error}")
         print("ℹ️ La aplicación iniciará sin conexión a BD")
@@ -120,6 +49,10 @@ async def lifespan(app: FastAPI):
     # Rebuild schemas to resolve forward references
     rebuild_schemas()
     
+    if settings.METRICS_ENABLED:
+        loop_monitor.interval = settings.EVENT_LOOP_MONITOR_INTERVAL_SECONDS
+        loop_monitor.start()
+    
     # Initialize AI services
     try:
         await initialize_ai_services()
@@ -137,6 +70,9 @@ async def lifespan(app: FastAPI):
         print("✅ Servicios de IA cerrados correctamente")
     except Exception as cleanup_error:
         print(f"⚠️ Error cerrando servicios de IA: {cleanup_error}")
+    
+    await loop_monitor.stop()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -144,6 +80,7 @@ app = FastAPI(
     description=settings.PROJECT_DESCRIPTION,
     version=settings.VERSION,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -156,6 +93,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Instrumentación por request (la más externa, para medir todo el stack)
+if settings.METRICS_ENABLED:
+    app.add_middleware(
+        InstrumentationMiddleware,
+        server_timing=settings.SERVER_TIMING_HEADER,
+        slow_query_seconds=settings.SLOW_QUERY_THRESHOLD_SECONDS
+    )
+    registry.register_stats("password_hasher", "Cola de hash de contraseñas", password_hasher.stats)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Métricas del proceso en formato de texto de Prometheus"""
+        return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
+
 # Include API routes
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
@@ -176,3 +127,4 @@ async def health_check():
         "version": settings.VERSION,
         "environment": settings.ENVIRONMENT
     }
+
@@ -4,10 +4,14 @@ from app.models.user import User, UserRole, UserSession
 from app.models.account import Account, AccountType, AccountCategory
 from app.models.journal import Journal, JournalType
 from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus, JournalEntryType, TransactionOrigin
-from app.models.cost_center import CostCenter
-from app.models.third_party import ThirdParty, ThirdPartyType, DocumentType
+from app.models.cost_center import CostCenter, CostCenterClosure, CostCenterMonthlyActual
+from app.models.third_party import (
+    ThirdParty, ThirdPartyType, DocumentType, OpenItemType, ThirdPartyOpenItem, ThirdPartyOpenBalance
+)
 from app.models.payment_terms import PaymentTerms, PaymentSchedule
-from app.models.product import Product, ProductType, ProductStatus, MeasurementUnit, TaxCategory
+from app.models.product import (
+    Product, ProductType, ProductStatus, MeasurementUnit, TaxCategory, StockMovement, StockMovementType
+)
 from app.models.tax import Tax, TaxType, TaxScope
 
 # Importar modelos de monedas y tipos de cambio
@@ -44,9 +48,14 @@ __all__ = [
     "JournalEntryType",
     "TransactionOrigin",
     "CostCenter",
+    "CostCenterClosure",
+    "CostCenterMonthlyActual",
     "ThirdParty",
     "ThirdPartyType",
     "DocumentType",
+    "OpenItemType",
+    "ThirdPartyOpenItem",
+    "ThirdPartyOpenBalance",
     "PaymentTerms",
     "PaymentSchedule",
     "Product",
@@ -54,6 +63,8 @@ __all__ = [
     "ProductStatus",
     "MeasurementUnit",   
     "TaxCategory",
+    "StockMovement",
+    "StockMovementType",
     # Modelos de monedas y tipos de cambio
     "Currency",
     "ExchangeRate",
@@ -6,7 +6,7 @@ import uuid
 from typing import Optional, List, TYPE_CHECKING
 from enum import Enum
 
-from sqlalchemy import String, Text, Boolean, Enum as SQLEnum, ForeignKey
+from sqlalchemy import String, Text, Boolean, Integer, Enum as SQLEnum, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -325,6 +325,16 @@ class CompanySettings(Base):
     # Configuración activa
     is_active: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
     
+    # Versión de la configuración: se incrementa en cada cambio de configuración,
+    # cuentas o diarios para invalidar las cachés en memoria de otros procesos
+    settings_version: Mapped[int] = mapped_column(
+        Integer,
+        default=1,
+        server_default="1",
+        nullable=False,
+        comment="Versión de la configuración para invalidar cachés"
+    )
+    
     # Metadatos
     notes: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
@@ -3,12 +3,15 @@ Cost Center model for cost accounting functionality.
 Implements hierarchical cost centers with parent-child relationships.
 """
 import uuid
+from datetime import date
+from decimal import Decimal
 from typing import Optional, List
 
-from sqlalchemy import String, Text, Boolean, ForeignKey
+from sqlalchemy import String, Text, Boolean, ForeignKey, Integer, UniqueConstraint, Date, Numeric
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
+from app.models.account import AccountType
 
 
 class CostCenter(Base):
@@ -156,3 +159,72 @@ class CostCenter(Base):
                 errors.append("Se detectó una referencia circular en la jerarquía")
         
         return errors
+
+
+class CostCenterClosure(Base):
+    """
+    Tabla de clausura de la jerarquía de centros de costo
+    Una fila por cada par (ancestro, descendiente), incluido el propio nodo con
+    profundidad 0. Permite resolver subárboles, ancestros y ciclos en una consulta.
+    """
+    __tablename__ = "cost_center_closure"
+
+    ancestor_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("cost_centers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    descendant_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("cost_centers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    depth: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        comment="Distancia entre ancestro y descendiente (0 = mismo nodo)"
+    )
+
+    __table_args__ = (
+        UniqueConstraint('ancestor_id', 'descendant_id', name='uq_cost_center_closure_pair'),
+    )
+
+    def __repr__(self) -> str:
+        return f"<CostCenterClosure(ancestor={self.ancestor_id}, descendant={self.descendant_id}, depth={self.depth})>"
+
+
+class CostCenterMonthlyActual(Base):
+    """
+    Instantánea mensual de reales por centro de costo y tipo de cuenta
+    Suma de débitos y créditos de los asientos contabilizados del mes; se
+    actualiza de forma incremental al contabilizar, anular o revertir asientos.
+    """
+    __tablename__ = "cost_center_monthly_actuals"
+
+    cost_center_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("cost_centers.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    account_type: Mapped[AccountType] = mapped_column(nullable=False)
+    period: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+        index=True,
+        comment="Primer día del mes"
+    )
+    total_debits: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=2), default=0, nullable=False)
+    total_credits: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=2), default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint(
+            'cost_center_id', 'account_type', 'period',
+            name='uq_cost_center_monthly_actuals_key'
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<CostCenterMonthlyActual(cost_center={self.cost_center_id}, type='{self.account_type}', "
+            f"period='{self.period}', debits={self.total_debits}, credits={self.total_credits})>"
+        )
@@ -1,10 +1,10 @@
 import uuid
 from decimal import Decimal
-from datetime import datetime, timezone
+from datetime import date, datetime, timezone
 from enum import Enum
 from typing import Optional, List, TYPE_CHECKING
 
-from sqlalchemy import Boolean, String, Text, ForeignKey, Numeric, DateTime, Integer
+from sqlalchemy import Boolean, String, Text, ForeignKey, Numeric, DateTime, Date, Integer, Index, text, Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -57,6 +57,14 @@ class TaxCategory(str, Enum):
     SUPER_REDUCED_RATE = "SUPER_REDUCED_RATE"  # Tasa súper reducida
 
 
+class StockMovementType(str, Enum):
+    """Tipos de movimiento de inventario"""
+    IN = "in"  # Entrada por asiento contabilizado (compras, ajustes al debe)
+    OUT = "out"  # Salida por asiento contabilizado (ventas, ajustes al haber)
+    ADJUSTMENT = "adjustment"  # Ajuste manual de stock
+    REVERSAL = "reversal"  # Compensación de un asiento que deja de estar contabilizado
+
+
 class Product(Base):
     """
     Modelo de productos y servicios
@@ -126,6 +134,10 @@ class Product(Base):
                                               comment="Stock máximo")
     reorder_point: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), default=0, nullable=False,
                                                   comment="Punto de reorden")
+    average_cost: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), default=0, nullable=False,
+                                                 comment="Costo promedio ponderado (lo mantiene el libro de movimientos)")
+    inventory_value: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), default=0, nullable=False,
+                                                    comment="Valor del inventario a costo promedio")
     
     # Información adicional
     barcode: Mapped[Optional[str]] = mapped_column(String(50), nullable=True, unique=True,
@@ -162,6 +174,12 @@ class Product(Base):
         lazy="dynamic"
     )
 
+    # Listados de stock bajo y reorden servidos por índices parciales
+    __table_args__ = (
+        Index('ix_products_low_stock', 'name', postgresql_where=text('manage_inventory AND current_stock <= min_stock')),
+        Index('ix_products_reorder', 'name', postgresql_where=text('manage_inventory AND current_stock <= reorder_point')),
+    )
+
     def __repr__(self) -> str:
         return f"<Product(code='{self.code}', name='{self.name}', type='{self.product_type}')>"
 
@@ -215,9 +233,9 @@ class Product(Base):
 
     @property
     def stock_value(self) -> Optional[Decimal]:
-        """Calcula el valor del stock actual"""
-        if self.current_stock and self.purchase_price:
-            return self.current_stock * self.purchase_price
+        """Valor del stock actual a costo promedio"""
+        if self.current_stock and self.inventory_value:
+            return self.inventory_value
         return None
 
     @property
@@ -353,3 +371,49 @@ class Product(Base):
             cls.name.ilike(search_pattern) |
             cls.description.ilike(search_pattern)
         ).all()
+
+
+class StockMovement(Base):
+    """
+    Movimiento de inventario (libro append-only). Se escribe al contabilizar
+    asientos con líneas de producto y en los ajustes manuales; cuando un asiento
+    deja de estar contabilizado se agrega una compensación, nunca se modifica
+    ni se borra una fila.
+    """
+    __tablename__ = "stock_movements"
+
+    product_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("products.id", ondelete="CASCADE"),
+        nullable=False
+    )
+    movement_type: Mapped[StockMovementType] = mapped_column(SQLEnum(StockMovementType), nullable=False)
+    movement_date: Mapped[date] = mapped_column(Date, nullable=False)
+    journal_entry_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("journal_entries.id", ondelete="SET NULL"),
+        nullable=True,
+        index=True
+    )
+    journal_entry_line_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("journal_entry_lines.id", ondelete="SET NULL"),
+        nullable=True
+    )
+    quantity: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), nullable=False,
+                                              comment="Cantidad con signo: positiva entra, negativa sale")
+    unit_cost: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), nullable=False)
+    total_cost: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), nullable=False,
+                                                comment="Valor con signo del movimiento")
+    balance_quantity: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), nullable=False,
+                                                      comment="Stock del producto después del movimiento")
+    average_cost: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=4), nullable=False,
+                                                  comment="Costo promedio después del movimiento")
+    reference: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+
+    __table_args__ = (
+        Index('ix_stock_movements_product_history', 'product_id', 'created_at'),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<StockMovement(product={self.product_id}, type='{self.movement_type}', "
+            f"quantity={self.quantity}, balance={self.balance_quantity})>"
+        )
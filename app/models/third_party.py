@@ -3,10 +3,12 @@ Third Party model for customers, suppliers, employees and other business partner
 Enables customer/supplier accounting and relationship management.
 """
 import uuid
+from datetime import date
+from decimal import Decimal
 from typing import Optional, List, TYPE_CHECKING
 from enum import Enum
 
-from sqlalchemy import String, Text, Boolean, Enum as SQLEnum, ForeignKey
+from sqlalchemy import String, Text, Boolean, Date, Numeric, Enum as SQLEnum, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.models.base import Base
@@ -39,6 +41,12 @@ class DocumentType(str, Enum):
     OTHER = "other"            # Otro
 
 
+class OpenItemType(str, Enum):
+    """Lado de la partida abierta"""
+    RECEIVABLE = "receivable"  # Por cobrar (clientes)
+    PAYABLE = "payable"        # Por pagar (proveedores)
+
+
 class ThirdParty(Base):
     """
     Modelo para terceros (clientes, proveedores, empleados, etc.)
@@ -189,3 +197,69 @@ class ThirdParty(Base):
                 errors.append("El RUT debe tener formato válido (ej: 12345678-9)")
         
         return errors
+
+
+class ThirdPartyOpenItem(Base):
+    """
+    Partida abierta de un tercero: factura contabilizada con saldo pendiente o
+    pago contabilizado con importe sin aplicar (con signo negativo). Se
+    sincroniza al contabilizar, anular, resetear o conciliar facturas y pagos.
+    """
+    __tablename__ = "third_party_open_items"
+
+    third_party_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("third_parties.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True
+    )
+    item_type: Mapped[OpenItemType] = mapped_column(SQLEnum(OpenItemType), nullable=False)
+    invoice_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("invoices.id", ondelete="CASCADE"),
+        nullable=True,
+        unique=True
+    )
+    payment_id: Mapped[Optional[uuid.UUID]] = mapped_column(
+        ForeignKey("payments.id", ondelete="CASCADE"),
+        nullable=True,
+        unique=True
+    )
+    document_number: Mapped[str] = mapped_column(String(50), nullable=False)
+    document_date: Mapped[date] = mapped_column(Date, nullable=False)
+    due_date: Mapped[date] = mapped_column(Date, nullable=False)
+    residual_amount: Mapped[Decimal] = mapped_column(
+        Numeric(precision=15, scale=2),
+        nullable=False,
+        comment="Saldo pendiente; negativo para notas de crédito y pagos sin aplicar"
+    )
+
+    __table_args__ = (
+        Index('ix_third_party_open_items_aging', 'item_type', 'due_date'),
+    )
+
+    def __repr__(self) -> str:
+        return (
+            f"<ThirdPartyOpenItem(third_party={self.third_party_id}, type='{self.item_type}', "
+            f"document='{self.document_number}', residual={self.residual_amount})>"
+        )
+
+
+class ThirdPartyOpenBalance(Base):
+    """
+    Totales de partidas abiertas por tercero (una fila por tercero) para
+    consultar saldo y crédito disponible sin recorrer el libro
+    """
+    __tablename__ = "third_party_open_balances"
+
+    third_party_id: Mapped[uuid.UUID] = mapped_column(
+        ForeignKey("third_parties.id", ondelete="CASCADE"),
+        nullable=False,
+        unique=True
+    )
+    receivable_amount: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=2), default=0, nullable=False)
+    payable_amount: Mapped[Decimal] = mapped_column(Numeric(precision=15, scale=2), default=0, nullable=False)
+
+    def __repr__(self) -> str:
+        return (
+            f"<ThirdPartyOpenBalance(third_party={self.third_party_id}, "
+            f"receivable={self.receivable_amount}, payable={self.payable_amount})>"
+        )
@@ -14,6 +14,7 @@ from app.schemas.currency import (
     CurrencyCreate, CurrencyUpdate, CurrencyRead, CurrencyList, CurrencySummary, CurrencyFilter,
     ExchangeRateCreate, ExchangeRateUpdate, ExchangeRateRead, ExchangeRateList, ExchangeRateFilter,
     CurrencyConversionRequest, CurrencyConversionResponse,
+    BatchCurrencyConversionRequest, BatchCurrencyConversionResponse,
     ExchangeRateImportRequest, ExchangeRateImportResult
 )
 from app.services.currency_service import CurrencyService, ExchangeRateService, CurrencyConversionService
@@ -550,5 +551,31 @@ async def convert_currency(
         )
 
 
+@conversion_router.post("/batch", response_model=BatchCurrencyConversionResponse)
+async def convert_currency_batch(
+    batch_request: BatchCurrencyConversionRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Convertir un lote de importes entre monedas.
+    
+    Cada importe tiene su propio par de monedas y fecha; el resultado incluye
+    la procedencia de las tasas usadas y un error por importe cuando no hay tasa.
+    """
+    try:
+        service = CurrencyConversionService(db)
+        return await service.convert_currency_batch(batch_request)
+        
+    except BusinessRuleError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error en conversión masiva de monedas: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error interno del servidor"
+        )
+
+
 # Include conversion router in main router
 router.include_router(conversion_router)
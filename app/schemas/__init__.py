@@ -50,7 +50,7 @@ from app.schemas.product import (
     ProductList, ProductFilter, ProductMovement, ProductStock, ProductImport,
     ProductExport, ProductValidation, BulkProductOperation, BulkProductOperationResult,
     ProductStats, ProductResponse, ProductDetailResponse, ProductListResponse,
-    JournalEntryLineProduct
+    JournalEntryLineProduct, StockMovementRead, StockAdjustmentItem, BulkStockAdjustment
 )
 
 from app.schemas.reports import (
@@ -117,7 +117,7 @@ __all__ = [
     "ProductList", "ProductFilter", "ProductMovement", "ProductStock", "ProductImport",
     "ProductExport", "ProductValidation", "BulkProductOperation", "BulkProductOperationResult",
     "ProductStats", "ProductResponse", "ProductDetailResponse", "ProductListResponse",
-    "JournalEntryLineProduct",
+    "JournalEntryLineProduct", "StockMovementRead", "StockAdjustmentItem", "BulkStockAdjustment",
     
     # Report schemas
     "BalanceSheetItem", "BalanceSheetSection", "BalanceSheet",
@@ -9,6 +9,8 @@ from datetime import datetime
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator
 
+from app.utils.pagination import CursorPageInfo
+
 
 # Schemas base
 class CostCenterBase(BaseModel):
@@ -132,7 +134,7 @@ class CostCenterSummary(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
-class CostCenterList(BaseModel):
+class CostCenterList(CursorPageInfo):
     """Schema para listado paginado"""
     cost_centers: List[CostCenterSummary]
     total: int
@@ -322,7 +324,7 @@ class CostCenterDetailResponse(CostCenterHierarchy):
     pass
 
 
-class CostCenterListResponse(BaseModel):
+class CostCenterListResponse(CursorPageInfo):
     """Paginated list response"""
     items: List[CostCenterSummary]
     total: int
@@ -243,6 +243,43 @@ class CurrencyConversionResponse(BaseModel):
     rate_source: str
 
 
+class BatchCurrencyConversionRequest(BaseModel):
+    """Schema para conversión masiva de importes (cada uno con su par y fecha)"""
+    items: List[CurrencyConversionRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=50000,
+        description="Importes a convertir"
+    )
+
+
+class BatchCurrencyConversionItemResult(BaseModel):
+    """Resultado de conversión de un importe dentro de un lote"""
+    index: int = Field(..., description="Posición del importe en la solicitud")
+    original_amount: Decimal
+    converted_amount: Optional[Decimal] = None
+    from_currency_code: str
+    to_currency_code: str
+    exchange_rate: Optional[Decimal] = None
+    conversion_date: date
+    rate_source: str
+    # Procedencia de las tasas usadas (None cuando la moneda es la base)
+    from_rate_id: Optional[uuid.UUID] = None
+    from_rate_date: Optional[date] = None
+    to_rate_id: Optional[uuid.UUID] = None
+    to_rate_date: Optional[date] = None
+    error: Optional[str] = None
+
+
+class BatchCurrencyConversionResponse(BaseModel):
+    """Schema para respuesta de conversión masiva"""
+    base_currency_code: str
+    results: List[BatchCurrencyConversionItemResult]
+    total: int
+    converted_count: int
+    failed_count: int
+
+
 # === IMPORT/EXPORT SCHEMAS ===
 
 class ExchangeRateImportRequest(BaseModel):
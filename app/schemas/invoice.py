@@ -9,6 +9,7 @@ from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 
 from app.models.invoice import InvoiceStatus, InvoiceType
+from app.utils.pagination import CursorPageInfo
 
 
 # ================================
@@ -216,7 +217,7 @@ class InvoiceWithLines(InvoiceResponse):
 # BULK OPERATIONS Y UTILIDADES
 # ================================
 
-class InvoiceListResponse(BaseModel):
+class InvoiceListResponse(CursorPageInfo):
     """Schema para respuesta de lista de facturas"""
     items: List[InvoiceResponse] = Field(..., description="Lista de facturas")
     total: int = Field(..., description="Total de facturas")
@@ -8,6 +8,7 @@ from typing import Optional, List
 from pydantic import BaseModel, Field, validator
 
 from app.models.payment import PaymentStatus, PaymentType, PaymentMethod
+from app.utils.pagination import CursorPageInfo
 
 
 # Base schemas
@@ -368,7 +369,7 @@ class BulkPaymentOperationResponse(BaseModel):
     summary: str = Field(description="Resumen de la operación")
 
 
-class PaymentListResponse(BaseModel):
+class PaymentListResponse(CursorPageInfo):
     """Schema para lista de pagos"""
     data: List[PaymentResponse]  # Cambiar payments por data para consistencia
     total: int
@@ -4,7 +4,7 @@ from datetime import datetime, date
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict, field_validator
 
-from app.models.product import ProductType, ProductStatus, MeasurementUnit, TaxCategory
+from app.models.product import ProductType, ProductStatus, MeasurementUnit, TaxCategory, StockMovementType
 from app.utils.enum_validators import create_enum_validator
 
 
@@ -255,6 +255,8 @@ class ProductRead(ProductBase):
     profit_margin: Optional[Decimal] = None
     profit_amount: Optional[Decimal] = None
     stock_value: Optional[Decimal] = None
+    average_cost: Optional[Decimal] = None
+    inventory_value: Optional[Decimal] = None
     has_valid_accounting_setup: Optional[bool] = None
 
 
@@ -420,6 +422,44 @@ class ProductValidation(BaseModel):
     warnings: List[str] = Field(default_factory=list)
 
 
+class StockMovementRead(BaseModel):
+    """Esquema para movimientos del libro de inventario"""
+    model_config = ConfigDict(from_attributes=True)
+    
+    id: uuid.UUID
+    product_id: uuid.UUID
+    movement_type: StockMovementType
+    movement_date: date
+    journal_entry_id: Optional[uuid.UUID] = None
+    quantity: Decimal
+    unit_cost: Decimal
+    total_cost: Decimal
+    balance_quantity: Decimal
+    average_cost: Decimal
+    reference: Optional[str] = None
+    created_at: datetime
+
+
+class StockAdjustmentItem(BaseModel):
+    """Ajuste de stock de un producto"""
+    product_id: uuid.UUID
+    quantity: Decimal = Field(..., description="Cantidad con signo: positiva entra, negativa sale")
+    unit_cost: Optional[Decimal] = Field(None, ge=0, description="Costo unitario de la entrada (por defecto el precio de compra)")
+    
+    @field_validator('quantity')
+    @classmethod
+    def validate_quantity(cls, v):
+        if v == 0:
+            raise ValueError('La cantidad del ajuste no puede ser cero')
+        return v
+
+
+class BulkStockAdjustment(BaseModel):
+    """Esquema para ajustes masivos de stock"""
+    items: List[StockAdjustmentItem] = Field(..., min_length=1, max_length=1000)
+    reason: Optional[str] = Field(None, max_length=100, description="Referencia del ajuste")
+
+
 class BulkProductOperation(BaseModel):
     """Esquema para operaciones masivas en productos"""
     product_ids: List[uuid.UUID]
@@ -10,8 +10,9 @@ from datetime import datetime
 
 from pydantic import BaseModel, ConfigDict, Field, field_validator, EmailStr
 
-from app.models.third_party import ThirdPartyType, DocumentType
+from app.models.third_party import ThirdPartyType, DocumentType, OpenItemType
 from app.utils.enum_validators import create_enum_validator
+from app.utils.pagination import CursorPageInfo
 
 
 # Schemas base
@@ -231,7 +232,7 @@ class ThirdPartySummary(BaseModel):
             self.status = "active" if self.is_active else "inactive"
 
 
-class ThirdPartyList(BaseModel):
+class ThirdPartyList(CursorPageInfo):
     """Schema para listado paginado"""
     third_parties: List[ThirdPartySummary]
     total: int
@@ -292,13 +293,16 @@ class ThirdPartyBalance(BaseModel):
 
 
 class ThirdPartyAging(BaseModel):
-    """Schema para análisis de antigüedad"""
-    third_party: ThirdPartySummary
+    """Schema para análisis de antigüedad de partidas abiertas"""
+    third_party_id: uuid.UUID
+    third_party_code: str
+    third_party_name: str
+    third_party_type: ThirdPartyType
+    item_type: OpenItemType
     current: Decimal  # 0-30 días
     days_31_60: Decimal
     days_61_90: Decimal
-    days_91_120: Decimal
-    over_120_days: Decimal
+    over_90_days: Decimal
     total_balance: Decimal
 
 
@@ -385,7 +389,7 @@ class ThirdPartyDetailResponse(ThirdPartyRead):
     current_balance: Optional[Decimal] = None
 
 
-class ThirdPartyListResponse(BaseModel):
+class ThirdPartyListResponse(CursorPageInfo):
     """Paginated list response"""
     items: List[ThirdPartySummary]
     total: int
@@ -3,10 +3,10 @@ Account Determination Service for Invoice Processing
 Implements Odoo-style automatic account determination for invoices.
 """
 import uuid
-from typing import Dict, List, Optional, Union
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 from decimal import Decimal
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.invoice import Invoice, InvoiceLine, InvoiceType
 from app.models.third_party import ThirdParty
@@ -14,6 +14,8 @@ from app.models.product import Product
 from app.models.account import Account, AccountType
 from app.models.tax import Tax, TaxType
 from app.models.company_settings import CompanySettings
+from app.services.company_settings_cache import AccountRef, company_settings_cache
+from app.services.account_rule_table import AccountRuleTable, get_rule_table, is_sale_invoice, match_account_patterns
 from app.utils.exceptions import BusinessRuleError, NotFoundError
 
 # Import para type hints
@@ -26,21 +28,62 @@ class AccountDeterminationService:
     """
     Servicio para determinación automática de cuentas contables en facturas
     Utiliza las configuraciones de empresa por defecto del sistema
+    
+    Las reglas (configuración de empresa, patrones del plan de cuentas e
+    impuestos) se compilan en una ``AccountRuleTable`` compartida; las cuentas
+    de productos se precargan por lote con ``preload_products``.
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self._company_settings = None
+        self._rules: Optional[AccountRuleTable] = None
+        # product_id -> (sales_account_id, purchase_account_id)
+        self._product_accounts: Dict[uuid.UUID, Tuple[Optional[uuid.UUID], Optional[uuid.UUID]]] = {}
     
-    def get_company_settings(self) -> Optional[CompanySettings]:
-        """Obtiene la configuración activa de la empresa (cache)"""
+    async def get_company_settings(self) -> Optional[CompanySettings]:
+        """
+        Obtiene la configuración activa de la empresa desde la caché por proceso
+        (valores escalares con acceso por atributo, sin relaciones)
+        """
         if self._company_settings is None:
-            self._company_settings = self.db.query(CompanySettings).filter(
-                CompanySettings.is_active == True
-            ).first()
+            self._company_settings = (await self.get_rules()).snapshot.settings
         return self._company_settings
     
-    def determine_accounts_for_invoice(self, invoice: Invoice) -> Dict[str, Dict]:
+    async def get_rules(self) -> AccountRuleTable:
+        """Tabla de reglas compilada para la versión vigente de la configuración"""
+        if self._rules is None:
+            self._rules = get_rule_table(await company_settings_cache.get_snapshot(self.db))
+        return self._rules
+    
+    async def preload_products(self, product_ids: Iterable[Optional[uuid.UUID]]) -> None:
+        """Carga en una consulta las cuentas de venta/compra de los productos indicados"""
+        missing = {pid for pid in product_ids if pid and pid not in self._product_accounts}
+        if not missing:
+            return
+        rows = (await self.db.execute(
+            select(Product.id, Product.sales_account_id, Product.purchase_account_id)
+            .where(Product.id.in_(missing))
+        )).all()
+        for product_id, sales_account_id, purchase_account_id in rows:
+            self._product_accounts[product_id] = (sales_account_id, purchase_account_id)
+        # Productos inexistentes: recordar para no volver a consultarlos
+        for product_id in missing - {row[0] for row in rows}:
+            self._product_accounts[product_id] = (None, None)
+    
+    async def determine_accounts_for_invoices(self, invoices: List[Invoice]) -> Dict[uuid.UUID, Dict[str, Dict]]:
+        """
+        Determina las cuentas de un lote de facturas en una sola pasada:
+        una consulta para los productos de todas las líneas y el resto en memoria.
+        Las facturas deben tener ``lines`` cargadas.
+        """
+        rules = await self.get_rules()
+        await self.preload_products(
+            line.product_id for invoice in invoices for line in invoice.lines
+        )
+        return {invoice.id: self._resolve_invoice_accounts(invoice, rules) for invoice in invoices}
+    
+    async def determine_accounts_for_invoice(self, invoice: Invoice) -> Dict[str, Dict]:
         """
         Determina todas las cuentas contables necesarias para una factura
         
@@ -52,10 +95,16 @@ class AccountDeterminationService:
                 'tax_accounts': [{...}]
             }
         """
+        rules = await self.get_rules()
+        await self.preload_products(line.product_id for line in invoice.lines)
+        return self._resolve_invoice_accounts(invoice, rules)
+    
+    def _resolve_invoice_accounts(self, invoice: Invoice, rules: AccountRuleTable) -> Dict[str, Dict]:
+        """Resuelve en memoria las cuentas de una factura (productos ya precargados)"""
         result = {
-            'third_party_account': self._get_third_party_account(invoice),
-            'line_accounts': self._get_line_accounts(invoice),
-            'tax_accounts': self._get_tax_accounts(invoice)
+            'third_party_account': self._get_third_party_account(invoice, rules),
+            'line_accounts': self._get_line_accounts(invoice, rules),
+            'tax_accounts': self._get_tax_accounts(invoice, rules)
         }
         
         # Validar que todas las cuentas requeridas fueron encontradas
@@ -63,56 +112,38 @@ class AccountDeterminationService:
         
         return result
     
-    def _get_third_party_account(self, invoice: Invoice) -> Dict[str, Union[str, uuid.UUID]]:
+    def _get_third_party_account(self, invoice: Invoice, rules: AccountRuleTable) -> Dict[str, Union[str, uuid.UUID]]:
         """
         Obtener cuenta del cliente/proveedor
         Jerarquía:
         1. Si se especifica cuenta override en la factura, usar esa
-        2. Si no, usar cuenta por defecto del tercero
+        2. Si no, usar cuenta por defecto del tercero (pendiente: hoy cae al paso 3)
         3. Si no tiene, usar cuenta por defecto del tipo
         """
-        # 1. Verificar override en la factura
-        if invoice.third_party_account_id:
-            account = self.db.query(Account).filter(Account.id == invoice.third_party_account_id).first()
-            if account:
-                self._validate_third_party_account(account, invoice.invoice_type)
-                return {
-                    'account_id': account.id,
-                    'account_code': account.code,
-                    'account_name': account.name,
-                    'source': 'invoice_override'
-                }
-        
-        # 2. Cuenta por defecto del tercero
-        third_party = invoice.third_party
-        if third_party:
-            # Por ahora, buscar cuenta por defecto del tipo (paso 3)
-            # TODO: Implementar cuentas por defecto en terceros si es necesario
-            pass
-          # 3. Cuenta por defecto del tipo
-        if invoice.invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]:
-            # Buscar cuenta de clientes (1105, 1140 - Clientes por cobrar)
-            account = self._get_default_account_by_pattern(['1105', '1140', '1300'], AccountType.ASSET)
-            account_description = "Cuenta de clientes por cobrar"
-        else:  # SUPPLIER_INVOICE
-            # Buscar cuenta de proveedores (2205 - Proveedores por pagar)
-            account = self._get_default_account_by_pattern(['2205', '2200'], AccountType.LIABILITY)
-            account_description = "Cuenta de proveedores por pagar"
+        resolved = rules.third_party_account(invoice.invoice_type, invoice.third_party_account_id)
         
-        if not account:
+        if resolved is None:
+            account_description = (
+                "Cuenta de clientes por cobrar" if is_sale_invoice(invoice.invoice_type)
+                else "Cuenta de proveedores por pagar"
+            )
             raise BusinessRuleError(
                 f"No se encontró cuenta contable para {account_description}. "
                 f"Configure una cuenta adecuada en el plan contable."
             )
         
+        account, source = resolved
+        if source == 'invoice_override':
+            self._validate_third_party_account(account, invoice.invoice_type)
+        
         return {
             'account_id': account.id,
             'account_code': account.code,
             'account_name': account.name,
-            'source': 'default_by_type'
+            'source': source
         }
     
-    def _get_line_accounts(self, invoice: Invoice) -> List[Dict[str, Union[str, uuid.UUID]]]:
+    def _get_line_accounts(self, invoice: Invoice, rules: AccountRuleTable) -> List[Dict[str, Union[str, uuid.UUID]]]:
         """
         Obtener cuentas de ingresos/gastos por línea
         Jerarquía para cada línea:
@@ -124,7 +155,7 @@ class AccountDeterminationService:
         line_accounts = []
         
         for line in invoice.lines:
-            account_info = self._determine_line_account(line, invoice.invoice_type)
+            account_info = self._determine_line_account(line, invoice.invoice_type, rules)
             line_accounts.append({
                 **account_info,
                 'line_id': line.id,
@@ -134,65 +165,38 @@ class AccountDeterminationService:
         
         return line_accounts
     
-    def _determine_line_account(self, line: InvoiceLine, invoice_type: InvoiceType) -> Dict[str, Union[str, uuid.UUID]]:
-        """Determina la cuenta contable para una línea específica"""
-        
-        # 1. Override en la línea
-        if line.account_id:
-            account = self.db.query(Account).filter(Account.id == line.account_id).first()
-            if account:
-                self._validate_line_account(account, invoice_type)
-                return {
-                    'account_id': account.id,
-                    'account_code': account.code,
-                    'account_name': account.name,
-                    'source': 'line_override'
-                }
-          # 2. Cuenta del producto
-        if line.product_id:
-            product = self.db.query(Product).filter(Product.id == line.product_id).first()
-            if product:
-                account_id = None
-                if invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]:
-                    account_id = product.sales_account_id
-                else:  # SUPPLIER_INVOICE
-                    account_id = product.purchase_account_id
-                
-                if account_id:
-                    account = self.db.query(Account).filter(Account.id == account_id).first()
-                    if account:
-                        return {
-                            'account_id': account.id,
-                            'account_code': account.code,
-                            'account_name': account.name,
-                            'source': 'product_account'
-                        }
-        
-        # 3. Cuenta de categoría del producto (TODO: implementar si es necesario)
-          # 4. Cuenta por defecto del tipo - usar configuraciones del sistema
-        if invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]:
-            # Buscar cuenta de ingresos por defecto configurada en el sistema
-            account = self._get_default_sales_income_account()
-            account_description = "ingresos por ventas"
-        else:  # SUPPLIER_INVOICE
-            # Buscar cuenta de gastos por defecto configurada en el sistema
-            account = self._get_default_purchase_expense_account()
-            account_description = "gastos por compras"
+    def _determine_line_account(
+        self,
+        line: InvoiceLine,
+        invoice_type: InvoiceType,
+        rules: AccountRuleTable
+    ) -> Dict[str, Union[str, uuid.UUID]]:
+        """Determina la cuenta contable para una línea específica (producto ya precargado)"""
+        resolved = rules.line_account(
+            invoice_type,
+            line.account_id,
+            self._product_accounts.get(line.product_id) if line.product_id else None
+        )
         
-        if not account:
+        if resolved is None:
+            account_description = "ingresos por ventas" if is_sale_invoice(invoice_type) else "gastos por compras"
             raise BusinessRuleError(
                 f"No se encontró cuenta contable por defecto para {account_description}. "
                 f"Configure una cuenta adecuada en el plan contable."
             )
         
+        account, source = resolved
+        if source == 'line_override':
+            self._validate_line_account(account, invoice_type)
+        
         return {
             'account_id': account.id,
             'account_code': account.code,
             'account_name': account.name,
-            'source': 'default_by_type'
+            'source': source
         }
     
-    def _get_tax_accounts(self, invoice: Invoice) -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
+    def _get_tax_accounts(self, invoice: Invoice, rules: AccountRuleTable) -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
         """
         Obtener cuentas de impuestos
         Para facturas de venta: usar cuentas de pasivo (impuestos por pagar)
@@ -201,42 +205,8 @@ class AccountDeterminationService:
         tax_accounts = []
         
         if invoice.tax_amount and invoice.tax_amount > 0:
-            # Determinar patrón de cuenta según tipo de factura
-            if invoice.invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]:
-                # Impuestos sobre ventas: cuentas de pasivo (impuestos por pagar)
-                # Patrones más generales para impuestos por pagar
-                patterns = ['2408', '2405', '2400', '24', '2105', '2100', '21']
-                account_type = AccountType.LIABILITY
-                description = "impuestos por pagar"
-            else:  # SUPPLIER_INVOICE
-                # Impuestos sobre compras: cuentas de activo (impuestos por cobrar/deducibles)
-                # Patrones para impuestos deducibles
-                patterns = ['1365', '1360', '1300', '13', '2408', '2405', '2400', '24']
-                account_type = None  # Permitir cualquier tipo
-                description = "impuestos deducibles"
-            
-            # Buscar cuenta usando patrones generales
-            account = self._get_default_account_by_pattern(patterns, account_type)
-            
-            if not account:
-                # Si no encuentra cuenta específica, usar cuenta de IVA general
-                iva_patterns = ['IVA', 'IVA_POR_PAGAR', 'IVA_DEDUCIBLE', 'IMPUESTO']
-                for pattern in iva_patterns:
-                    account = self.db.query(Account).filter(
-                        Account.name.ilike(f"%{pattern}%"),
-                        Account.is_active == True,
-                        Account.allows_movements == True
-                    ).first()
-                    if account:
-                        break
-            
-            if not account:
-                # Como último recurso, usar una cuenta de pasivo genérica
-                account = self.db.query(Account).filter(
-                    Account.account_type == AccountType.LIABILITY,
-                    Account.is_active == True,
-                    Account.allows_movements == True
-                ).order_by(Account.code).first()
+            is_sale = is_sale_invoice(invoice.invoice_type)
+            account = rules.invoice_tax_default[is_sale]
             
             if account:
                 tax_accounts.append({
@@ -247,6 +217,7 @@ class AccountDeterminationService:
                     'source': 'default_tax_account'
                 })
             else:
+                description = "impuestos por pagar" if is_sale else "impuestos deducibles"
                 raise BusinessRuleError(
                     f"No se encontró cuenta contable para {description}. "
                     f"Configure una cuenta apropiada en el plan contable."
@@ -256,58 +227,64 @@ class AccountDeterminationService:
     
     # Methods specifically needed by InvoiceService
     
-    def determine_third_party_account(self, invoice: Invoice) -> Account:
+    async def determine_third_party_account(self, invoice: Invoice) -> AccountRef:
         """
         Determinar cuenta del tercero para el InvoiceService
-        Retorna directamente el objeto Account
+        Retorna la cuenta resuelta (id, código, nombre, tipo)
         """
-        account_data = self._get_third_party_account(invoice)
-        account = self.db.query(Account).filter(Account.id == account_data['account_id']).first()
-        if not account:
-            raise BusinessRuleError(f"Account not found: {account_data['account_id']}")
-        return account
+        return self.resolve_third_party_account(invoice, await self.get_rules())
     
-    def determine_line_account(self, line: "InvoiceLine") -> Account:
+    async def determine_line_account(self, line: "InvoiceLine", invoice_type: Optional[InvoiceType] = None) -> AccountRef:
         """
         Determinar cuenta contable para una línea de factura
-        Retorna directamente el objeto Account
+        Retorna la cuenta resuelta (id, código, nombre, tipo)
         """
         # Obtener la factura para conocer el tipo
-        invoice = line.invoice
-        if not invoice:
-            raise BusinessRuleError("Invoice line must have an associated invoice")
+        if invoice_type is None:
+            invoice = await self.db.get(Invoice, line.invoice_id) if line.invoice_id else None
+            if not invoice:
+                raise BusinessRuleError("Invoice line must have an associated invoice")
+            invoice_type = invoice.invoice_type
         
-        account_data = self._determine_line_account(line, invoice.invoice_type)
-        account = self.db.query(Account).filter(Account.id == account_data['account_id']).first()
-        if not account:
-            raise BusinessRuleError(f"Account not found: {account_data['account_id']}")
-        return account
+        rules = await self.get_rules()
+        if line.product_id:
+            await self.preload_products([line.product_id])
+        return self.resolve_line_account(line, invoice_type, rules)
+    
+    def resolve_third_party_account(self, invoice: Invoice, rules: AccountRuleTable) -> AccountRef:
+        """Cuenta del tercero resuelta en memoria con la tabla de reglas ya obtenida"""
+        account_data = self._get_third_party_account(invoice, rules)
+        return rules.snapshot.accounts[account_data['account_id']]
+    
+    def resolve_line_account(self, line: InvoiceLine, invoice_type: InvoiceType, rules: AccountRuleTable) -> AccountRef:
+        """
+        Cuenta de una línea resuelta en memoria; los productos deben estar
+        precargados con ``preload_products``
+        """
+        account_data = self._determine_line_account(line, invoice_type, rules)
+        return rules.snapshot.accounts[account_data['account_id']]
     
-    def determine_tax_account(self, tax: "Tax", invoice_type: InvoiceType) -> Account:
+    async def determine_tax_account(self, tax: "Tax", invoice_type: InvoiceType) -> AccountRef:
         """
         Determinar cuenta contable para un impuesto específico
-        Retorna directamente el objeto Account
+        Retorna la cuenta resuelta (id, código, nombre, tipo)
         """
-        # Usar la cuenta contable directamente del impuesto
-        if hasattr(tax, 'account_id') and tax.account_id:
-            account = self.db.query(Account).filter(Account.id == tax.account_id).first()
-            if account:
-                return account
+        rules = await self.get_rules()
         
-        # Fallback: buscar cuenta por defecto según el tipo de factura
-        if invoice_type == InvoiceType.CUSTOMER_INVOICE:
-            # IVA por pagar
-            account = self._get_default_account_by_pattern(['2408', '2400'], AccountType.LIABILITY)
-        else:  # PURCHASE
-            # IVA deducible
-            account = self._get_default_account_by_pattern(['1365', '2408'], None)
+        # Usar la cuenta contable directamente del impuesto
+        account = rules.any_account(getattr(tax, 'account_id', None))
+        if account:
+            return account
         
+        # Fallback: cuenta por defecto según el tipo de factura
+        # (IVA por pagar en ventas, IVA deducible en compras)
+        account = rules.tax_fallback[invoice_type == InvoiceType.CUSTOMER_INVOICE]
         if not account:
             raise BusinessRuleError(f"No tax account found for invoice type {invoice_type}")
         
         return account
     
-    def get_tax_account_by_type(self, tax_type: str, invoice_type: InvoiceType) -> Optional[Account]:
+    async def get_tax_account_by_type(self, tax_type: str, invoice_type: InvoiceType) -> Optional[AccountRef]:
         """
         Obtiene la cuenta específica para un tipo de impuesto según la configuración de empresa
         
@@ -316,46 +293,11 @@ class AccountDeterminationService:
             invoice_type: Tipo de factura para determinar si es por pagar o deducible
             
         Returns:
-            Account específica para el tipo de impuesto o None si no se encuentra
-        """
-        settings = self.get_company_settings()
-        if not settings:
-            return None
-        
-        # Determinar si es impuesto por pagar (ventas) o deducible (compras)
-        is_payable = invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]
-        
-        # Mapear tipo de impuesto a campo de configuración
-        account_field_mapping = {
-            'ICMS': 'default_icms_payable_account_id' if is_payable else 'default_icms_deductible_account_id',
-            'PIS': 'default_pis_payable_account_id' if is_payable else 'default_pis_deductible_account_id',
-            'COFINS': 'default_cofins_payable_account_id' if is_payable else 'default_cofins_deductible_account_id',
-            'IPI': 'default_ipi_payable_account_id' if is_payable else 'default_ipi_deductible_account_id',
-            'ISS': 'default_iss_payable_account_id' if is_payable else None,  # ISS solo por pagar
-            'CSLL': 'default_csll_payable_account_id' if is_payable else None,  # CSLL solo por pagar
-            'IRPJ': 'default_irpj_payable_account_id' if is_payable else None,  # IRPJ solo por pagar
-        }
-        
-        # Obtener el campo correspondiente
-        account_field = account_field_mapping.get(tax_type.upper())
-        if not account_field:
-            return None
-        
-        # Obtener el ID de la cuenta desde la configuración
-        account_id = getattr(settings, account_field, None)
-        if not account_id:
-            return None
-        
-        # Buscar y validar la cuenta
-        account = self.db.query(Account).filter(
-            Account.id == account_id,
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).first()
-        
-        return account
-
-    def determine_accounts_for_payment(self, payment: "Payment") -> Dict[str, Dict]:
+            Cuenta específica para el tipo de impuesto o None si no se encuentra
+        """
+        return (await self.get_rules()).tax_account_by_type(tax_type, invoice_type)
+    
+    async def determine_accounts_for_payment(self, payment: "Payment") -> Dict[str, Dict]:
         """
         Determina todas las cuentas contables necesarias para un pago
         
@@ -384,7 +326,7 @@ class AccountDeterminationService:
         
         # Determinar cuenta bancaria/efectivo
         if payment.payment_method in ['BANK_TRANSFER', 'CHECK', 'DEBIT_CARD']:
-            bank_account = self._get_default_bank_account()
+            bank_account = await self._get_default_bank_account()
             if bank_account:
                 result['bank_cash_account'] = {
                     'account_id': bank_account.id,
@@ -393,7 +335,7 @@ class AccountDeterminationService:
                     'source': 'default_bank_account'
                 }
         else:  # CASH, CREDIT_CARD, etc.
-            cash_account = self._get_default_cash_account()
+            cash_account = await self._get_default_cash_account()
             if cash_account:
                 result['bank_cash_account'] = {
                     'account_id': cash_account.id,
@@ -405,10 +347,10 @@ class AccountDeterminationService:
         # Determinar cuenta de tercero
         if payment.payment_type == PaymentType.CUSTOMER_PAYMENT:
             # Cuenta de clientes por cobrar
-            account = self._get_default_customer_receivable_account()
+            account = await self._get_default_customer_receivable_account()
         else:  # SUPPLIER_PAYMENT
             # Cuenta de proveedores por pagar
-            account = self._get_default_supplier_payable_account()
+            account = await self._get_default_supplier_payable_account()
         
         if account:
             result['third_party_account'] = {
@@ -427,7 +369,7 @@ class AccountDeterminationService:
         
         return result
 
-    def get_payment_journal_entry_preview(self, payment: "Payment") -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
+    async def get_payment_journal_entry_preview(self, payment: "Payment") -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
         """
         Genera preview de las líneas del asiento contable que se creará para un pago
         
@@ -439,7 +381,7 @@ class AccountDeterminationService:
         """
         from app.models.payment import PaymentType
         
-        accounts = self.determine_accounts_for_payment(payment)
+        accounts = await self.determine_accounts_for_payment(payment)
         lines = []
         
         bank_cash_account = accounts['bank_cash_account']
@@ -503,7 +445,7 @@ class AccountDeterminationService:
         
         return lines
 
-    def get_invoice_journal_entry_preview(self, invoice: "Invoice") -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
+    async def get_invoice_journal_entry_preview(self, invoice: "Invoice") -> List[Dict[str, Union[str, uuid.UUID, Decimal]]]:
         """
         Genera preview de las líneas del asiento contable que se creará para una factura
         (usa el método existente pero lo renombra para consistencia con la API)
@@ -514,228 +456,52 @@ class AccountDeterminationService:
         Returns:
             Lista de diccionarios con las líneas del asiento
         """
-        return self.get_journal_entry_lines_preview(invoice)
+        return await self.get_journal_entry_lines_preview(invoice)
 
-    def _get_default_bank_account(self) -> Optional[Account]:
-        """Obtiene la cuenta bancaria por defecto"""
-        settings = self.get_company_settings()
-        if settings and settings.default_bank_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_bank_account_id,
-                Account.is_active == True,
-                Account.allows_movements == True
-            ).first()
-            if account:
-                return account
-        
-        # Fallback: buscar primera cuenta bancaria activa
-        account = self.db.query(Account).filter(
-            Account.code.like('11%'),  # Cuentas de activo corriente
-            Account.name.ilike('%banco%'),
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).first()
-        
-        return account
+    async def _get_default_bank_account(self) -> Optional[AccountRef]:
+        """Obtiene la cuenta bancaria por defecto (configuración o primera cuenta 11xx de bancos)"""
+        return (await self.get_rules()).bank_account
 
-    def _get_default_cash_account(self) -> Optional[Account]:
-        """Obtiene la cuenta de efectivo por defecto"""
-        settings = self.get_company_settings()
-        if settings and settings.default_cash_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_cash_account_id,
-                Account.is_active == True,
-                Account.allows_movements == True
-            ).first()
-            if account:
-                return account
-        
-        # Fallback: buscar primera cuenta de efectivo activa
-        account = self.db.query(Account).filter(
-            Account.code.like('11%'),  # Cuentas de activo corriente
-            Account.name.ilike('%efectivo%'),
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).first()
-        
-        return account
+    async def _get_default_cash_account(self) -> Optional[AccountRef]:
+        """Obtiene la cuenta de efectivo por defecto (configuración o primera cuenta 11xx de efectivo)"""
+        return (await self.get_rules()).cash_account
 
-    def _get_default_sales_income_account(self) -> Optional[Account]:
-        """Obtiene la cuenta por defecto para ingresos por ventas del sistema"""
-        # 1. Primero intentar obtener de la configuración de empresa
-        settings = self.get_company_settings()
-        if settings and settings.default_sales_income_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_sales_income_account_id,
-                Account.is_active == True,
-                Account.allows_movements == True
-            ).first()
-            
-            if account:
-                return account
-        
-        # 2. Si no está configurado, buscar usando patrones comunes
-        # Patrones típicos para ingresos por ventas en diferentes países
-        patterns = ['411', '4100', '4110', '4111', '4135', '41100', '41110']
-        
-        account = self._get_default_account_by_pattern(patterns, AccountType.INCOME)
-        if account:
-            return account
-        
-        # 3. Como último recurso, buscar la primera cuenta de ingresos activa
-        account = self.db.query(Account).filter(
-            Account.account_type == AccountType.INCOME,
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).order_by(Account.code).first()
-        
-        return account
+    async def _get_default_sales_income_account(self) -> Optional[AccountRef]:
+        """
+        Obtiene la cuenta por defecto para ingresos por ventas del sistema:
+        configuración de empresa, patrones comunes (411, 4135, ...) o primera cuenta de ingresos
+        """
+        return (await self.get_rules()).line_default[True]
     
-    def _get_default_purchase_expense_account(self) -> Optional[Account]:
-        """Obtiene la cuenta por defecto para gastos por compras del sistema"""
-        # 1. Primero intentar obtener de la configuración de empresa
-        settings = self.get_company_settings()
-        if settings and settings.default_purchase_expense_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_purchase_expense_account_id,
-                Account.is_active == True,
-                Account.allows_movements == True
-            ).first()
-            
-            if account:
-                return account
-        
-        # 2. Si no está configurado, buscar usando patrones comunes
-        # Patrones típicos para gastos por compras en diferentes países
-        patterns = ['511', '5100', '5110', '5111', '51100', '51110']
-        
-        account = self._get_default_account_by_pattern(patterns, AccountType.EXPENSE)
-        if account:
-            return account
-        
-        # 3. Como último recurso, buscar la primera cuenta de gastos activa
-        account = self.db.query(Account).filter(
-            Account.account_type == AccountType.EXPENSE,
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).order_by(Account.code).first()
-        
-        return account
+    async def _get_default_purchase_expense_account(self) -> Optional[AccountRef]:
+        """
+        Obtiene la cuenta por defecto para gastos por compras del sistema:
+        configuración de empresa, patrones comunes (511, 5100, ...) o primera cuenta de gastos
+        """
+        return (await self.get_rules()).line_default[False]
     
-    def _get_default_customer_receivable_account(self) -> Optional[Account]:
+    async def _get_default_customer_receivable_account(self) -> Optional[AccountRef]:
         """Obtiene la cuenta por defecto para clientes por cobrar"""
-        settings = self.get_company_settings()
-        if settings and settings.default_customer_receivable_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_customer_receivable_account_id,
-                Account.is_active == True
-            ).first()
-            if account:
-                return account
-        
-        # Fallback: buscar primera cuenta de activo corriente para clientes
-        account = self.db.query(Account).filter(
-            Account.account_type == AccountType.ASSET,
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).order_by(Account.code).first()
-        
-        return account
+        return (await self.get_rules()).payment_third_party_default[True]
 
-    def _get_default_supplier_payable_account(self) -> Optional[Account]:
+    async def _get_default_supplier_payable_account(self) -> Optional[AccountRef]:
         """Obtiene la cuenta por defecto para proveedores por pagar"""
-        settings = self.get_company_settings()
-        if settings and settings.default_supplier_payable_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_supplier_payable_account_id,
-                Account.is_active == True
-            ).first()
-            if account:
-                return account
-        
-        # Fallback: buscar primera cuenta de pasivo corriente para proveedores
-        account = self.db.query(Account).filter(
-            Account.account_type == AccountType.LIABILITY,
-            Account.is_active == True,
-            Account.allows_movements == True
-        ).order_by(Account.code).first()
-        
-        return account
+        return (await self.get_rules()).payment_third_party_default[False]
 
-    def _get_default_tax_account_for_invoice_type(self, invoice_type: InvoiceType) -> Optional[Account]:
+    async def _get_default_tax_account_for_invoice_type(self, invoice_type: InvoiceType) -> Optional[AccountRef]:
         """
         Obtiene la cuenta por defecto para impuestos según el tipo de factura
-        usando la configuración de empresa
-        """
-        settings = self.get_company_settings()
-        if not settings:
-            return None
-        
-        # 1. Usar cuenta específica según tipo de factura
-        if invoice_type in [InvoiceType.CUSTOMER_INVOICE, InvoiceType.CREDIT_NOTE, InvoiceType.DEBIT_NOTE]:
-            # Impuestos sobre ventas: usar cuenta de impuestos por pagar
-            if settings.default_sales_tax_payable_account_id:
-                account = self.db.query(Account).filter(
-                    Account.id == settings.default_sales_tax_payable_account_id,
-                    Account.is_active == True,
-                    Account.allows_movements == True
-                ).first()
-                if account:
-                    return account
-        else:  # SUPPLIER_INVOICE
-            # Impuestos sobre compras: usar cuenta de impuestos deducibles
-            if settings.default_purchase_tax_deductible_account_id:
-                account = self.db.query(Account).filter(
-                    Account.id == settings.default_purchase_tax_deductible_account_id,
-                    Account.is_active == True,
-                    Account.allows_movements == True
-                ).first()
-                if account:
-                    return account
-        
-        # 2. Usar cuenta genérica de impuestos como fallback
-        if settings.default_tax_account_id:
-            account = self.db.query(Account).filter(
-                Account.id == settings.default_tax_account_id,
-                Account.is_active == True,
-                Account.allows_movements == True
-            ).first()
-            if account:
-                return account
-        
-        return None
+        usando la configuración de empresa (específica de ventas/compras o genérica)
+        """
+        return (await self.get_rules()).generic_tax_account(invoice_type)
     
-    def _get_default_account_by_pattern(self, code_patterns: List[str], account_type: Optional[AccountType]) -> Optional[Account]:
+    async def _get_default_account_by_pattern(self, code_patterns: List[str], account_type: Optional[AccountType]) -> Optional[AccountRef]:
         """
         Busca una cuenta por patrones de código y tipo con lógica mejorada
         """
-        query = self.db.query(Account).filter(
-            Account.is_active == True, 
-            Account.allows_movements == True
+        return match_account_patterns(
+            (await self.get_rules()).snapshot.accounts.values(), code_patterns, account_type
         )
-        
-        if account_type:
-            query = query.filter(Account.account_type == account_type)
-        
-        # Buscar por patrones de código en orden de prioridad
-        for pattern in code_patterns:
-            # Primero buscar coincidencia exacta
-            account = query.filter(Account.code == pattern).first()
-            if account:
-                return account
-            
-            # Luego buscar que comience con el patrón
-            account = query.filter(Account.code.like(f"{pattern}%")).first()
-            if account:
-                return account
-        
-        # Si no encuentra nada con patrones específicos, buscar la primera cuenta del tipo
-        if account_type:
-            account = query.filter(Account.account_type == account_type).order_by(Account.code).first()
-            if account:
-                return account
-        
-        return None
     
     def _validate_third_party_account(self, account: Account, invoice_type: InvoiceType) -> None:
         """Valida que la cuenta de tercero sea compatible con el tipo de factura"""
@@ -790,11 +556,11 @@ class AccountDeterminationService:
                 f"Error en determinación de cuentas: {'; '.join(errors)}"
             )
     
-    def get_journal_entry_lines_preview(self, invoice: Invoice) -> List[Dict]:
+    async def get_journal_entry_lines_preview(self, invoice: Invoice) -> List[Dict]:
         """
         Genera preview de las líneas del asiento contable que se creará
         """
-        accounts = self.determine_accounts_for_invoice(invoice)
+        accounts = await self.determine_accounts_for_invoice(invoice)
         lines = []
         
         # Línea del tercero (cliente/proveedor)
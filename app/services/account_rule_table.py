@@ -0,0 +1,242 @@
+"""
+Tabla de reglas de determinación de cuentas para facturas y pagos.
+
+Compila una sola vez, sobre la foto de configuración de empresa
+(``CompanySettingsSnapshot``), los fallbacks que ``AccountDeterminationService``
+recorría con consultas por línea: cuentas por defecto de la empresa, búsquedas
+por patrón de código en el plan de cuentas y cuentas de impuestos. Las reglas
+por producto se resuelven con el mapa de cuentas de productos que el llamador
+precarga para el lote, de modo que todas las líneas de un lote de facturas se
+determinan sin consultas adicionales.
+"""
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.account import AccountType
+from app.models.invoice import InvoiceType
+from app.services.company_settings_cache import AccountRef, CompanySettingsSnapshot
+
+
+# Tipos de factura que generan cuentas de venta (por cobrar / ingresos / impuestos por pagar)
+SALE_INVOICE_TYPES = frozenset({
+    InvoiceType.CUSTOMER_INVOICE,
+    InvoiceType.CREDIT_NOTE,
+    InvoiceType.DEBIT_NOTE,
+})
+
+# Patrones de código por regla, en orden de prioridad
+THIRD_PARTY_PATTERNS = {
+    True: (['1105', '1140', '1300'], AccountType.ASSET),
+    False: (['2205', '2200'], AccountType.LIABILITY),
+}
+LINE_PATTERNS = {
+    True: (['411', '4100', '4110', '4111', '4135', '41100', '41110'], AccountType.INCOME),
+    False: (['511', '5100', '5110', '5111', '51100', '51110'], AccountType.EXPENSE),
+}
+INVOICE_TAX_PATTERNS = {
+    True: (['2408', '2405', '2400', '24', '2105', '2100', '21'], AccountType.LIABILITY),
+    False: (['1365', '1360', '1300', '13', '2408', '2405', '2400', '24'], None),
+}
+INVOICE_TAX_NAME_PATTERNS = ['IVA', 'IVA_POR_PAGAR', 'IVA_DEDUCIBLE', 'IMPUESTO']
+TAX_FALLBACK_PATTERNS = {
+    True: (['2408', '2400'], AccountType.LIABILITY),
+    False: (['1365', '2408'], None),
+}
+
+# Regla resuelta: (cuenta, origen)
+ResolvedAccount = Tuple[AccountRef, str]
+
+
+def is_sale_invoice(invoice_type: InvoiceType) -> bool:
+    """True si el tipo de factura usa las cuentas del lado de ventas"""
+    return invoice_type in SALE_INVOICE_TYPES
+
+
+def match_account_patterns(
+    accounts: Iterable[AccountRef],
+    code_patterns: List[str],
+    account_type: Optional[AccountType]
+) -> Optional[AccountRef]:
+    """
+    Busca una cuenta activa con movimientos por patrones de código: para cada
+    patrón primero coincidencia exacta y luego prefijo; si ninguno coincide,
+    la primera cuenta del tipo. ``accounts`` debe venir ordenado por código.
+    """
+    candidates = [
+        account for account in accounts
+        if account.is_active and account.allows_movements
+        and (account_type is None or account.account_type == account_type)
+    ]
+    by_code = {account.code: account for account in candidates}
+
+    for pattern in code_patterns:
+        if pattern in by_code:
+            return by_code[pattern]
+        for account in candidates:
+            if account.code.startswith(pattern):
+                return account
+
+    if account_type and candidates:
+        return candidates[0]
+    return None
+
+
+class AccountRuleTable:
+    """
+    Reglas de determinación compiladas para una versión de la configuración.
+
+    Inmutable y compartida entre peticiones mientras la foto de configuración
+    no cambie (ver ``get_rule_table``).
+    """
+
+    def __init__(self, snapshot: CompanySettingsSnapshot):
+        self.snapshot = snapshot
+        accounts = list(snapshot.accounts.values())
+
+        self.third_party_default: Dict[bool, Optional[AccountRef]] = {
+            is_sale: match_account_patterns(accounts, *THIRD_PARTY_PATTERNS[is_sale])
+            for is_sale in (True, False)
+        }
+        self.line_default: Dict[bool, Optional[AccountRef]] = {
+            True: (
+                snapshot.default_account('default_sales_income_account_id', require_movements=True)
+                or match_account_patterns(accounts, *LINE_PATTERNS[True])
+            ),
+            False: (
+                snapshot.default_account('default_purchase_expense_account_id', require_movements=True)
+                or match_account_patterns(accounts, *LINE_PATTERNS[False])
+            ),
+        }
+        self.invoice_tax_default: Dict[bool, Optional[AccountRef]] = {
+            is_sale: self._compile_invoice_tax_account(accounts, is_sale)
+            for is_sale in (True, False)
+        }
+        self.tax_generic: Dict[bool, Optional[AccountRef]] = {
+            True: (
+                snapshot.default_account('default_sales_tax_payable_account_id', require_movements=True)
+                or snapshot.default_account('default_tax_account_id', require_movements=True)
+            ),
+            False: (
+                snapshot.default_account('default_purchase_tax_deductible_account_id', require_movements=True)
+                or snapshot.default_account('default_tax_account_id', require_movements=True)
+            ),
+        }
+        self.tax_fallback: Dict[bool, Optional[AccountRef]] = {
+            is_sale: match_account_patterns(accounts, *TAX_FALLBACK_PATTERNS[is_sale])
+            for is_sale in (True, False)
+        }
+        self.bank_account = self._compile_treasury_account(
+            accounts, 'default_bank_account_id', 'banco'
+        )
+        self.cash_account = self._compile_treasury_account(
+            accounts, 'default_cash_account_id', 'efectivo'
+        )
+        self.payment_third_party_default: Dict[bool, Optional[AccountRef]] = {
+            True: (
+                snapshot.default_account('default_customer_receivable_account_id')
+                or snapshot.first_account(AccountType.ASSET, require_movements=True)
+            ),
+            False: (
+                snapshot.default_account('default_supplier_payable_account_id')
+                or snapshot.first_account(AccountType.LIABILITY, require_movements=True)
+            ),
+        }
+
+    def _compile_invoice_tax_account(self, accounts: List[AccountRef], is_sale: bool) -> Optional[AccountRef]:
+        account = match_account_patterns(accounts, *INVOICE_TAX_PATTERNS[is_sale])
+        if account:
+            return account
+
+        # Cuenta de IVA general por nombre
+        for pattern in INVOICE_TAX_NAME_PATTERNS:
+            term = pattern.lower()
+            for candidate in accounts:
+                if candidate.is_active and candidate.allows_movements and term in candidate.name.lower():
+                    return candidate
+
+        # Como último recurso, una cuenta de pasivo genérica
+        return self.snapshot.first_account(AccountType.LIABILITY, require_movements=True)
+
+    def _compile_treasury_account(
+        self,
+        accounts: List[AccountRef],
+        settings_field: str,
+        name_term: str
+    ) -> Optional[AccountRef]:
+        account = self.snapshot.default_account(settings_field, require_movements=True)
+        if account:
+            return account
+        for candidate in accounts:
+            if (
+                candidate.is_active and candidate.allows_movements
+                and candidate.code.startswith('11')
+                and name_term in candidate.name.lower()
+            ):
+                return candidate
+        return None
+
+    def any_account(self, account_id: Optional[uuid.UUID]) -> Optional[AccountRef]:
+        """Cuenta por ID sin filtrar por estado (overrides explícitos del usuario)"""
+        if not account_id:
+            return None
+        return self.snapshot.accounts.get(account_id)
+
+    def third_party_account(
+        self,
+        invoice_type: InvoiceType,
+        override_account_id: Optional[uuid.UUID] = None
+    ) -> Optional[ResolvedAccount]:
+        """Cuenta del cliente/proveedor: override de la factura o por defecto del tipo"""
+        account = self.any_account(override_account_id)
+        if account:
+            return account, 'invoice_override'
+        account = self.third_party_default[is_sale_invoice(invoice_type)]
+        return (account, 'default_by_type') if account else None
+
+    def line_account(
+        self,
+        invoice_type: InvoiceType,
+        line_account_id: Optional[uuid.UUID],
+        product_accounts: Optional[Tuple[Optional[uuid.UUID], Optional[uuid.UUID]]]
+    ) -> Optional[ResolvedAccount]:
+        """
+        Cuenta de ingresos/gastos de una línea: override de la línea, cuenta del
+        producto (venta o compra) o cuenta por defecto del tipo de factura.
+
+        ``product_accounts`` es (sales_account_id, purchase_account_id) del producto.
+        """
+        account = self.any_account(line_account_id)
+        if account:
+            return account, 'line_override'
+
+        is_sale = is_sale_invoice(invoice_type)
+        if product_accounts:
+            account = self.any_account(product_accounts[0] if is_sale else product_accounts[1])
+            if account:
+                return account, 'product_account'
+
+        account = self.line_default[is_sale]
+        return (account, 'default_by_type') if account else None
+
+    def tax_account_by_type(self, tax_type: str, invoice_type: InvoiceType) -> Optional[AccountRef]:
+        """Cuenta específica del tipo de impuesto configurada en la empresa"""
+        return self.snapshot.tax_account(tax_type, is_sale_invoice(invoice_type))
+
+    def generic_tax_account(self, invoice_type: InvoiceType) -> Optional[AccountRef]:
+        """Cuenta genérica de impuestos configurada en la empresa"""
+        if self.snapshot.settings is None:
+            return None
+        return self.tax_generic[is_sale_invoice(invoice_type)]
+
+
+# Última tabla compilada (se recompila cuando cambia la foto de configuración)
+_compiled: Optional[AccountRuleTable] = None
+
+
+def get_rule_table(snapshot: CompanySettingsSnapshot) -> AccountRuleTable:
+    """Tabla de reglas para la foto indicada, compilada una vez por foto"""
+    global _compiled
+    table = _compiled
+    if table is None or table.snapshot is not snapshot:
+        table = _compiled = AccountRuleTable(snapshot)
+    return table
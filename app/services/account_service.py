@@ -15,6 +15,8 @@ from app.schemas.account import (
     AccountValidation, BulkAccountOperation, AccountStats, BulkAccountDelete,
     BulkAccountDeleteResult, AccountDeleteValidation
 )
+from app.services.company_settings_cache import company_settings_cache
+from app.services.stats_builder import StatsQuery
 from app.utils.exceptions import AccountNotFoundError, AccountValidationError
 
 
@@ -69,7 +71,9 @@ class AccountService:
         )
         
         self.db.add(account)
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
         await self.db.refresh(account)
         
         return account
@@ -142,7 +146,9 @@ class AccountService:
             setattr(account, field, value)
         
         account.updated_at = datetime.utcnow()
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
         await self.db.refresh(account)
         
         return account
@@ -168,7 +174,9 @@ class AccountService:
             raise AccountValidationError("No se puede eliminar una cuenta que tiene cuentas hijas")
         
         await self.db.delete(account)
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
         
         return True
     
@@ -410,43 +418,34 @@ class AccountService:
 
     async def get_account_stats(self) -> AccountStats:
         """Obtener estadísticas de cuentas"""
-        
-        total_result = await self.db.execute(select(func.count(Account.id)))
-        total_accounts = total_result.scalar() or 0
-        
-        active_result = await self.db.execute(
-            select(func.count(Account.id)).where(Account.is_active == True)
+        has_movements = (
+            select(JournalEntryLine.id)
+            .where(JournalEntryLine.account_id == Account.id)
+            .exists()
         )
-        active_accounts = active_result.scalar() or 0
-        
-        by_type = {}
-        for account_type in AccountType:
-            type_result = await self.db.execute(
-                select(func.count(Account.id))
-                .where(Account.account_type == account_type)
-            )
-            by_type[account_type.value] = type_result.scalar() or 0
-        
-        by_category = {}
-        for category in AccountCategory:
-            cat_result = await self.db.execute(
-                select(func.count(Account.id))
-                .where(Account.category == category)
-            )
-            by_category[category.value] = cat_result.scalar() or 0
-          # Calcular cuentas con y sin movimientos
-        from app.models.journal_entry import JournalEntryLine
-        
-        # Subconsulta para obtener cuentas con movimientos
-        accounts_with_movements_query = (
-            select(func.count(func.distinct(JournalEntryLine.account_id)))
-            .select_from(JournalEntryLine)
-            .join(Account, JournalEntryLine.account_id == Account.id)
-            .where(Account.is_active == True)
+        stats = await (
+            StatsQuery(Account)
+            .count("total")
+            .count("active", Account.is_active == True)
+            .count("with_movements", Account.is_active == True, has_movements)
+            .count_by("by_type", Account.account_type)
+            .count_by("by_category", Account.category)
+            .execute(self.db, cache_key="accounts")
         )
-        accounts_with_movements = await self.db.scalar(accounts_with_movements_query) or 0
+        total_accounts = stats["total"]
+        active_accounts = stats["active"]
+        accounts_with_movements = stats["with_movements"]
         accounts_without_movements = active_accounts - accounts_with_movements
-        
+
+        by_type = {
+            account_type.value: stats["by_type"].get(account_type, 0)
+            for account_type in AccountType
+        }
+        by_category = {
+            category.value: stats["by_category"].get(category, 0)
+            for category in AccountCategory
+        }
+
         return AccountStats(
             total_accounts=total_accounts,
             active_accounts=active_accounts,
@@ -513,7 +512,9 @@ class AccountService:
                 results["errors"].append(f"Error en cuenta {account_id}: {str(e)}")
         
         if results["success"]:
+            await company_settings_cache.bump_version(self.db)
             await self.db.commit()
+            company_settings_cache.invalidate()
         
         return results
     
@@ -675,6 +676,12 @@ class AccountService:
             # Commit intermedio después de cada chunk para evitar transacciones muy largas
             await self.db.commit()
         
+        if result.successfully_deleted:
+            # Las cuentas por defecto de la configuración pueden haber desaparecido
+            await company_settings_cache.bump_version(self.db)
+            await self.db.commit()
+            company_settings_cache.invalidate()
+        
         # Añadir información sobre la razón de eliminación si se proporcionó
         if delete_request.delete_reason and result.successfully_deleted:
             result.warnings.append(f"Razón de eliminación: {delete_request.delete_reason}")
@@ -829,6 +836,8 @@ class AccountService:
                 created_accounts.append(account)
         
         if created_accounts:
+            await company_settings_cache.bump_version(self.db)
             await self.db.commit()
+            company_settings_cache.invalidate()
         
         return created_accounts
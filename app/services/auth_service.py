@@ -6,17 +6,18 @@ from typing import List, Optional, Dict, Any
 
 from fastapi import HTTPException, status
 from fastapi_users import BaseUserManager, UUIDIDMixin
-from passlib.context import CryptContext
-from sqlalchemy import select, func, and_
+from sqlalchemy import select, and_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app.models.user import User, UserRole, UserSession
+from app.services.principal_cache import principal_cache
 from app.schemas.user import (
     UserCreateByAdmin, UserResponse, UserStatsResponse, 
     UserCreate, UserUpdate, UserRead, PasswordChangeRequest
 )
-from app.utils.security import validate_password_strength
+from app.utils.security import password_hasher, validate_password_strength
+from app.services.stats_builder import StatsQuery
 from app.utils.exceptions import UserNotFoundError, UserValidationError, AuthenticationError
 
 
@@ -28,15 +29,14 @@ class AuthService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
         
-    def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verifica una contraseña contra su hash"""
-        return self.pwd_context.verify(plain_password, hashed_password)
+    async def _verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica una contraseña contra su hash (en el executor de hash)"""
+        return await password_hasher.verify(plain_password, hashed_password)
     
-    def _hash_password(self, password: str) -> str:
-        """Genera el hash de una contraseña"""
-        return self.pwd_context.hash(password)
+    async def _hash_password(self, password: str) -> str:
+        """Genera el hash de una contraseña (en el executor de hash)"""
+        return await password_hasher.hash(password)
     
     def generate_temporary_password(self, length: int = 12) -> str:
         """Genera una contraseña temporal segura"""
@@ -83,9 +83,11 @@ class AuthService:
             )
         
         # Verificar contraseña
-        if not self._verify_password(password, user.hashed_password):
-            # Incrementar intentos fallidos            user.increment_login_attempts()
+        if not await self._verify_password(password, user.hashed_password):
+            # Incrementar intentos fallidos (bloquea la cuenta al llegar al máximo)
+            user.increment_login_attempts()
             await self.db.commit()
+            principal_cache.invalidate(user.id)
             return None
         
         # Login exitoso
@@ -162,6 +164,7 @@ class AuthService:
         """Actualiza datos después de un login exitoso"""
         user.update_last_login()
         await self.db.commit()
+        principal_cache.invalidate(user.id)
 
     async def create_user_by_admin(
         self, 
@@ -181,7 +184,7 @@ class AuthService:
             raise UserValidationError(f"Contraseña temporal débil: {', '.join(validation['errors'])}")
 
         # Crear hash de la contraseña temporal
-        hashed_password = self._hash_password(user_data.temporary_password)
+        hashed_password = await self._hash_password(user_data.temporary_password)
 
         # Crear el usuario
         new_user = User(
@@ -213,7 +216,7 @@ class AuthService:
             raise UserValidationError("Ya existe un usuario con este email")
 
         # Crear hash de la contraseña
-        hashed_password = self._hash_password(user_data.password)
+        hashed_password = await self._hash_password(user_data.password)
 
         # Crear el usuario
         new_user = User(
@@ -257,6 +260,7 @@ class AuthService:
 
         user.updated_at = datetime.now(timezone.utc)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
         await self.db.refresh(user)
 
         return user
@@ -264,43 +268,22 @@ class AuthService:
     async def get_user_stats(self) -> UserStatsResponse:
         """Obtiene estadísticas de usuarios del sistema"""
         
-        # Total de usuarios
-        total_result = await self.db.execute(select(func.count(User.id)))
-        total_users = total_result.scalar() or 0
-        
-        # Usuarios activos
-        active_result = await self.db.execute(
-            select(func.count(User.id)).where(User.is_active == True)
-        )
-        active_users = active_result.scalar() or 0
-        
-        # Usuarios bloqueados
-        locked_result = await self.db.execute(
-            select(func.count(User.id)).where(
-                and_(
-                    User.locked_until.is_not(None),
-                    User.locked_until > datetime.now(timezone.utc)
-                )
-            )
-        )
-        locked_users = locked_result.scalar() or 0
-        
-        # Usuarios por rol
-        users_by_role = {}
-        for role in UserRole:
-            role_result = await self.db.execute(
-                select(func.count(User.id)).where(User.role == role)
-            )
-            users_by_role[role.value] = role_result.scalar() or 0
-        
-        # Logins recientes (últimas 24 horas)
-        recent_threshold = datetime.now(timezone.utc) - timedelta(hours=24)
-        recent_result = await self.db.execute(
-            select(func.count(User.id)).where(
-                User.last_login >= recent_threshold
-            )
+        now = datetime.now(timezone.utc)
+        stats = await (
+            StatsQuery(User)
+            .count("total")
+            .count("active", User.is_active == True)
+            .count("locked", User.locked_until.is_not(None), User.locked_until > now)
+            # Logins recientes (últimas 24 horas)
+            .count("recent_logins", User.last_login >= now - timedelta(hours=24))
+            .count_by("by_role", User.role)
+            .execute(self.db, cache_key="users")
         )
-        recent_logins = recent_result.scalar() or 0
+        total_users = stats["total"]
+        active_users = stats["active"]
+        locked_users = stats["locked"]
+        recent_logins = stats["recent_logins"]
+        users_by_role = {role.value: stats["by_role"].get(role, 0) for role in UserRole}
 
         return UserStatsResponse(
             total_users=total_users,
@@ -354,6 +337,7 @@ class AuthService:
         user.updated_at = datetime.now(timezone.utc)
         
         await self.db.commit()
+        principal_cache.invalidate(user_id)
         await self.db.refresh(user)
         
         return user
@@ -366,7 +350,7 @@ class AuthService:
 
         # Generar nueva contraseña temporal
         temp_password = self.generate_temporary_password()
-        hashed_password = self._hash_password(temp_password)
+        hashed_password = await self._hash_password(temp_password)
 
         # Actualizar usuario
         user.hashed_password = hashed_password
@@ -376,6 +360,7 @@ class AuthService:
         user.updated_at = datetime.now(timezone.utc)
 
         await self.db.commit()
+        principal_cache.invalidate(user_id)
 
         return temp_password
 
@@ -389,6 +374,7 @@ class AuthService:
         user.updated_at = datetime.now(timezone.utc)
         
         await self.db.commit()
+        principal_cache.invalidate(user_id)
         await self.db.refresh(user)
         
         return user
@@ -408,7 +394,7 @@ class AuthService:
             raise UserValidationError("Las contraseñas nuevas no coinciden")
 
         # Verificar contraseña actual
-        if not self._verify_password(password_data.current_password, user.hashed_password):
+        if not await self._verify_password(password_data.current_password, user.hashed_password):
             raise UserValidationError("Contraseña actual incorrecta")
 
         # Validar fortaleza de la nueva contraseña
@@ -417,12 +403,13 @@ class AuthService:
             raise UserValidationError(f"Contraseña débil: {', '.join(validation['errors'])}")
 
         # Actualizar con nueva contraseña
-        user.hashed_password = self._hash_password(password_data.new_password)
+        user.hashed_password = await self._hash_password(password_data.new_password)
         user.force_password_change = False
         user.password_changed_at = datetime.now(timezone.utc)
         user.updated_at = datetime.now(timezone.utc)
 
         await self.db.commit()
+        principal_cache.invalidate(user_id)
 
         return True
 
@@ -487,8 +474,10 @@ class AuthService:
         session = result.scalar_one_or_none()
         
         if session:
+            user_id = session.user_id
             await self.db.delete(session)
             await self.db.commit()
+            principal_cache.invalidate(user_id)
             return True
             
         return False
@@ -535,6 +524,7 @@ class AuthService:
             await self.db.delete(session)
             
         await self.db.commit()
+        principal_cache.invalidate(user_id)
         
         return len(sessions)    
     
@@ -550,6 +540,7 @@ class AuthService:
         # Eliminar el usuario
         await self.db.delete(user)
         await self.db.commit()
+        principal_cache.invalidate(user_id)
         
         return True
 
@@ -578,7 +569,7 @@ class AuthService:
         
         # Crear el usuario administrador por defecto
         try:
-            hashed_password = self._hash_password(settings.DEFAULT_ADMIN_PASSWORD)
+            hashed_password = await self._hash_password(settings.DEFAULT_ADMIN_PASSWORD)
             
             admin_user = User(
                 email=settings.DEFAULT_ADMIN_EMAIL,
@@ -624,7 +615,7 @@ class AuthService:
         
         # Crear el usuario administrador por defecto
         auth_service = cls(db)
-        hashed_password = auth_service._hash_password(settings.DEFAULT_ADMIN_PASSWORD)
+        hashed_password = await auth_service._hash_password(settings.DEFAULT_ADMIN_PASSWORD)
         
         admin_user = User(
             email=settings.DEFAULT_ADMIN_EMAIL,
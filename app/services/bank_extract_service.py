@@ -7,8 +7,9 @@ import hashlib
 from decimal import Decimal
 from datetime import datetime, date
 from typing import Optional, List, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.models.bank_extract import BankExtract, BankExtractLine, BankExtractStatus, BankExtractLineType
 from app.models.account import Account
@@ -30,10 +31,22 @@ logger = get_logger(__name__)
 class BankExtractService:
     """Servicio para gestión de extractos bancarios"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def import_bank_extract(
+    async def _get_extract(self, extract_id: uuid.UUID) -> BankExtract:
+        """Extracto con sus líneas cargadas (los totales de la respuesta las recorren)"""
+        result = await self.db.execute(
+            select(BankExtract)
+            .options(selectinload(BankExtract.extract_lines))
+            .where(BankExtract.id == extract_id)
+        )
+        extract = result.scalar_one_or_none()
+        if not extract:
+            raise NotFoundError(f"Bank extract with id {extract_id} not found")
+        return extract
+
+    async def import_bank_extract(
         self, 
         extract_data: BankExtractImport, 
         created_by_id: uuid.UUID,
@@ -45,9 +58,7 @@ class BankExtractService:
         """
         try:
             # Validar que la cuenta existe
-            account = self.db.query(Account).filter(
-                Account.id == extract_data.account_id
-            ).first()
+            account = await self.db.get(Account, extract_data.account_id)
             if not account:
                 raise NotFoundError(f"Account with id {extract_data.account_id} not found")
 
@@ -57,9 +68,9 @@ class BankExtractService:
                 file_hash = hashlib.md5(file_content).hexdigest()
                 
                 # Verificar si ya existe un extracto con el mismo hash
-                existing = self.db.query(BankExtract).filter(
-                    BankExtract.file_hash == file_hash
-                ).first()
+                existing = (await self.db.execute(
+                    select(BankExtract).where(BankExtract.file_hash == file_hash).limit(1)
+                )).scalar_one_or_none()
                 if existing:
                     raise BusinessRuleError(f"Bank extract already imported: {existing.name}")
 
@@ -83,7 +94,7 @@ class BankExtractService:
             )
 
             self.db.add(extract)
-            self.db.flush()
+            await self.db.flush()
 
             # Importar líneas
             imported_lines = 0
@@ -121,10 +132,10 @@ class BankExtractService:
                 except Exception as e:
                     errors.append(f"Line {line_data.sequence}: {str(e)}")
 
-            self.db.flush()
+            await self.db.flush()
 
             # Validar el extracto
-            validation = self.validate_extract(extract.id)
+            validation = await self.validate_extract(extract.id)
             if not validation.is_valid:
                 warnings.extend(validation.warnings)
                 if validation.errors:
@@ -134,7 +145,7 @@ class BankExtractService:
             if not errors:
                 extract.status = BankExtractStatus.IMPORTED
             
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Bank extract imported: {extract.id}, {imported_lines} lines")
             
@@ -148,16 +159,14 @@ class BankExtractService:
 
         except Exception as e:
             logger.error(f"Error importing bank extract: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def create_extract(self, extract_data: BankExtractCreate, created_by_id: uuid.UUID) -> BankExtractResponse:
+    async def create_extract(self, extract_data: BankExtractCreate, created_by_id: uuid.UUID) -> BankExtractResponse:
         """Crear extracto bancario básico"""
         try:
             # Validar cuenta
-            account = self.db.query(Account).filter(
-                Account.id == extract_data.account_id
-            ).first()
+            account = await self.db.get(Account, extract_data.account_id)
             if not account:
                 raise NotFoundError(f"Account with id {extract_data.account_id} not found")
 
@@ -177,49 +186,43 @@ class BankExtractService:
                 created_by_id=created_by_id,
                 imported_at=datetime.utcnow()
             )
+            # Colección inicializada vacía: la respuesta cuenta líneas sin recargar
+            extract.extract_lines = []
 
             self.db.add(extract)
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Bank extract created: {extract.id}")
             return BankExtractResponse.from_orm(extract)
 
         except Exception as e:
             logger.error(f"Error creating bank extract: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def get_extract(self, extract_id: uuid.UUID) -> BankExtractResponse:
+    async def get_extract(self, extract_id: uuid.UUID) -> BankExtractResponse:
         """Obtener extracto por ID"""
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
-        if not extract:
-            raise NotFoundError(f"Bank extract with id {extract_id} not found")
-        
+        extract = await self._get_extract(extract_id)
         return BankExtractResponse.from_orm(extract)
 
-    def get_extract_with_lines(self, extract_id: uuid.UUID) -> BankExtractWithLines:
+    async def get_extract_with_lines(self, extract_id: uuid.UUID) -> BankExtractWithLines:
         """Obtener extracto con líneas"""
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
-        if not extract:
-            raise NotFoundError(f"Bank extract with id {extract_id} not found")
-        
-        lines = self.db.query(BankExtractLine).filter(
-            BankExtractLine.bank_extract_id == extract_id
-        ).order_by(BankExtractLine.sequence).all()
+        extract = await self._get_extract(extract_id)
+        lines = sorted(extract.extract_lines, key=lambda line: line.sequence)
         
         return BankExtractWithLines(
             **BankExtractResponse.from_orm(extract).dict(),
             lines=[BankExtractLineResponse.from_orm(line) for line in lines]
         )
 
-    def add_extract_line(
+    async def add_extract_line(
         self, 
         extract_id: uuid.UUID, 
         line_data: BankExtractLineCreate, 
         created_by_id: uuid.UUID
     ) -> BankExtractLineResponse:
         """Agregar línea a extracto"""
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
+        extract = await self.db.get(BankExtract, extract_id)
         if not extract:
             raise NotFoundError(f"Bank extract with id {extract_id} not found")
 
@@ -249,23 +252,23 @@ class BankExtractService:
         line.pending_amount = abs(line.credit_amount - line.debit_amount)
 
         self.db.add(line)
-        self.db.commit()
+        await self.db.commit()
 
         logger.info(f"Extract line added to extract {extract_id}")
         return BankExtractLineResponse.from_orm(line)
 
-    def validate_extract(self, extract_id: uuid.UUID) -> BankExtractValidation:
+    async def validate_extract(self, extract_id: uuid.UUID) -> BankExtractValidation:
         """
         Validar extracto bancario
         Verificar balances y consistencia como en Odoo
         """
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
+        extract = await self.db.get(BankExtract, extract_id)
         if not extract:
             raise NotFoundError(f"Bank extract with id {extract_id} not found")
 
-        lines = self.db.query(BankExtractLine).filter(
-            BankExtractLine.bank_extract_id == extract_id
-        ).all()
+        lines = (await self.db.execute(
+            select(BankExtractLine).where(BankExtractLine.bank_extract_id == extract_id)
+        )).scalars().all()
 
         errors = []
         warnings = []
@@ -304,7 +307,7 @@ class BankExtractService:
             warnings=warnings
         )
 
-    def get_extracts(
+    async def get_extracts(
         self,
         account_id: Optional[uuid.UUID] = None,
         status: Optional[BankExtractStatus] = None,
@@ -314,27 +317,31 @@ class BankExtractService:
         size: int = 50
     ) -> BankExtractListResponse:
         """Obtener lista de extractos con filtros"""
-        query = self.db.query(BankExtract)
+        query = select(BankExtract)
 
         # Aplicar filtros
         if account_id:
-            query = query.filter(BankExtract.account_id == account_id)
+            query = query.where(BankExtract.account_id == account_id)
         
         if status:
-            query = query.filter(BankExtract.status == status)
+            query = query.where(BankExtract.status == status)
             
         if date_from:
-            query = query.filter(BankExtract.statement_date >= date_from)
+            query = query.where(BankExtract.statement_date >= date_from)
             
         if date_to:
-            query = query.filter(BankExtract.statement_date <= date_to)
+            query = query.where(BankExtract.statement_date <= date_to)
 
         # Contar total
-        total = query.count()
+        total = await self.db.scalar(select(func.count()).select_from(query.subquery()))
 
         # Paginación
         offset = (page - 1) * size
-        extracts = query.order_by(desc(BankExtract.statement_date)).offset(offset).limit(size).all()
+        result = await self.db.execute(
+            query.options(selectinload(BankExtract.extract_lines))
+            .order_by(desc(BankExtract.statement_date)).offset(offset).limit(size)
+        )
+        extracts = result.scalars().all()
 
         return BankExtractListResponse(
             extracts=[BankExtractResponse.from_orm(e) for e in extracts],
@@ -344,36 +351,32 @@ class BankExtractService:
             pages=(total + size - 1) // size
         )
 
-    def start_reconciliation_process(self, extract_id: uuid.UUID) -> BankExtractResponse:
+    async def start_reconciliation_process(self, extract_id: uuid.UUID) -> BankExtractResponse:
         """
         Iniciar proceso de conciliación
         Cambiar estado del extracto a "processing"
         """
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
-        if not extract:
-            raise NotFoundError(f"Bank extract with id {extract_id} not found")
+        extract = await self._get_extract(extract_id)
 
         if extract.status != BankExtractStatus.IMPORTED:
             raise BusinessRuleError("Extract must be imported to start reconciliation")
 
         # Validar antes de iniciar conciliación
-        validation = self.validate_extract(extract_id)
+        validation = await self.validate_extract(extract_id)
         if not validation.is_valid:
             raise BusinessRuleError(f"Extract validation failed: {', '.join(validation.errors)}")
 
         extract.status = BankExtractStatus.PROCESSING
-        self.db.commit()
+        await self.db.commit()
 
         logger.info(f"Reconciliation process started for extract {extract_id}")
         return BankExtractResponse.from_orm(extract)
 
-    def close_extract(self, extract_id: uuid.UUID, closed_by_id: uuid.UUID) -> BankExtractResponse:
+    async def close_extract(self, extract_id: uuid.UUID, closed_by_id: uuid.UUID) -> BankExtractResponse:
         """
         Cerrar extracto después de conciliación completa
         """
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
-        if not extract:
-            raise NotFoundError(f"Bank extract with id {extract_id} not found")
+        extract = await self._get_extract(extract_id)
 
         if extract.status != BankExtractStatus.RECONCILED:
             raise BusinessRuleError("Extract must be reconciled to close")
@@ -382,7 +385,7 @@ class BankExtractService:
         extract.reconciled_by_id = closed_by_id
         extract.reconciled_at = datetime.utcnow()
         
-        self.db.commit()
+        await self.db.commit()
 
         logger.info(f"Extract closed: {extract_id}")
         return BankExtractResponse.from_orm(extract)
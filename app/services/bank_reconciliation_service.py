@@ -6,8 +6,9 @@ import uuid
 from decimal import Decimal
 from datetime import datetime, date, timedelta
 from typing import Optional, List, Dict, Any, Tuple
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func, desc, text
+from sqlalchemy import and_, or_, func, desc, text, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.models.bank_reconciliation import BankReconciliation, ReconciliationType
 from app.models.bank_extract import BankExtract, BankExtractLine, BankExtractStatus
@@ -30,10 +31,20 @@ logger = get_logger(__name__)
 class BankReconciliationService:
     """Servicio para conciliación bancaria"""
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def create_reconciliation(
+    async def _get_reconciliation(self, reconciliation_id: uuid.UUID, *options) -> BankReconciliation:
+        """Conciliación por ID con las relaciones indicadas cargadas"""
+        result = await self.db.execute(
+            select(BankReconciliation).options(*options).where(BankReconciliation.id == reconciliation_id)
+        )
+        reconciliation = result.scalar_one_or_none()
+        if not reconciliation:
+            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        return reconciliation
+
+    async def create_reconciliation(
         self, 
         reconciliation_data: BankReconciliationCreate, 
         created_by_id: uuid.UUID
@@ -44,9 +55,7 @@ class BankReconciliationService:
         """
         try:
             # Validar línea de extracto
-            extract_line = self.db.query(BankExtractLine).filter(
-                BankExtractLine.id == reconciliation_data.extract_line_id
-            ).first()
+            extract_line = await self.db.get(BankExtractLine, reconciliation_data.extract_line_id)
             if not extract_line:
                 raise NotFoundError(f"Extract line with id {reconciliation_data.extract_line_id} not found")
 
@@ -59,9 +68,7 @@ class BankReconciliationService:
             invoice = None
             
             if reconciliation_data.payment_id:
-                payment = self.db.query(Payment).filter(
-                    Payment.id == reconciliation_data.payment_id
-                ).first()
+                payment = await self.db.get(Payment, reconciliation_data.payment_id)
                 if not payment:
                     raise NotFoundError(f"Payment with id {reconciliation_data.payment_id} not found")
                 
@@ -69,9 +76,7 @@ class BankReconciliationService:
                     raise BusinessRuleError("Payment must be confirmed for reconciliation")
 
             if reconciliation_data.invoice_id:
-                invoice = self.db.query(Invoice).filter(
-                    Invoice.id == reconciliation_data.invoice_id
-                ).first()
+                invoice = await self.db.get(Invoice, reconciliation_data.invoice_id)
                 if not invoice:
                     raise NotFoundError(f"Invoice with id {reconciliation_data.invoice_id} not found")
                 
@@ -96,25 +101,26 @@ class BankReconciliationService:
             )
 
             self.db.add(reconciliation)
-            self.db.flush()
+            await self.db.flush()
 
-            # Actualizar línea de extracto
+            # Actualizar línea de extracto (recarga sus conciliaciones, incluida la nueva)
+            await self.db.refresh(extract_line, ["bank_reconciliations"])
             extract_line.calculate_pending_amount()
 
             # Actualizar extracto si todas las líneas están conciliadas
-            self._update_extract_status(extract_line.bank_extract_id)
+            await self._update_extract_status(extract_line.bank_extract_id)
 
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Bank reconciliation created: {reconciliation.id}")
             return BankReconciliationResponse.from_orm(reconciliation)
 
         except Exception as e:
             logger.error(f"Error creating reconciliation: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def auto_reconcile_extract(
+    async def auto_reconcile_extract(
         self,
         extract_id: uuid.UUID,
         request: AutoReconciliationRequest,
@@ -125,7 +131,7 @@ class BankReconciliationService:
         Busca coincidencias automáticas como en Odoo
         """
         try:
-            extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
+            extract = await self.db.get(BankExtract, extract_id)
             if not extract:
                 raise NotFoundError(f"Extract with id {extract_id} not found")
 
@@ -133,27 +139,34 @@ class BankReconciliationService:
                 raise BusinessRuleError("Extract must be in processing status for auto reconciliation")
 
             # Obtener líneas a procesar
-            lines_query = self.db.query(BankExtractLine).filter(
+            lines_query = select(BankExtractLine).where(
                 BankExtractLine.bank_extract_id == extract_id,
                 BankExtractLine.is_reconciled == False
             )
 
             if request.extract_line_ids:
-                lines_query = lines_query.filter(
+                lines_query = lines_query.where(
                     BankExtractLine.id.in_(request.extract_line_ids)
                 )
 
-            lines = lines_query.all()
+            # Capturar identificadores antes de procesar: el rollback de una conciliación
+            # fallida expira las líneas cargadas y no se pueden recargar en diferido
+            line_refs = [
+                (line.id, line.sequence)
+                for line in (await self.db.execute(lines_query)).scalars().all()
+            ]
 
             processed_lines = 0
             reconciled_lines = 0
             suggested_reconciliations = []
             errors = []
 
-            for line in lines:
+            for line_id, line_sequence in line_refs:
                 try:
+                    line = await self.db.get(BankExtractLine, line_id)
+
                     # Buscar pagos coincidentes
-                    matches = self._find_payment_matches(
+                    matches = await self._find_payment_matches(
                         line, 
                         request.tolerance_amount or Decimal('0'),
                         request.tolerance_days or 0,
@@ -178,12 +191,12 @@ class BankReconciliationService:
                             notes=f"Automatically matched with confidence: {best_match.get('confidence', 0)}"
                         )
 
-                        reconciliation = self.create_reconciliation(reconciliation_data, created_by_id)
+                        reconciliation = await self.create_reconciliation(reconciliation_data, created_by_id)
                         suggested_reconciliations.append(reconciliation)
                         reconciled_lines += 1
 
                 except Exception as e:
-                    errors.append(f"Line {line.sequence}: {str(e)}")
+                    errors.append(f"Line {line_sequence}: {str(e)}")
 
             logger.info(f"Auto reconciliation completed: {reconciled_lines}/{processed_lines} lines")
 
@@ -196,10 +209,10 @@ class BankReconciliationService:
 
         except Exception as e:
             logger.error(f"Error in auto reconciliation: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def _find_payment_matches(
+    async def _find_payment_matches(
         self, 
         extract_line: BankExtractLine, 
         tolerance_amount: Decimal,
@@ -223,22 +236,17 @@ class BankReconciliationService:
         if date_range_end:
             search_date_end = min(search_date_end, date_range_end)
 
-        # Buscar pagos
-        payments_query = self.db.query(Payment).filter(
+        # Buscar pagos que aún no estén conciliados
+        payments_query = select(Payment).where(
             Payment.status == PaymentStatus.CONFIRMED,
             Payment.payment_date >= search_date_start,
-            Payment.payment_date <= search_date_end
+            Payment.payment_date <= search_date_end,
+            ~select(BankReconciliation.id).where(
+                BankReconciliation.payment_id == Payment.id
+            ).exists()
         )
 
-        for payment in payments_query.all():
-            # Verificar si el pago ya está conciliado
-            existing_reconciliation = self.db.query(BankReconciliation).filter(
-                BankReconciliation.payment_id == payment.id
-            ).first()
-            
-            if existing_reconciliation:
-                continue
-
+        for payment in (await self.db.execute(payments_query)).scalars().all():
             # Calcular score de coincidencia
             amount_diff = abs(payment.amount - line_amount)
             date_diff = abs((payment.payment_date - extract_line.transaction_date).days)
@@ -280,11 +288,14 @@ class BankReconciliationService:
         
         return matches[:5]  # Retornar top 5 coincidencias
 
-    def validate_reconciliation(self, reconciliation_id: uuid.UUID) -> ReconciliationValidation:
+    async def validate_reconciliation(self, reconciliation_id: uuid.UUID) -> ReconciliationValidation:
         """Validar conciliación"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
+        result = await self.db.execute(
+            select(BankReconciliation)
+            .options(joinedload(BankReconciliation.extract_line))
+            .where(BankReconciliation.id == reconciliation_id)
+        )
+        reconciliation = result.scalar_one_or_none()
         
         if not reconciliation:
             raise NotFoundError(f"Reconciliation with id {reconciliation_id} not found")
@@ -297,9 +308,11 @@ class BankReconciliationService:
         extract_line_amount = abs(extract_line.credit_amount - extract_line.debit_amount)
         
         # Calcular total conciliado para esta línea
-        total_reconciled = self.db.query(func.sum(BankReconciliation.amount)).filter(
-            BankReconciliation.extract_line_id == extract_line.id
-        ).scalar() or Decimal('0')
+        total_reconciled = await self.db.scalar(
+            select(func.sum(BankReconciliation.amount)).where(
+                BankReconciliation.extract_line_id == extract_line.id
+            )
+        ) or Decimal('0')
 
         remaining_amount = extract_line_amount - total_reconciled
 
@@ -325,16 +338,22 @@ class BankReconciliationService:
             warnings=warnings
         )
 
-    def confirm_reconciliations(
+    async def confirm_reconciliations(
         self, 
         reconciliation_ids: List[uuid.UUID], 
         confirmed_by_id: uuid.UUID
     ) -> List[BankReconciliationResponse]:
         """Confirmar múltiples conciliaciones"""
         try:
-            reconciliations = self.db.query(BankReconciliation).filter(
-                BankReconciliation.id.in_(reconciliation_ids)
-            ).all()
+            result = await self.db.execute(
+                select(BankReconciliation)
+                .options(
+                    selectinload(BankReconciliation.extract_line)
+                    .selectinload(BankExtractLine.bank_reconciliations)
+                )
+                .where(BankReconciliation.id.in_(reconciliation_ids))
+            )
+            reconciliations = result.scalars().all()
 
             if len(reconciliations) != len(reconciliation_ids):
                 raise NotFoundError("Some reconciliations not found")
@@ -349,19 +368,24 @@ class BankReconciliationService:
                 # Actualizar línea de extracto
                 reconciliation.extract_line.calculate_pending_amount()
 
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Confirmed {len(confirmed)} reconciliations")
             return confirmed
 
         except Exception as e:
             logger.error(f"Error confirming reconciliations: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def _update_extract_status(self, extract_id: uuid.UUID):
+    async def _update_extract_status(self, extract_id: uuid.UUID):
         """Actualizar estado del extracto basado en conciliación"""
-        extract = self.db.query(BankExtract).filter(BankExtract.id == extract_id).first()
+        result = await self.db.execute(
+            select(BankExtract)
+            .options(selectinload(BankExtract.extract_lines))
+            .where(BankExtract.id == extract_id)
+        )
+        extract = result.scalar_one_or_none()
         if not extract:
             return
 
@@ -373,7 +397,7 @@ class BankReconciliationService:
             extract.status = BankExtractStatus.RECONCILED
             logger.info(f"Extract {extract_id} fully reconciled")
 
-    def get_reconciliations(
+    async def get_reconciliations(
         self,
         extract_id: Optional[uuid.UUID] = None,
         payment_id: Optional[uuid.UUID] = None,
@@ -383,29 +407,32 @@ class BankReconciliationService:
         size: int = 50
     ) -> BankReconciliationListResponse:
         """Obtener lista de conciliaciones con filtros"""
-        query = self.db.query(BankReconciliation)
+        query = select(BankReconciliation)
 
         # Aplicar filtros
         if extract_id:
-            query = query.join(BankExtractLine).filter(
+            query = query.join(BankExtractLine).where(
                 BankExtractLine.bank_extract_id == extract_id
             )
         
         if payment_id:
-            query = query.filter(BankReconciliation.payment_id == payment_id)
+            query = query.where(BankReconciliation.payment_id == payment_id)
             
         if invoice_id:
-            query = query.filter(BankReconciliation.invoice_id == invoice_id)
+            query = query.where(BankReconciliation.invoice_id == invoice_id)
             
         if is_confirmed is not None:
-            query = query.filter(BankReconciliation.is_confirmed == is_confirmed)
+            query = query.where(BankReconciliation.is_confirmed == is_confirmed)
 
         # Contar total
-        total = query.count()
+        total = await self.db.scalar(select(func.count()).select_from(query.subquery()))
 
         # Paginación
         offset = (page - 1) * size
-        reconciliations = query.order_by(desc(BankReconciliation.created_at)).offset(offset).limit(size).all()
+        result = await self.db.execute(
+            query.order_by(desc(BankReconciliation.created_at)).offset(offset).limit(size)
+        )
+        reconciliations = result.scalars().all()
         
         return BankReconciliationListResponse(
             reconciliations=[BankReconciliationResponse.from_orm(r) for r in reconciliations],
@@ -415,7 +442,7 @@ class BankReconciliationService:
             pages=(total + size - 1) // size
         )
 
-    def list_reconciliations(
+    async def list_reconciliations(
         self,
         skip: int = 0,
         limit: int = 100,
@@ -423,35 +450,27 @@ class BankReconciliationService:
         account_id: Optional[uuid.UUID] = None,
         extract_id: Optional[uuid.UUID] = None    ) -> BankReconciliationListResponse:
         """Listar conciliaciones con filtros"""
-        return self.get_reconciliations(
+        return await self.get_reconciliations(
             extract_id=extract_id,
             is_confirmed=status == "confirmed" if status else None,
             page=(skip // limit) + 1,
             size=limit
         )
 
-    def get_reconciliation(self, reconciliation_id: uuid.UUID) -> BankReconciliationResponse:
+    async def get_reconciliation(self, reconciliation_id: uuid.UUID) -> BankReconciliationResponse:
         """Obtener conciliación por ID"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
-        if not reconciliation:
-            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        reconciliation = await self._get_reconciliation(reconciliation_id)
         
         return BankReconciliationResponse.from_orm(reconciliation)
 
-    def update_reconciliation(
+    async def update_reconciliation(
         self, 
         reconciliation_id: uuid.UUID, 
         reconciliation_data: BankReconciliationUpdate, 
         updated_by_id: uuid.UUID
     ) -> BankReconciliationResponse:
         """Actualizar conciliación"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
-        if not reconciliation:
-            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        reconciliation = await self._get_reconciliation(reconciliation_id)
 
         # Verificar que se puede actualizar
         if reconciliation.is_confirmed:
@@ -461,35 +480,27 @@ class BankReconciliationService:
             setattr(reconciliation, field, value)
 
         reconciliation.updated_at = datetime.utcnow()
-        self.db.commit()
+        await self.db.commit()
 
         logger.info(f"Bank reconciliation updated: {reconciliation_id}")
         return BankReconciliationResponse.from_orm(reconciliation)
 
-    def delete_reconciliation(self, reconciliation_id: uuid.UUID, deleted_by_id: uuid.UUID):
+    async def delete_reconciliation(self, reconciliation_id: uuid.UUID, deleted_by_id: uuid.UUID):
         """Eliminar conciliación"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
-        if not reconciliation:
-            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        reconciliation = await self._get_reconciliation(reconciliation_id)
 
         # Verificar que se puede eliminar
         if reconciliation.is_confirmed:
             raise BusinessRuleError("Cannot delete confirmed reconciliation")
 
-        self.db.delete(reconciliation)
-        self.db.commit()
+        await self.db.delete(reconciliation)
+        await self.db.commit()
 
         logger.info(f"Bank reconciliation deleted: {reconciliation_id}")
 
-    def confirm_reconciliation(self, reconciliation_id: uuid.UUID, confirmed_by_id: uuid.UUID) -> BankReconciliationResponse:
+    async def confirm_reconciliation(self, reconciliation_id: uuid.UUID, confirmed_by_id: uuid.UUID) -> BankReconciliationResponse:
         """Confirmar conciliación"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
-        if not reconciliation:
-            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        reconciliation = await self._get_reconciliation(reconciliation_id)
 
         if reconciliation.is_confirmed:
             raise BusinessRuleError("Reconciliation is already confirmed")
@@ -497,29 +508,25 @@ class BankReconciliationService:
         reconciliation.is_confirmed = True
         reconciliation.confirmed_by_id = confirmed_by_id
         reconciliation.confirmed_at = datetime.utcnow()
-        self.db.commit()
+        await self.db.commit()
 
         logger.info(f"Bank reconciliation confirmed: {reconciliation_id}")
         return BankReconciliationResponse.from_orm(reconciliation)
 
-    def cancel_reconciliation(self, reconciliation_id: uuid.UUID, cancelled_by_id: uuid.UUID) -> BankReconciliationResponse:
+    async def cancel_reconciliation(self, reconciliation_id: uuid.UUID, cancelled_by_id: uuid.UUID) -> BankReconciliationResponse:
         """Cancelar conciliación"""
-        reconciliation = self.db.query(BankReconciliation).filter(
-            BankReconciliation.id == reconciliation_id
-        ).first()
-        if not reconciliation:
-            raise NotFoundError(f"Bank reconciliation with id {reconciliation_id} not found")
+        reconciliation = await self._get_reconciliation(reconciliation_id)
 
         if reconciliation.is_confirmed:
             raise BusinessRuleError("Cannot cancel confirmed reconciliation")        # Marcar como cancelada (puedes agregar un campo cancelled si lo necesitas)
         reconciliation.is_confirmed = False
         reconciliation.updated_at = datetime.utcnow()
-        self.db.commit()
+        await self.db.commit()
         
         logger.info(f"Bank reconciliation cancelled: {reconciliation_id}")
         return BankReconciliationResponse.from_orm(reconciliation)
 
-    def auto_reconcile(
+    async def auto_reconcile(
         self,
         extract_id: uuid.UUID,
         account_id: Optional[uuid.UUID] = None,
@@ -531,10 +538,12 @@ class BankReconciliationService:
         from app.schemas.bank_reconciliation import BankReconciliationAutoResponse
         
         # Obtener líneas del extracto
-        extract_lines = self.db.query(BankExtractLine).filter(
-            BankExtractLine.bank_extract_id == extract_id,
-            BankExtractLine.is_reconciled == False
-        ).all()
+        extract_line_ids = (await self.db.scalars(
+            select(BankExtractLine.id).where(
+                BankExtractLine.bank_extract_id == extract_id,
+                BankExtractLine.is_reconciled == False
+            )
+        )).all()
         
         # Crear request para el método existente
         from app.schemas.bank_reconciliation import AutoReconciliationRequest
@@ -543,11 +552,11 @@ class BankReconciliationService:
             tolerance_days=tolerance_days or 7,
             date_range_start=None,
             date_range_end=None,
-            extract_line_ids=[line.id for line in extract_lines]
+            extract_line_ids=list(extract_line_ids)
         )
         
         # Usar método existente
-        result = self.auto_reconcile_extract(extract_id, request, created_by_id or uuid.uuid4())
+        result = await self.auto_reconcile_extract(extract_id, request, created_by_id or uuid.uuid4())
         
         # Calcular monto conciliado
         reconciled_amount = Decimal('0')
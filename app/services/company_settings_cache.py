@@ -0,0 +1,360 @@
+"""
+Caché en memoria de la configuración de empresa y de la resolución de cuentas por defecto.
+
+Mantiene una foto (snapshot) con los valores de ``company_settings``, un índice
+ligero del plan de cuentas, las cuentas específicas de cada diario y el mapa de
+cuentas de impuestos. Con la foto cargada, resolver "qué cuenta usar" es una
+búsqueda en diccionarios en lugar de una cadena de consultas.
+
+La foto se invalida de inmediato en este proceso cuando se escribe la
+configuración, una cuenta o un diario. Para los demás workers, cada escritura
+incrementa ``company_settings.settings_version``; la versión se verifica como
+máximo cada ``COMPANY_SETTINGS_VERSION_CHECK_SECONDS`` y la foto se recarga
+siempre al vencer ``COMPANY_SETTINGS_CACHE_TTL_SECONDS``.
+"""
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.settings import settings
+from app.models.account import Account, AccountCategory, AccountType
+from app.models.company_settings import CompanySettings
+from app.models.journal import Journal
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+# Cuentas configurables por diario (sobrescriben las de empresa)
+JOURNAL_ACCOUNT_FIELDS = (
+    "default_account_id",
+    "default_debit_account_id",
+    "default_credit_account_id",
+    "customer_receivable_account_id",
+    "supplier_payable_account_id",
+    "cash_difference_account_id",
+    "bank_charges_account_id",
+    "currency_exchange_account_id",
+)
+
+# (tipo de impuesto, es_por_pagar) -> campo de configuración
+TAX_ACCOUNT_FIELDS: Dict[Tuple[str, bool], str] = {
+    ("ICMS", True): "default_icms_payable_account_id",
+    ("ICMS", False): "default_icms_deductible_account_id",
+    ("PIS", True): "default_pis_payable_account_id",
+    ("PIS", False): "default_pis_deductible_account_id",
+    ("COFINS", True): "default_cofins_payable_account_id",
+    ("COFINS", False): "default_cofins_deductible_account_id",
+    ("IPI", True): "default_ipi_payable_account_id",
+    ("IPI", False): "default_ipi_deductible_account_id",
+    ("ISS", True): "default_iss_payable_account_id",
+    ("CSLL", True): "default_csll_payable_account_id",
+    ("IRPJ", True): "default_irpj_payable_account_id",
+}
+
+
+class AccountRef(NamedTuple):
+    """Datos mínimos de una cuenta para generar líneas de asiento"""
+    id: uuid.UUID
+    code: str
+    name: str
+    account_type: AccountType
+    category: Optional[AccountCategory]
+    is_active: bool
+    allows_movements: bool
+
+
+_ACCOUNT_COLUMNS = (
+    Account.id,
+    Account.code,
+    Account.name,
+    Account.account_type,
+    Account.category,
+    Account.is_active,
+    Account.allows_movements,
+)
+
+_JOURNAL_COLUMNS = (Journal.id,) + tuple(getattr(Journal, field) for field in JOURNAL_ACCOUNT_FIELDS)
+
+
+class CompanySettingsSnapshot:
+    """Foto inmutable de la configuración de empresa y de las cuentas que referencia"""
+
+    __slots__ = ("settings", "settings_version", "accounts", "journal_accounts", "tax_accounts")
+
+    def __init__(
+        self,
+        settings_values: Optional[Dict[str, Any]],
+        accounts: Iterable[AccountRef],
+        journal_accounts: Dict[uuid.UUID, Dict[str, Optional[uuid.UUID]]]
+    ):
+        # Valores escalares de company_settings con acceso por atributo
+        # (settings.default_bank_account_id, settings.currency_code, ...)
+        self.settings: Optional[SimpleNamespace] = (
+            SimpleNamespace(**settings_values) if settings_values is not None else None
+        )
+        self.settings_version: Optional[int] = (
+            settings_values.get("settings_version") if settings_values is not None else None
+        )
+        # Ordenadas por código para que los fallbacks "primera cuenta" sean deterministas
+        self.accounts: Dict[uuid.UUID, AccountRef] = {
+            account.id: account for account in sorted(accounts, key=lambda a: a.code)
+        }
+        self.journal_accounts = journal_accounts
+        self.tax_accounts: Dict[Tuple[str, bool], uuid.UUID] = {}
+        if self.settings is not None:
+            for key, field in TAX_ACCOUNT_FIELDS.items():
+                account_id = settings_values.get(field)
+                if account_id:
+                    self.tax_accounts[key] = account_id
+
+    def account(
+        self,
+        account_id: Optional[uuid.UUID],
+        require_movements: bool = False
+    ) -> Optional[AccountRef]:
+        """Cuenta activa por ID (opcionalmente sólo si admite movimientos)"""
+        if not account_id:
+            return None
+        account = self.accounts.get(account_id)
+        if account is None or not account.is_active:
+            return None
+        if require_movements and not account.allows_movements:
+            return None
+        return account
+
+    def default_account(self, field: str, require_movements: bool = False) -> Optional[AccountRef]:
+        """Cuenta por defecto de la empresa para el campo indicado (``*_account_id``)"""
+        if self.settings is None:
+            return None
+        return self.account(getattr(self.settings, field, None), require_movements)
+
+    def journal_account(
+        self,
+        journal_id: Optional[uuid.UUID],
+        field: str,
+        require_movements: bool = False
+    ) -> Optional[AccountRef]:
+        """Cuenta específica configurada en un diario"""
+        if not journal_id:
+            return None
+        overrides = self.journal_accounts.get(journal_id)
+        if not overrides:
+            return None
+        return self.account(overrides.get(field), require_movements)
+
+    def tax_account(self, tax_type: str, is_payable: bool) -> Optional[AccountRef]:
+        """Cuenta configurada para un tipo de impuesto (por pagar o deducible)"""
+        return self.account(self.tax_accounts.get((tax_type.upper(), is_payable)), require_movements=True)
+
+    def first_account(
+        self,
+        account_type: AccountType,
+        category: Optional[AccountCategory] = None,
+        require_movements: bool = False
+    ) -> Optional[AccountRef]:
+        """Primera cuenta activa (por código) del tipo y categoría indicados"""
+        for account in self.accounts.values():
+            if not account.is_active or account.account_type != account_type:
+                continue
+            if category is not None and account.category != category:
+                continue
+            if require_movements and not account.allows_movements:
+                continue
+            return account
+        return None
+
+    def customer_receivable_account(
+        self,
+        third_party_account_id: Optional[uuid.UUID] = None,
+        journal_id: Optional[uuid.UUID] = None
+    ) -> Optional[AccountRef]:
+        """
+        Cuenta por cobrar según la jerarquía: tercero, diario, empresa y
+        primera cuenta de activo corriente
+        """
+        return (
+            self.account(third_party_account_id)
+            or self.journal_account(journal_id, "customer_receivable_account_id")
+            or self.default_account("default_customer_receivable_account_id")
+            or self.first_account(AccountType.ASSET, AccountCategory.CURRENT_ASSET)
+        )
+
+    def supplier_payable_account(
+        self,
+        third_party_account_id: Optional[uuid.UUID] = None,
+        journal_id: Optional[uuid.UUID] = None
+    ) -> Optional[AccountRef]:
+        """
+        Cuenta por pagar según la jerarquía: tercero, diario, empresa y
+        primera cuenta de pasivo corriente
+        """
+        return (
+            self.account(third_party_account_id)
+            or self.journal_account(journal_id, "supplier_payable_account_id")
+            or self.default_account("default_supplier_payable_account_id")
+            or self.first_account(AccountType.LIABILITY, AccountCategory.CURRENT_LIABILITY)
+        )
+
+
+def _settings_values(row: Optional[CompanySettings]) -> Optional[Dict[str, Any]]:
+    """Copia las columnas de la configuración a un dict desacoplado de la sesión"""
+    if row is None:
+        return None
+    return {column.key: getattr(row, column.key) for column in CompanySettings.__table__.columns}
+
+
+def _build_snapshot(
+    settings_row: Optional[CompanySettings],
+    account_rows: Iterable[Tuple],
+    journal_rows: Iterable[Tuple]
+) -> CompanySettingsSnapshot:
+    journal_accounts: Dict[uuid.UUID, Dict[str, Optional[uuid.UUID]]] = {}
+    for row in journal_rows:
+        overrides = {
+            field: value for field, value in zip(JOURNAL_ACCOUNT_FIELDS, row[1:]) if value
+        }
+        if overrides:
+            journal_accounts[row[0]] = overrides
+
+    return CompanySettingsSnapshot(
+        _settings_values(settings_row),
+        (AccountRef(*row) for row in account_rows),
+        journal_accounts
+    )
+
+
+_ACTIVE_SETTINGS = select(CompanySettings).where(CompanySettings.is_active == True)
+_ACTIVE_VERSION = select(CompanySettings.settings_version).where(CompanySettings.is_active == True)
+
+
+class CompanySettingsCache:
+    """
+    Caché por proceso de ``CompanySettingsSnapshot``.
+
+    Las lecturas dentro del intervalo de verificación no tocan la base de
+    datos; pasado el intervalo se consulta sólo la columna de versión.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: Optional[float] = None,
+        version_check_seconds: Optional[float] = None
+    ):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else settings.COMPANY_SETTINGS_CACHE_TTL_SECONDS
+        )
+        self.version_check_seconds = (
+            version_check_seconds if version_check_seconds is not None
+            else settings.COMPANY_SETTINGS_VERSION_CHECK_SECONDS
+        )
+        self._snapshot: Optional[CompanySettingsSnapshot] = None
+        self._loaded_at: Optional[float] = None
+        self._checked_at: Optional[float] = None
+        self._generation = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> Optional[CompanySettingsSnapshot]:
+        """Foto actual sin validar (None si no se ha cargado)"""
+        return self._snapshot
+
+    def invalidate(self) -> None:
+        """Descarta la foto; la próxima lectura la recarga"""
+        self._generation += 1
+        self._snapshot = None
+        self._loaded_at = None
+        self._checked_at = None
+
+    def load(self, snapshot: CompanySettingsSnapshot) -> None:
+        """Instala una foto ya construida (útil para pruebas y precarga)"""
+        now = time.monotonic()
+        self._snapshot = snapshot
+        self._loaded_at = now
+        self._checked_at = now
+
+    async def bump_version(self, db: AsyncSession) -> None:
+        """
+        Incrementa la versión de la configuración dentro de la transacción del
+        llamador para que los demás workers recarguen su foto. Llamar a
+        ``invalidate()`` después del commit.
+        """
+        await db.execute(
+            update(CompanySettings)
+            .where(CompanySettings.is_active == True)
+            .values(settings_version=CompanySettings.settings_version + 1)
+        )
+
+    def _state(self) -> str:
+        """'fresh' (usar tal cual), 'check' (verificar versión) o 'stale' (recargar)"""
+        if self._snapshot is None or self._loaded_at is None:
+            return "stale"
+        now = time.monotonic()
+        if now - self._loaded_at >= self.ttl_seconds:
+            return "stale"
+        if now - self._checked_at < self.version_check_seconds:
+            return "fresh"
+        return "check"
+
+    def _install(self, snapshot: CompanySettingsSnapshot, generation: int) -> CompanySettingsSnapshot:
+        # Si hubo una invalidación durante la carga, la foto sirve para esta
+        # llamada pero no se conserva
+        if generation == self._generation:
+            self.load(snapshot)
+        logger.debug(
+            f"Configuración de empresa en caché: versión {snapshot.settings_version}, "
+            f"{len(snapshot.accounts)} cuentas, {len(snapshot.journal_accounts)} diarios con cuentas propias"
+        )
+        return snapshot
+
+    async def get_snapshot(self, db: AsyncSession) -> CompanySettingsSnapshot:
+        """Foto vigente, recargándola con tres consultas sólo si cambió la versión"""
+        state = self._state()
+        if state == "fresh":
+            return self._snapshot
+
+        async with self._lock:
+            state = self._state()
+            if state == "fresh":
+                return self._snapshot
+
+            if state == "check":
+                version = await db.scalar(_ACTIVE_VERSION)
+                if version == self._snapshot.settings_version:
+                    self._checked_at = time.monotonic()
+                    return self._snapshot
+
+            generation = self._generation
+            settings_row = (await db.execute(_ACTIVE_SETTINGS)).scalars().first()
+            account_rows = (await db.execute(select(*_ACCOUNT_COLUMNS))).all()
+            journal_rows = (await db.execute(select(*_JOURNAL_COLUMNS))).all()
+            return self._install(_build_snapshot(settings_row, account_rows, journal_rows), generation)
+
+    def get_snapshot_sync(self, db: Session) -> CompanySettingsSnapshot:
+        """Variante para servicios que todavía usan la sesión síncrona"""
+        state = self._state()
+        if state == "fresh":
+            return self._snapshot
+
+        if state == "check":
+            version = db.scalar(_ACTIVE_VERSION)
+            if version == self._snapshot.settings_version:
+                self._checked_at = time.monotonic()
+                return self._snapshot
+
+        generation = self._generation
+        settings_row = db.execute(_ACTIVE_SETTINGS).scalars().first()
+        account_rows = db.execute(select(*_ACCOUNT_COLUMNS)).all()
+        journal_rows = db.execute(select(*_JOURNAL_COLUMNS)).all()
+        return self._install(_build_snapshot(settings_row, account_rows, journal_rows), generation)
+
+
+# Instancia compartida por proceso
+company_settings_cache = CompanySettingsCache()
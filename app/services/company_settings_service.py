@@ -16,6 +16,8 @@ from app.schemas.company_settings import (
 )
 from app.utils.exceptions import NotFoundError, BusinessRuleError
 from app.services.currency_change_service import CurrencyChangeService
+from app.services.exchange_rate_cache import exchange_rate_table
+from app.services.company_settings_cache import AccountRef, company_settings_cache
 import logging
 
 logger = logging.getLogger(__name__)
@@ -111,6 +113,7 @@ class CompanySettingsService:
         self.db.add(settings)
         await self.db.flush()
         await self.db.commit()
+        company_settings_cache.invalidate()
         
         # Reload with relations
         await self.db.refresh(settings, [
@@ -185,12 +188,18 @@ class CompanySettingsService:
                 setattr(settings, field, value)
                 logger.info(f"Actualizando {field}: {old_value} -> {value}")
         
+        settings.settings_version = (settings.settings_version or 0) + 1
+        
         self.db.add(settings)
         await self.db.flush()
         logger.info("Datos enviados a la base de datos (flush realizado)")
         
         await self.db.commit()
         logger.info("Commit realizado - cambios persistidos")
+        company_settings_cache.invalidate()
+        
+        if 'currency_code' in update_data or 'base_currency_id' in update_data:
+            exchange_rate_table.invalidate()
         
         # Reload with all relations needed for response building
         await self.db.refresh(settings, [
@@ -252,6 +261,7 @@ class CompanySettingsService:
             )
             self.db.add(settings)
             await self.db.commit()
+            company_settings_cache.invalidate()
             logger.info("Created default company settings")
         
         return settings
@@ -447,9 +457,11 @@ class CompanySettingsService:
         for field, value in update_data.items():
             if hasattr(settings, field):
                 setattr(settings, field, value)
+        settings.settings_version = (settings.settings_version or 0) + 1
         
         try:
             await self.db.commit()
+            company_settings_cache.invalidate()
             
             # Reload the settings to get the updated configuration
             return await self.get_tax_accounts_configuration()
@@ -796,125 +808,58 @@ class CompanySettingsService:
         ]
     
     # Additional methods for payment flow integration
-    async def get_customer_receivable_account(self, third_party=None) -> Optional[Account]:
+    # Resueltos sobre la foto en memoria de configuración y plan de cuentas
+    @staticmethod
+    def _first_matching_account(snapshot, account_type: AccountType, code_prefix: Optional[str], name_terms: List[str]) -> Optional[AccountRef]:
+        """Primera cuenta activa (por código) del tipo cuyo código o nombre coincide"""
+        for account in snapshot.accounts.values():
+            if not account.is_active or account.account_type != account_type:
+                continue
+            name = account.name.lower()
+            if (code_prefix and account.code.startswith(code_prefix)) or any(term in name for term in name_terms):
+                return account
+        return None
+
+    async def get_customer_receivable_account(self, third_party=None) -> Optional[AccountRef]:
         """Get the appropriate receivable account for a customer"""
+        snapshot = await company_settings_cache.get_snapshot(self.db)
+        
         # If third party has specific account configured
-        if third_party and hasattr(third_party, 'receivable_account_id') and third_party.receivable_account_id:
-            account_result = await self.db.execute(
-                select(Account).where(
-                    and_(
-                        Account.id == third_party.receivable_account_id,
-                        Account.is_active == True
-                    )
-                )
-            )
-            account = account_result.scalar_one_or_none()
-            if account:
-                return account
+        account = snapshot.account(getattr(third_party, 'receivable_account_id', None))
+        if account:
+            return account
         
         # Use company default
-        settings = await self.get_company_settings()
-        if settings and settings.default_customer_receivable_account_id:
-            account_result = await self.db.execute(
-                select(Account).where(
-                    and_(
-                        Account.id == settings.default_customer_receivable_account_id,
-                        Account.is_active == True
-                    )
-                )
-            )
-            return account_result.scalar_one_or_none()
+        if snapshot.settings and snapshot.settings.default_customer_receivable_account_id:
+            return snapshot.default_account('default_customer_receivable_account_id')
         
         # Fallback: find any receivable account
-        account_result = await self.db.execute(
-            select(Account).where(
-                and_(
-                    Account.account_type == AccountType.ASSET,
-                    or_(
-                        Account.code.like('13%'),
-                        Account.name.ilike('%cobrar%'),
-                        Account.name.ilike('%cliente%')
-                    ),
-                    Account.is_active == True
-                )
-            ).order_by(Account.code).limit(1)
-        )
-        return account_result.scalar_one_or_none()
+        return self._first_matching_account(snapshot, AccountType.ASSET, '13', ['cobrar', 'cliente'])
     
-    async def get_supplier_payable_account(self, third_party=None) -> Optional[Account]:
+    async def get_supplier_payable_account(self, third_party=None) -> Optional[AccountRef]:
         """Get the appropriate payable account for a supplier"""
+        snapshot = await company_settings_cache.get_snapshot(self.db)
+        
         # If third party has specific account configured
-        if third_party and hasattr(third_party, 'payable_account_id') and third_party.payable_account_id:
-            account_result = await self.db.execute(
-                select(Account).where(
-                    and_(
-                        Account.id == third_party.payable_account_id,
-                        Account.is_active == True
-                    )
-                )
-            )
-            account = account_result.scalar_one_or_none()
-            if account:
-                return account
+        account = snapshot.account(getattr(third_party, 'payable_account_id', None))
+        if account:
+            return account
         
         # Use company default
-        settings = await self.get_company_settings()
-        if settings and settings.default_supplier_payable_account_id:
-            account_result = await self.db.execute(
-                select(Account).where(
-                    and_(
-                        Account.id == settings.default_supplier_payable_account_id,
-                        Account.is_active == True
-                    )
-                )
-            )
-            return account_result.scalar_one_or_none()
+        if snapshot.settings and snapshot.settings.default_supplier_payable_account_id:
+            return snapshot.default_account('default_supplier_payable_account_id')
         
         # Fallback: find any payable account
-        account_result = await self.db.execute(
-            select(Account).where(
-                and_(
-                    Account.account_type == AccountType.LIABILITY,
-                    or_(
-                        Account.code.like('22%'),
-                        Account.name.ilike('%pagar%'),
-                        Account.name.ilike('%proveedor%')
-                    ),
-                    Account.is_active == True
-                )
-            ).order_by(Account.code).limit(1)
-        )
-        return account_result.scalar_one_or_none()
+        return self._first_matching_account(snapshot, AccountType.LIABILITY, '22', ['pagar', 'proveedor'])
     
-    async def get_bank_suspense_account(self) -> Optional[Account]:
+    async def get_bank_suspense_account(self) -> Optional[AccountRef]:
         """Get the bank suspense account"""
-        settings = await self.get_company_settings()
-        if settings and settings.bank_suspense_account_id:
-            account_result = await self.db.execute(
-                select(Account).where(
-                    and_(
-                        Account.id == settings.bank_suspense_account_id,
-                        Account.is_active == True
-                    )
-                )
-            )
-            return account_result.scalar_one_or_none()
+        snapshot = await company_settings_cache.get_snapshot(self.db)
+        if snapshot.settings and snapshot.settings.bank_suspense_account_id:
+            return snapshot.default_account('bank_suspense_account_id')
         
         # Fallback: find any bank account that could serve as suspense
-        account_result = await self.db.execute(
-            select(Account).where(
-                and_(
-                    Account.account_type == AccountType.ASSET,
-                    or_(
-                        Account.name.ilike('%banco%'),
-                        Account.name.ilike('%suspense%'),
-                        Account.name.ilike('%transitoria%')
-                    ),
-                    Account.is_active == True
-                )
-            ).order_by(Account.code).limit(1)
-        )
-        return account_result.scalar_one_or_none()
+        return self._first_matching_account(snapshot, AccountType.ASSET, None, ['banco', 'suspense', 'transitoria'])
     
     async def get_account_suggestions(self, account_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Obtiene sugerencias de cuentas basadas en el tipo solicitado"""
@@ -0,0 +1,189 @@
+"""
+Cost Center Actuals Service: monthly actuals snapshot per cost center.
+Keeps cost_center_monthly_actuals in sync with posted journal entries and
+serves monthly series to budget tracking, KPIs and trends.
+"""
+import uuid
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Date, and_, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import Account, AccountType
+from app.models.cost_center import CostCenterClosure, CostCenterMonthlyActual
+from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus
+
+# (tipo de cuenta, débitos, créditos)
+Movement = Tuple[AccountType, Decimal, Decimal]
+
+# Columnas de la instantánea en el orden de ``_movements_query``
+_SNAPSHOT_COLUMNS = [
+    'id', 'cost_center_id', 'account_type', 'period',
+    'total_debits', 'total_credits', 'created_at', 'updated_at'
+]
+
+
+def month_start(value: date) -> date:
+    """Primer día del mes de la fecha"""
+    return value.replace(day=1)
+
+
+def add_months(value: date, months: int) -> date:
+    """Primer día del mes desplazado ``months`` meses"""
+    index = value.year * 12 + value.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def covers_whole_months(start_date: date, end_date: date) -> bool:
+    """Si el rango empieza el día 1 y termina el último día de un mes"""
+    return (
+        start_date.day == 1
+        and end_date.day == monthrange(end_date.year, end_date.month)[1]
+        and start_date <= end_date
+    )
+
+
+class CostCenterActualsService:
+    """Servicio para la instantánea mensual de reales por centro de costo"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _movements_query(self, sign: int = 1):
+        """Agregado (centro, tipo de cuenta, mes) de las líneas con centro de costo"""
+        period = cast(func.date_trunc('month', JournalEntry.entry_date), Date)
+        return (
+            select(
+                func.gen_random_uuid(),
+                JournalEntryLine.cost_center_id,
+                Account.account_type,
+                period,
+                func.sum(JournalEntryLine.debit_amount) * sign,
+                func.sum(JournalEntryLine.credit_amount) * sign,
+                func.now(),
+                func.now()
+            )
+            .select_from(JournalEntryLine)
+            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
+            .join(Account, JournalEntryLine.account_id == Account.id)
+            .where(JournalEntryLine.cost_center_id.is_not(None))
+            .group_by(JournalEntryLine.cost_center_id, Account.account_type, period)
+        )
+
+    async def apply_entries(self, entry_ids: Iterable[uuid.UUID], sign: int = 1) -> None:
+        """
+        Sumar (sign=1, asientos que pasan a contabilizados) o restar (sign=-1,
+        asientos contabilizados que se anulan o vuelven a borrador) sus líneas
+        en la instantánea. Un único INSERT ... ON CONFLICT DO UPDATE dentro de
+        la transacción del llamador; las líneas deben estar ya en la base.
+        """
+        entry_ids = list(dict.fromkeys(entry_ids))
+        if not entry_ids:
+            return
+
+        statement = pg_insert(CostCenterMonthlyActual).from_select(
+            _SNAPSHOT_COLUMNS,
+            self._movements_query(sign).where(JournalEntryLine.journal_entry_id.in_(entry_ids))
+        )
+        statement = statement.on_conflict_do_update(
+            constraint='uq_cost_center_monthly_actuals_key',
+            set_={
+                'total_debits': CostCenterMonthlyActual.total_debits + statement.excluded.total_debits,
+                'total_credits': CostCenterMonthlyActual.total_credits + statement.excluded.total_credits,
+                'updated_at': func.now()
+            }
+        )
+        await self.db.execute(statement)
+
+    async def rebuild(self) -> None:
+        """Recalcular la instantánea completa desde el libro (reparación o carga inicial)"""
+        await self.db.execute(delete(CostCenterMonthlyActual))
+        await self.db.execute(
+            pg_insert(CostCenterMonthlyActual).from_select(
+                _SNAPSHOT_COLUMNS,
+                self._movements_query().where(JournalEntry.status == JournalEntryStatus.POSTED)
+            )
+        )
+
+    async def get_movements(
+        self,
+        cost_center_ids: Optional[List[uuid.UUID]],
+        start_date: date,
+        end_date: date,
+        consolidate_subtrees: bool = False
+    ) -> Dict[uuid.UUID, List[Movement]]:
+        """
+        Totales por (centro de costo, tipo de cuenta) de los meses entre
+        ``start_date`` y ``end_date``, con la misma forma que el agregado
+        sobre el libro. Con ``consolidate_subtrees`` cada centro suma su subárbol.
+        """
+        rows = await self._query_snapshot(
+            cost_center_ids, start_date, end_date, consolidate_subtrees, by_month=False
+        )
+        movements: Dict[uuid.UUID, List[Movement]] = {}
+        for cost_center_id, account_type, debits, credits in rows:
+            movements.setdefault(cost_center_id, []).append((account_type, debits, credits))
+        return movements
+
+    async def get_monthly_movements(
+        self,
+        cost_center_ids: List[uuid.UUID],
+        start_date: date,
+        end_date: date
+    ) -> Dict[uuid.UUID, Dict[date, List[Movement]]]:
+        """Movimientos por centro de costo y mes (primer día) entre ambas fechas"""
+        rows = await self._query_snapshot(cost_center_ids, start_date, end_date, False, by_month=True)
+        monthly: Dict[uuid.UUID, Dict[date, List[Movement]]] = {}
+        for cost_center_id, period, account_type, debits, credits in rows:
+            monthly.setdefault(cost_center_id, {}).setdefault(period, []).append(
+                (account_type, debits, credits)
+            )
+        return monthly
+
+    async def _query_snapshot(
+        self,
+        cost_center_ids: Optional[List[uuid.UUID]],
+        start_date: date,
+        end_date: date,
+        consolidate_subtrees: bool,
+        by_month: bool
+    ) -> List[tuple]:
+        if cost_center_ids is not None and not cost_center_ids:
+            return []
+
+        if consolidate_subtrees:
+            group_column = CostCenterClosure.ancestor_id
+        else:
+            group_column = CostCenterMonthlyActual.cost_center_id
+        keys = [group_column, CostCenterMonthlyActual.period] if by_month else [group_column]
+
+        query = (
+            select(
+                *keys,
+                CostCenterMonthlyActual.account_type,
+                func.sum(CostCenterMonthlyActual.total_debits),
+                func.sum(CostCenterMonthlyActual.total_credits)
+            )
+            .select_from(CostCenterMonthlyActual)
+            .where(
+                and_(
+                    CostCenterMonthlyActual.period >= month_start(start_date),
+                    CostCenterMonthlyActual.period <= month_start(end_date)
+                )
+            )
+            .group_by(*keys, CostCenterMonthlyActual.account_type)
+        )
+        if consolidate_subtrees:
+            query = query.join(
+                CostCenterClosure,
+                CostCenterClosure.descendant_id == CostCenterMonthlyActual.cost_center_id
+            )
+        if cost_center_ids is not None:
+            query = query.where(group_column.in_(set(cost_center_ids)))
+
+        result = await self.db.execute(query)
+        return result.all()
@@ -5,16 +5,21 @@ Provides profitability analysis, budget tracking, KPIs and comparative reports.
 import uuid
 from datetime import datetime, date, timedelta
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable, Tuple
 from calendar import monthrange
 
+import numpy as np
+
 from sqlalchemy import select, func, and_, or_, desc, asc, case, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
-from app.models.cost_center import CostCenter
+from app.models.cost_center import CostCenter, CostCenterClosure
 from app.models.journal_entry import JournalEntryLine, JournalEntry, JournalEntryStatus
 from app.models.account import Account, AccountType, AccountCategory
+from app.services.cost_center_actuals_service import (
+    CostCenterActualsService, Movement, add_months, covers_whole_months, month_start
+)
 from app.schemas.cost_center import (
     CostCenterRead, CostCenterProfitability, CostCenterProfitabilityMetrics,
     CostCenterComparison, CostCenterComparisonItem, CostCenterBudgetTracking,
@@ -24,11 +29,17 @@ from app.schemas.cost_center import (
 from app.utils.exceptions import NotFoundError, ValidationError
 
 
+def _to_decimal(value: float) -> Decimal:
+    """Convierte un resultado de NumPy a Decimal (vía su representación corta)"""
+    return Decimal(str(round(float(value), 6)))
+
+
 class CostCenterReportingService:
     """Servicio para reportes avanzados de centros de costo"""
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.cost_center_actuals = CostCenterActualsService(db)
 
     async def get_cost_center_profitability(
         self,
@@ -93,19 +104,24 @@ class CostCenterReportingService:
     ) -> CostCenterComparison:
         """Comparar rendimiento entre múltiples centros de costo"""
         
-        comparison_items = []
+        # Centros de costo y sus métricas: una consulta cada uno para todo el conjunto
+        result = await self.db.execute(
+            select(CostCenter).where(CostCenter.id.in_(cost_center_ids))
+        )
+        cost_centers_by_id = {cc.id: cc for cc in result.scalars().all()}
+        if any(cost_center_id not in cost_centers_by_id for cost_center_id in cost_center_ids):
+            raise NotFoundError("Centro de costo no encontrado")
         
-        # Calcular métricas para cada centro de costo
-        for cost_center_id in cost_center_ids:
-            cost_center = await self._get_cost_center_or_404(cost_center_id)
-            profitability_metrics = await self._calculate_profitability_metrics(
-                cost_center_id, start_date, end_date, True
-            )
-            
-            comparison_items.append({
-                'cost_center': cost_center,
-                'metrics': profitability_metrics
-            })
+        metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            cost_center_ids, start_date, end_date, True
+        )
+        comparison_items = [
+            {
+                'cost_center': cost_centers_by_id[cost_center_id],
+                'metrics': metrics_by_id[cost_center_id]
+            }
+            for cost_center_id in dict.fromkeys(cost_center_ids)
+        ]
         
         # Ordenar por rentabilidad
         comparison_items.sort(
@@ -162,10 +178,24 @@ class CostCenterReportingService:
             start_date = date(budget_year, 1, 1)
             end_date = date(budget_year, 12, 31)
         
-        # Obtener datos reales
-        actual_metrics = await self._calculate_profitability_metrics(
-            cost_center_id, start_date, end_date, True
+        # Reales mes a mes desde la instantánea (una consulta para todo el período)
+        monthly = (await self.cost_center_actuals.get_monthly_movements(
+            [cost_center_id], start_date, end_date
+        )).get(cost_center_id, {})
+        actual_metrics = self._metrics_from_movements(
+            (movement for movements in monthly.values() for movement in movements), True
         )
+        monthly_actuals = []
+        period = month_start(start_date)
+        while period <= end_date:
+            period_metrics = self._metrics_from_movements(monthly.get(period, []), True)
+            monthly_actuals.append({
+                'month': Decimal(period.month),
+                'revenue': period_metrics.revenue,
+                'costs': period_metrics.total_costs,
+                'profit': period_metrics.net_profit
+            })
+            period = add_months(period, 1)
         
         # Simular datos presupuestarios (en implementación real vendría de tabla de presupuestos)
         budget_revenue = actual_metrics.revenue * Decimal('1.1')  # Presupuesto 10% mayor
@@ -208,6 +238,7 @@ class CostCenterReportingService:
             revenue_variance=revenue_variance,
             cost_variance=cost_variance,
             profit_variance=profit_variance,
+            monthly_actuals=monthly_actuals,
             alerts=alerts,
             recommendations=recommendations
         )
@@ -229,26 +260,53 @@ class CostCenterReportingService:
             cost_center_id, start_date, end_date, True
         )
         
+        # Tendencias mes contra mes (y promedio de referencia) desde la instantánea
+        trends = {'margin': "stable", 'efficiency': "stable", 'revenue': "stable"}
+        growth = Decimal('0')
+        benchmarks: Dict[str, Optional[Decimal]] = {'margin': None, 'efficiency': None}
+        if include_trends:
+            months_back = max(benchmark_period or 1, 1)
+            current_month = month_start(end_date)
+            monthly = (await self.cost_center_actuals.get_monthly_movements(
+                [cost_center_id], add_months(current_month, -months_back), end_date
+            )).get(cost_center_id, {})
+            history = [
+                self._metrics_from_movements(monthly.get(add_months(current_month, -offset), []), True)
+                for offset in range(months_back, -1, -1)
+            ]
+            current, previous = history[-1], history[-2]
+            
+            trends['margin'] = self._trend_label(current.net_margin, previous.net_margin)
+            trends['efficiency'] = self._trend_label(current.cost_efficiency, previous.cost_efficiency)
+            trends['revenue'] = self._trend_label(current.revenue, previous.revenue)
+            if previous.revenue > 0:
+                growth = (current.revenue - previous.revenue) / previous.revenue * 100
+            if benchmark_period:
+                benchmarks['margin'] = sum((item.net_margin for item in history[:-1]), Decimal('0')) / months_back
+                benchmarks['efficiency'] = sum((item.cost_efficiency for item in history[:-1]), Decimal('0')) / months_back
+        
         # Calcular KPIs
         profitability_ratio = CostCenterKPIValue(
             value=metrics.net_margin,
             unit="%",
             status=self._classify_performance(metrics.net_margin, [5, 10, 15, 20]),
-            trend="stable"  # Se calcularía con datos históricos
+            trend=trends['margin'],
+            benchmark_value=benchmarks['margin']
         )
         
         cost_efficiency = CostCenterKPIValue(
             value=metrics.cost_efficiency,
             unit="ratio",
             status=self._classify_performance(metrics.cost_efficiency, [0.7, 0.8, 0.9, 0.95]),
-            trend="stable"
+            trend=trends['efficiency'],
+            benchmark_value=benchmarks['efficiency']
         )
         
         revenue_growth = CostCenterKPIValue(
-            value=Decimal('0'),  # Se calcularía con período anterior
+            value=growth,
             unit="%",
-            status="average",
-            trend="stable"
+            status=self._classify_performance(growth, [-5, 0, 5, 10]),
+            trend=trends['revenue']
         )
         
         # Calcular puntuación general
@@ -289,28 +347,44 @@ class CostCenterReportingService:
         result = await self.db.execute(query)
         cost_centers = result.scalars().all()
         
-        # Calcular métricas para cada centro de costo
-        ranking_items = []
-        for cost_center in cost_centers:
-            metrics = await self._calculate_profitability_metrics(
-                cost_center.id, start_date, end_date, True
-            )
-            
-            # Seleccionar métrica para ranking
-            metric_value = self._get_ranking_metric_value(metrics, ranking_metric)
-            
-            ranking_items.append({
+        # Métricas de todos los centros con un único agregado agrupado
+        cost_center_ids = [cost_center.id for cost_center in cost_centers]
+        metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            cost_center_ids, start_date, end_date, True
+        )
+        trends_by_id = await self._ranking_trends(cost_center_ids, ranking_metric, end_date)
+        return self._build_ranking(
+            ranking_metric, start_date, end_date, cost_centers, metrics_by_id, limit, trends_by_id
+        )
+
+    def _build_ranking(
+        self,
+        ranking_metric: str,
+        start_date: date,
+        end_date: date,
+        cost_centers: List[CostCenter],
+        metrics_by_id: Dict[uuid.UUID, CostCenterProfitabilityMetrics],
+        limit: int,
+        trends_by_id: Optional[Dict[uuid.UUID, str]] = None
+    ) -> CostCenterRanking:
+        """Ranking y estadísticas de la métrica en memoria sobre métricas ya calculadas"""
+        ranking_items = [
+            {
                 'cost_center': cost_center,
-                'metric_value': metric_value,
-                'metrics': metrics
-            })
+                'metric_value': self._get_ranking_metric_value(metrics_by_id[cost_center.id], ranking_metric),
+                'metrics': metrics_by_id[cost_center.id]
+            }
+            for cost_center in cost_centers
+        ]
+        metric_values = [item['metric_value'] for item in ranking_items]
         
-        # Ordenar por métrica
-        ranking_items.sort(key=lambda x: x['metric_value'], reverse=True)
+        # Ordenar por métrica (descendente, estable ante empates)
+        order = np.argsort(-np.array(metric_values, dtype=float), kind='stable')
         
         # Crear items de ranking
         ranked_list = []
-        for i, item in enumerate(ranking_items[:limit]):
+        for i, index in enumerate(order[:limit]):
+            item = ranking_items[index]
             ranked_list.append(
                 CostCenterRankingItem(
                     position=i + 1,
@@ -318,18 +392,12 @@ class CostCenterReportingService:
                     metric_value=item['metric_value'],
                     metric_description=self._get_metric_description(ranking_metric),
                     performance_score=self._calculate_performance_score(item['metrics']),
-                    trend="stable"  # Se calcularía con datos históricos
+                    trend=(trends_by_id or {}).get(item['cost_center'].id, "stable")
                 )
             )
         
         # Estadísticas de la métrica
-        metric_values = [item['metric_value'] for item in ranking_items]
-        metric_stats = {
-            'average': sum(metric_values) / len(metric_values) if metric_values else Decimal('0'),
-            'median': sorted(metric_values)[len(metric_values)//2] if metric_values else Decimal('0'),
-            'max': max(metric_values) if metric_values else Decimal('0'),
-            'min': min(metric_values) if metric_values else Decimal('0')
-        }
+        metric_stats = self._metric_statistics(metric_values)
         
         insights = self._generate_ranking_insights(ranked_list, ranking_metric)
         
@@ -349,37 +417,64 @@ class CostCenterReportingService:
         root_cost_center_id: Optional[uuid.UUID] = None,
         max_depth: int = 3
     ) -> Dict[str, Any]:
-        """Análisis de jerarquía de centros de costo"""
+        """
+        Análisis de jerarquía de centros de costo. Cada nodo incluye sus métricas
+        directas y las consolidadas de su subárbol (resueltas con la clausura).
+        """
         
-        # Obtener jerarquía
-        hierarchy_query = select(CostCenter).options(
-            selectinload(CostCenter.children),
-            selectinload(CostCenter.parent)
+        # Nivel absoluto de cada centro: mayor profundidad hacia sus ancestros
+        levels = (
+            select(
+                CostCenterClosure.descendant_id.label('cost_center_id'),
+                func.max(CostCenterClosure.depth).label('level')
+            )
+            .group_by(CostCenterClosure.descendant_id)
+            .subquery()
+        )
+        hierarchy_query = (
+            select(CostCenter, levels.c.level)
+            .join(levels, levels.c.cost_center_id == CostCenter.id)
+            .order_by(levels.c.level, CostCenter.code)
         )
         
         if root_cost_center_id:
-            hierarchy_query = hierarchy_query.where(
-                or_(
-                    CostCenter.id == root_cost_center_id,
-                    CostCenter.parent_id == root_cost_center_id
+            await self._get_cost_center_or_404(root_cost_center_id)
+            subtree = select(CostCenterClosure.descendant_id).where(
+                and_(
+                    CostCenterClosure.ancestor_id == root_cost_center_id,
+                    CostCenterClosure.depth <= max_depth
                 )
             )
+            hierarchy_query = hierarchy_query.where(CostCenter.id.in_(subtree))
+        else:
+            hierarchy_query = hierarchy_query.where(levels.c.level <= max_depth)
         
         result = await self.db.execute(hierarchy_query)
-        cost_centers = result.scalars().all()
+        rows = result.all()
+        cost_center_ids = [cost_center.id for cost_center, _ in rows]
+        
+        # Métricas directas y consolidadas por subárbol: un agregado cada una
+        metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            cost_center_ids, start_date, end_date, True
+        )
+        subtree_metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            cost_center_ids, start_date, end_date, True, consolidate_subtrees=True
+        )
         
-        # Calcular métricas para cada nivel
         hierarchy_data = []
-        for cost_center in cost_centers:
-            metrics = await self._calculate_profitability_metrics(
-                cost_center.id, start_date, end_date, True
-            )
+        for cost_center, level in rows:
+            cost_center.level = level
+            consolidated = subtree_metrics_by_id[cost_center.id]
+            parent_consolidated = subtree_metrics_by_id.get(cost_center.parent_id)
             
             hierarchy_data.append({
                 'cost_center': CostCenterRead.model_validate(cost_center),
-                'level': cost_center.level,
-                'metrics': metrics,
-                'contribution_to_parent': self._calculate_contribution_percentage(cost_center, metrics)
+                'level': level,
+                'metrics': metrics_by_id[cost_center.id],
+                'consolidated_metrics': consolidated,
+                'contribution_to_parent': self._calculate_contribution_percentage(
+                    consolidated, parent_consolidated
+                )
             })
         
         return {
@@ -401,12 +496,20 @@ class CostCenterReportingService:
         # Determinar fechas según período
         start_date, end_date = self._get_period_dates(period)
         
+        # Centros activos y sus métricas (un único agregado para todo el tablero)
+        result = await self.db.execute(select(CostCenter).where(CostCenter.is_active == True))
+        cost_centers = result.scalars().all()
+        metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            [cost_center.id for cost_center in cost_centers], start_date, end_date, True
+        )
+        
         # Obtener métricas consolidadas
-        total_metrics = await self._calculate_consolidated_metrics(start_date, end_date)
+        total_metrics = self._consolidate_metrics(metrics_by_id.values(), len(cost_centers))
         
         # Obtener top performers
-        ranking = await self.get_cost_center_ranking(
-            "profit", start_date, end_date, top_performers_count
+        trends_by_id = await self._ranking_trends(list(metrics_by_id.keys()), "profit", end_date)
+        ranking = self._build_ranking(
+            "profit", start_date, end_date, cost_centers, metrics_by_id, top_performers_count, trends_by_id
         )
         
         # Generar alertas si se solicita
@@ -447,30 +550,136 @@ class CostCenterReportingService:
         include_indirect_costs: bool
     ) -> CostCenterProfitabilityMetrics:
         """Calcular métricas de rentabilidad"""
+        metrics_by_id = await self._calculate_profitability_metrics_bulk(
+            [cost_center_id], start_date, end_date, include_indirect_costs
+        )
+        return metrics_by_id[cost_center_id]
+
+    async def _calculate_profitability_metrics_bulk(
+        self,
+        cost_center_ids: Optional[List[uuid.UUID]],
+        start_date: date,
+        end_date: date,
+        include_indirect_costs: bool,
+        consolidate_subtrees: bool = False
+    ) -> Dict[uuid.UUID, CostCenterProfitabilityMetrics]:
+        """
+        Métricas de rentabilidad de varios centros de costo con una sola
+        consulta agrupada por (centro de costo, tipo de cuenta). Con
+        ``cost_center_ids`` None se calculan todos los centros con movimientos.
+        Los centros sin movimientos en el período obtienen métricas en cero.
+        Con ``consolidate_subtrees`` cada centro suma los movimientos de todo
+        su subárbol (join con la tabla de clausura).
+        """
+        if cost_center_ids is not None and not cost_center_ids:
+            return {}
+        
+        if covers_whole_months(start_date, end_date):
+            # Meses completos: se leen de la instantánea mensual en lugar del libro
+            movements_by_id = await self.cost_center_actuals.get_movements(
+                cost_center_ids, start_date, end_date, consolidate_subtrees
+            )
+            return self._metrics_by_id(movements_by_id, cost_center_ids, include_indirect_costs)
+        
+        if consolidate_subtrees:
+            group_column = CostCenterClosure.ancestor_id
+        else:
+            group_column = JournalEntryLine.cost_center_id
         
-        # Consulta para obtener movimientos del centro de costo
         movements_query = (
             select(
+                group_column,
                 Account.account_type,
                 func.sum(JournalEntryLine.debit_amount).label('total_debits'),
                 func.sum(JournalEntryLine.credit_amount).label('total_credits')
             )
+            .select_from(JournalEntryLine)
             .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
             .join(Account, JournalEntryLine.account_id == Account.id)
             .where(
                 and_(
-                    JournalEntryLine.cost_center_id == cost_center_id,
                     JournalEntry.entry_date >= start_date,
                     JournalEntry.entry_date <= end_date,
                     JournalEntry.status == JournalEntryStatus.POSTED
                 )
             )
-            .group_by(Account.account_type)
+            .group_by(group_column, Account.account_type)
         )
+        if consolidate_subtrees:
+            movements_query = movements_query.join(
+                CostCenterClosure, CostCenterClosure.descendant_id == JournalEntryLine.cost_center_id
+            )
+        if cost_center_ids is not None:
+            movements_query = movements_query.where(group_column.in_(set(cost_center_ids)))
+        else:
+            movements_query = movements_query.where(group_column.is_not(None))
         
         result = await self.db.execute(movements_query)
-        movements = result.all()
+        movements_by_id: Dict[uuid.UUID, List[Movement]] = {}
+        for cost_center_id, account_type, debits, credits in result.all():
+            movements_by_id.setdefault(cost_center_id, []).append((account_type, debits, credits))
         
+        return self._metrics_by_id(movements_by_id, cost_center_ids, include_indirect_costs)
+
+    def _metrics_by_id(
+        self,
+        movements_by_id: Dict[uuid.UUID, List[Movement]],
+        cost_center_ids: Optional[List[uuid.UUID]],
+        include_indirect_costs: bool
+    ) -> Dict[uuid.UUID, CostCenterProfitabilityMetrics]:
+        """Métricas por centro; los centros pedidos sin movimientos quedan en cero"""
+        ids = movements_by_id.keys() if cost_center_ids is None else cost_center_ids
+        return {
+            cost_center_id: self._metrics_from_movements(
+                movements_by_id.get(cost_center_id, []), include_indirect_costs
+            )
+            for cost_center_id in ids
+        }
+
+    async def _ranking_trends(
+        self,
+        cost_center_ids: List[uuid.UUID],
+        ranking_metric: str,
+        end_date: date
+    ) -> Dict[uuid.UUID, str]:
+        """Tendencia (up, stable, down) de la métrica entre el mes de cierre y el anterior"""
+        current_month = month_start(end_date)
+        previous_month = add_months(current_month, -1)
+        monthly = await self.cost_center_actuals.get_monthly_movements(
+            cost_center_ids, previous_month, current_month
+        )
+        labels = {1: "up", 0: "stable", -1: "down"}
+        trends = {}
+        for cost_center_id in cost_center_ids:
+            months = monthly.get(cost_center_id, {})
+            current, previous = (
+                self._get_ranking_metric_value(
+                    self._metrics_from_movements(months.get(period, []), True), ranking_metric
+                )
+                for period in (current_month, previous_month)
+            )
+            trends[cost_center_id] = labels[self._trend_direction(current, previous)]
+        return trends
+
+    def _trend_direction(self, current: Decimal, previous: Decimal) -> int:
+        """1 si sube, -1 si baja, 0 si la variación es menor al 1% del valor anterior"""
+        tolerance = max(abs(previous) * Decimal('0.01'), Decimal('0.01'))
+        if current - previous > tolerance:
+            return 1
+        if previous - current > tolerance:
+            return -1
+        return 0
+
+    def _trend_label(self, current: Decimal, previous: Decimal) -> str:
+        """Tendencia de un KPI: improving, stable o declining"""
+        return {1: "improving", 0: "stable", -1: "declining"}[self._trend_direction(current, previous)]
+
+    def _metrics_from_movements(
+        self,
+        movements: Iterable[Tuple[AccountType, Optional[Decimal], Optional[Decimal]]],
+        include_indirect_costs: bool
+    ) -> CostCenterProfitabilityMetrics:
+        """Métricas de rentabilidad a partir de (tipo de cuenta, débitos, créditos)"""
         # Calcular totales por tipo de cuenta
         revenue = Decimal('0')
         direct_costs = Decimal('0')
@@ -713,8 +922,28 @@ class CostCenterReportingService:
         return {
             'avg_margin': Decimal(str(sum(margins))) / Decimal(str(len(margins))),
             'avg_revenue': Decimal(str(sum(revenues))) / Decimal(str(len(revenues))),
-            'margin_std': Decimal('0'),  # Se calcularía la desviación estándar
-            'revenue_std': Decimal('0')
+            'margin_std': _to_decimal(np.std(np.array(margins, dtype=float))),
+            'revenue_std': _to_decimal(np.std(np.array(revenues, dtype=float)))
+        }
+
+    def _metric_statistics(self, values: List[Decimal]) -> Dict[str, Decimal]:
+        """Promedio, mediana, desviación estándar y extremos de una métrica"""
+        if not values:
+            return {
+                'average': Decimal('0'),
+                'median': Decimal('0'),
+                'max': Decimal('0'),
+                'min': Decimal('0'),
+                'std': Decimal('0')
+            }
+        
+        array = np.array(values, dtype=float)
+        return {
+            'average': sum(values) / len(values),
+            'median': _to_decimal(np.median(array)),
+            'max': values[int(array.argmax())],
+            'min': values[int(array.argmin())],
+            'std': _to_decimal(np.std(array))
         }
 
     def _generate_comparison_insights(self, items: List[CostCenterComparisonItem]) -> List[str]:
@@ -785,24 +1014,20 @@ class CostCenterReportingService:
         
         return start_date, end_date
 
-    async def _calculate_consolidated_metrics(self, start_date: date, end_date: date) -> Dict[str, Any]:
-        """Calcular métricas consolidadas"""
-        # Obtener todos los centros de costo activos
-        query = select(CostCenter).where(CostCenter.is_active == True)
-        result = await self.db.execute(query)
-        cost_centers = result.scalars().all()
-        
+    def _consolidate_metrics(
+        self,
+        metrics: Iterable[CostCenterProfitabilityMetrics],
+        active_cost_centers: int
+    ) -> Dict[str, Any]:
+        """Totales consolidados sobre las métricas de cada centro"""
         total_revenue = Decimal('0')
         total_costs = Decimal('0')
         total_profit = Decimal('0')
         
-        for cost_center in cost_centers:
-            metrics = await self._calculate_profitability_metrics(
-                cost_center.id, start_date, end_date, True
-            )
-            total_revenue += metrics.revenue
-            total_costs += metrics.total_costs
-            total_profit += metrics.net_profit
+        for item in metrics:
+            total_revenue += item.revenue
+            total_costs += item.total_costs
+            total_profit += item.net_profit
         
         total_margin = (total_profit / total_revenue * 100) if total_revenue > 0 else Decimal('0')
         
@@ -811,7 +1036,7 @@ class CostCenterReportingService:
             'total_costs': total_costs,
             'total_profit': total_profit,
             'total_margin': total_margin,
-            'active_cost_centers': len(cost_centers)
+            'active_cost_centers': active_cost_centers
         }
 
     async def _generate_executive_alerts(self, start_date: date, end_date: date) -> List[CostCenterAlert]:
@@ -835,10 +1060,15 @@ class CostCenterReportingService:
         
         return insights
 
-    def _calculate_contribution_percentage(self, cost_center: CostCenter, metrics: CostCenterProfitabilityMetrics) -> Decimal:
-        """Calcular porcentaje de contribución al padre"""
-        # Implementación simplificada
-        return Decimal('0')
+    def _calculate_contribution_percentage(
+        self,
+        metrics: CostCenterProfitabilityMetrics,
+        parent_metrics: Optional[CostCenterProfitabilityMetrics]
+    ) -> Decimal:
+        """Porcentaje del ingreso consolidado del padre que aporta el subárbol"""
+        if parent_metrics is None or parent_metrics.revenue <= 0:
+            return Decimal('0')
+        return metrics.revenue / parent_metrics.revenue * 100
 
     def _generate_hierarchy_summary(self, hierarchy_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generar resumen de jerarquía"""
@@ -5,14 +5,15 @@ Handles CRUD operations, hierarchical structure validation and reporting.
 import uuid
 from datetime import datetime, date
 from decimal import Decimal
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
 from math import ceil
 
-from sqlalchemy import select, func, and_, or_, desc, asc, text
+from sqlalchemy import select, func, and_, or_, desc, asc, text, insert, delete, literal_column
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload, joinedload
+from sqlalchemy.orm import selectinload, joinedload, aliased
 
-from app.models.cost_center import CostCenter
+from app.models.cost_center import CostCenter, CostCenterClosure
 from app.models.journal_entry import JournalEntryLine, JournalEntry
 from app.models.account import Account
 from app.schemas.cost_center import (
@@ -22,9 +23,15 @@ from app.schemas.cost_center import (
     BulkCostCenterDelete, BulkCostCenterDeleteResult, CostCenterDeleteValidation,
     CostCenterImportResult, CostCenterTree
 )
+from app.services.stats_builder import StatsQuery
 from app.utils.exceptions import (
     ValidationError, NotFoundError, ConflictError, BusinessLogicError
 )
+from app.utils.pagination import KeysetPaginator, SortKey, estimate_total
+
+
+# Orden del listado paginado por cursor (el mismo del listado por offset)
+COST_CENTER_KEYSET = KeysetPaginator(SortKey(CostCenter.code))
 
 
 class CostCenterService:
@@ -75,6 +82,8 @@ class CostCenterService:
             raise ValidationError(f"Errores de validación: {'; '.join(validation_errors)}")
         
         self.db.add(cost_center)
+        await self.db.flush()
+        await self._link_to_parent(cost_center.id, cost_center.parent_id)
         await self.db.commit()
         await self.db.refresh(cost_center)
         
@@ -95,16 +104,8 @@ class CostCenterService:
         cost_center = result.scalar_one_or_none()
         
         if cost_center:
-            # Calcular propiedades dinámicas de forma segura para el objeto principal
-            await self._calculate_cost_center_properties_safe(cost_center)
-            
-            # Si tiene padre, también calcular sus propiedades
-            if cost_center.parent:
-                await self._calculate_cost_center_properties_safe(cost_center.parent)
-            
-            # Calcular propiedades para los hijos también
-            for child in cost_center.children:
-                await self._calculate_cost_center_properties_safe(child)
+            # Propiedades dinámicas del centro, su padre y sus hijos en un solo paso
+            await self._calculate_hierarchy_properties(self._with_relatives(cost_center))
         
         return cost_center
 
@@ -121,15 +122,8 @@ class CostCenterService:
         cost_center = result.scalar_one_or_none()
         
         if cost_center:
-            # Calcular propiedades dinámicas de forma segura para el objeto principal
-            await self._calculate_cost_center_properties_safe(cost_center)
-            
-            # Si tiene padre, también calcular sus propiedades
-            if cost_center.parent:
-                await self._calculate_cost_center_properties_safe(cost_center.parent)            
-            # Calcular propiedades para los hijos también
-            for child in cost_center.children:
-                await self._calculate_cost_center_properties_safe(child)
+            # Propiedades dinámicas del centro, su padre y sus hijos en un solo paso
+            await self._calculate_hierarchy_properties(self._with_relatives(cost_center))
         
         return cost_center
 
@@ -178,7 +172,9 @@ class CostCenterService:
                     raise ValidationError("La asignación crearía una referencia circular")
         
         # Actualizar campos
-        for field, value in cost_center_data.model_dump(exclude_unset=True).items():
+        updates = cost_center_data.model_dump(exclude_unset=True)
+        moved = 'parent_id' in updates and updates['parent_id'] != cost_center.parent_id
+        for field, value in updates.items():
             setattr(cost_center, field, value)
         
         # Validar el modelo actualizado
@@ -186,9 +182,16 @@ class CostCenterService:
         if validation_errors:
             raise ValidationError(f"Errores de validación: {'; '.join(validation_errors)}")
         
+        if moved:
+            await self.db.flush()
+            await self._move_subtree(cost_center_id, cost_center.parent_id)
+        
         await self.db.commit()
         await self.db.refresh(cost_center)
         
+        if moved:
+            await self._calculate_hierarchy_properties([cost_center])
+        
         return cost_center
 
     async def delete_cost_center(self, cost_center_id: uuid.UUID) -> bool:
@@ -226,9 +229,15 @@ class CostCenterService:
         self, 
         filter_params: CostCenterFilter,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> CostCenterList:
-        """Obtener lista paginada de centros de costo"""
+        """
+        Obtener lista paginada de centros de costo.
+
+        Con ``cursor`` ("" para la primera página) pagina por clave en lugar de
+        ``skip`` y el total es una estimación del planificador.
+        """
         
         # Construir query base con eager loading de las relaciones necesarias
         query = select(CostCenter).options(
@@ -261,9 +270,13 @@ class CostCenterService:
         
         # Filtros de jerarquía
         if filter_params.level is not None:
-            # Para filtrar por nivel, necesitamos usar subconsultas o calcular el nivel
-            # Por simplicidad, filtraremos los resultados después de la consulta
-            pass  # Se manejará en el post-procesamiento
+            # El nivel es la mayor profundidad entre el centro y sus ancestros
+            level_subquery = (
+                select(CostCenterClosure.descendant_id)
+                .group_by(CostCenterClosure.descendant_id)
+                .having(func.max(CostCenterClosure.depth) == filter_params.level)
+            )
+            conditions.append(CostCenter.id.in_(level_subquery))
         
         if filter_params.has_children is not None:
             if filter_params.has_children:
@@ -296,30 +309,25 @@ class CostCenterService:
         if conditions:
             query = query.where(and_(*conditions))
         
-        # Contar total
-        count_query = select(func.count(CostCenter.id))
-        if conditions:
-            count_query = count_query.where(and_(*conditions))
-        
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar() or 0
-          # Aplicar paginación y ordenamiento
-        query = query.order_by(CostCenter.code).offset(skip).limit(limit)
+        if cursor is None:
+            # Contar total
+            count_query = select(func.count(CostCenter.id))
+            if conditions:
+                count_query = count_query.where(and_(*conditions))
+            
+            total_result = await self.db.execute(count_query)
+            total = total_result.scalar() or 0
+            # Aplicar paginación y ordenamiento
+            query = query.order_by(CostCenter.code).offset(skip).limit(limit)
+        else:
+            total = await estimate_total(self.db, query)
+            query = COST_CENTER_KEYSET.apply(query, cursor, limit)
         
         result = await self.db.execute(query)
         cost_centers = result.scalars().all()
         
-        # Aplicar filtros post-procesamiento (como level)
-        if filter_params.level is not None:
-            # Calcular propiedades dinámicas para todos los centros de costo
-            for cc in cost_centers:
-                await self._calculate_cost_center_properties_safe(cc)
-            # Filtrar por nivel
-            cost_centers = [cc for cc in cost_centers if cc.level == filter_params.level]
-        else:
-            # Calcular propiedades dinámicas solo si no se filtró por nivel
-            for cc in cost_centers:
-                await self._calculate_cost_center_properties_safe(cc)
+        # Calcular propiedades dinámicas de la página completa
+        await self._calculate_hierarchy_properties(cost_centers)
           # Convertir a summaries
         cost_center_summaries = []
         for cc in cost_centers:
@@ -344,7 +352,9 @@ class CostCenterService:
             total=total,
             page=page,
             size=len(cost_center_summaries),
-            pages=pages
+            pages=pages,
+            next_cursor=COST_CENTER_KEYSET.next_cursor(cost_centers, limit) if cursor is not None else None,
+            total_is_estimate=cursor is not None
         )
 
     async def get_cost_center_hierarchy(self, parent_id: Optional[uuid.UUID] = None) -> List[CostCenter]:
@@ -495,54 +505,35 @@ class CostCenterService:
 
     async def get_cost_center_stats(self) -> CostCenterStats:
         """Obtener estadísticas de centros de costo"""
-        
-        # Contar totales
-        total_query = select(func.count(CostCenter.id))
-        total_result = await self.db.execute(total_query)
-        total_cost_centers = total_result.scalar() or 0
-        
-        # Contar activos
-        active_query = select(func.count(CostCenter.id)).where(CostCenter.is_active == True)
-        active_result = await self.db.execute(active_query)
-        active_cost_centers = active_result.scalar() or 0
-        
-        # Contar raíz (sin padre)
-        root_query = select(func.count(CostCenter.id)).where(CostCenter.parent_id.is_(None))
-        root_result = await self.db.execute(root_query)
-        root_cost_centers = root_result.scalar() or 0
-        
-        # Contar hojas (sin hijos)
-        leaf_query = select(func.count(CostCenter.id)).where(
-            ~CostCenter.id.in_(
-                select(CostCenter.parent_id).where(CostCenter.parent_id.is_not(None))
-            )
-        )
-        leaf_result = await self.db.execute(leaf_query)
-        leaf_cost_centers = leaf_result.scalar() or 0
-        
-        # Nivel máximo de jerarquía
-        max_level = 0
-        all_cost_centers = await self.db.execute(
-            select(CostCenter).options(selectinload(CostCenter.parent))
+        child = aliased(CostCenter)
+        has_children = select(child.id).where(child.parent_id == CostCenter.id).exists()
+        has_movements = (
+            select(JournalEntryLine.id)
+            .where(JournalEntryLine.cost_center_id == CostCenter.id)
+            .exists()
         )
-        for cc in all_cost_centers.scalars():
-            max_level = max(max_level, cc.level)
-        
-        # Centros con movimientos
-        movements_query = select(func.count(func.distinct(JournalEntryLine.cost_center_id))).where(
-            JournalEntryLine.cost_center_id.is_not(None)
+        stats = await (
+            StatsQuery(CostCenter)
+            .count("total")
+            .count("active", CostCenter.is_active == True)
+            .count("roots", CostCenter.parent_id.is_(None))
+            .count("leaves", ~has_children)
+            .count("with_movements", has_movements)
+            # Nivel máximo de jerarquía desde la tabla de clausura
+            .value("max_level", select(func.max(CostCenterClosure.depth)).scalar_subquery())
+            .execute(self.db, cache_key="cost_centers")
         )
-        movements_result = await self.db.execute(movements_query)
-        cost_centers_with_movements = movements_result.scalar() or 0
+        total_cost_centers = stats["total"]
+        active_cost_centers = stats["active"]
         
         return CostCenterStats(
             total_cost_centers=total_cost_centers,
             active_cost_centers=active_cost_centers,
             inactive_cost_centers=total_cost_centers - active_cost_centers,
-            root_cost_centers=root_cost_centers,
-            leaf_cost_centers=leaf_cost_centers,
-            max_hierarchy_level=max_level,
-            cost_centers_with_movements=cost_centers_with_movements
+            root_cost_centers=stats["roots"],
+            leaf_cost_centers=stats["leaves"],
+            max_hierarchy_level=stats["max_level"] or 0,
+            cost_centers_with_movements=stats["with_movements"]
         )
 
     async def bulk_operation(self, operation_data: BulkCostCenterOperation) -> Dict[str, Any]:
@@ -585,77 +576,123 @@ class CostCenterService:
         return results
 
     async def _would_create_cycle(self, cost_center_id: uuid.UUID, parent_id: uuid.UUID) -> bool:
-        """Verificar si asignar un padre crearía un ciclo"""
-        
-        current_id = parent_id
-        visited = set()
-        
-        while current_id and current_id not in visited:
-            if current_id == cost_center_id:
-                return True
-            
-            visited.add(current_id)
-            
-            # Obtener el padre del padre
+        """Verificar si asignar un padre crearía un ciclo (el padre está en el subárbol)"""
+        result = await self.db.execute(
+            select(func.count())
+            .select_from(CostCenterClosure)
+            .where(
+                and_(
+                    CostCenterClosure.ancestor_id == cost_center_id,
+                    CostCenterClosure.descendant_id == parent_id
+                )
+            )
+        )
+        return (result.scalar() or 0) > 0
+
+    async def _link_to_parent(self, cost_center_id: uuid.UUID, parent_id: Optional[uuid.UUID]) -> None:
+        """Registrar en la clausura un centro de costo nuevo bajo su padre"""
+        rows = [{"ancestor_id": cost_center_id, "descendant_id": cost_center_id, "depth": 0}]
+        if parent_id:
             result = await self.db.execute(
-                select(CostCenter.parent_id).where(CostCenter.id == current_id)
+                select(CostCenterClosure.ancestor_id, CostCenterClosure.depth)
+                .where(CostCenterClosure.descendant_id == parent_id)
+            )
+            rows.extend(
+                {"ancestor_id": ancestor_id, "descendant_id": cost_center_id, "depth": depth + 1}
+                for ancestor_id, depth in result.all()
             )
-            current_id = result.scalar()
-        return False
+        await self.db.execute(insert(CostCenterClosure), rows)
 
-    async def _calculate_cost_center_properties_safe(self, cost_center: CostCenter) -> None:
-        """Calcular propiedades dinámicas del centro de costo de forma segura"""
-        # Calcular full_code
-        if cost_center.parent_id:
-            parent_result = await self.db.execute(
-                select(CostCenter).where(CostCenter.id == cost_center.parent_id)
+    async def _move_subtree(self, cost_center_id: uuid.UUID, parent_id: Optional[uuid.UUID]) -> None:
+        """
+        Mover un subárbol completo en la clausura: se eliminan los vínculos con
+        los ancestros anteriores y se enlaza cada nodo con los nuevos ancestros.
+        """
+        subtree_link = aliased(CostCenterClosure)
+        subtree = select(subtree_link.descendant_id).where(subtree_link.ancestor_id == cost_center_id)
+        await self.db.execute(
+            delete(CostCenterClosure)
+            .where(
+                and_(
+                    CostCenterClosure.descendant_id.in_(subtree),
+                    CostCenterClosure.ancestor_id.not_in(subtree)
+                )
             )
-            parent = parent_result.scalar_one_or_none()
-            if parent:
-                # Recursivamente obtener el código completo del padre
-                parent_full_code = await self._get_parent_full_code(parent)
-                cost_center.full_code = f"{parent_full_code}.{cost_center.code}"
-            else:
-                cost_center.full_code = cost_center.code
-        else:
-            cost_center.full_code = cost_center.code
-        
-        # Calcular level
-        cost_center.level = await self._calculate_level(cost_center)
+            .execution_options(synchronize_session=False)
+        )
+        if not parent_id:
+            return
         
-        # Calcular is_leaf (contar hijos directamente en la BD)
-        children_count_result = await self.db.execute(
-            select(func.count(CostCenter.id))
-            .where(CostCenter.parent_id == cost_center.id)
+        # Producto cartesiano: ancestros del nuevo padre x nodos del subárbol
+        above = aliased(CostCenterClosure)
+        below = aliased(CostCenterClosure)
+        result = await self.db.execute(
+            select(above.ancestor_id, below.descendant_id, above.depth + below.depth + 1)
+            .join(below, below.ancestor_id == cost_center_id)
+            .where(above.descendant_id == parent_id)
         )
-        children_count = children_count_result.scalar() or 0
-        cost_center.is_leaf = children_count == 0
-    
-    async def _get_parent_full_code(self, cost_center: CostCenter) -> str:
-        """Obtener el código completo de un centro de costo recursivamente"""
-        if cost_center.parent_id:
-            parent_result = await self.db.execute(
-                select(CostCenter).where(CostCenter.id == cost_center.parent_id)
+        rows = [
+            {"ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": depth}
+            for ancestor_id, descendant_id, depth in result.all()
+        ]
+        if rows:
+            await self.db.execute(insert(CostCenterClosure), rows)
+
+    @staticmethod
+    def _with_relatives(cost_center: CostCenter) -> List[CostCenter]:
+        """El centro de costo junto con su padre e hijos ya cargados"""
+        relatives = [cost_center]
+        if cost_center.parent:
+            relatives.append(cost_center.parent)
+        relatives.extend(cost_center.children)
+        return relatives
+
+    async def _calculate_cost_center_properties_safe(self, cost_center: CostCenter) -> None:
+        """Calcular propiedades dinámicas del centro de costo de forma segura"""
+        await self._calculate_hierarchy_properties([cost_center])
+
+    async def _calculate_hierarchy_properties(self, cost_centers: Iterable[CostCenter]) -> None:
+        """
+        Calcular full_code, level e is_leaf de varios centros de costo a partir
+        de la clausura: una consulta para ancestros y otra para hijos directos.
+        """
+        cost_centers_by_id = {cc.id: cc for cc in cost_centers}
+        if not cost_centers_by_id:
+            return
+        
+        ancestor = aliased(CostCenter)
+        paths_result = await self.db.execute(
+            select(
+                CostCenterClosure.descendant_id,
+                func.max(CostCenterClosure.depth),
+                func.string_agg(
+                    ancestor.code,
+                    aggregate_order_by(literal_column("'.'"), CostCenterClosure.depth.desc())
+                )
             )
-            parent = parent_result.scalar_one_or_none()
-            if parent:
-                parent_full_code = await self._get_parent_full_code(parent)
-                return f"{parent_full_code}.{cost_center.code}"
-        return cost_center.code
-    
-    async def _calculate_level(self, cost_center: CostCenter) -> int:
-        """Calcular el nivel de jerarquía de un centro de costo"""
-        level = 0
-        current_parent_id = cost_center.parent_id
+            .join(ancestor, ancestor.id == CostCenterClosure.ancestor_id)
+            .where(CostCenterClosure.descendant_id.in_(cost_centers_by_id.keys()))
+            .group_by(CostCenterClosure.descendant_id)
+        )
+        paths = {row[0]: (row[1], row[2]) for row in paths_result.all()}
         
-        while current_parent_id:
-            level += 1
-            parent_result = await self.db.execute(
-                select(CostCenter.parent_id).where(CostCenter.id == current_parent_id)
+        children_result = await self.db.execute(
+            select(CostCenterClosure.ancestor_id, func.count())
+            .where(
+                and_(
+                    CostCenterClosure.ancestor_id.in_(cost_centers_by_id.keys()),
+                    CostCenterClosure.depth == 1
+                )
             )
-            current_parent_id = parent_result.scalar_one_or_none()
+            .group_by(CostCenterClosure.ancestor_id)
+        )
+        children_counts = dict(children_result.all())
         
-        return level
+        for cost_center_id, cost_center in cost_centers_by_id.items():
+            level, full_code = paths.get(cost_center_id, (0, cost_center.code))
+            cost_center.level = level
+            cost_center.full_code = full_code
+            cost_center.is_leaf = children_counts.get(cost_center_id, 0) == 0
 
     async def bulk_delete_cost_centers(self, delete_request: 'BulkCostCenterDelete', user_id: uuid.UUID) -> 'BulkCostCenterDeleteResult':
         """Borrar múltiples centros de costo con validaciones exhaustivas"""
@@ -880,12 +917,22 @@ class CostCenterService:
                     
                     if existing_cost_center:
                         # Actualizar existente
+                        new_parent_id = cost_center_data.get('parent_id', existing_cost_center.parent_id)
+                        moved = new_parent_id != existing_cost_center.parent_id
+                        if moved and new_parent_id and (
+                            new_parent_id == existing_cost_center.id
+                            or await self._would_create_cycle(existing_cost_center.id, new_parent_id)
+                        ):
+                            raise ValidationError("La asignación crearía una referencia circular")
+                        
                         for key, value in cost_center_data.items():
                             if key != 'code':  # No actualizar el código
                                 setattr(existing_cost_center, key, value)
                         
                         existing_cost_center.updated_at = datetime.utcnow()
-                        await self._calculate_cost_center_properties_safe(existing_cost_center)
+                        if moved:
+                            await self.db.flush()
+                            await self._move_subtree(existing_cost_center.id, new_parent_id)
                         result.updated_existing += 1
                         
                     else:
@@ -895,9 +942,10 @@ class CostCenterService:
                         cost_center_data['updated_at'] = datetime.utcnow()
                         
                         new_cost_center = CostCenter(**cost_center_data)
-                        await self._calculate_cost_center_properties_safe(new_cost_center)
                         
                         self.db.add(new_cost_center)
+                        await self.db.flush()
+                        await self._link_to_parent(new_cost_center.id, new_cost_center.parent_id)
                         result.successfully_imported += 1
                         result.created_cost_centers.append(new_cost_center.id)
                 
@@ -942,8 +990,7 @@ class CostCenterService:
         cost_centers = list(result.scalars().all())
         
         # Calcular propiedades dinámicas para todos los centros de costo
-        for cc in cost_centers:
-            await self._calculate_cost_center_properties_safe(cc)
+        await self._calculate_hierarchy_properties(cost_centers)
         
         # Crear CSV
         output = io.StringIO()
@@ -996,8 +1043,7 @@ class CostCenterService:
         all_cost_centers = list(result.scalars().all())
         
         # Calcular propiedades dinámicas para todos los centros de costo
-        for cc in all_cost_centers:
-            await self._calculate_cost_center_properties_safe(cc)
+        await self._calculate_hierarchy_properties(all_cost_centers)
         
         # Crear un diccionario para acceso rápido por ID
         cost_centers_dict = {cc.id: cc for cc in all_cost_centers}
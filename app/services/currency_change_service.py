@@ -4,11 +4,11 @@ Maneja todas las validaciones y procesos necesarios para cambiar
 la moneda base sin perder integridad de datos históricos.
 """
 import uuid
-from datetime import datetime, date
-from decimal import Decimal
-from typing import Optional, List, Dict, Any
+from datetime import datetime, date, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Optional, List, Dict, Any, Callable
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, text, and_, or_
+from sqlalchemy import select, text, and_, or_, func, case
 from sqlalchemy.orm import selectinload
 
 from app.models.company_settings import CompanySettings
@@ -20,6 +20,7 @@ from app.models.payment import Payment
 from app.schemas.company_settings import CompanySettingsUpdate
 from app.utils.exceptions import BusinessRuleError, NotFoundError
 from app.services.journal_entry_service import JournalEntryService
+from app.services.exchange_rate_cache import exchange_rate_table
 import logging
 
 logger = logging.getLogger(__name__)
@@ -34,12 +35,26 @@ class CurrencyChangeValidationResult:
         self.historical_entries_count = 0
         self.entries_with_foreign_currency = 0
         self.accounts_affected = 0
+        self.foreign_balances: List[Dict[str, Any]] = []
+
+# Callback de progreso: (etapa, procesados, total)
+ProgressCallback = Callable[[str, int, int], None]
+
+# Cada cuántos grupos (cuenta, moneda) se informa progreso al revalorizar
+REVALUATION_PROGRESS_STEP = 500
 
 class CurrencyChangeService:
     """Servicio para gestión de cambios de moneda base"""
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, progress_callback: Optional[ProgressCallback] = None):
         self.db = db
+        self.progress_callback = progress_callback
+
+    def _report_progress(self, stage: str, processed: int, total: int) -> None:
+        """Informa el avance de procesos largos (log + callback opcional)"""
+        logger.info(f"Cambio de moneda - {stage}: {processed}/{total}")
+        if self.progress_callback:
+            self.progress_callback(stage, processed, total)
 
     async def validate_currency_change(
         self, 
@@ -97,14 +112,11 @@ class CurrencyChangeService:
         """Analiza asientos contables históricos que serán afectados"""
         
         # Contar asientos contabilizados
-        posted_entries_result = await self.db.execute(
-            select(JournalEntry).where(
+        result.historical_entries_count = await self.db.scalar(
+            select(func.count(JournalEntry.id)).where(
                 JournalEntry.status == JournalEntryStatus.POSTED
             )
-        )
-        posted_entries = posted_entries_result.scalars().all()
-        
-        result.historical_entries_count = len(posted_entries)
+        ) or 0
         
         if result.historical_entries_count > 0:
             result.warnings.append(
@@ -112,21 +124,97 @@ class CurrencyChangeService:
                 "Sus valores históricos se mantendrán en la moneda original."
             )
         
-        # Contar asientos con monedas extranjeras
-        foreign_currency_lines_result = await self.db.execute(
-            select(JournalEntryLine).where(
+        # Contar líneas con monedas extranjeras
+        result.entries_with_foreign_currency = await self.db.scalar(
+            select(func.count(JournalEntryLine.id)).where(
                 JournalEntryLine.currency_id.isnot(None)
             )
-        )
-        foreign_currency_lines = foreign_currency_lines_result.scalars().all()
-        
-        result.entries_with_foreign_currency = len(foreign_currency_lines)
+        ) or 0
         
         if result.entries_with_foreign_currency > 0:
             result.warnings.append(
                 f"Existen {result.entries_with_foreign_currency} líneas de asiento con monedas extranjeras. "
                 "Estas líneas requerirán revisión después del cambio."
             )
+            result.foreign_balances = await self._aggregate_foreign_currency_balances()
+            without_amount = sum(b["lines_without_amount_currency"] for b in result.foreign_balances)
+            if without_amount:
+                result.warnings.append(
+                    f"{without_amount} líneas en moneda extranjera no tienen importe en moneda original "
+                    "y se revalúan por su importe en moneda base."
+                )
+
+    async def _aggregate_foreign_currency_balances(
+        self,
+        as_of_date: Optional[date] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Saldos contabilizados en moneda extranjera agrupados por (cuenta, moneda).
+        
+        Devuelve el saldo en moneda base (débito - crédito) y el saldo en moneda
+        original (amount_currency con el signo del movimiento) calculados en BD.
+        Las líneas sin amount_currency toman su importe en moneda base, como
+        ``JournalEntryLine.effective_amount_currency``, y se cuentan aparte para
+        poder informarlas.
+        """
+        signed_amount_currency = case(
+            (
+                JournalEntryLine.debit_amount > 0,
+                func.coalesce(JournalEntryLine.amount_currency, JournalEntryLine.debit_amount)
+            ),
+            else_=-func.coalesce(JournalEntryLine.amount_currency, JournalEntryLine.credit_amount)
+        )
+        
+        query = (
+            select(
+                JournalEntryLine.account_id,
+                Account.code.label("account_code"),
+                Account.name.label("account_name"),
+                JournalEntryLine.currency_id,
+                Currency.code.label("currency_code"),
+                func.sum(JournalEntryLine.debit_amount - JournalEntryLine.credit_amount).label("book_balance"),
+                func.sum(signed_amount_currency).label("foreign_balance"),
+                func.count(JournalEntryLine.id).label("line_count"),
+                func.count(JournalEntryLine.id).filter(
+                    JournalEntryLine.amount_currency.is_(None)
+                ).label("lines_without_amount_currency")
+            )
+            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
+            .join(Account, JournalEntryLine.account_id == Account.id)
+            .join(Currency, JournalEntryLine.currency_id == Currency.id)
+            .where(
+                and_(
+                    JournalEntry.status == JournalEntryStatus.POSTED,
+                    JournalEntryLine.currency_id.isnot(None)
+                )
+            )
+            .group_by(
+                JournalEntryLine.account_id, Account.code, Account.name,
+                JournalEntryLine.currency_id, Currency.code
+            )
+            .order_by(Account.code, Currency.code)
+        )
+        
+        if as_of_date:
+            query = query.where(
+                JournalEntry.entry_date < datetime.combine(as_of_date + timedelta(days=1), datetime.min.time())
+            )
+        
+        result = await self.db.execute(query)
+        return [
+            {
+                "account_id": row.account_id,
+                "account_code": row.account_code,
+                "account_name": row.account_name,
+                "currency_id": row.currency_id,
+                "currency_code": row.currency_code,
+                "book_balance": row.book_balance or Decimal("0"),
+                "foreign_balance": row.foreign_balance or Decimal("0"),
+                "line_count": row.line_count,
+                "lines_without_amount_currency": row.lines_without_amount_currency
+            }
+            for row in result.all()
+        ]
 
     async def _validate_exchange_rates(
         self, 
@@ -197,11 +285,9 @@ class CurrencyChangeService:
         """Genera resumen del impacto del cambio"""
         
         # Contar cuentas que serán afectadas
-        accounts_result = await self.db.execute(
-            select(Account).where(Account.is_active == True)
-        )
-        accounts = accounts_result.scalars().all()
-        result.accounts_affected = len(accounts)
+        result.accounts_affected = await self.db.scalar(
+            select(func.count(Account.id)).where(Account.is_active == True)
+        ) or 0
         
         result.impact_summary = {
             "current_currency": current_currency,
@@ -209,6 +295,18 @@ class CurrencyChangeService:
             "total_accounts": result.accounts_affected,
             "historical_entries": result.historical_entries_count,
             "foreign_currency_lines": result.entries_with_foreign_currency,
+            "accounts_with_foreign_balances": len({b["account_id"] for b in result.foreign_balances}),
+            "foreign_currency_balances": [
+                {
+                    "account_code": b["account_code"],
+                    "currency_code": b["currency_code"],
+                    "book_balance": str(b["book_balance"]),
+                    "foreign_balance": str(b["foreign_balance"]),
+                    "line_count": b["line_count"],
+                    "lines_without_amount_currency": b["lines_without_amount_currency"]
+                }
+                for b in result.foreign_balances
+            ],
             "requires_adjustment_entries": result.historical_entries_count > 0,
             "requires_exchange_rates": True
         }
@@ -273,29 +371,13 @@ class CurrencyChangeService:
         
         logger.info("Creando asientos de revalorización por cambio de moneda")
         
-        # Buscar moneda objetivo para obtener tasa de cambio
-        new_currency_result = await self.db.execute(
-            select(Currency).where(Currency.code == new_currency)
-        )
-        new_currency_obj = new_currency_result.scalar_one_or_none()
-        
-        if not new_currency_obj:
-            logger.warning(f"No se encontró la moneda {new_currency} para crear asientos de revalorización")
-            return []
-        
-        # Buscar tasa de cambio
-        exchange_rate_result = await self.db.execute(
-            select(ExchangeRate).where(
-                and_(
-                    ExchangeRate.currency_id == new_currency_obj.id,
-                    ExchangeRate.rate_date <= effective_date
-                )
-            ).order_by(ExchangeRate.rate_date.desc()).limit(1)
-        )
-        exchange_rate = exchange_rate_result.scalar_one_or_none()
+        # Tasa de la moneda objetivo desde la tabla de tipos de cambio en memoria
+        await exchange_rate_table.ensure_loaded(self.db)
+        exchange_rate = exchange_rate_table.get_rate(new_currency, effective_date)
         
         if not exchange_rate:
             # No crear asientos si no hay tasa de cambio
+            logger.warning(f"No se encontró tasa de cambio de {new_currency} para crear asientos de revalorización")
             return []
         
         # Obtener diario para ajustes
@@ -308,17 +390,16 @@ class CurrencyChangeService:
             # No crear asientos si no hay cuenta configurada
             return []
         
-        # Por ahora, crear un asiento de ejemplo que documente el cambio
-        journal_entry_service = JournalEntryService(self.db)
+        # Saldos en moneda extranjera agregados en BD por (cuenta, moneda)
+        self._report_progress("agregando saldos en moneda extranjera", 0, 1)
+        balances = await self._aggregate_foreign_currency_balances(effective_date)
+        self._report_progress("agregando saldos en moneda extranjera", 1, 1)
         
-        entry_data = {
-            "journal_id": adjustment_journal.id,
-            "entry_date": datetime.combine(effective_date, datetime.min.time()),
-            "description": f"Revalorización por cambio de moneda base de {current_currency} a {new_currency}",
-            "entry_type": "adjustment",
-            "transaction_origin": TransactionOrigin.ADJUSTMENT,
-            "reference": f"CURRENCY-CHANGE-{current_currency}-{new_currency}-{effective_date}",
-            "lines": [
+        lines = await self._build_revaluation_lines(balances, effective_date, exchange_diff_account.id)
+        
+        if not lines:
+            # Sin saldos que revalorizar: asiento simbólico que documenta el cambio
+            lines = [
                 {
                     "account_id": exchange_diff_account.id,
                     "description": f"Diferencia por cambio de moneda base (tasa: {exchange_rate.rate})",
@@ -332,6 +413,17 @@ class CurrencyChangeService:
                     "credit_amount": Decimal("0.01")  # Asiento simbólico
                 }
             ]
+        
+        journal_entry_service = JournalEntryService(self.db)
+        
+        entry_data = {
+            "journal_id": adjustment_journal.id,
+            "entry_date": datetime.combine(effective_date, datetime.min.time()),
+            "description": f"Revalorización por cambio de moneda base de {current_currency} a {new_currency}",
+            "entry_type": "adjustment",
+            "transaction_origin": TransactionOrigin.ADJUSTMENT,
+            "reference": f"CURRENCY-CHANGE-{current_currency}-{new_currency}-{effective_date}",
+            "lines": lines
         }
         
         try:
@@ -355,6 +447,69 @@ class CurrencyChangeService:
             logger.warning(f"No se pudo crear asiento de revalorización: {e}")
             return []
 
+    async def _build_revaluation_lines(
+        self,
+        balances: List[Dict[str, Any]],
+        effective_date: date,
+        exchange_diff_account_id: uuid.UUID
+    ) -> List[Dict[str, Any]]:
+        """
+        Genera en memoria las líneas de revalorización a partir de los saldos
+        agregados: cada saldo en moneda extranjera se valora a la tasa vigente
+        en la fecha efectiva y la diferencia con el saldo contable se compensa
+        contra la cuenta de diferencias de cambio.
+        """
+        await exchange_rate_table.ensure_loaded(self.db)
+        
+        lines: List[Dict[str, Any]] = []
+        net_difference = Decimal("0")
+        total = len(balances)
+        
+        for processed, balance in enumerate(balances, 1):
+            if processed % REVALUATION_PROGRESS_STEP == 0:
+                self._report_progress("generando líneas de revalorización", processed, total)
+            
+            if balance["account_id"] == exchange_diff_account_id:
+                continue
+            
+            rate = exchange_rate_table.get_rate(balance["currency_code"], effective_date)
+            if not rate:
+                logger.warning(
+                    f"Sin tasa de cambio para {balance['currency_code']} en {effective_date}; "
+                    f"no se revaloriza la cuenta {balance['account_code']}"
+                )
+                continue
+            
+            revalued = rate.convert_to_base(balance["foreign_balance"]).quantize(
+                Decimal("0.01"), rounding=ROUND_HALF_UP
+            )
+            difference = revalued - balance["book_balance"]
+            if difference == 0:
+                continue
+            
+            lines.append({
+                "account_id": balance["account_id"],
+                "description": (
+                    f"Revalorización {balance['currency_code']} "
+                    f"{balance['foreign_balance']} a tasa {rate.rate}"
+                ),
+                "debit_amount": difference if difference > 0 else Decimal("0.00"),
+                "credit_amount": -difference if difference < 0 else Decimal("0.00")
+            })
+            net_difference += difference
+        
+        self._report_progress("generando líneas de revalorización", total, total)
+        
+        if lines and net_difference != 0:
+            lines.append({
+                "account_id": exchange_diff_account_id,
+                "description": "Diferencia por cambio de moneda base",
+                "debit_amount": -net_difference if net_difference < 0 else Decimal("0.00"),
+                "credit_amount": net_difference if net_difference > 0 else Decimal("0.00")
+            })
+        
+        return lines
+
     async def _get_or_create_adjustment_journal(self) -> Journal:
         """Obtiene o crea un diario para ajustes de moneda"""
         
@@ -485,6 +640,7 @@ class CurrencyChangeService:
             settings.updated_at = datetime.utcnow()
             
             await self.db.commit()
+            exchange_rate_table.invalidate()
             
             logger.info(f"Cambio de moneda ejecutado exitosamente: {current_currency} -> {new_currency}")
             
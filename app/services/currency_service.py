@@ -6,16 +6,20 @@ from decimal import Decimal
 from datetime import date, datetime, timedelta
 from typing import Optional, List, Dict, Any, Tuple
 
+import numpy as np
 from sqlalchemy import select, and_, or_, desc, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
 from app.models.currency import Currency, ExchangeRate
 from app.models.company_settings import CompanySettings
+from app.services.exchange_rate_cache import exchange_rate_table, CachedRate
 from app.schemas.currency import (
     CurrencyCreate, CurrencyUpdate, CurrencyFilter,
     ExchangeRateCreate, ExchangeRateUpdate, ExchangeRateFilter,
     CurrencyConversionRequest, CurrencyConversionResponse,
+    BatchCurrencyConversionRequest, BatchCurrencyConversionResponse,
+    BatchCurrencyConversionItemResult,
     ExchangeRateImportRequest, ExchangeRateImportResult
 )
 from app.utils.exceptions import NotFoundError, BusinessRuleError, ValidationError
@@ -144,6 +148,7 @@ class CurrencyService:
         exchange_rate = ExchangeRate(**exchange_rate_data.model_dump())
         self.db.add(exchange_rate)
         await self.db.commit()
+        exchange_rate_table.invalidate()
         
         logger.info(f"Exchange rate inicial creado para {currency.code}: 1.0")
     
@@ -258,6 +263,7 @@ class CurrencyService:
         settings.currency_code = currency.code  # Mantener compatibilidad
         
         await self.db.commit()
+        exchange_rate_table.invalidate()
         
         logger.info(f"Moneda base establecida: {currency.code}")
         return currency
@@ -345,17 +351,32 @@ class ExchangeRateService:
         if reference_date is None:
             reference_date = date.today()
         
-        query = select(ExchangeRate).options(
-            joinedload(ExchangeRate.currency)
-        ).join(Currency).where(
-            and_(
-                Currency.code == currency_code.upper(),
-                ExchangeRate.rate_date <= reference_date
-            )
-        ).order_by(desc(ExchangeRate.rate_date)).limit(1)
+        cached_rate = await self.get_cached_rate(currency_code, reference_date)
+        if not cached_rate:
+            return None
         
-        result = await self.db.execute(query)
-        return result.scalar_one_or_none()
+        # Búsqueda por clave primaria: se resuelve desde el identity map si
+        # el tipo de cambio ya está cargado en la sesión
+        return await self.db.get(
+            ExchangeRate,
+            cached_rate.exchange_rate_id,
+            options=[joinedload(ExchangeRate.currency)]
+        )
+    
+    async def get_cached_rate(
+        self,
+        currency_code: str,
+        reference_date: Optional[date] = None
+    ) -> Optional[CachedRate]:
+        """
+        Obtener el tipo de cambio vigente desde la tabla en memoria
+        (sin consultas a BD una vez cargada la tabla)
+        """
+        if reference_date is None:
+            reference_date = date.today()
+        
+        await exchange_rate_table.ensure_loaded(self.db)
+        return exchange_rate_table.get_rate(currency_code, reference_date)
     
     async def create_exchange_rate(self, exchange_rate_data: ExchangeRateCreate) -> ExchangeRate:
         """
@@ -383,6 +404,7 @@ class ExchangeRateService:
         exchange_rate = ExchangeRate(**exchange_rate_data.model_dump())
         self.db.add(exchange_rate)
         await self.db.commit()
+        exchange_rate_table.invalidate()
         await self.db.refresh(exchange_rate, ["currency"])
         
         logger.info(f"Tipo de cambio creado: {currency.code} = {exchange_rate.rate} ({exchange_rate.rate_date})")
@@ -404,6 +426,7 @@ class ExchangeRateService:
             setattr(exchange_rate, field, value)
         
         await self.db.commit()
+        exchange_rate_table.invalidate()
         await self.db.refresh(exchange_rate, ["currency"])
         
         logger.info(f"Tipo de cambio actualizado: {exchange_rate.currency.code}")
@@ -420,6 +443,7 @@ class ExchangeRateService:
         
         await self.db.delete(exchange_rate)
         await self.db.commit()
+        exchange_rate_table.invalidate()
         
         logger.info(f"Tipo de cambio eliminado: {exchange_rate.currency.code} ({exchange_rate.rate_date})")
         return True
@@ -455,16 +479,15 @@ class CurrencyConversionService:
                 rate_source="same_currency"
             )
         
-        # Obtener moneda base
-        base_currency = await self.currency_service.get_base_currency()
-        if not base_currency:
+        # Obtener moneda base y tipos de cambio desde la tabla en memoria
+        await exchange_rate_table.ensure_loaded(self.db)
+        base_code = exchange_rate_table.base_currency_code
+        if not base_code:
             raise BusinessRuleError("No hay moneda base configurada en el sistema")
         
-        base_code = base_currency.code
-        
         # Caso 1: Conversión desde moneda base a otra moneda
         if from_code == base_code and to_code != base_code:
-            rate = await self.exchange_rate_service.get_latest_exchange_rate(to_code, conversion_date)
+            rate = exchange_rate_table.get_rate(to_code, conversion_date)
             if not rate:
                 raise NotFoundError(f"No se encontró tipo de cambio para {to_code} en {conversion_date}")
             
@@ -473,7 +496,7 @@ class CurrencyConversionService:
             
         # Caso 2: Conversión desde otra moneda a moneda base
         elif from_code != base_code and to_code == base_code:
-            rate = await self.exchange_rate_service.get_latest_exchange_rate(from_code, conversion_date)
+            rate = exchange_rate_table.get_rate(from_code, conversion_date)
             if not rate:
                 raise NotFoundError(f"No se encontró tipo de cambio para {from_code} en {conversion_date}")
             
@@ -482,8 +505,8 @@ class CurrencyConversionService:
             
         # Caso 3: Conversión entre dos monedas extranjeras (vía moneda base)
         else:
-            from_rate = await self.exchange_rate_service.get_latest_exchange_rate(from_code, conversion_date)
-            to_rate = await self.exchange_rate_service.get_latest_exchange_rate(to_code, conversion_date)
+            from_rate = exchange_rate_table.get_rate(from_code, conversion_date)
+            to_rate = exchange_rate_table.get_rate(to_code, conversion_date)
             
             if not from_rate:
                 raise NotFoundError(f"No se encontró tipo de cambio para {from_code} en {conversion_date}")
@@ -505,6 +528,120 @@ class CurrencyConversionService:
             rate_source="database"
         )
     
+    async def convert_currency_batch(
+        self,
+        batch_request: BatchCurrencyConversionRequest
+    ) -> BatchCurrencyConversionResponse:
+        """
+        Convertir un lote de importes, cada uno con su par de monedas y fecha.
+        
+        Las tasas se resuelven desde la tabla en memoria (como máximo una
+        consulta para cargarla) y los importes se calculan en bloque sobre
+        arrays de Decimal, con la misma aritmética que convert_currency.
+        Los importes sin tasa disponible se devuelven con error sin abortar el lote.
+        """
+        await exchange_rate_table.ensure_loaded(self.db)
+        base_code = exchange_rate_table.base_currency_code
+        if not base_code:
+            raise BusinessRuleError("No hay moneda base configurada en el sistema")
+        
+        today = date.today()
+        items = batch_request.items
+        size = len(items)
+        
+        amounts = np.empty(size, dtype=object)
+        from_rates = np.empty(size, dtype=object)
+        to_rates = np.empty(size, dtype=object)
+        rate_kind = np.zeros(size, dtype=np.int8)  # 0 misma moneda, 1 desde base, 2 hacia base, 3 cruzada
+        
+        results: List[BatchCurrencyConversionItemResult] = []
+        one = Decimal('1')
+        
+        for index, item in enumerate(items):
+            conversion_date = item.conversion_date or today
+            from_code = item.from_currency_code
+            to_code = item.to_currency_code
+            result = BatchCurrencyConversionItemResult(
+                index=index,
+                original_amount=item.amount,
+                from_currency_code=from_code,
+                to_currency_code=to_code,
+                conversion_date=conversion_date,
+                rate_source="database"
+            )
+            results.append(result)
+            amounts[index] = item.amount
+            from_rates[index] = one
+            to_rates[index] = one
+            
+            if from_code == to_code:
+                result.rate_source = "same_currency"
+                continue
+            
+            missing = []
+            if from_code != base_code:
+                from_rate = exchange_rate_table.get_rate(from_code, conversion_date)
+                if from_rate:
+                    from_rates[index] = from_rate.rate
+                    result.from_rate_id = from_rate.exchange_rate_id
+                    result.from_rate_date = from_rate.rate_date
+                else:
+                    missing.append(from_code)
+            if to_code != base_code:
+                to_rate = exchange_rate_table.get_rate(to_code, conversion_date)
+                if to_rate and to_rate.rate != 0:
+                    to_rates[index] = to_rate.rate
+                    result.to_rate_id = to_rate.exchange_rate_id
+                    result.to_rate_date = to_rate.rate_date
+                elif to_rate:
+                    result.error = "No se puede convertir con tasa de cambio 0"
+                else:
+                    missing.append(to_code)
+            
+            if missing:
+                result.error = (
+                    f"No se encontró tipo de cambio para {', '.join(missing)} en {conversion_date}"
+                )
+            
+            if result.error:
+                from_rates[index] = one
+                to_rates[index] = one
+                continue
+            
+            if from_code == base_code:
+                rate_kind[index] = 1
+            elif to_code == base_code:
+                rate_kind[index] = 2
+            else:
+                rate_kind[index] = 3
+        
+        # Aritmética en bloque: importe -> moneda base -> moneda destino
+        converted = (amounts * from_rates) / to_rates
+        exchange_rates = np.where(
+            rate_kind == 1, to_rates,
+            np.where(rate_kind == 2, from_rates, from_rates / to_rates)
+        )
+        
+        failed_count = 0
+        for index, result in enumerate(results):
+            if result.error:
+                failed_count += 1
+                continue
+            if rate_kind[index] == 0:
+                result.converted_amount = result.original_amount
+                result.exchange_rate = Decimal('1.0')
+            else:
+                result.converted_amount = converted[index]
+                result.exchange_rate = exchange_rates[index]
+        
+        return BatchCurrencyConversionResponse(
+            base_currency_code=base_code,
+            results=results,
+            total=size,
+            converted_count=size - failed_count,
+            failed_count=failed_count
+        )
+    
     async def validate_exchange_rate_exists(
         self, 
         currency_code: str, 
@@ -514,7 +651,7 @@ class CurrencyConversionService:
         Validar que existe tipo de cambio para una moneda en una fecha
         """
         try:
-            rate = await self.exchange_rate_service.get_latest_exchange_rate(currency_code, transaction_date)
+            rate = await self.exchange_rate_service.get_cached_rate(currency_code, transaction_date)
             return rate is not None
         except Exception:
             return False
@@ -0,0 +1,178 @@
+"""
+Tabla en memoria de tipos de cambio para conversiones sin consultas a BD.
+
+Mantiene, por moneda, los arrays ordenados de (rate_date, rate) y el código de
+la moneda base. Las búsquedas "tipo de cambio vigente a una fecha" se resuelven
+con bisect sobre esos arrays. La tabla se carga completa con una sola consulta
+y se invalida cuando se escriben tipos de cambio o cambia la moneda base.
+"""
+import asyncio
+import bisect
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.settings import settings
+from app.models.currency import Currency, ExchangeRate
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class CachedRate(NamedTuple):
+    """Tipo de cambio resuelto desde la tabla en memoria"""
+    currency_code: str
+    rate_date: date
+    rate: Decimal
+    exchange_rate_id: uuid.UUID
+
+    def convert_to_base(self, amount: Decimal) -> Decimal:
+        """Convierte un importe de esta moneda a la moneda base"""
+        return amount * self.rate
+
+    def convert_from_base(self, amount: Decimal) -> Decimal:
+        """Convierte un importe de la moneda base a esta moneda"""
+        if self.rate == 0:
+            raise ValueError("No se puede convertir con tasa de cambio 0")
+        return amount / self.rate
+
+
+class _RateSeries:
+    """Serie histórica de una moneda, ordenada por fecha"""
+    __slots__ = ("dates", "rates", "ids")
+
+    def __init__(self) -> None:
+        self.dates: List[date] = []
+        self.rates: List[Decimal] = []
+        self.ids: List[uuid.UUID] = []
+
+
+class ExchangeRateTable:
+    """
+    Tabla de tipos de cambio por moneda con búsqueda por fecha (bisect).
+
+    La tabla es por proceso: las escrituras hechas desde este proceso la
+    invalidan de inmediato y las de otros workers se recogen al vencer el TTL.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else settings.EXCHANGE_RATE_CACHE_TTL_SECONDS
+        )
+        self._series: Dict[str, _RateSeries] = {}
+        self._base_currency_code: Optional[str] = None
+        self._loaded_at: Optional[float] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_loaded(self) -> bool:
+        if self._loaded_at is None:
+            return False
+        return (time.monotonic() - self._loaded_at) < self.ttl_seconds
+
+    @property
+    def base_currency_code(self) -> Optional[str]:
+        return self._base_currency_code
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    def invalidate(self) -> None:
+        """Marca la tabla como obsoleta; la próxima consulta la recarga"""
+        self._version += 1
+        self._loaded_at = None
+
+    async def ensure_loaded(self, db: AsyncSession) -> None:
+        """Carga la tabla si no está cargada o si venció el TTL"""
+        if self.is_loaded:
+            return
+
+        async with self._lock:
+            if self.is_loaded:
+                return
+
+            version = self._version
+            series, base_code = await self._load(db)
+            self._series = series
+            self._base_currency_code = base_code
+
+            # Si hubo una invalidación durante la carga, los datos sirven para
+            # esta llamada pero la siguiente volverá a cargar
+            if version == self._version:
+                self._loaded_at = time.monotonic()
+
+            logger.debug(
+                f"Tabla de tipos de cambio cargada: {len(series)} monedas, base {base_code}"
+            )
+
+    async def _load(self, db: AsyncSession) -> Tuple[Dict[str, _RateSeries], Optional[str]]:
+        """Lee todos los tipos de cambio en una consulta y resuelve la moneda base"""
+        from app.services.currency_service import CurrencyService
+
+        result = await db.execute(
+            select(Currency.code, ExchangeRate.rate_date, ExchangeRate.rate, ExchangeRate.id)
+            .join(Currency, ExchangeRate.currency_id == Currency.id)
+            .order_by(Currency.code, ExchangeRate.rate_date)
+        )
+
+        series: Dict[str, _RateSeries] = {}
+        for code, rate_date, rate, rate_id in result.all():
+            entry = series.get(code)
+            if entry is None:
+                entry = series[code] = _RateSeries()
+            entry.dates.append(rate_date)
+            entry.rates.append(rate)
+            entry.ids.append(rate_id)
+
+        base_currency = await CurrencyService(db).get_base_currency()
+        return series, base_currency.code if base_currency else None
+
+    def load_rows(
+        self,
+        rows: List[Tuple[str, date, Decimal, uuid.UUID]],
+        base_currency_code: Optional[str]
+    ) -> None:
+        """Carga la tabla desde filas (code, rate_date, rate, id) ya obtenidas"""
+        series: Dict[str, _RateSeries] = {}
+        for code, rate_date, rate, rate_id in sorted(rows, key=lambda r: (r[0], r[1])):
+            entry = series.setdefault(code.upper(), _RateSeries())
+            entry.dates.append(rate_date)
+            entry.rates.append(rate)
+            entry.ids.append(rate_id)
+
+        self._series = series
+        self._base_currency_code = base_currency_code
+        self._loaded_at = time.monotonic()
+
+    def get_rate(self, currency_code: str, reference_date: date) -> Optional[CachedRate]:
+        """
+        Tipo de cambio vigente para la moneda a la fecha de referencia
+        (el más reciente con rate_date <= reference_date)
+        """
+        code = currency_code.upper()
+        entry = self._series.get(code)
+        if entry is None:
+            return None
+
+        index = bisect.bisect_right(entry.dates, reference_date) - 1
+        if index < 0:
+            return None
+
+        return CachedRate(
+            currency_code=code,
+            rate_date=entry.dates[index],
+            rate=entry.rates[index],
+            exchange_rate_id=entry.ids[index]
+        )
+
+
+# Instancia compartida por proceso
+exchange_rate_table = ExchangeRateTable()
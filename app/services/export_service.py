@@ -10,8 +10,8 @@ import uuid
 from decimal import Decimal
 
 import pandas as pd
-from sqlalchemy.orm import Session
-from sqlalchemy import inspect, text, MetaData, Table
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import inspect, text, MetaData, Table, select, func
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.schemas.export_generic import (
@@ -98,17 +98,21 @@ class ExportService:
         ]
     }
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def get_available_tables(self) -> AvailableTablesResponse:
+    async def _count(self, model) -> int:
+        """Total de registros de la tabla del modelo"""
+        return await self.db.scalar(select(func.count()).select_from(model)) or 0
+    
+    async def get_available_tables(self) -> AvailableTablesResponse:
         """Obtiene información de todas las tablas disponibles para exportación"""
         tables = []
         for table_name in TableName:
             try:
                 model = self.TABLE_MODEL_MAPPING[table_name]
                 columns = self._get_table_columns(model, table_name)
-                total_records = self.db.query(model).count()
+                total_records = await self._count(model)
                 
                 table_schema = TableSchema(
                     table_name=table_name.value,
@@ -126,16 +130,16 @@ class ExportService:
             tables=tables,
             total_tables=len(tables)
         )
-    def get_table_schema(self, table_name: TableName) -> TableSchema:
+    async def get_table_schema(self, table_name: TableName) -> TableSchema:
         """Obtiene el schema de una tabla específica"""
         model = self.TABLE_MODEL_MAPPING[table_name]
         columns = self._get_table_columns(model)
-        total_records = self.db.query(model).count()
+        total_records = await self._count(model)
         
         # Obtener datos de muestra
         sample_data = None
         try:
-            sample_rows = self.db.query(model).limit(5).all()
+            sample_rows = (await self.db.execute(select(model).limit(5))).scalars().all()
             sample_data = [self._model_to_dict(row, table_name=table_name) for row in sample_rows]
         except Exception:
             pass
@@ -149,7 +153,7 @@ class ExportService:
             sample_data=sample_data
         )
     
-    def export_data(self, request: ExportRequest, user_id: uuid.UUID) -> ExportResponse:
+    async def export_data(self, request: ExportRequest, user_id: uuid.UUID) -> ExportResponse:
         """Exporta datos según los parámetros especificados"""
         try:
             # Obtener modelo de la tabla
@@ -159,7 +163,7 @@ class ExportService:
             query = self._build_query(model, request.filters)
             
             # Obtener datos
-            data = query.all()
+            data = (await self.db.execute(query)).scalars().all()
               # Convertir a diccionarios
             dict_data = [self._model_to_dict(row, request.columns, table_name=request.table_name) for row in data]
             
@@ -173,7 +177,7 @@ class ExportService:
                 export_date=datetime.utcnow(),
                 user_id=user_id,
                 table_name=request.table_name.value,
-                total_records=self.db.query(model).count(),
+                total_records=await self._count(model),
                 exported_records=len(dict_data),
                 filters_applied=request.filters.model_dump(exclude_none=True),
                 format=request.export_format,
@@ -226,28 +230,28 @@ class ExportService:
     
     def _build_query(self, model, filters: ExportFilter):
         """Construye query con filtros aplicados"""
-        query = self.db.query(model)
+        query = select(model)
         
         # Filtro por IDs específicos
         if filters.ids:
-            query = query.filter(model.id.in_(filters.ids))
+            query = query.where(model.id.in_(filters.ids))
         
         # Filtro por rango de fechas
         if filters.date_from and hasattr(model, 'created_at'):
-            query = query.filter(model.created_at >= filters.date_from)
+            query = query.where(model.created_at >= filters.date_from)
         
         if filters.date_to and hasattr(model, 'created_at'):
-            query = query.filter(model.created_at <= filters.date_to)
+            query = query.where(model.created_at <= filters.date_to)
         
         # Filtro por registros activos
         if filters.active_only is not None and hasattr(model, 'is_active'):
-            query = query.filter(model.is_active == filters.active_only)
+            query = query.where(model.is_active == filters.active_only)
         
         # Filtros personalizados
         if filters.custom_filters:
             for field, value in filters.custom_filters.items():
                 if hasattr(model, field):
-                    query = query.filter(getattr(model, field) == value)
+                    query = query.where(getattr(model, field) == value)
           # Aplicar offset y limit
         if filters.offset:
             query = query.offset(filters.offset)
@@ -11,6 +11,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
 from app.models.account import Account, AccountType
+from app.services.company_settings_cache import company_settings_cache
 
 
 logger = logging.getLogger(__name__)
@@ -243,7 +244,12 @@ class HierarchicalAccountImportService:
         
         # Confirmar todas las transacciones si todo salió bien
         if failed_count == 0:
+            if created_count:
+                # Las cuentas por defecto de la configuración se resuelven por código
+                await company_settings_cache.bump_version(self.db)
             await self.db.commit()
+            if created_count:
+                company_settings_cache.invalidate()
             logger.info("Todas las cuentas fueron creadas exitosamente")
         else:
             await self.db.rollback()
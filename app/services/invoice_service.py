@@ -6,8 +6,9 @@ import uuid
 from decimal import Decimal
 from datetime import datetime, date, timezone
 from typing import Optional, List, Dict, Any, Tuple
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc, and_, func
+from sqlalchemy import select, delete, func, insert, inspect, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 
 from app.models.invoice import Invoice, InvoiceLine, InvoiceStatus, InvoiceType
 from app.models.third_party import ThirdParty
@@ -18,6 +19,7 @@ from app.models.tax import Tax
 from app.models.journal import Journal, JournalType
 from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus, JournalEntryType, TransactionOrigin
 from app.models.nfe import NFe
+from app.models.base import Base
 from app.schemas.invoice import (
     InvoiceCreate, InvoiceUpdate, InvoiceResponse,
     InvoiceLineCreate, InvoiceLineUpdate, InvoiceLineResponse,
@@ -26,13 +28,30 @@ from app.schemas.invoice import (
 )
 from app.schemas.journal_entry import JournalEntryCreate, JournalEntryLineCreate
 from app.services.account_determination_service import AccountDeterminationService
+from app.services.account_rule_table import AccountRuleTable
+from app.services.cost_center_actuals_service import CostCenterActualsService
 from app.services.payment_terms_processor import PaymentTermsProcessor
+from app.services.third_party_open_item_service import ThirdPartyOpenItemService
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
 from app.utils.logging import get_logger
-from app.utils.codes import generate_code
+from app.utils.pagination import KeysetPaginator, SortKey, estimate_total
+from app.utils.codes import generate_code_async, generate_code_block_async
 
 logger = get_logger(__name__)
 
+# Facturas por transacción en la contabilización en lote
+BULK_POST_CHUNK_SIZE = 500
+
+
+def _insert_row(instance: Base) -> Dict[str, Any]:
+    """Valores de columna asignados en un objeto transitorio, para INSERT masivo"""
+    state = inspect(instance)
+    return {
+        attr.key: state.dict[attr.key]
+        for attr in state.mapper.column_attrs
+        if attr.key in state.dict
+    }
+
 
 class InvoiceService:
     """
@@ -45,12 +64,27 @@ class InvoiceService:
         ↓ [Cancelar]
     CANCELLED (Cancelada) - Reversión del asiento, estado final    """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
         self.account_determination = AccountDeterminationService(db)
         self.payment_terms_processor = PaymentTermsProcessor(db)
-    
-    def _get_default_journal_for_invoice_type(self, invoice_type: InvoiceType) -> Optional[Journal]:
+        self.cost_center_actuals = CostCenterActualsService(db)
+        self.open_items = ThirdPartyOpenItemService(db)
+
+    async def _get_invoice_for_posting(self, invoice_id: uuid.UUID) -> Optional[Invoice]:
+        """
+        Obtiene la factura con tercero y líneas cargados, que es lo que recorren
+        la validación y la generación del asiento
+        """
+        result = await self.db.execute(
+            select(Invoice).options(
+                joinedload(Invoice.third_party),
+                selectinload(Invoice.lines)
+            ).where(Invoice.id == invoice_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def _get_default_journal_for_invoice_type(self, invoice_type: InvoiceType) -> Optional[Journal]:
         """
         Obtiene el diario por defecto para un tipo de factura
         
@@ -73,12 +107,15 @@ class InvoiceService:
             return None
         
         # Buscar el primer diario activo de este tipo
-        return self.db.query(Journal).filter(
-            Journal.type == journal_type,
-            Journal.is_active == True
-        ).first()
+        result = await self.db.execute(
+            select(Journal).where(
+                Journal.type == journal_type,
+                Journal.is_active == True
+            ).limit(1)
+        )
+        return result.scalar_one_or_none()
     
-    def _determine_journal_for_invoice(self, invoice_data: InvoiceCreate) -> Optional[Journal]:
+    async def _determine_journal_for_invoice(self, invoice_data: InvoiceCreate) -> Optional[Journal]:
         """
         Determina qué diario usar para una factura
         
@@ -96,20 +133,23 @@ class InvoiceService:
         
         # Si se especifica journal_id, validar que existe y está activo
         if invoice_data.journal_id:
-            journal = self.db.query(Journal).filter(
-                Journal.id == invoice_data.journal_id,
-                Journal.is_active == True
-            ).first()
+            result = await self.db.execute(
+                select(Journal).where(
+                    Journal.id == invoice_data.journal_id,
+                    Journal.is_active == True
+                )
+            )
+            journal = result.scalar_one_or_none()
             
             if not journal:
                 raise NotFoundError(f"Journal with id {invoice_data.journal_id} not found or inactive")
         else:
             # Selección automática basada en el tipo de factura
-            journal = self._get_default_journal_for_invoice_type(invoice_data.invoice_type)
+            journal = await self._get_default_journal_for_invoice_type(invoice_data.invoice_type)
         
         return journal
     
-    def _generate_invoice_number_with_journal(self, journal: Journal) -> str:
+    async def _generate_invoice_number_with_journal(self, journal: Journal) -> str:
         """
         Genera el número de factura usando la secuencia del diario
         
@@ -124,44 +164,42 @@ class InvoiceService:
         
         # Guardar los cambios en la secuencia del diario
         self.db.add(journal)
-        self.db.flush()  # Para asegurar que se actualice la secuencia
+        await self.db.flush()  # Para asegurar que se actualice la secuencia
         
         return invoice_number
     
-    def create_invoice(self, invoice_data: InvoiceCreate, created_by_id: uuid.UUID) -> InvoiceResponse:
+    async def create_invoice(self, invoice_data: InvoiceCreate, created_by_id: uuid.UUID) -> InvoiceResponse:
         """
         Crear una nueva factura en estado DRAFT siguiendo patrón Odoo
         """
         try:
             # Validar que el tercero existe
-            third_party = self.db.query(ThirdParty).filter(
-                ThirdParty.id == invoice_data.third_party_id
-            ).first()
+            third_party = await self.db.get(ThirdParty, invoice_data.third_party_id)
             if not third_party:
                 raise NotFoundError(f"ThirdParty with id {invoice_data.third_party_id} not found")
 
             # Validar términos de pago si se proporcionan
             if invoice_data.payment_terms_id:
-                payment_terms = self.db.query(PaymentTerms).filter(
-                    PaymentTerms.id == invoice_data.payment_terms_id
-                ).first()
+                payment_terms = await self.db.get(PaymentTerms, invoice_data.payment_terms_id)
                 if not payment_terms:
                     raise NotFoundError(f"PaymentTerms with id {invoice_data.payment_terms_id} not found")            # Determinar diario a usar
-            journal = self._determine_journal_for_invoice(invoice_data)
+            journal = await self._determine_journal_for_invoice(invoice_data)
             
             # Generar número de factura usando el diario
             if invoice_data.invoice_number:
                 # Si se especifica un número manual, validar que no existe
-                existing = self.db.query(Invoice).filter(Invoice.number == invoice_data.invoice_number).first()
+                existing = await self.db.scalar(
+                    select(Invoice.id).where(Invoice.number == invoice_data.invoice_number).limit(1)
+                )
                 if existing:
                     raise ValidationError(f"Invoice number {invoice_data.invoice_number} already exists")
                 invoice_number = invoice_data.invoice_number
             elif journal:
                 # Usar la secuencia del diario
-                invoice_number = self._generate_invoice_number_with_journal(journal)
+                invoice_number = await self._generate_invoice_number_with_journal(journal)
             else:
                 # Fallback al método anterior
-                invoice_number = self._generate_invoice_number(invoice_data.invoice_type)            # Crear factura
+                invoice_number = await self._generate_invoice_number(invoice_data.invoice_type)            # Crear factura
             new_invoice = Invoice(
                 number=invoice_number,
                 invoice_type=invoice_data.invoice_type,
@@ -182,31 +220,31 @@ class InvoiceService:
             )
             
             self.db.add(new_invoice)
-            self.db.flush()  # Para obtener el ID
-            self.db.commit()
+            await self.db.flush()  # Para obtener el ID
+            await self.db.commit()
 
             logger.info(f"Invoice {invoice_number} created in DRAFT status")
             return InvoiceResponse.from_orm(new_invoice)
 
         except Exception as e:
             logger.error(f"Error creating invoice: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def create_invoice_with_lines(self, invoice_data: InvoiceCreateWithLines, created_by_id: uuid.UUID) -> InvoiceWithLines:
+    async def create_invoice_with_lines(self, invoice_data: InvoiceCreateWithLines, created_by_id: uuid.UUID) -> InvoiceWithLines:
         """
         Crear factura con líneas en una sola transacción
         """
         try:
             # Crear la factura principal
             invoice_create = InvoiceCreate(**invoice_data.dict(exclude={'lines'}))
-            invoice = self.create_invoice(invoice_create, created_by_id)
+            invoice = await self.create_invoice(invoice_create, created_by_id)
             
             # Agregar líneas si existen
             lines = []
             if invoice_data.lines:
                 for line_data in invoice_data.lines:
-                    line = self.add_invoice_line(
+                    line = await self.add_invoice_line(
                         invoice_id=invoice.id,
                         line_data=line_data,
                         created_by_id=created_by_id
@@ -214,7 +252,7 @@ class InvoiceService:
                     lines.append(line)
             
             # Recalcular totales
-            updated_invoice = self.calculate_invoice_totals(invoice.id)
+            updated_invoice = await self.calculate_invoice_totals(invoice.id)
             
             return InvoiceWithLines(
                 **updated_invoice.dict(),
@@ -223,17 +261,17 @@ class InvoiceService:
 
         except Exception as e:
             logger.error(f"Error creating invoice with lines: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def post_invoice(self, invoice_id: uuid.UUID, posted_by_id: uuid.UUID) -> InvoiceResponse:
+    async def post_invoice(self, invoice_id: uuid.UUID, posted_by_id: uuid.UUID) -> InvoiceResponse:
         """
         Contabilizar factura: DRAFT → POSTED
         Genera asiento contable automáticamente y bloquea edición
         """
         try:
-            # 1. Obtener y validar la factura
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            # 1. Obtener y validar la factura (con tercero y líneas para no cargar relaciones en diferido)
+            invoice = await self._get_invoice_for_posting(invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
@@ -242,37 +280,37 @@ class InvoiceService:
                 raise BusinessRuleError(f"Invoice cannot be posted in current status: {invoice.status}")
             
             # 2. Recalcular totales antes de contabilizar
-            self.calculate_invoice_totals(invoice_id)
-            self.db.refresh(invoice)
+            await self.calculate_invoice_totals(invoice_id)
             
             if not invoice.total_amount or invoice.total_amount <= 0:
                 raise BusinessRuleError("Invoice must have a positive total amount")
             
             # 3. Validar completitud de la factura
-            validation_errors = self._validate_invoice_for_posting(invoice)
+            validation_errors = await self._validate_invoice_for_posting(invoice)
             if validation_errors:
                 raise BusinessRuleError(f"Validation errors: {'; '.join(validation_errors)}")
             
             # 4. Crear asiento contable automáticamente
-            journal_entry = self._create_journal_entry_for_invoice(invoice, posted_by_id)
+            journal_entry = await self._create_journal_entry_for_invoice(invoice, posted_by_id)
               # 5. Actualizar estado de la factura
             invoice.status = InvoiceStatus.POSTED
             invoice.posted_by_id = posted_by_id
             invoice.posted_at = datetime.utcnow()
             invoice.journal_entry_id = journal_entry.id
             invoice.updated_at = datetime.utcnow()
+            await self.open_items.sync(invoice_ids=[invoice.id])
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info(f"Invoice {invoice.number} posted successfully with journal entry {journal_entry.number}")
             return InvoiceResponse.from_orm(invoice)
             
         except Exception as e:
             logger.error(f"Error posting invoice {invoice_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def cancel_invoice(self, invoice_id: uuid.UUID, cancelled_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
+    async def cancel_invoice(self, invoice_id: uuid.UUID, cancelled_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
         """
         Cancelar factura: POSTED → CANCELLED
         Nuevo flujo con asientos de reversión explícitos para mejor auditoría:
@@ -298,10 +336,13 @@ class InvoiceService:
             logger.info(f"🚫 [CANCEL] Starting cancellation process for invoice {invoice_id}")
             
             # 1. Obtener y validar la factura
-            invoice = self.db.query(Invoice).options(
-                joinedload(Invoice.third_party),
-                joinedload(Invoice.journal_entry)
-            ).filter(Invoice.id == invoice_id).first()
+            result = await self.db.execute(
+                select(Invoice).options(
+                    joinedload(Invoice.third_party),
+                    joinedload(Invoice.journal_entry)
+                ).where(Invoice.id == invoice_id)
+            )
+            invoice = result.scalar_one_or_none()
             
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
@@ -320,7 +361,7 @@ class InvoiceService:
             reversal_entry = None
             if invoice.journal_entry_id:
                 logger.info(f"📝 [CANCEL] Creating reversal journal entry for invoice {invoice.number}")
-                reversal_entry = self._create_reversal_journal_entry(invoice, cancelled_by_id, reason)
+                reversal_entry = await self._create_reversal_journal_entry(invoice, cancelled_by_id, reason)
                 logger.info(f"✅ [CANCEL] Reversal journal entry {reversal_entry.number} created successfully")
             else:
                 logger.warning(f"⚠️ [CANCEL] Invoice {invoice.number} has no journal entry to reverse")
@@ -340,18 +381,19 @@ class InvoiceService:
                 invoice.notes += f"\n{cancellation_note}"
             else:
                 invoice.notes = cancellation_note
+            await self.open_items.sync(invoice_ids=[invoice.id])
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info(f"🎉 [CANCEL] Invoice {invoice.number} cancelled successfully with reversal entry audit trail")
             return InvoiceResponse.from_orm(invoice)
             
         except Exception as e:
             logger.error(f"💥 [CANCEL] Error cancelling invoice {invoice_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def cancel_invoice_legacy(self, invoice_id: uuid.UUID, cancelled_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
+    async def cancel_invoice_legacy(self, invoice_id: uuid.UUID, cancelled_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
         """
         Cancelar factura usando el método legacy (Odoo-style)
         POSTED → CANCELLED sin asientos de reversión explícitos
@@ -379,7 +421,7 @@ class InvoiceService:
             logger.info(f"🚫 [CANCEL_LEGACY] Starting legacy cancellation for invoice {invoice_id}")
             
             # 1. Obtener y validar la factura
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
@@ -389,9 +431,7 @@ class InvoiceService:
             
             # 2. Cancelar el journal entry original (siguiendo flujo Odoo)
             if invoice.journal_entry_id:
-                original_entry = self.db.query(JournalEntry).filter(
-                    JournalEntry.id == invoice.journal_entry_id
-                ).first()
+                original_entry = await self.db.get(JournalEntry, invoice.journal_entry_id)
                 
                 if original_entry and original_entry.status == JournalEntryStatus.POSTED:
                     # Marcar el asiento original como cancelado (sin crear reversión)
@@ -407,20 +447,8 @@ class InvoiceService:
                         original_entry.notes = cancel_note
                     
                     # CRÍTICO: Revertir los saldos de las cuentas
-                    journal_lines = self.db.query(JournalEntryLine).options(
-                        joinedload(JournalEntryLine.account)
-                    ).filter(
-                        JournalEntryLine.journal_entry_id == original_entry.id
-                    ).all()
-                    
-                    for line in journal_lines:
-                        if line.account:
-                            # Revertir saldos usando los mismos montos pero con signo contrario
-                            line.account.balance -= (line.debit_amount or 0) - (line.credit_amount or 0)
-                            line.account.debit_balance -= (line.debit_amount or 0)
-                            line.account.credit_balance -= (line.credit_amount or 0)
-                            line.account.updated_at = datetime.utcnow()
-                            self.db.add(line.account)
+                    await self._revert_entry_balances(original_entry.id)
+                    await self.cost_center_actuals.apply_entries([original_entry.id], sign=-1)
                     
                     logger.info(f"📝 [CANCEL_LEGACY] Journal entry {original_entry.number} marked as cancelled")
             
@@ -433,15 +461,16 @@ class InvoiceService:
             # Agregar nota sobre la cancelación
             if reason:
                 invoice.notes = (invoice.notes or "") + f"\n[CANCELLED - LEGACY] {reason}"
+            await self.open_items.sync(invoice_ids=[invoice.id])
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info(f"✅ [CANCEL_LEGACY] Invoice {invoice.number} cancelled using legacy method")
             return InvoiceResponse.from_orm(invoice)
             
         except Exception as e:
             logger.error(f"💥 [CANCEL_LEGACY] Error in legacy cancellation: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
     # =================================================================
@@ -482,7 +511,7 @@ class InvoiceService:
     - Use el método LEGACY para sistemas simples o compatibilidad con Odoo
     """
 
-    def reset_to_draft(self, invoice_id: uuid.UUID, reset_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
+    async def reset_to_draft(self, invoice_id: uuid.UUID, reset_by_id: uuid.UUID, reason: Optional[str] = None) -> InvoiceResponse:
         """
         Resetear factura a DRAFT desde POSTED o CANCELLED
         - POSTED → DRAFT: Elimina el asiento contable asociado
@@ -493,7 +522,7 @@ class InvoiceService:
         """
         try:
             # 1. Obtener y validar la factura
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
@@ -509,9 +538,7 @@ class InvoiceService:
             journal_entry = None
             
             if journal_entry_id:
-                journal_entry = self.db.query(JournalEntry).filter(
-                    JournalEntry.id == journal_entry_id
-                ).first()
+                journal_entry = await self.db.get(JournalEntry, journal_entry_id)
             
             # 3. Resetear campos de contabilización y cancelación PRIMERO
             previous_status = invoice.status
@@ -527,54 +554,48 @@ class InvoiceService:
             invoice.journal_entry_id = None
             
             # 5. Hacer flush para persistir los cambios de la factura antes de manejar journal entries
-            self.db.flush()
+            await self.db.flush()
             
             # 6. Manejar asientos contables: SIEMPRE eliminar cuando se resetea a DRAFT
             if journal_entry:
                 # Si el asiento estaba POSTED, revertir los saldos antes de eliminar
                 if journal_entry.status == JournalEntryStatus.POSTED:
-                    journal_lines = self.db.query(JournalEntryLine).options(
-                        joinedload(JournalEntryLine.account)
-                    ).filter(
-                        JournalEntryLine.journal_entry_id == journal_entry.id
-                    ).all()
-                    
-                    for line in journal_lines:
-                        if line.account:
-                            # Revertir saldos usando los mismos montos pero con signo contrario
-                            # Si antes era débito ahora es crédito y viceversa
-                            line.account.balance -= (line.debit_amount or 0) - (line.credit_amount or 0)
-                            line.account.debit_balance -= (line.debit_amount or 0)
-                            line.account.credit_balance -= (line.credit_amount or 0)
-                            line.account.updated_at = datetime.utcnow()
-                            self.db.add(line.account)
+                    # Revertir saldos usando los mismos montos pero con signo contrario
+                    await self._revert_entry_balances(journal_entry.id)
+                    await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
                 
                 # Eliminar líneas del journal entry primero
-                self.db.query(JournalEntryLine).filter(
-                    JournalEntryLine.journal_entry_id == journal_entry.id
-                ).delete()
+                await self.db.execute(
+                    delete(JournalEntryLine).where(JournalEntryLine.journal_entry_id == journal_entry.id)
+                )
                 
                 # Luego eliminar el journal entry
-                self.db.delete(journal_entry)
+                await self.db.delete(journal_entry)
                 
                 logger.info(f"Deleted journal entry {journal_entry.number} for reset invoice {invoice.number} (was {previous_status})")
             
             # Si la factura estaba CANCELLED, también eliminar los asientos de reversión
             if previous_status == InvoiceStatus.CANCELLED and journal_entry:
                 # Buscar asientos de reversión que referencien el asiento original
-                reversal_entries = self.db.query(JournalEntry).filter(
-                    JournalEntry.entry_type == JournalEntryType.REVERSAL,
-                    JournalEntry.reference.like(f"%{journal_entry.reference}%")
-                ).all()
+                result = await self.db.execute(
+                    select(JournalEntry).where(
+                        JournalEntry.entry_type == JournalEntryType.REVERSAL,
+                        JournalEntry.reference.like(f"%{journal_entry.reference}%")
+                    )
+                )
+                reversal_entries = result.scalars().all()
                 
                 for reversal_entry in reversal_entries:
+                    if reversal_entry.status == JournalEntryStatus.POSTED:
+                        await self.cost_center_actuals.apply_entries([reversal_entry.id], sign=-1)
+                    
                     # Eliminar líneas del asiento de reversión primero
-                    self.db.query(JournalEntryLine).filter(
-                        JournalEntryLine.journal_entry_id == reversal_entry.id
-                    ).delete()
+                    await self.db.execute(
+                        delete(JournalEntryLine).where(JournalEntryLine.journal_entry_id == reversal_entry.id)
+                    )
                     
                     # Eliminar el asiento de reversión
-                    self.db.delete(reversal_entry)
+                    await self.db.delete(reversal_entry)
                     
                     logger.info(f"Deleted reversal journal entry {reversal_entry.number} for reset invoice {invoice.number}")
             
@@ -584,18 +605,19 @@ class InvoiceService:
                 invoice.notes = (invoice.notes or "") + f"\n[RESET TO DRAFT FROM {status_name}] {reason}"
             else:
                 invoice.notes = (invoice.notes or "") + f"\n[RESET TO DRAFT FROM {status_name}] Reset by user {reset_by_id}"
+            await self.open_items.sync(invoice_ids=[invoice.id])
             
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Invoice {invoice.number} reset from {status_name} to DRAFT")
             return InvoiceResponse.from_orm(invoice)
 
         except Exception as e:
             logger.error(f"Error resetting invoice {invoice_id} to draft: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def add_invoice_line(
+    async def add_invoice_line(
         self, 
         invoice_id: uuid.UUID, 
         line_data: InvoiceLineCreate, 
@@ -606,7 +628,7 @@ class InvoiceService:
         """
         try:
             # Validar que la factura existe y está en DRAFT
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
@@ -616,14 +638,14 @@ class InvoiceService:
             # Validar producto si se proporciona
             product = None
             if hasattr(line_data, 'product_id') and line_data.product_id:
-                product = self.db.query(Product).filter(Product.id == line_data.product_id).first()
+                product = await self.db.get(Product, line_data.product_id)
                 if not product:
                     raise NotFoundError(f"Product with id {line_data.product_id} not found")
             
             # Determinar siguiente secuencia
-            max_sequence = self.db.query(func.max(InvoiceLine.sequence)).filter(
-                InvoiceLine.invoice_id == invoice_id
-            ).scalar() or 0
+            max_sequence = await self.db.scalar(
+                select(func.max(InvoiceLine.sequence)).where(InvoiceLine.invoice_id == invoice_id)
+            ) or 0
             
             # Crear línea
             new_line = InvoiceLine(
@@ -640,37 +662,40 @@ class InvoiceService:
                 updated_at=datetime.utcnow()            )
             
             self.db.add(new_line)
-            self.db.flush()  # Para obtener el ID y cargar relaciones
+            await self.db.flush()  # Para obtener el ID y cargar relaciones
             
             # Recargar la línea con la información del producto
-            reloaded_line = self.db.query(InvoiceLine).options(
-                joinedload(InvoiceLine.product)
-            ).filter(InvoiceLine.id == new_line.id).first()
+            result = await self.db.execute(
+                select(InvoiceLine).options(
+                    joinedload(InvoiceLine.product)
+                ).where(InvoiceLine.id == new_line.id)
+            )
+            reloaded_line = result.scalar_one_or_none()
             
             if not reloaded_line:
                 raise Exception("Failed to reload invoice line")
             
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Line added to invoice {invoice.number}")
             return self._create_line_response_with_product_info(reloaded_line)
 
         except Exception as e:
             logger.error(f"Error adding line to invoice {invoice_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def get_invoice(self, invoice_id: uuid.UUID) -> InvoiceResponse:
+    async def get_invoice(self, invoice_id: uuid.UUID) -> InvoiceResponse:
         """
         Obtener factura por ID
         """
-        invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        invoice = await self.db.get(Invoice, invoice_id)
         if not invoice:
             raise NotFoundError(f"Invoice with id {invoice_id} not found")
         
         return InvoiceResponse.from_orm(invoice)
 
-    def get_invoices(
+    async def get_invoices(
         self,
         skip: int = 0,
         limit: int = 1000,
@@ -688,7 +713,8 @@ class InvoiceService:
         currency_code: Optional[str] = None,
         created_by_id: Optional[uuid.UUID] = None,
         sort_by: Optional[str] = "invoice_date",
-        sort_order: Optional[str] = "desc"
+        sort_order: Optional[str] = "desc",
+        cursor: Optional[str] = None
     ) -> InvoiceListResponse:
         """
         Obtener lista de facturas con filtros avanzados
@@ -711,52 +737,52 @@ class InvoiceService:
             created_by_id: ID del usuario que creó la factura
             sort_by: Campo por el cual ordenar (invoice_date, number, total_amount, etc.)
             sort_order: Orden de clasificación (asc, desc)
+            cursor: Paginación por cursor ("" para la primera página); ignora ``skip``
+                y devuelve un total estimado
         
         Returns:
             InvoiceListResponse con facturas filtradas y metadatos de paginación
         """
-        from sqlalchemy import func
-        
         # Construir query base con join para tercero (para búsqueda por nombre)
-        query = self.db.query(Invoice).join(ThirdParty, Invoice.third_party_id == ThirdParty.id)
+        query = select(Invoice).join(ThirdParty, Invoice.third_party_id == ThirdParty.id)
         
         # Aplicar filtros básicos
         if third_party_id:
-            query = query.filter(Invoice.third_party_id == third_party_id)
+            query = query.where(Invoice.third_party_id == third_party_id)
             
         if status:
-            query = query.filter(Invoice.status == status)
+            query = query.where(Invoice.status == status)
             
         if invoice_type:
-            query = query.filter(Invoice.invoice_type == invoice_type)
+            query = query.where(Invoice.invoice_type == invoice_type)
             
         if currency_code:
-            query = query.filter(Invoice.currency_code == currency_code)
+            query = query.where(Invoice.currency_code == currency_code)
             
         if created_by_id:
-            query = query.filter(Invoice.created_by_id == created_by_id)
+            query = query.where(Invoice.created_by_id == created_by_id)
         
         # Filtros de fecha (más flexibles)
         if date_from:
-            query = query.filter(Invoice.invoice_date >= date_from)
+            query = query.where(Invoice.invoice_date >= date_from)
             
         if date_to:
-            query = query.filter(Invoice.invoice_date <= date_to)
+            query = query.where(Invoice.invoice_date <= date_to)
         
         # Filtros de búsqueda de texto (parcial, case-insensitive)
         if invoice_number:
-            query = query.filter(Invoice.number.ilike(f"%{invoice_number}%"))
+            query = query.where(Invoice.number.ilike(f"%{invoice_number}%"))
             
         if third_party_name:
-            query = query.filter(ThirdParty.name.ilike(f"%{third_party_name}%"))
+            query = query.where(ThirdParty.name.ilike(f"%{third_party_name}%"))
             
         if description:
-            query = query.filter(Invoice.description.ilike(f"%{description}%"))
+            query = query.where(Invoice.description.ilike(f"%{description}%"))
             
         if reference:
             # Buscar en referencia interna o externa
-            query = query.filter(
-                func.or_(
+            query = query.where(
+                or_(
                     Invoice.internal_reference.ilike(f"%{reference}%"),
                     Invoice.external_reference.ilike(f"%{reference}%")
                 )
@@ -764,10 +790,10 @@ class InvoiceService:
         
         # Filtros de monto
         if amount_from is not None:
-            query = query.filter(Invoice.total_amount >= amount_from)
+            query = query.where(Invoice.total_amount >= amount_from)
             
         if amount_to is not None:
-            query = query.filter(Invoice.total_amount <= amount_to)
+            query = query.where(Invoice.total_amount <= amount_to)
           # Aplicar ordenamiento
         valid_sort_fields = {
             "invoice_date": Invoice.invoice_date,
@@ -781,14 +807,32 @@ class InvoiceService:
         sort_field = valid_sort_fields.get(sort_by or "invoice_date", Invoice.invoice_date)
         sort_direction = (sort_order or "desc").lower()
         
+        if cursor is not None:
+            paginator = KeysetPaginator(SortKey(sort_field, sort_direction != "asc"))
+            result = await self.db.execute(paginator.apply(query, cursor, limit))
+            invoices = result.scalars().all()
+            total = await estimate_total(self.db, query)
+            return InvoiceListResponse(
+                items=[InvoiceResponse.from_orm(inv) for inv in invoices],
+                total=total,
+                page=1,
+                size=limit,
+                total_pages=(total + limit - 1) // limit,
+                next_cursor=paginator.next_cursor(invoices, limit),
+                total_is_estimate=True
+            )
+        
         if sort_direction == "asc":
             query = query.order_by(sort_field.asc())
         else:
             query = query.order_by(sort_field.desc())
         
         # Obtener total y datos paginados
-        total = query.count()
-        invoices = query.offset(skip).limit(limit).all()
+        total = await self.db.scalar(
+            select(func.count()).select_from(query.order_by(None).subquery())
+        ) or 0
+        result = await self.db.execute(query.offset(skip).limit(limit))
+        invoices = result.scalars().all()
         
         # Convertir a respuestas apropiadas
         invoice_responses = [InvoiceResponse.from_orm(inv) for inv in invoices]
@@ -801,120 +845,150 @@ class InvoiceService:
             total_pages=(total + limit - 1) // limit
         )
 
-    def calculate_invoice_totals(self, invoice_id: uuid.UUID) -> InvoiceResponse:
+    async def calculate_invoice_totals(self, invoice_id: uuid.UUID) -> InvoiceResponse:
         """
         Recalcular totales de la factura basado en sus líneas
         """
         try:
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
-            lines = self.db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice_id).all()
-            
-            subtotal = Decimal('0')
-            total_discount = Decimal('0')
-            tax_amount = Decimal('0')
-            
-            for line in lines:
-                # Calcular subtotal de línea
-                line_subtotal = line.quantity * line.unit_price
-                subtotal += line_subtotal
-                
-                # Calcular descuento usando discount_percentage (field correcto)
-                if line.discount_percentage:
-                    line_discount = line_subtotal * (line.discount_percentage / 100)
-                    total_discount += line_discount
-                
-                # Usar tax_amount directo de la línea (implementación básica por ahora)
-                # TODO: Implementar cálculo de impuestos automático cuando el módulo esté completo
-                if hasattr(line, 'tax_amount') and line.tax_amount:
-                    tax_amount += line.tax_amount
-            
-            # Calcular totales finales
-            subtotal_after_discount = subtotal - total_discount
-            
-            # Actualizar totales en la factura usando nombres correctos del modelo
-            invoice.subtotal = subtotal_after_discount
-            invoice.discount_amount = total_discount
-            invoice.tax_amount = tax_amount
-            invoice.total_amount = subtotal_after_discount + tax_amount
-            invoice.outstanding_amount = invoice.total_amount - invoice.paid_amount
-            invoice.updated_at = datetime.utcnow()
+            result = await self.db.execute(select(InvoiceLine).where(InvoiceLine.invoice_id == invoice_id))
+            self._apply_line_totals(invoice, result.scalars().all())
             
-            self.db.commit()
+            await self.db.commit()
             
             return InvoiceResponse.from_orm(invoice)
 
         except Exception as e:
             logger.error(f"Error calculating invoice totals for {invoice_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def _generate_invoice_number(self, invoice_type: InvoiceType) -> str:
+    @staticmethod
+    def _apply_line_totals(invoice: Invoice, lines: List[InvoiceLine]) -> None:
+        """Recalcula en memoria los totales de la factura a partir de sus líneas"""
+        subtotal = Decimal('0')
+        total_discount = Decimal('0')
+        tax_amount = Decimal('0')
+        
+        for line in lines:
+            # Calcular subtotal de línea
+            line_subtotal = line.quantity * line.unit_price
+            subtotal += line_subtotal
+            
+            # Calcular descuento usando discount_percentage (field correcto)
+            if line.discount_percentage:
+                line_discount = line_subtotal * (line.discount_percentage / 100)
+                total_discount += line_discount
+            
+            # Usar tax_amount directo de la línea (implementación básica por ahora)
+            # TODO: Implementar cálculo de impuestos automático cuando el módulo esté completo
+            if hasattr(line, 'tax_amount') and line.tax_amount:
+                tax_amount += line.tax_amount
+        
+        # Calcular totales finales
+        subtotal_after_discount = subtotal - total_discount
+        
+        # Actualizar totales en la factura usando nombres correctos del modelo
+        invoice.subtotal = subtotal_after_discount
+        invoice.discount_amount = total_discount
+        invoice.tax_amount = tax_amount
+        invoice.total_amount = subtotal_after_discount + tax_amount
+        invoice.outstanding_amount = invoice.total_amount - invoice.paid_amount
+        invoice.updated_at = datetime.utcnow()
+
+    async def _generate_invoice_number(self, invoice_type: InvoiceType) -> str:
         """
         Generar número de factura secuencial
         """
         prefix = "INV" if invoice_type == InvoiceType.CUSTOMER_INVOICE else "BILL"
-        return generate_code(self.db, Invoice, "number", prefix)
+        return await generate_code_async(self.db, Invoice, "number", prefix)
 
-    def _validate_invoice_for_posting(self, invoice: Invoice) -> List[str]:
+    async def _validate_invoice_for_posting(self, invoice: Invoice) -> List[str]:
         """
         Validar que la factura esté completa para contabilizar
         """
+        await self.account_determination.preload_products(line.product_id for line in invoice.lines)
+        return self._collect_posting_errors(invoice, await self.account_determination.get_rules())
+
+    def _collect_posting_errors(self, invoice: Invoice, rules: AccountRuleTable) -> List[str]:
+        """
+        Validación en memoria para contabilizar: líneas presentes y cuentas
+        determinables (productos de las líneas ya precargados)
+        """
         errors = []
         
-        # Validar que tiene líneas
-        lines_count = self.db.query(InvoiceLine).filter(
-            InvoiceLine.invoice_id == invoice.id
-        ).count()
-        if lines_count == 0:
+        # Validar que tiene líneas (cargadas junto con la factura)
+        lines = invoice.lines
+        if not lines:
             errors.append("Invoice must have at least one line")
         
         # Validar que todas las líneas tienen cuentas contables determinables
-        lines = self.db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id).all()
         for line in lines:
             try:
-                self.account_determination.determine_line_account(line)
+                self.account_determination.resolve_line_account(line, invoice.invoice_type, rules)
             except Exception as e:
                 errors.append(f"Line {line.sequence}: Cannot determine account - {str(e)}")
         
         # Validar cuenta del tercero
         try:
-            self.account_determination.determine_third_party_account(invoice)
+            self.account_determination.resolve_third_party_account(invoice, rules)
         except Exception as e:
             errors.append(f"Cannot determine third party account - {str(e)}")
         
         return errors
 
-    def _create_journal_entry_for_invoice(self, invoice: Invoice, created_by_id: uuid.UUID) -> JournalEntry:
+    async def _create_journal_entry_for_invoice(self, invoice: Invoice, created_by_id: uuid.UUID) -> JournalEntry:
         """
         Crear asiento contable para la factura siguiendo el patrón Odoo
         """
-        # Determinar tipo de asiento según el origen
-        entry_type = JournalEntryType.AUTOMATIC
-        
-        # Determinar origen de transacción
-        if invoice.invoice_type == InvoiceType.CUSTOMER_INVOICE:
-            transaction_origin = TransactionOrigin.SALE
-        else:
-            transaction_origin = TransactionOrigin.PURCHASE
-        
         # Generar número para el journal entry usando el diario de la factura
         if invoice.journal_id:
             # Usar el mismo diario que la factura
-            journal = self.db.query(Journal).filter(Journal.id == invoice.journal_id).first()
+            journal = await self.db.get(Journal, invoice.journal_id)
             if journal:
                 entry_number = self._generate_journal_entry_number_with_journal(journal)
             else:
-                entry_number = self._generate_journal_entry_number()
+                entry_number = await self._generate_journal_entry_number()
         else:
-            entry_number = self._generate_journal_entry_number()
+            entry_number = await self._generate_journal_entry_number()
         
         # Crear asiento principal
-        journal_entry = JournalEntry(
+        journal_entry = self._new_invoice_journal_entry(invoice, entry_number, created_by_id)
+        
+        self.db.add(journal_entry)
+        await self.db.flush()
+        
+        # Crear líneas del asiento
+        journal_lines = await self._create_journal_entry_lines(journal_entry, invoice)
+        
+        # CRÍTICO: Calcular totales del journal entry con las líneas creadas
+        # (sin recorrer journal_entry.lines, que no está cargada)
+        journal_entry.total_debit = sum((line.debit_amount or Decimal('0') for line in journal_lines), Decimal('0'))
+        journal_entry.total_credit = sum((line.credit_amount or Decimal('0') for line in journal_lines), Decimal('0'))
+        
+        # CRÍTICO: Actualizar saldos de las cuentas ya que se creó con status POSTED
+        await self._apply_account_balances(journal_lines)
+        
+        # Hacer flush para asegurar que se guarden los cambios en las cuentas
+        await self.db.flush()
+        await self.cost_center_actuals.apply_entries([journal_entry.id])
+        
+        return journal_entry
+
+    def _new_invoice_journal_entry(self, invoice: Invoice, entry_number: str, created_by_id: uuid.UUID) -> JournalEntry:
+        """Asiento contabilizado (sin líneas ni totales) para una factura; no se agrega a la sesión"""
+        # Determinar origen de transacción
+        if invoice.invoice_type == InvoiceType.CUSTOMER_INVOICE:
+            transaction_origin = TransactionOrigin.SALE
+        else:
+            transaction_origin = TransactionOrigin.PURCHASE
+        
+        return JournalEntry(
             number=entry_number,
-            entry_type=entry_type,
+            entry_type=JournalEntryType.AUTOMATIC,
             status=JournalEntryStatus.POSTED,
             entry_date=datetime.combine(invoice.invoice_date, datetime.min.time()).replace(tzinfo=timezone.utc),
             description=f"Invoice {invoice.number} - {invoice.third_party.name if invoice.third_party else 'Unknown'}",
@@ -923,57 +997,89 @@ class InvoiceService:
             journal_id=invoice.journal_id,  # Usar el mismo diario que la factura
             created_by_id=created_by_id
         )
+
+    async def _apply_account_balances(self, journal_lines: List[JournalEntryLine], sign: int = 1) -> None:
+        """
+        Aplica (sign=1) o revierte (sign=-1) en los saldos de las cuentas los
+        importes de las líneas indicadas, cargando todas las cuentas en una consulta
+        """
+        account_ids = {line.account_id for line in journal_lines if line.account_id}
+        if not account_ids:
+            return
         
-        self.db.add(journal_entry)
-        self.db.flush()
-        
-        # Crear líneas del asiento
-        self._create_journal_entry_lines(journal_entry, invoice)
+        result = await self.db.execute(select(Account).where(Account.id.in_(account_ids)))
+        accounts = {account.id: account for account in result.scalars().all()}
         
-        # CRÍTICO: Calcular totales del journal entry después de crear las líneas
-        journal_entry.calculate_totals()
+        for line in journal_lines:
+            account = accounts.get(line.account_id)
+            if not account:
+                continue
+            debit = (line.debit_amount or Decimal('0')) * sign
+            credit = (line.credit_amount or Decimal('0')) * sign
+            account.balance += debit - credit
+            account.debit_balance += debit
+            account.credit_balance += credit
+            account.updated_at = datetime.utcnow()
+            
+            # Log para debugging
+            logger.debug(f"Updated account {account.code} - {account.name}: "
+                         f"D: {debit:+}, C: {credit:+}, Balance: {account.balance}")
+
+    async def _revert_entry_balances(self, journal_entry_id: uuid.UUID) -> None:
+        """Revierte en los saldos de las cuentas los importes de un asiento contabilizado"""
+        result = await self.db.execute(
+            select(JournalEntryLine).where(JournalEntryLine.journal_entry_id == journal_entry_id)
+        )
+        await self._apply_account_balances(result.scalars().all(), sign=-1)
+
+    async def _create_journal_entry_lines(self, journal_entry: JournalEntry, invoice: Invoice) -> List[JournalEntryLine]:
+        """
+        Crear líneas del asiento contable para la factura siguiendo lógica contable estándar
         
-        # CRÍTICO: Actualizar saldos de las cuentas ya que se creó con status POSTED
-        # Cargar las líneas con sus cuentas para actualizar saldos
-        journal_lines = self.db.query(JournalEntryLine).options(
-            joinedload(JournalEntryLine.account)
-        ).filter(
-            JournalEntryLine.journal_entry_id == journal_entry.id
-        ).all()
+        La factura debe tener ``lines`` cargadas. Retorna las líneas creadas.
+        """
+        rules = await self.account_determination.get_rules()
+        await self.account_determination.preload_products(line.product_id for line in invoice.lines)
+        nfe_taxes = await self._load_nfe_tax_totals([invoice.id])
+        payment_terms = await self.payment_terms_processor.load_payment_terms([invoice.payment_terms_id])
         
-        for line in journal_lines:
-            if line.account:
-                # Actualizar saldos de la cuenta
-                line.account.balance += (line.debit_amount or 0) - (line.credit_amount or 0)
-                line.account.debit_balance += (line.debit_amount or 0)
-                line.account.credit_balance += (line.credit_amount or 0)
-                line.account.updated_at = datetime.utcnow()
-                self.db.add(line.account)
-                
-                # Log para debugging
-                logger.info(f"Updated account {line.account.code} - {line.account.name}: "
-                          f"D: +{line.debit_amount or 0}, C: +{line.credit_amount or 0}, "
-                          f"Balance: {line.account.balance}")
+        created_lines = self._build_journal_entry_lines(
+            journal_entry.id, invoice, rules,
+            nfe_taxes.get(invoice.id),
+            payment_terms.get(invoice.payment_terms_id)
+        )
+        self.db.add_all(created_lines)
         
-        # Hacer flush para asegurar que se guarden los cambios en las cuentas
-        self.db.flush()
+        # Hacer flush para asegurar que todas las líneas se creen antes de calcular totales
+        await self.db.flush()
         
-        return journal_entry
+        return created_lines
 
-    def _create_journal_entry_lines(self, journal_entry: JournalEntry, invoice: Invoice):
+    def _build_journal_entry_lines(
+        self,
+        journal_entry_id: uuid.UUID,
+        invoice: Invoice,
+        rules: AccountRuleTable,
+        nfe_taxes: Optional[Dict[str, Decimal]],
+        payment_terms: Optional[PaymentTerms]
+    ) -> List[JournalEntryLine]:
         """
-        Crear líneas del asiento contable para la factura siguiendo lógica contable estándar
+        Construye en memoria las líneas del asiento de una factura: ingresos/gastos
+        por línea, impuestos y vencimientos del tercero.
+        
+        Todo lo que consulta debe venir precargado: productos de las líneas
+        (``preload_products``), totales de la NFe y condiciones de pago con sus
+        cronogramas. Las líneas no se agregan a la sesión.
         """
-        lines = self.db.query(InvoiceLine).filter(InvoiceLine.invoice_id == invoice.id).all()
         line_counter = 1
+        created_lines: List[JournalEntryLine] = []
         
-        # Log para debugging
-        logger.info(f"Creating journal entry lines for invoice {invoice.number} - Type: {invoice.invoice_type}")
+        logger.debug(f"Creating journal entry lines for invoice {invoice.number} - Type: {invoice.invoice_type}")
         
         # 1. Líneas por cada línea de factura (ingresos/gastos)
-        for line in lines:
+        for line in invoice.lines:
             try:
-                account = self.account_determination.determine_line_account(line)
+                account = self.account_determination.resolve_line_account(line, invoice.invoice_type, rules)
                 line_amount = line.quantity * line.unit_price
                 
                 # Aplicar descuentos
@@ -989,55 +1095,74 @@ class InvoiceService:
                     debit = line_amount
                     credit = Decimal('0')
                 
-                # Log para debugging
-                logger.info(f"Line {line_counter}: Account {account.code} - Amount: {line_amount} - D: {debit}, C: {credit}")
+                logger.debug(f"Line {line_counter}: Account {account.code} - Amount: {line_amount} - D: {debit}, C: {credit}")
                 
-                journal_line = JournalEntryLine(
-                    journal_entry_id=journal_entry.id,
+                created_lines.append(JournalEntryLine(
+                    journal_entry_id=journal_entry_id,
                     account_id=account.id,
                     description=line.description[:255],  # Limitar longitud
                     debit_amount=debit,
                     credit_amount=credit,
                     cost_center_id=getattr(line, 'cost_center_id', None),
                     line_number=line_counter
-                )
-                self.db.add(journal_line)
+                ))
                 line_counter += 1
                 
             except Exception as e:
                 logger.error(f"Error creating journal line for invoice line {line.id}: {str(e)}")
                 raise  # Re-lanzar la excepción para manejarla arriba
         
-        # 2. Línea de impuestos (si aplica)
+        # 2. Líneas de impuestos (si aplica)
         if invoice.tax_amount and invoice.tax_amount > 0:
-            self._create_tax_journal_line(journal_entry, invoice, line_counter)
-            line_counter += 1
+            tax_lines = self._build_tax_journal_lines(journal_entry_id, invoice, line_counter, nfe_taxes, rules)
+            created_lines.extend(tax_lines)
+            line_counter += len(tax_lines)
         
         # 3. Líneas del tercero (cuenta por cobrar/pagar) usando payment terms
-        third_party_account = self.account_determination.determine_third_party_account(invoice)
+        third_party_account = self.account_determination.resolve_third_party_account(invoice, rules)
         
-        # Log para debugging
-        logger.info(f"Third party account: {third_party_account.code} - {third_party_account.name}")
+        logger.debug(f"Third party account: {third_party_account.code} - {third_party_account.name}")
         
-        due_lines, _ = self.payment_terms_processor.process_invoice_payment_terms(
-            invoice, third_party_account, line_counter
+        due_lines, _ = self.payment_terms_processor.build_due_lines(
+            invoice, payment_terms, third_party_account, line_counter
         )
         
         # Agregar las líneas de vencimiento al asiento
         for due_line in due_lines:
-            due_line.journal_entry_id = journal_entry.id
-            self.db.add(due_line)
-            
-            # Log para debugging
-            logger.info(f"Due line: Account {third_party_account.code} - D: {due_line.debit_amount}, C: {due_line.credit_amount}")
+            due_line.journal_entry_id = journal_entry_id
+            created_lines.append(due_line)
         
-        # Hacer flush para asegurar que todas las líneas se creen antes de calcular totales
-        self.db.flush()
+        return created_lines
 
-    def _create_tax_journal_line(self, journal_entry: JournalEntry, invoice: Invoice, line_number: int):
+    async def _load_nfe_tax_totals(self, invoice_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Dict[str, Decimal]]:
+        """Totales de impuestos de las NFe vinculadas a las facturas (una consulta)"""
+        result = await self.db.execute(
+            select(
+                NFe.invoice_id,
+                NFe.valor_total_icms,
+                NFe.valor_total_ipi,
+                NFe.valor_total_pis,
+                NFe.valor_total_cofins
+            ).where(NFe.invoice_id.in_(invoice_ids))
+        )
+        totals: Dict[uuid.UUID, Dict[str, Decimal]] = {}
+        for invoice_id, icms, ipi, pis, cofins in result.all():
+            # Una NFe por factura; si hubiera varias se usa la primera
+            totals.setdefault(invoice_id, {'ICMS': icms, 'IPI': ipi, 'PIS': pis, 'COFINS': cofins})
+        return totals
+
+    def _build_tax_journal_lines(
+        self,
+        journal_entry_id: uuid.UUID,
+        invoice: Invoice,
+        line_number: int,
+        nfe_taxes: Optional[Dict[str, Decimal]],
+        rules: AccountRuleTable
+    ) -> List[JournalEntryLine]:
         """
-        Crear líneas de asiento para impuestos
+        Crear líneas de asiento para impuestos (totales de la NFe ya precargados)
         """
+        tax_lines: List[JournalEntryLine] = []
         try:
             # Obtener detalles de impuestos de la factura
             tax_details = {
@@ -1047,14 +1172,9 @@ class InvoiceService:
                 'COFINS': Decimal('0')
             }
             
-            # Obtener la NFe relacionada
-            nfe = self.db.query(NFe).filter(NFe.invoice_id == invoice.id).first()
-            if nfe:
+            if nfe_taxes:
                 # Usar los totales de la NFe
-                tax_details['ICMS'] = nfe.valor_total_icms
-                tax_details['IPI'] = nfe.valor_total_ipi
-                tax_details['PIS'] = nfe.valor_total_pis
-                tax_details['COFINS'] = nfe.valor_total_cofins
+                tax_details.update(nfe_taxes)
             else:
                 # Si no hay NFe, usar el total de impuestos de la factura
                 if invoice.tax_amount:
@@ -1067,11 +1187,12 @@ class InvoiceService:
             for tax_type, amount in tax_details.items():
                 if amount > 0:
                     # Intentar obtener cuenta específica por tipo de impuesto
-                    account = self.account_determination.get_tax_account_by_type(tax_type, invoice.invoice_type)
+                    specific_account = rules.tax_account_by_type(tax_type, invoice.invoice_type)
+                    account = specific_account
                     
                     # Si no se encuentra cuenta específica, usar cuenta genérica
                     if not account:
-                        account = self.account_determination._get_default_tax_account_for_invoice_type(invoice.invoice_type)
+                        account = rules.generic_tax_account(invoice.invoice_type)
                         logger.warning(f"No se encontró cuenta específica para {tax_type}, usando cuenta genérica: {account.code if account else 'None'}")
                     
                     if not account:
@@ -1090,27 +1211,26 @@ class InvoiceService:
                         credit = Decimal('0')
                     
                     # Log para debugging - mostrar cuenta específica o genérica
-                    account_source = "específica" if self.account_determination.get_tax_account_by_type(tax_type, invoice.invoice_type) else "genérica"
-                    logger.info(f"Tax line: {tax_type} - Account {account.code} ({account_source}) - Amount: {amount} - D: {debit}, C: {credit}")
+                    account_source = "específica" if specific_account else "genérica"
+                    logger.debug(f"Tax line: {tax_type} - Account {account.code} ({account_source}) - Amount: {amount} - D: {debit}, C: {credit}")
                     
-                    tax_line = JournalEntryLine(
-                        journal_entry_id=journal_entry.id,
+                    tax_lines.append(JournalEntryLine(
+                        journal_entry_id=journal_entry_id,
                         account_id=account.id,
                         description=f"{tax_type} - Factura {invoice.number}",
                         debit_amount=debit,
                         credit_amount=credit,
                         line_number=line_number
-                    )
-                    self.db.add(tax_line)
+                    ))
                     line_number += 1
             
         except Exception as e:
             logger.warning(f"Error creating tax journal lines for invoice {invoice.id}: {str(e)}")
             raise
         
-        return line_number
+        return tax_lines
 
-    def _create_reversal_journal_entry(self, invoice: Invoice, created_by_id: uuid.UUID, reason: Optional[str] = None) -> JournalEntry:
+    async def _create_reversal_journal_entry(self, invoice: Invoice, created_by_id: uuid.UUID, reason: Optional[str] = None) -> JournalEntry:
         """
         Crear asiento de reversión explícito para cancelación de factura
         
@@ -1136,9 +1256,12 @@ class InvoiceService:
             logger.info(f"📝 [REVERSAL] Creating reversal journal entry for invoice {invoice.number}")
             
             # 1. Validar y obtener el asiento original
-            original_entry = self.db.query(JournalEntry).options(
-                joinedload(JournalEntry.lines)
-            ).filter(JournalEntry.id == invoice.journal_entry_id).first()
+            result = await self.db.execute(
+                select(JournalEntry).options(
+                    selectinload(JournalEntry.lines)
+                ).where(JournalEntry.id == invoice.journal_entry_id)
+            )
+            original_entry = result.scalar_one_or_none()
             
             if not original_entry:
                 raise ValidationError(f"Original journal entry not found for invoice {invoice.number}")
@@ -1167,7 +1290,7 @@ class InvoiceService:
             )
             
             self.db.add(reversal_entry)
-            self.db.flush()
+            await self.db.flush()
             
             logger.info(f"✅ [REVERSAL] Reversal entry {reversal_number} created successfully")
             
@@ -1191,26 +1314,17 @@ class InvoiceService:
                            f"Original D:{orig_line.debit_amount}/C:{orig_line.credit_amount} → "
                            f"Reversal D:{reversal_line.debit_amount}/C:{reversal_line.credit_amount}")
             
-            self.db.flush()
+            await self.db.flush()
             
             # 5. Calcular totales del asiento de reversión
-            reversal_entry.calculate_totals()
+            reversal_entry.total_debit = sum((line.debit_amount for line in reversal_lines), Decimal('0'))
+            reversal_entry.total_credit = sum((line.credit_amount for line in reversal_lines), Decimal('0'))
             logger.info(f"📊 [REVERSAL] Totals calculated - Debit: {reversal_entry.total_debit}, Credit: {reversal_entry.total_credit}")
             
-            # 6. Actualizar saldos de las cuentas
-            updated_accounts = set()
-            for line in reversal_lines:
-                if line.account_id not in updated_accounts:
-                    account = self.db.query(Account).filter(Account.id == line.account_id).first()
-                    if account:
-                        # Actualizar saldos usando los montos de la reversión
-                        account.balance += (line.debit_amount or Decimal('0')) - (line.credit_amount or Decimal('0'))
-                        account.debit_balance += (line.debit_amount or Decimal('0'))
-                        account.credit_balance += (line.credit_amount or Decimal('0'))
-                        account.updated_at = datetime.utcnow()
-                        
-                        updated_accounts.add(line.account_id)
-                        logger.debug(f"💰 [REVERSAL] Updated account {account.code} balance: {account.balance}")
+            # 6. Actualizar saldos de las cuentas usando los montos de la reversión
+            await self._apply_account_balances(reversal_lines)
+            await self.cost_center_actuals.apply_entries([reversal_entry.id])
+            updated_accounts = {line.account_id for line in reversal_lines}
             
             # 7. Marcar el asiento original como revertido (para referencia)
             original_entry.notes = (original_entry.notes or "") + f"\n[REVERSED] by {reversal_number} on {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')}"
@@ -1238,11 +1352,11 @@ class InvoiceService:
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         return f"REV-{original_number}-{timestamp}"
     
-    def _generate_journal_entry_number(self) -> str:
+    async def _generate_journal_entry_number(self) -> str:
         """
         Generar número secuencial para asientos contables (método legacy)
         """
-        return generate_code(self.db, JournalEntry, "number", "JE")
+        return await generate_code_async(self.db, JournalEntry, "number", "JE")
     
     def _generate_journal_entry_number_with_journal(self, journal: Journal) -> str:
         """
@@ -1313,19 +1427,22 @@ class InvoiceService:
             
         return InvoiceLineResponse(**line_data)
     
-    def get_invoice_with_lines(self, invoice_id: uuid.UUID) -> InvoiceWithLines:
+    async def get_invoice_with_lines(self, invoice_id: uuid.UUID) -> InvoiceWithLines:
         """
         Obtener factura con todas sus líneas
         """
         # Obtener la factura base
-        invoice_response = self.get_invoice(invoice_id)
+        invoice_response = await self.get_invoice(invoice_id)
         
         # Obtener las líneas ordenadas por secuencia con información del producto
-        lines = self.db.query(InvoiceLine).options(
-            joinedload(InvoiceLine.product)
-        ).filter(
-            InvoiceLine.invoice_id == invoice_id
-        ).order_by(InvoiceLine.sequence).all()
+        result = await self.db.execute(
+            select(InvoiceLine).options(
+                joinedload(InvoiceLine.product)
+            ).where(
+                InvoiceLine.invoice_id == invoice_id
+            ).order_by(InvoiceLine.sequence)
+        )
+        lines = result.scalars().all()
         
         lines_response = [self._create_line_response_with_product_info(line) for line in lines]
         
@@ -1335,13 +1452,13 @@ class InvoiceService:
         
         return InvoiceWithLines(**invoice_dict)
 
-    def update_invoice(self, invoice_id: uuid.UUID, invoice_data: InvoiceUpdate) -> InvoiceResponse:
+    async def update_invoice(self, invoice_id: uuid.UUID, invoice_data: InvoiceUpdate) -> InvoiceResponse:
         """
         Actualizar factura (solo en estado DRAFT)
         """
         try:
             # Obtener y validar la factura
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
@@ -1365,17 +1482,17 @@ class InvoiceService:
             
             invoice.updated_at = datetime.utcnow()
             
-            self.db.commit()
+            await self.db.commit()
             
             logger.info(f"Invoice {invoice.number} updated")
             return InvoiceResponse.from_orm(invoice)
 
         except Exception as e:
             logger.error(f"Error updating invoice {invoice_id}: {str(e)}")
-            self.db.rollback()
+            await self.db.rollback()
             raise
 
-    def get_payment_schedule_preview(
+    async def get_payment_schedule_preview(
         self, 
         invoice_id: uuid.UUID
     ) -> List[Dict[str, Any]]:
@@ -1383,7 +1500,7 @@ class InvoiceService:
         Obtiene una vista previa de cómo se dividirán los pagos de una factura
         según sus condiciones de pago
         """
-        invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+        invoice = await self.db.get(Invoice, invoice_id)
         if not invoice:
             raise NotFoundError(f"Invoice with id {invoice_id} not found")
         
@@ -1396,23 +1513,23 @@ class InvoiceService:
                 'due_date': invoice.due_date or invoice.invoice_date,
                 'description': f'Full payment - Invoice {invoice.number}'            }]
         
-        return self.payment_terms_processor.get_payment_schedule_preview(
+        return await self.payment_terms_processor.get_payment_schedule_preview(
             invoice.total_amount or Decimal('0'),
             invoice.payment_terms_id,
             invoice.invoice_date
         )
 
-    def validate_payment_terms(self, payment_terms_id: uuid.UUID) -> Tuple[bool, List[str]]:
+    async def validate_payment_terms(self, payment_terms_id: uuid.UUID) -> Tuple[bool, List[str]]:
         """
         Valida las condiciones de pago para uso en facturas
         """
-        return self.payment_terms_processor.validate_payment_terms_for_invoice(payment_terms_id)
+        return await self.payment_terms_processor.validate_payment_terms_for_invoice(payment_terms_id)
 
     # ================================
     # BULK OPERATIONS
     # ================================
 
-    def bulk_post_invoices(
+    async def bulk_post_invoices(
         self, 
         invoice_ids: List[uuid.UUID], 
         posted_by_id: uuid.UUID,
@@ -1426,9 +1543,11 @@ class InvoiceService:
         
         Características:
         - Validación previa de estados
-        - Procesamiento por lotes para performance
-        - Control de errores individual
-        - Rollback opcional en caso de error
+        - Procesamiento por bloques de ``BULK_POST_CHUNK_SIZE`` facturas: todo lo que
+          consulta la contabilización se precarga por bloque, los asientos y sus
+          líneas se construyen en memoria y se insertan con INSERT masivos
+        - Control de errores individual (las facturas con error no se contabilizan)
+        - ``stop_on_error`` detiene el lote en la primera factura con error
         """
         import time
         start_time = time.time()
@@ -1438,71 +1557,24 @@ class InvoiceService:
         failed_items = []
         skipped_items = []
         
+        # Respetar el orden solicitado sin procesar dos veces la misma factura
+        ordered_ids = list(dict.fromkeys(invoice_ids))
+        
         try:
-            # 1. Validación masiva previa
-            invoices = self.db.query(Invoice).filter(
-                Invoice.id.in_(invoice_ids)
-            ).all()
-            
-            invoices_by_id = {inv.id: inv for inv in invoices}
-            
-            # Identificar IDs no encontrados
-            found_ids = set(invoices_by_id.keys())
-            not_found_ids = set(invoice_ids) - found_ids
-            
-            for invoice_id in not_found_ids:
-                failed_items.append({
-                    "id": str(invoice_id),
-                    "error": "Invoice not found"
-                })
-            
-            # 2. Validar estados
-            valid_invoices = []
-            for invoice in invoices:
-                if invoice.status != InvoiceStatus.DRAFT:
-                    skipped_items.append({
-                        "id": str(invoice.id),
-                        "reason": f"Invoice status is {invoice.status}, expected DRAFT",
-                        "current_status": invoice.status
-                    })
-                elif not invoice.total_amount or invoice.total_amount <= 0:
-                    skipped_items.append({
-                        "id": str(invoice.id),
-                        "reason": "Invoice total must be greater than 0",
-                        "total_amount": float(invoice.total_amount or 0)
-                    })
-                else:
-                    valid_invoices.append(invoice)
-            
-            # 3. Procesar facturas válidas
-            for invoice in valid_invoices:
-                try:
-                    # Usar el método individual existente
-                    self.post_invoice(invoice.id, posted_by_id)
-                    successful_ids.append(invoice.id)
-                    
-                    # Agregar notas adicionales si se proporcionan
-                    if notes:
-                        invoice.notes = (invoice.notes or "") + f"\n[BULK POST] {notes}"
-                        
-                except Exception as e:
-                    error_msg = str(e)
-                    failed_items.append({
-                        "id": str(invoice.id),
-                        "error": error_msg,
-                        "invoice_number": invoice.number
-                    })
-                    
-                    if stop_on_error:
-                        logger.error(f"Bulk post stopped at invoice {invoice.id}: {error_msg}")
-                        break
-                    else:
-                        logger.warning(f"Failed to post invoice {invoice.id}: {error_msg}")
-                        continue
+            for start in range(0, len(ordered_ids), BULK_POST_CHUNK_SIZE):
+                stopped = await self._bulk_post_chunk(
+                    ordered_ids[start:start + BULK_POST_CHUNK_SIZE],
+                    posted_by_id,
+                    notes,
+                    stop_on_error,
+                    successful_ids,
+                    failed_items,
+                    skipped_items
+                )
+                if stopped:
+                    break
             
-            # 4. Commit si hay éxitos
             if successful_ids:
-                self.db.commit()
                 logger.info(f"Bulk post completed: {len(successful_ids)} successful, {len(failed_items)} failed, {len(skipped_items)} skipped")
             
             execution_time = time.time() - start_time
@@ -1519,11 +1591,179 @@ class InvoiceService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Bulk post operation failed: {str(e)}")
             raise
 
-    def bulk_cancel_invoices(
+    async def _bulk_post_chunk(
+        self,
+        chunk_ids: List[uuid.UUID],
+        posted_by_id: uuid.UUID,
+        notes: Optional[str],
+        stop_on_error: bool,
+        successful_ids: List[uuid.UUID],
+        failed_items: List[Dict[str, Any]],
+        skipped_items: List[Dict[str, Any]]
+    ) -> bool:
+        """
+        Contabiliza un bloque de facturas en una transacción y acumula los
+        resultados en las listas recibidas. Retorna True si el lote debe detenerse.
+        """
+        # 1. Facturas del bloque con tercero y líneas
+        result = await self.db.execute(
+            select(Invoice).options(
+                joinedload(Invoice.third_party),
+                selectinload(Invoice.lines)
+            ).where(Invoice.id.in_(chunk_ids))
+        )
+        invoices_by_id = {inv.id: inv for inv in result.scalars().all()}
+        
+        # 2. Validar existencia y estados; el total se valida ya recalculado desde las líneas
+        candidates: List[Invoice] = []
+        for invoice_id in chunk_ids:
+            invoice = invoices_by_id.get(invoice_id)
+            if invoice is None:
+                failed_items.append({
+                    "id": str(invoice_id),
+                    "error": "Invoice not found"
+                })
+                continue
+            if invoice.status != InvoiceStatus.DRAFT:
+                skipped_items.append({
+                    "id": str(invoice.id),
+                    "reason": f"Invoice status is {invoice.status}, expected DRAFT",
+                    "current_status": invoice.status
+                })
+                continue
+            
+            self._apply_line_totals(invoice, invoice.lines)
+            if not invoice.total_amount or invoice.total_amount <= 0:
+                skipped_items.append({
+                    "id": str(invoice.id),
+                    "reason": "Invoice total must be greater than 0",
+                    "total_amount": float(invoice.total_amount or 0)
+                })
+            else:
+                candidates.append(invoice)
+        
+        if not candidates:
+            return False
+        
+        # 3. Precargar todo lo que consulta la contabilización (una consulta por tipo)
+        rules = await self.account_determination.get_rules()
+        await self.account_determination.preload_products(
+            line.product_id for invoice in candidates for line in invoice.lines
+        )
+        nfe_taxes = await self._load_nfe_tax_totals([invoice.id for invoice in candidates])
+        payment_terms = await self.payment_terms_processor.load_payment_terms(
+            invoice.payment_terms_id for invoice in candidates
+        )
+        
+        # 4. Construir asientos en memoria; las facturas con error quedan fuera
+        stopped = False
+        prepared: List[Tuple[Invoice, uuid.UUID, List[JournalEntryLine]]] = []
+        for invoice in candidates:
+            try:
+                validation_errors = self._collect_posting_errors(invoice, rules)
+                if validation_errors:
+                    raise BusinessRuleError(f"Validation errors: {'; '.join(validation_errors)}")
+                
+                entry_id = uuid.uuid4()
+                journal_lines = self._build_journal_entry_lines(
+                    entry_id, invoice, rules,
+                    nfe_taxes.get(invoice.id),
+                    payment_terms.get(invoice.payment_terms_id)
+                )
+                prepared.append((invoice, entry_id, journal_lines))
+                
+            except Exception as e:
+                failed_items.append({
+                    "id": str(invoice.id),
+                    "error": str(e),
+                    "invoice_number": invoice.number
+                })
+                if stop_on_error:
+                    logger.error(f"Bulk post stopped at invoice {invoice.id}: {str(e)}")
+                    stopped = True
+                    break
+                logger.warning(f"Failed to post invoice {invoice.id}: {str(e)}")
+        
+        if not prepared:
+            await self.db.commit()  # Persistir los totales recalculados
+            return stopped
+        
+        # Capturar identificadores antes de escribir: si el bloque falla, el rollback
+        # expira las instancias cargadas y no se pueden recargar en diferido
+        prepared_refs = [(invoice.id, invoice.number) for invoice, _, _ in prepared]
+        
+        try:
+            # 5. Asignar números de asiento en bloque: secuencia de cada diario
+            # (bloqueado hasta el commit) o un rango JE consecutivo
+            journal_ids = {invoice.journal_id for invoice, _, _ in prepared if invoice.journal_id}
+            journals: Dict[uuid.UUID, Journal] = {}
+            if journal_ids:
+                journal_result = await self.db.execute(
+                    select(Journal).where(Journal.id.in_(journal_ids)).with_for_update()
+                )
+                journals = {journal.id: journal for journal in journal_result.scalars().all()}
+            fallback_numbers = iter(await generate_code_block_async(
+                self.db, JournalEntry, "number",
+                sum(1 for invoice, _, _ in prepared if invoice.journal_id not in journals),
+                "JE"
+            ))
+            
+            entry_rows: List[Dict[str, Any]] = []
+            line_rows: List[Dict[str, Any]] = []
+            all_lines: List[JournalEntryLine] = []
+            posted_at = datetime.utcnow()
+            for invoice, entry_id, journal_lines in prepared:
+                journal = journals.get(invoice.journal_id)
+                entry_number = (
+                    self._generate_journal_entry_number_with_journal(journal) if journal
+                    else next(fallback_numbers)
+                )
+                journal_entry = self._new_invoice_journal_entry(invoice, entry_number, posted_by_id)
+                journal_entry.id = entry_id
+                journal_entry.total_debit = sum((line.debit_amount or Decimal('0') for line in journal_lines), Decimal('0'))
+                journal_entry.total_credit = sum((line.credit_amount or Decimal('0') for line in journal_lines), Decimal('0'))
+                entry_rows.append(_insert_row(journal_entry))
+                line_rows.extend(_insert_row(line) for line in journal_lines)
+                all_lines.extend(journal_lines)
+                
+                invoice.status = InvoiceStatus.POSTED
+                invoice.posted_by_id = posted_by_id
+                invoice.posted_at = posted_at
+                invoice.journal_entry_id = entry_id
+                invoice.updated_at = posted_at
+                if notes:
+                    invoice.notes = (invoice.notes or "") + f"\n[BULK POST] {notes}"
+            
+            # 6. Inserción masiva de asientos y líneas, saldos de cuentas y facturas
+            await self.db.execute(insert(JournalEntry), entry_rows)
+            await self.db.execute(insert(JournalEntryLine), line_rows)
+            await self._apply_account_balances(all_lines)
+            await self.cost_center_actuals.apply_entries(row["id"] for row in entry_rows)
+            await self.open_items.sync(invoice_ids=[invoice.id for invoice, _, _ in prepared])
+            await self.db.commit()
+            
+        except Exception as e:
+            await self.db.rollback()
+            for invoice_id, invoice_number in prepared_refs:
+                failed_items.append({
+                    "id": str(invoice_id),
+                    "error": str(e),
+                    "invoice_number": invoice_number
+                })
+            logger.error(f"Failed to post block of {len(prepared_refs)} invoices: {str(e)}")
+            return stopped or stop_on_error
+        
+        successful_ids.extend(invoice_id for invoice_id, _ in prepared_refs)
+        
+        # Liberar el mapa de identidad entre bloques (lotes de miles de facturas)
+        self.db.expunge_all()
+        return stopped
+
+    async def bulk_cancel_invoices(
         self, 
         invoice_ids: List[uuid.UUID], 
         cancelled_by_id: uuid.UUID,
@@ -1543,9 +1783,8 @@ class InvoiceService:
         
         try:
             # 1. Validación masiva previa
-            invoices = self.db.query(Invoice).filter(
-                Invoice.id.in_(invoice_ids)
-            ).all()
+            result = await self.db.execute(select(Invoice).where(Invoice.id.in_(invoice_ids)))
+            invoices = result.scalars().all()
             
             invoices_by_id = {inv.id: inv for inv in invoices}
             
@@ -1577,30 +1816,43 @@ class InvoiceService:
                 else:
                     valid_invoices.append(invoice)
             
-            # 3. Procesar facturas válidas
-            for invoice in valid_invoices:
+            # 3. Precargar las cuentas de los productos de todo el lote (una consulta);
+            # la determinación de cuentas de cada línea se resuelve luego en memoria
+            if valid_invoices:
+                product_ids = await self.db.scalars(
+                    select(InvoiceLine.product_id).where(
+                        InvoiceLine.invoice_id.in_([inv.id for inv in valid_invoices]),
+                        InvoiceLine.product_id.isnot(None)
+                    ).distinct()
+                )
+                await self.account_determination.preload_products(product_ids.all())
+            
+            # 4. Procesar facturas válidas
+            # Capturar identificadores antes de procesar: el rollback de una factura fallida
+            # expira las instancias cargadas y no se pueden recargar en diferido
+            for invoice_id, invoice_number in [(inv.id, inv.number) for inv in valid_invoices]:
                 try:
                     # Usar el método individual existente
-                    self.cancel_invoice(invoice.id, cancelled_by_id, reason)
-                    successful_ids.append(invoice.id)
+                    await self.cancel_invoice(invoice_id, cancelled_by_id, reason)
+                    successful_ids.append(invoice_id)
                         
                 except Exception as e:
                     error_msg = str(e)
                     failed_items.append({
-                        "id": str(invoice.id),
+                        "id": str(invoice_id),
                         "error": error_msg,
-                        "invoice_number": invoice.number
+                        "invoice_number": invoice_number
                     })
                     
                     if stop_on_error:
-                        logger.error(f"Bulk cancel stopped at invoice {invoice.id}: {error_msg}")
+                        logger.error(f"Bulk cancel stopped at invoice {invoice_id}: {error_msg}")
                         break
                     else:
-                        logger.warning(f"Failed to cancel invoice {invoice.id}: {error_msg}")
+                        logger.warning(f"Failed to cancel invoice {invoice_id}: {error_msg}")
                         continue
-              # 4. Commit si hay éxitos
+              # 5. Commit si hay éxitos
             if successful_ids:
-                self.db.commit()
+                await self.db.commit()
                 logger.info(f"Bulk cancel completed: {len(successful_ids)} successful, {len(failed_items)} failed, {len(skipped_items)} skipped")
             
             execution_time = time.time() - start_time
@@ -1617,11 +1869,11 @@ class InvoiceService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Bulk cancel operation failed: {str(e)}")
             raise
 
-    def bulk_reset_to_draft_invoices(
+    async def bulk_reset_to_draft_invoices(
         self, 
         invoice_ids: List[uuid.UUID], 
         reset_by_id: uuid.UUID,
@@ -1642,9 +1894,8 @@ class InvoiceService:
         
         try:
             # 1. Validación masiva previa
-            invoices = self.db.query(Invoice).filter(
-                Invoice.id.in_(invoice_ids)
-            ).all()
+            result = await self.db.execute(select(Invoice).where(Invoice.id.in_(invoice_ids)))
+            invoices = result.scalars().all()
             
             invoices_by_id = {inv.id: inv for inv in invoices}
             
@@ -1676,31 +1927,44 @@ class InvoiceService:
                 else:
                     valid_invoices.append(invoice)
             
-            # 3. Procesar facturas válidas
-            for invoice in valid_invoices:
+            # 3. Precargar las cuentas de los productos de todo el lote (una consulta);
+            # la determinación de cuentas de cada línea se resuelve luego en memoria
+            if valid_invoices:
+                product_ids = await self.db.scalars(
+                    select(InvoiceLine.product_id).where(
+                        InvoiceLine.invoice_id.in_([inv.id for inv in valid_invoices]),
+                        InvoiceLine.product_id.isnot(None)
+                    ).distinct()
+                )
+                await self.account_determination.preload_products(product_ids.all())
+            
+            # 4. Procesar facturas válidas
+            # Capturar identificadores antes de procesar: el rollback de una factura fallida
+            # expira las instancias cargadas y no se pueden recargar en diferido
+            for invoice_id, invoice_number in [(inv.id, inv.number) for inv in valid_invoices]:
                 try:
                     # Usar el método individual existente
-                    self.reset_to_draft(invoice.id, reset_by_id, reason)
-                    successful_ids.append(invoice.id)
+                    await self.reset_to_draft(invoice_id, reset_by_id, reason)
+                    successful_ids.append(invoice_id)
                         
                 except Exception as e:
                     error_msg = str(e)
                     failed_items.append({
-                        "id": str(invoice.id),
+                        "id": str(invoice_id),
                         "error": error_msg,
-                        "invoice_number": invoice.number
+                        "invoice_number": invoice_number
                     })
                     
                     if stop_on_error:
-                        logger.error(f"Bulk reset stopped at invoice {invoice.id}: {error_msg}")
+                        logger.error(f"Bulk reset stopped at invoice {invoice_id}: {error_msg}")
                         break
                     else:
-                        logger.warning(f"Failed to reset invoice {invoice.id}: {error_msg}")
+                        logger.warning(f"Failed to reset invoice {invoice_id}: {error_msg}")
                         continue
             
-            # 4. Commit si hay éxitos
+            # 5. Commit si hay éxitos
             if successful_ids:
-                self.db.commit()
+                await self.db.commit()
                 logger.info(f"Bulk reset completed: {len(successful_ids)} successful, {len(failed_items)} failed, {len(skipped_items)} skipped")
             
             execution_time = time.time() - start_time
@@ -1716,11 +1980,11 @@ class InvoiceService:
                 "execution_time_seconds": round(execution_time, 3)
             }            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Bulk reset operation failed: {str(e)}")
             raise
 
-    def bulk_delete_invoices(
+    async def bulk_delete_invoices(
         self, 
         invoice_ids: List[uuid.UUID], 
         deleted_by_id: uuid.UUID,
@@ -1742,9 +2006,8 @@ class InvoiceService:
             from app.models.invoice import InvoiceLine
             
             # 1. Validación masiva previa
-            invoices = self.db.query(Invoice).filter(
-                Invoice.id.in_(invoice_ids)
-            ).all()
+            result = await self.db.execute(select(Invoice).where(Invoice.id.in_(invoice_ids)))
+            invoices = result.scalars().all()
             
             invoices_by_id = {inv.id: inv for inv in invoices}
             
@@ -1776,14 +2039,26 @@ class InvoiceService:
                 else:
                     valid_invoices.append(invoice)
             
-            # 3. Procesar facturas válidas
+            # 3. Precargar las cuentas de los productos de todo el lote (una consulta);
+            # la determinación de cuentas de cada línea se resuelve luego en memoria
+            if valid_invoices:
+                product_ids = await self.db.scalars(
+                    select(InvoiceLine.product_id).where(
+                        InvoiceLine.invoice_id.in_([inv.id for inv in valid_invoices]),
+                        InvoiceLine.product_id.isnot(None)
+                    ).distinct()
+                )
+                await self.account_determination.preload_products(product_ids.all())
+            
+            # 4. Procesar facturas válidas
             for invoice in valid_invoices:
                 try:
                     # Verificar y desactivar referencias de NFe antes de eliminar
                     from app.models.nfe import NFe, NFeStatus
                     
                     # Buscar NFe que referencian esta factura
-                    nfes = self.db.query(NFe).filter(NFe.invoice_id == invoice.id).all()
+                    nfe_result = await self.db.execute(select(NFe).where(NFe.invoice_id == invoice.id))
+                    nfes = nfe_result.scalars().all()
                     
                     # Desactivar la referencia a la factura en las NFe
                     for nfe in nfes:
@@ -1792,12 +2067,14 @@ class InvoiceService:
                         logger.info(f"Unlinked NFe {nfe.chave_nfe} from invoice {invoice.id}")
                     
                     # Eliminar líneas de factura primero
-                    self.db.query(InvoiceLine).filter(
-                        InvoiceLine.invoice_id == invoice.id
-                    ).delete(synchronize_session=False)
+                    await self.db.execute(
+                        delete(InvoiceLine).where(
+                            InvoiceLine.invoice_id == invoice.id
+                        ).execution_options(synchronize_session=False)
+                    )
                     
                     # Eliminar factura
-                    self.db.delete(invoice)
+                    await self.db.delete(invoice)
                     successful_ids.append(invoice.id)
                     
                     logger.info(f"Deleted invoice {invoice.id} ({invoice.number}) and unlinked {len(nfes)} NFe references - Reason: {reason or 'Not specified'}")
@@ -1811,9 +2088,9 @@ class InvoiceService:
                     })
                     logger.warning(f"Failed to delete invoice {invoice.id}: {error_msg}")
             
-            # 4. Commit si hay éxitos
+            # 5. Commit si hay éxitos
             if successful_ids:
-                self.db.commit()
+                await self.db.commit()
                 logger.info(f"Bulk delete completed: {len(successful_ids)} successful, {len(failed_items)} failed, {len(skipped_items)} skipped")
             
             execution_time = time.time() - start_time
@@ -1830,11 +2107,11 @@ class InvoiceService:
             }
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Bulk delete operation failed: {str(e)}")
             raise
 
-    def validate_bulk_operation(
+    async def validate_bulk_operation(
         self, 
         invoice_ids: List[uuid.UUID], 
         operation: str
@@ -1854,9 +2131,8 @@ class InvoiceService:
             raise ValueError(f"Unknown operation: {operation}")
         
         # Obtener facturas
-        invoices = self.db.query(Invoice).filter(
-            Invoice.id.in_(invoice_ids)
-        ).all()
+        result = await self.db.execute(select(Invoice).where(Invoice.id.in_(invoice_ids)))
+        invoices = result.scalars().all()
         
         invoices_by_id = {inv.id: inv for inv in invoices}
         
@@ -1925,7 +2201,7 @@ class InvoiceService:
             "can_proceed": len(valid_invoices) > 0
         }
     
-    def get_cancellation_options(self, invoice_id: uuid.UUID) -> Dict[str, Any]:
+    async def get_cancellation_options(self, invoice_id: uuid.UUID) -> Dict[str, Any]:
         """
         Proporciona información sobre las opciones de cancelación disponibles
         
@@ -1936,7 +2212,7 @@ class InvoiceService:
             Dict con información sobre métodos de cancelación disponibles
         """
         try:
-            invoice = self.db.query(Invoice).filter(Invoice.id == invoice_id).first()
+            invoice = await self.db.get(Invoice, invoice_id)
             if not invoice:
                 raise NotFoundError(f"Invoice with id {invoice_id} not found")
             
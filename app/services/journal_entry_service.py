@@ -3,7 +3,7 @@ from datetime import datetime, date, timedelta, timezone
 from decimal import Decimal
 from typing import List, Optional, Tuple
 
-from sqlalchemy import select, func, and_, or_, desc, delete
+from sqlalchemy import select, func, and_, desc, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -41,14 +41,20 @@ from app.schemas.journal_entry import (
     JournalEntryReverseValidation, 
     BulkJournalEntryReverseResult
 )
-from app.utils.exceptions import JournalEntryError, AccountNotFoundError, BalanceError
+from app.services.cost_center_actuals_service import CostCenterActualsService
+from app.services.stock_movement_service import StockMovementService
+from app.services.stats_builder import StatsQuery
+from app.utils.exceptions import JournalEntryError, AccountNotFoundError, BalanceError, ValidationError
 from app.utils.description_generator import JournalEntryDescriptionGenerator
+from app.utils.search import JOURNAL_ENTRY_SEARCH
 
 
 class JournalEntryService:
     """Servicio para operaciones de asientos contables"""
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.cost_center_actuals = CostCenterActualsService(db)
+        self.stock_movements = StockMovementService(db)
     async def create_journal_entry(
         self, 
         entry_data: JournalEntryCreate, 
@@ -379,12 +385,7 @@ class JournalEntryService:
                 conditions.append(JournalEntry.entry_date <= filters.end_date)
             
             if filters.search_text:
-                search_filter = or_(
-                    JournalEntry.number.ilike(f"%{filters.search_text}%"),
-                    JournalEntry.description.ilike(f"%{filters.search_text}%"),
-                    JournalEntry.reference.ilike(f"%{filters.search_text}%")
-                )
-                conditions.append(search_filter)
+                conditions.append(JOURNAL_ENTRY_SEARCH.condition(filters.search_text))
             
             if filters.account_id:
                 # Usar subconsulta para filtrar por cuenta
@@ -790,18 +791,14 @@ class JournalEntryService:
                 # Verificar que el producto sigue activo
                 if line.product.status != ProductStatus.ACTIVE:
                     raise JournalEntryError(f"El producto {line.product.code} - {line.product.name} no está activo")
-                
-                # Validar stock disponible para productos de inventario (solo para ventas/salidas)
-                if (line.product.product_type in [ProductType.PRODUCT, ProductType.BOTH] and 
-                    journal_entry.transaction_origin == TransactionOrigin.SALE and
-                    line.quantity and line.quantity > 0):
-                    
-                    if line.product.manage_inventory and line.product.current_stock is not None:
-                        if line.product.current_stock < line.quantity:
-                            raise JournalEntryError(
-                                f"Stock insuficiente para producto {line.product.code}. "
-                                f"Stock actual: {line.product.current_stock}, Cantidad requerida: {line.quantity}"
-                            )
+        
+        # Movimientos de inventario, stock y costo promedio. Va antes de tocar
+        # el asiento y los saldos: si una venta no tiene stock (se valida con
+        # el producto bloqueado) el asiento queda sin cambios
+        try:
+            await self.stock_movements.apply_entries([journal_entry.id])
+        except ValidationError as e:
+            raise JournalEntryError(e.message)
         
         # Contabilizar el asiento y actualizar saldos de cuentas
         journal_entry.status = JournalEntryStatus.POSTED
@@ -823,6 +820,9 @@ class JournalEntryService:
             if line.account:
                 line.account.update_balance(line.debit_amount, line.credit_amount)
         
+        # Instantánea mensual de reales por centro de costo
+        await self.cost_center_actuals.apply_entries([journal_entry.id])
+        
         # Actualizar notas si se proporcionan
         if post_data and post_data.reason:
             if journal_entry.notes:
@@ -860,6 +860,8 @@ class JournalEntryService:
                 cancelled_by_id, 
                 cancel_data.reason
             )
+            # El original deja de estar contabilizado: sale de la instantánea
+            await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
         
         # Anular el asiento original
         journal_entry.status = JournalEntryStatus.CANCELLED
@@ -916,6 +918,9 @@ class JournalEntryService:
                 reference=original_line.reference,
                 third_party_id=original_line.third_party_id,
                 cost_center_id=original_line.cost_center_id,
+                product_id=original_line.product_id,
+                quantity=original_line.quantity,
+                unit_price=original_line.unit_price,
                 line_number=original_line.line_number
             )
             reversal_lines.append(reversal_line)
@@ -957,6 +962,11 @@ class JournalEntryService:
             if line.account:
                 line.account.update_balance(line.debit_amount, line.credit_amount)
         
+        await self.cost_center_actuals.apply_entries([reversal_entry.id])
+        # El inventario se compensa contra los movimientos del original: la
+        # reversión no registra movimientos propios
+        await self.stock_movements.apply_entries([original_entry.id], sign=-1)
+        
         return reversal_entry
 
     async def get_journal_entry_stats(
@@ -971,80 +981,39 @@ class JournalEntryService:
             conditions.append(JournalEntry.entry_date >= start_date)
         if end_date:
             conditions.append(JournalEntry.entry_date <= end_date)
-          # Estadísticas por estado
-        stats_query = select(
-            JournalEntry.status,
-            func.count(JournalEntry.id).label('count'),
-            func.sum(JournalEntry.total_debit).label('total_amount')
-        ).group_by(JournalEntry.status)
-        
-        if conditions:
-            stats_query = stats_query.where(and_(*conditions))
-        
-        stats_result = await self.db.execute(stats_query)
-        stats_by_status = {}
-        total_amount_posted = Decimal('0')
-        
-        for row in stats_result:
-            stats_by_status[row[0]] = {'count': int(row[1]), 'amount': row[2] or Decimal('0')}
-            if row[0] == JournalEntryStatus.POSTED:
-                total_amount_posted = row[2] or Decimal('0')
-        
-        # Estadísticas por tipo
-        type_query = select(
-            JournalEntry.entry_type,
-            func.count(JournalEntry.id).label('count')
-        ).group_by(JournalEntry.entry_type)
-        
-        if conditions:
-            type_query = type_query.where(and_(*conditions))
-        type_result = await self.db.execute(type_query)
-        stats_by_type = {str(row[0]): int(row[1]) for row in type_result}
-          # Estadísticas por mes - Usar alias para evitar problemas de GROUP BY
-        month_truncated = func.date_trunc('month', JournalEntry.entry_date).label('month_truncated')
-        month_query = select(
-            month_truncated,
-            func.count(JournalEntry.id).label('count')
-        ).group_by(month_truncated)  # Usar el mismo alias en GROUP BY
-        
-        if conditions:
-            month_query = month_query.where(and_(*conditions))
-        
-        month_query = month_query.order_by(month_truncated)  # Ordenar por mes para resultados consistentes
-        month_result = await self.db.execute(month_query)
-        stats_by_month = {str(row[0]): int(row[1]) for row in month_result}
-          # Calcular estadísticas adicionales para el mes y año actual
+
         current_date = date.today()
         current_month_start = current_date.replace(day=1)
         current_year_start = current_date.replace(month=1, day=1)
-        
-        # Entradas de este mes
-        month_query = select(func.count(JournalEntry.id)).where(
-            JournalEntry.entry_date >= current_month_start
+
+        # El rango solo aplica a los conteos por estado y al importe;
+        # las entradas del mes y del año actual no dependen del filtro
+        query = (
+            StatsQuery(JournalEntry)
+            .count("total", *conditions)
+            .sum("total_amount", JournalEntry.total_debit, *conditions)
+            .count("this_month", JournalEntry.entry_date >= current_month_start)
+            .count("this_year", JournalEntry.entry_date >= current_year_start)
         )
-        month_count_result = await self.db.execute(month_query)
-        entries_this_month = month_count_result.scalar() or 0
-        
-        # Entradas de este año
-        year_query = select(func.count(JournalEntry.id)).where(
-            JournalEntry.entry_date >= current_year_start
+        for status in JournalEntryStatus:
+            query.count(status.value, JournalEntry.status == status, *conditions)
+        stats = await query.execute(
+            self.db, cache_key=("journal_entries", start_date, end_date, current_date)
         )
-        year_count_result = await self.db.execute(year_query)
-        entries_this_year = year_count_result.scalar() or 0
-          # Calcular totales de débito y crédito
-        total_debit_amount = Decimal(str(sum(stat['amount'] for stat in stats_by_status.values())))
-        total_credit_amount = total_debit_amount  # En contabilidad siempre deben ser iguales
+
+        # En contabilidad débitos y créditos siempre deben ser iguales
+        total_debit_amount = stats["total_amount"] or Decimal('0')
         
         return JournalEntryStatistics(
-            total_entries=sum(stat['count'] for stat in stats_by_status.values()),
-            draft_entries=stats_by_status.get(JournalEntryStatus.DRAFT, {'count': 0})['count'],
-            approved_entries=stats_by_status.get(JournalEntryStatus.APPROVED, {'count': 0})['count'],
-            posted_entries=stats_by_status.get(JournalEntryStatus.POSTED, {'count': 0})['count'],
-            cancelled_entries=stats_by_status.get(JournalEntryStatus.CANCELLED, {'count': 0})['count'],
+            total_entries=stats["total"],
+            draft_entries=stats[JournalEntryStatus.DRAFT.value],
+            approved_entries=stats[JournalEntryStatus.APPROVED.value],
+            posted_entries=stats[JournalEntryStatus.POSTED.value],
+            cancelled_entries=stats[JournalEntryStatus.CANCELLED.value],
             total_debit_amount=total_debit_amount,
-            total_credit_amount=total_credit_amount,
-            entries_this_month=entries_this_month,
-            entries_this_year=entries_this_year
+            total_credit_amount=total_debit_amount,
+            entries_this_month=stats["this_month"],
+            entries_this_year=stats["this_year"]
         )
 
     async def search_journal_entries(self, filters: JournalEntryFilter) -> List[JournalEntry]:
@@ -1295,6 +1264,9 @@ class JournalEntryService:
                         # Obtener el asiento para eliminarlo
                         journal_entry = await self.get_journal_entry_by_id(entry_id)
                         if journal_entry:
+                            if journal_entry.status == JournalEntryStatus.POSTED:
+                                await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
+                                await self.stock_movements.apply_entries([journal_entry.id], sign=-1)
                             await self.db.delete(journal_entry)
                             deleted_entries.append(validation)
                             
@@ -1464,9 +1436,13 @@ class JournalEntryService:
             pass
         
         # Restablecer a borrador
+        was_posted = journal_entry.status == JournalEntryStatus.POSTED
         success = journal_entry.reset_to_draft(reset_by_id)
         if not success:
             raise JournalEntryError("No se pudo restablecer el asiento a borrador")
+        if was_posted:
+            await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
+            await self.stock_movements.apply_entries([journal_entry.id], sign=-1)
         
         # Agregar razón en las notas
         if reset_data.reason:
@@ -1937,6 +1913,9 @@ class JournalEntryService:
                         global_warnings.append(f"Asiento {validation.journal_entry_number} contabilizado")
                         
                     except Exception as e:
+                        # Descartar lo que haya quedado a medias en la sesión: el
+                        # commit del siguiente asiento lo guardaría como contabilizado
+                        await self.db.rollback()
                         validation.can_post = False
                         validation.errors.append(f"Error durante contabilización: {str(e)}")
                         failed_entries.append(validation)
@@ -2252,6 +2231,8 @@ class JournalEntryService:
                 journal_entry.status = JournalEntryStatus.DRAFT
                 journal_entry.posted_by_id = None
                 journal_entry.posted_at = None
+                await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
+                await self.stock_movements.apply_entries([journal_entry.id], sign=-1)
                 # Nota: En un entorno real, esto podría requerir auditoría adicional
             elif journal_entry.status == JournalEntryStatus.CANCELLED:
                 # Restaurar manualmente desde cancelado
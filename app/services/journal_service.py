@@ -12,6 +12,7 @@ from app.models.journal import Journal, JournalType
 from app.models.journal_entry import JournalEntry
 from app.models.account import Account
 from app.models.user import User
+from app.services.company_settings_cache import company_settings_cache
 from app.schemas.journal import (
     JournalCreate, JournalUpdate, JournalFilter,
     JournalStats, JournalSequenceInfo,
@@ -22,6 +23,24 @@ from app.schemas.journal import (
 from app.utils.exceptions import (
     AccountingSystemException, AccountNotFoundError, AccountValidationError
 )
+from app.utils.pagination import KeysetPaginator, SortKey, estimate_total
+
+
+# Columnas NOT NULL admitidas como orden del listado paginado por cursor
+JOURNAL_KEYSET_COLUMNS = {
+    "name": Journal.name,
+    "code": Journal.code,
+    "type": Journal.type,
+    "sequence_prefix": Journal.sequence_prefix,
+    "is_active": Journal.is_active,
+    "created_at": Journal.created_at,
+}
+
+
+def journal_keyset(order_by: str = "name", order_dir: str = "asc") -> KeysetPaginator:
+    """Paginador por clave del listado de diarios (columnas desconocidas ordenan por nombre)"""
+    column = JOURNAL_KEYSET_COLUMNS.get(order_by, Journal.name)
+    return KeysetPaginator(SortKey(column, order_dir.lower() == "desc"))
 
 
 class JournalNotFoundError(AccountingSystemException):
@@ -90,7 +109,9 @@ class JournalService:
         )
 
         self.db.add(journal)
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
         await self.db.refresh(journal)
 
         return journal
@@ -148,49 +169,12 @@ class JournalService:
         skip: int = 0,
         limit: int = 100,
         order_by: str = "name",
-        order_dir: str = "asc"
+        order_dir: str = "asc",
+        cursor: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Obtiene lista de diarios con conteo de asientos para JournalListItem        """
-        # Query principal con joins para obtener información completa
-        query = select(Journal).options(
-            joinedload(Journal.default_account)
-        )
-
-        # Aplicar filtros
-        conditions = []
-        
-        if filters.type is not None:
-            conditions.append(Journal.type == filters.type)
-            
-        if filters.is_active is not None:
-            conditions.append(Journal.is_active == filters.is_active)
-            
-        if filters.search:
-            search_term = f"%{filters.search}%"
-            conditions.append(
-                or_(
-                    Journal.name.ilike(search_term),
-                    Journal.code.ilike(search_term),
-                    Journal.description.ilike(search_term)
-                )
-            )
-
-        if conditions:
-            query = query.where(and_(*conditions))
-
-        # Aplicar ordenamiento
-        order_column = getattr(Journal, order_by, Journal.name)
-        if order_dir.lower() == "desc":
-            query = query.order_by(desc(order_column))
-        else:
-            query = query.order_by(asc(order_column))
-
-        # Aplicar paginación
-        query = query.offset(skip).limit(limit)
-        
-        result = await self.db.execute(query)
-        journals = result.scalars().all()
+        journals = await self.get_journals(filters, skip, limit, order_by, order_dir, cursor)
         
         # Convertir a lista de diccionarios con conteo manual de journal entries
         journals_list = []
@@ -222,54 +206,50 @@ class JournalService:
         skip: int = 0,
         limit: int = 100,
         order_by: str = "name",
-        order_dir: str = "asc"
+        order_dir: str = "asc",
+        cursor: Optional[str] = None
     ) -> List[Journal]:
         """
-        Obtiene lista de diarios con filtros y paginación
+        Obtiene lista de diarios con filtros y paginación.
+
+        Con ``cursor`` ("" para la primera página) pagina por clave en lugar de
+        ``skip``; ver ``journal_keyset``.
         """
         query = select(Journal).options(
             joinedload(Journal.default_account)
-        )
+        ).where(*self._journal_conditions(filters))
 
-        # Aplicar filtros
-        conditions = []
-        
-        if filters.type is not None:
-            conditions.append(Journal.type == filters.type)
-            
-        if filters.is_active is not None:
-            conditions.append(Journal.is_active == filters.is_active)
-            
-        if filters.search:
-            search_term = f"%{filters.search}%"
-            conditions.append(
-                or_(
-                    Journal.name.ilike(search_term),
-                    Journal.code.ilike(search_term),
-                    Journal.description.ilike(search_term)
-                )
-            )
-
-        if conditions:
-            query = query.where(and_(*conditions))
-
-        # Aplicar ordenamiento
-        order_column = getattr(Journal, order_by, Journal.name)
-        if order_dir.lower() == "desc":
-            query = query.order_by(desc(order_column))
+        if cursor is not None:
+            query = journal_keyset(order_by, order_dir).apply(query, cursor, limit)
         else:
-            query = query.order_by(asc(order_column))
+            # Aplicar ordenamiento
+            order_column = getattr(Journal, order_by, Journal.name)
+            if order_dir.lower() == "desc":
+                query = query.order_by(desc(order_column))
+            else:
+                query = query.order_by(asc(order_column))
 
-        # Aplicar paginación
-        query = query.offset(skip).limit(limit)
+            # Aplicar paginación
+            query = query.offset(skip).limit(limit)
         
         result = await self.db.execute(query)
         return list(result.scalars().all())
 
-    async def count_journals(self, filters: JournalFilter) -> int:
-        """Cuenta el total de diarios que coinciden con los filtros"""
-        query = select(func.count(Journal.id))
+    async def count_journals(self, filters: JournalFilter, estimate: bool = False) -> int:
+        """
+        Cuenta el total de diarios que coinciden con los filtros.
+        Con ``estimate`` usa la estimación del planificador en lugar de COUNT.
+        """
+        conditions = self._journal_conditions(filters)
+        if estimate:
+            return await estimate_total(self.db, select(Journal.id).where(*conditions))
+
+        result = await self.db.execute(select(func.count(Journal.id)).where(*conditions))
+        return result.scalar() or 0
 
+    @staticmethod
+    def _journal_conditions(filters: JournalFilter) -> list:
+        """Condiciones comunes del listado y del conteo de diarios"""
         conditions = []
         
         if filters.type is not None:
@@ -288,11 +268,7 @@ class JournalService:
                 )
             )
 
-        if conditions:
-            query = query.where(and_(*conditions))
-
-        result = await self.db.execute(query)
-        return result.scalar() or 0
+        return conditions
 
     async def update_journal(
         self, 
@@ -319,7 +295,9 @@ class JournalService:
         for field, value in update_data.items():
             setattr(journal, field, value)
 
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
         await self.db.refresh(journal)
 
         return journal
@@ -341,7 +319,9 @@ class JournalService:
             raise JournalValidationError("journal_entries", str(count_result), "No se puede eliminar un diario que tiene asientos contables asociados")
 
         await self.db.delete(journal)
+        await company_settings_cache.bump_version(self.db)
         await self.db.commit()
+        company_settings_cache.invalidate()
 
         return True
 
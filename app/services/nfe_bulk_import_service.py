@@ -27,7 +27,6 @@ from app.models.account import Account
 
 from app.services.nfe_xml_parser import NFeXMLParser
 from app.services.nfe_validation_service import NFeValidationService
-from app.services.invoice_service import InvoiceService
 
 logger = logging.getLogger(__name__)
 
@@ -93,7 +92,6 @@ class NFeBulkImportService:
         self.db = db
         self.xml_parser = NFeXMLParser()
         self.validation_service = NFeValidationService(db)
-        self.invoice_service = InvoiceService(db)
         
     async def process_bulk_import(
         self,
@@ -4,24 +4,31 @@ This is a clean implementation that provides the essential payment workflow capa
 """
 import uuid
 from decimal import Decimal
-from datetime import datetime, date, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import datetime, date, timedelta, timezone
+from typing import Optional, List, Dict, Any, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import selectinload
-from sqlalchemy import select, and_, func, delete
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy import BigInteger, select, and_, func, delete, insert, update, case, cast, literal
 
 from app.models.payment import Payment, PaymentInvoice, PaymentStatus, PaymentType
 from app.models.invoice import Invoice, InvoiceStatus
 from app.models.journal import Journal, JournalType
 from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus, JournalEntryType, TransactionOrigin
-from app.models.account import Account
+from app.models.account import Account, AccountType
 from app.schemas.payment import PaymentResponse
 from app.services.payment_service import PaymentService
+from app.services.cost_center_actuals_service import CostCenterActualsService
+from app.services.third_party_open_item_service import ThirdPartyOpenItemService
+from app.services.company_settings_cache import AccountRef, CompanySettingsSnapshot, company_settings_cache
+from app.services.invoice_service import _insert_row
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
 from app.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+# Pagos por transacción en la confirmación masiva
+BULK_CONFIRM_CHUNK_SIZE = 200
+
 
 class PaymentFlowService:
     """
@@ -43,15 +50,17 @@ class PaymentFlowService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.payment_service = PaymentService(db)
+        self.cost_center_actuals = CostCenterActualsService(db)
+        self.open_items = ThirdPartyOpenItemService(db)
     
     async def confirm_payment(self, payment_id: uuid.UUID, confirmed_by_id: uuid.UUID, force: bool = False) -> PaymentResponse:
         """
         Confirm/Post payment: DRAFT → POSTED (contabilización)
-        
+
         FLUJO CORRECTO:
         1. DRAFT → POSTED (se contabiliza y genera journal entry)
         2. POSTED → PAID (cuando se concilie, pero por ahora va directo a PAID)
-        
+
         Este método maneja la contabilización:
         1. Valida que el pago esté en DRAFT
         2. Crea journal entry para contabilidad
@@ -59,11 +68,9 @@ class PaymentFlowService:
         4. Procesa reconciliación de facturas
         """
         try:
-            logger.info(f"🚀 [CONFIRM_PAYMENT] Starting confirmation process for payment {payment_id}")
-            logger.info(f"🔍 [CONFIRM_PAYMENT] Confirmed by user: {confirmed_by_id}, Force mode: {force}")
-            
+            logger.info(f"🚀 [CONFIRM_PAYMENT] Starting confirmation process for payment {payment_id} (force={force})")
+
             # Get payment with all required relations
-            logger.debug(f"📋 [CONFIRM_PAYMENT] Loading payment {payment_id} with all relations")
             payment_result = await self.db.execute(
                 select(Payment).options(
                     selectinload(Payment.payment_invoices).selectinload(PaymentInvoice.invoice),
@@ -73,76 +80,44 @@ class PaymentFlowService:
                 ).where(Payment.id == payment_id)
             )
             payment = payment_result.scalar_one_or_none()
-            
+
             if not payment:
-                error_msg = f"Payment with id {payment_id} not found"
-                logger.error(f"❌ [CONFIRM_PAYMENT] {error_msg}")
-                raise NotFoundError(error_msg)
-            
-            logger.info(f"✅ [CONFIRM_PAYMENT] Payment {payment.number} loaded successfully")
-            logger.info(f"📊 [CONFIRM_PAYMENT] Payment details: Status={payment.status}, Amount={payment.amount}, Type={payment.payment_type}")
-            logger.info(f"🏢 [CONFIRM_PAYMENT] Third party: {payment.third_party.name if payment.third_party else 'None'}")
-            logger.info(f"💰 [CONFIRM_PAYMENT] Account: {payment.account.name if payment.account else 'None'}")
-            
-            # Check if payment is in DRAFT status (only status allowed for confirmation)
-            if payment.status != PaymentStatus.DRAFT:
-                error_msg = f"Payment can only be confirmed from DRAFT status, current: {payment.status}"
-                logger.error(f"❌ [CONFIRM_PAYMENT] Payment {payment.number} - {error_msg}")
-                raise BusinessRuleError(error_msg)
-            
-            logger.info(f"✅ [CONFIRM_PAYMENT] Payment {payment.number} status validation passed (DRAFT)")
-            
-            # Validate payment for confirmation (skip if force=True)
-            if not force:
-                logger.info(f"🔍 [CONFIRM_PAYMENT] Starting validation for payment {payment.number}")
-                validation_errors = await self._validate_payment_for_confirmation(payment)
-                
-                if validation_errors:
-                    error_msg = f"Payment validation failed: {'; '.join(validation_errors)}"
-                    logger.error(f"❌ [CONFIRM_PAYMENT] Payment {payment.number} - {error_msg}")
-                    raise BusinessRuleError(error_msg)
-                
-                logger.info(f"✅ [CONFIRM_PAYMENT] Payment {payment.number} validation passed")
-            else:
-                logger.warning(f"⚠️ [CONFIRM_PAYMENT] FORCE MODE: Skipping validation for payment {payment.number}")
-            
+                raise NotFoundError(f"Payment with id {payment_id} not found")
+
+            # Solo DRAFT; validación completa salvo en modo forzado
+            self._check_confirmable(payment, force)
+
             # Ensure payment has required journal
             if not payment.journal_id:
-                logger.info(f"🔧 [CONFIRM_PAYMENT] Payment {payment.number} missing journal, getting default journal")
-                journal_id = await self._get_default_payment_journal(payment.payment_type)
-                payment.journal_id = journal_id
-                logger.info(f"✅ [CONFIRM_PAYMENT] Payment {payment.number} assigned journal ID: {journal_id}")
-            
+                payment.journal_id = await self._get_default_payment_journal(payment.payment_type)
+                logger.debug(f"🔧 [CONFIRM_PAYMENT] Payment {payment.number} assigned default journal {payment.journal_id}")
+
             # Create journal entry for the payment
-            logger.info(f"📝 [CONFIRM_PAYMENT] Creating journal entry for payment {payment.number}")
             journal_entry = await self._create_payment_journal_entry(payment, confirmed_by_id)
             payment.journal_entry_id = journal_entry.id
-            logger.info(f"✅ [CONFIRM_PAYMENT] Journal entry {journal_entry.number} created for payment {payment.number}")
-            
+
             # Update payment status to POSTED (will be PAID until reconciliation is implemented)
-            logger.info(f"📝 [CONFIRM_PAYMENT] Updating payment {payment.number} status to POSTED")
             payment.status = PaymentStatus.POSTED  # Temporalmente POSTED, luego será PAID
             payment.posted_by_id = confirmed_by_id
             payment.posted_at = datetime.utcnow()
             payment.confirmed_by_id = confirmed_by_id
             payment.confirmed_at = datetime.utcnow()
             payment.updated_at = datetime.utcnow()
-            
-            logger.info(f"✅ [CONFIRM_PAYMENT] Payment {payment.number} status updated to {payment.status}")
-            
+
             # Process invoice reconciliation
-            logger.info(f"🔗 [CONFIRM_PAYMENT] Processing invoice reconciliation for payment {payment.number}")
             await self._reconcile_payment_invoices(payment)
-            logger.info(f"✅ [CONFIRM_PAYMENT] Invoice reconciliation completed for payment {payment.number}")
-            
+            await self.open_items.sync(
+                invoice_ids=[pi.invoice_id for pi in payment.payment_invoices],
+                payment_ids=[payment.id]
+            )
+
             await self.db.commit()
-            
-            logger.info(f"🎉 [CONFIRM_PAYMENT] Payment {payment.number} processed successfully - Final Status: {payment.status}")
+
+            logger.info(f"🎉 [CONFIRM_PAYMENT] Payment {payment.number} posted with journal entry {journal_entry.number}")
             return PaymentResponse.from_orm(payment)
-            
+
         except Exception as e:
-            logger.error(f"💥 [CONFIRM_PAYMENT] Error confirming payment {payment_id}: {str(e)}")
-            logger.error(f"💥 [CONFIRM_PAYMENT] Exception type: {type(e).__name__}")
+            logger.error(f"💥 [CONFIRM_PAYMENT] Error confirming payment {payment_id}: {type(e).__name__}: {str(e)}")
             await self.db.rollback()
             raise
     
@@ -182,6 +157,8 @@ class PaymentFlowService:
                     journal_entry = journal_entry_result.scalar_one_or_none()
                     
                     if journal_entry:
+                        if journal_entry.status == JournalEntryStatus.POSTED:
+                            await self.cost_center_actuals.apply_entries([journal_entry.id], sign=-1)
                         # Delete journal entry lines first
                         await self.db.execute(
                             delete(JournalEntryLine).where(JournalEntryLine.journal_entry_id == journal_entry.id)
@@ -210,6 +187,8 @@ class PaymentFlowService:
                             reversal_entries = reversal_entries_result.scalars().all()
                             
                             for reversal_entry in reversal_entries:
+                                if reversal_entry.status == JournalEntryStatus.POSTED:
+                                    await self.cost_center_actuals.apply_entries([reversal_entry.id], sign=-1)
                                 # Delete reversal entry lines first
                                 await self.db.execute(
                                     delete(JournalEntryLine).where(JournalEntryLine.journal_entry_id == reversal_entry.id)
@@ -233,6 +212,7 @@ class PaymentFlowService:
             payment.cancelled_at = None
             payment.journal_entry_id = None
             payment.updated_at = datetime.utcnow()
+            await self.open_items.sync(payment_ids=[payment.id])
             
             await self.db.commit()
             
@@ -335,6 +315,10 @@ class PaymentFlowService:
             if reason:
                 cancellation_note = f"Cancelled on {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} by user {cancelled_by_id}. Reason: {reason}"
                 payment.notes = f"{payment.notes or ''}\n{cancellation_note}".strip()
+            await self.open_items.sync(
+                invoice_ids=[pi.invoice_id for pi in payment.payment_invoices],
+                payment_ids=[payment.id]
+            )
             
             # Persistir cambios
             await self.db.commit()
@@ -408,22 +392,13 @@ class PaymentFlowService:
                 
                 payment = payment_dict[payment_id]
                 
-                logger.info(f"🔍 [VALIDATE_BULK] Validating payment {payment.number} - Status: {payment.status}, Amount: {payment.amount}")
-                
                 # Solo se pueden contabilizar pagos en estado DRAFT
                 if payment.status != PaymentStatus.DRAFT:
-                    error_msg = f"Payment in {payment.status} status cannot be confirmed/posted - only DRAFT payments allowed"
-                    logger.warning(f"❌ [VALIDATE_BULK] Payment {payment.number} - {error_msg}")
-                    validation_errors = [error_msg]
+                    validation_errors = [
+                        f"Payment in {payment.status} status cannot be confirmed/posted - only DRAFT payments allowed"
+                    ]
                 else:
-                    # Validar pago DRAFT para confirmación
-                    logger.debug(f"🔍 [VALIDATE_BULK] Running DRAFT validation for payment {payment.number}")
-                    validation_errors = await self._validate_payment_for_confirmation(payment)
-                    
-                    if validation_errors:
-                        logger.warning(f"❌ [VALIDATE_BULK] Payment {payment.number} validation failed: {validation_errors}")
-                    else:
-                        logger.info(f"✅ [VALIDATE_BULK] Payment {payment.number} validation passed")
+                    validation_errors = self._collect_confirmation_errors(payment)
                 
                 warnings = await self._get_payment_warnings(payment)
                 
@@ -461,12 +436,15 @@ class PaymentFlowService:
     ) -> Dict[str, Any]:
         """
         Confirma/Contabiliza múltiples pagos en lote
-        
+
         FLUJO CORRECTO:
         - Solo procesa pagos en estado DRAFT
         - DRAFT → POSTED (contabilización con journal entry)
         - Temporalmente POSTED hasta implementar conciliación
-        
+
+        Cada bloque de pagos se contabiliza en una sola transacción (ver
+        ``_post_payment_chunk``).
+
         Args:
             payment_ids: Lista de IDs de pagos a confirmar/contabilizar
             confirmed_by_id: ID del usuario que confirma/contabiliza
@@ -474,43 +452,28 @@ class PaymentFlowService:
             force: Forzar operación ignorando warnings
         """
         try:
-            logger.info(f"🚀 [BULK_CONFIRM] Starting bulk confirmation for {len(payment_ids)} payments")
-            logger.info(f"👤 [BULK_CONFIRM] Confirmed by user: {confirmed_by_id}")
-            logger.info(f"📝 [BULK_CONFIRM] Confirmation notes: {confirmation_notes}")
-            logger.info(f"⚠️ [BULK_CONFIRM] Force mode: {force}")
-            
+            logger.info(f"🚀 [BULK_CONFIRM] Starting bulk confirmation for {len(payment_ids)} payments (user={confirmed_by_id}, force={force})")
+
             if not payment_ids:
-                error_msg = "Payment IDs list cannot be empty"
-                logger.error(f"❌ [BULK_CONFIRM] {error_msg}")
-                raise ValidationError(error_msg)
-            
+                raise ValidationError("Payment IDs list cannot be empty")
+
             if len(payment_ids) > 1000:
-                error_msg = "Too many payments requested. Maximum 1000 payments per bulk operation"
-                logger.error(f"❌ [BULK_CONFIRM] {error_msg}")
-                raise ValidationError(error_msg)
-            
+                raise ValidationError("Too many payments requested. Maximum 1000 payments per bulk operation")
+
             # Validar primero si no es forzado
             if not force:
-                logger.info(f"🔍 [BULK_CONFIRM] Starting validation phase for {len(payment_ids)} payments")
                 validation_result = await self.validate_bulk_confirmation(payment_ids)
-                
-                logger.info(f"📊 [BULK_CONFIRM] Validation results: Valid={validation_result['summary']['valid']}, Invalid={validation_result['summary']['invalid']}, Warnings={validation_result['summary']['warnings']}")
-                
+
                 if validation_result["summary"]["invalid"] > 0:
                     error_msg = f"Some payments failed validation. {validation_result['summary']['invalid']} invalid payments found. Use force=True to override or fix errors first."
                     logger.error(f"❌ [BULK_CONFIRM] {error_msg}")
-                    
-                    # Log detalles de errores
-                    for payment_id, result in validation_result["validation_results"].items():
-                        if not result["valid"]:
-                            logger.error(f"❌ [BULK_CONFIRM] Payment {result.get('payment_number', payment_id)} errors: {result['errors']}")
-                    
                     raise BusinessRuleError(error_msg)
-                
-                logger.info(f"✅ [BULK_CONFIRM] All payments passed validation")
+
+                # Los pagos validados se vuelven a cargar con sus relaciones en cada bloque
+                self.db.expunge_all()
             else:
                 logger.warning(f"⚠️ [BULK_CONFIRM] FORCE MODE: Skipping validation phase")
-            
+
             results = {
                 "total_payments": len(payment_ids),
                 "successful": 0,
@@ -519,63 +482,44 @@ class PaymentFlowService:
                 "processing_time": None,
                 "operation": "bulk_confirm_draft_to_posted"
             }
-            
+
             start_time = datetime.utcnow()
-            logger.info(f"⏰ [BULK_CONFIRM] Processing started at {start_time}")
-            
-            # Procesar en lotes para mejor rendimiento
-            batch_size = 50
-            total_batches = (len(payment_ids) + batch_size - 1) // batch_size
-            logger.info(f"📦 [BULK_CONFIRM] Processing in {total_batches} batches of {batch_size} payments each")
-            
-            for i in range(0, len(payment_ids), batch_size):
-                batch = payment_ids[i:i + batch_size]
-                batch_num = (i // batch_size) + 1
-                
-                logger.info(f"📦 [BULK_CONFIRM] Processing batch {batch_num}/{total_batches} with {len(batch)} payments")
-                
-                for payment_id in batch:
-                    try:
-                        logger.debug(f"🔄 [BULK_CONFIRM] Processing payment {payment_id}")
-                        result = await self.confirm_payment(payment_id, confirmed_by_id, force=force)
-                        
-                        results["results"][str(payment_id)] = {
-                            "success": True,
-                            "payment_number": result.number,
-                            "message": f"Payment {result.number} processed successfully" + (" (FORCED)" if force else ""),
-                            "final_status": result.status.value if hasattr(result.status, 'value') else str(result.status)
-                        }
-                        results["successful"] += 1
-                        
-                        logger.info(f"✅ [BULK_CONFIRM] Payment {result.number} processed successfully - Status: {result.status}")
-                        
-                    except Exception as e:
-                        logger.error(f"💥 [BULK_CONFIRM] Failed to confirm payment {payment_id}: {str(e)}")
-                        logger.error(f"💥 [BULK_CONFIRM] Exception type: {type(e).__name__}")
-                        
-                        results["results"][str(payment_id)] = {
-                            "success": False,
-                            "error": str(e),
-                            "message": f"Failed to confirm payment: {str(e)}",
-                            "exception_type": type(e).__name__
-                        }
-                        results["failed"] += 1
-                
-                # Commit intermedio para evitar transacciones muy largas
-                logger.debug(f"💾 [BULK_CONFIRM] Committing batch {batch_num}")
-                await self.db.commit()
-            
+
+            for i in range(0, len(payment_ids), BULK_CONFIRM_CHUNK_SIZE):
+                posted, failed = await self._post_payment_chunk(
+                    payment_ids[i:i + BULK_CONFIRM_CHUNK_SIZE],
+                    confirmed_by_id,
+                    confirm=True,
+                    force=force
+                )
+
+                for payment_id, payment_number in posted:
+                    results["results"][str(payment_id)] = {
+                        "success": True,
+                        "payment_number": payment_number,
+                        "message": f"Payment {payment_number} processed successfully" + (" (FORCED)" if force else ""),
+                        "final_status": PaymentStatus.POSTED.value
+                    }
+                    results["successful"] += 1
+
+                for payment_id, _, error in failed:
+                    results["results"][str(payment_id)] = {
+                        "success": False,
+                        "error": str(error),
+                        "message": f"Failed to confirm payment: {str(error)}",
+                        "exception_type": type(error).__name__
+                    }
+                    results["failed"] += 1
+
             end_time = datetime.utcnow()
             results["processing_time"] = (end_time - start_time).total_seconds()
-            
-            logger.info(f"🎉 [BULK_CONFIRM] Bulk confirmation completed in {results['processing_time']:.2f} seconds")
-            logger.info(f"📊 [BULK_CONFIRM] Final results: {results['successful']}/{results['total_payments']} successful, {results['failed']} failed")
-            
+
+            logger.info(f"🎉 [BULK_CONFIRM] Completed in {results['processing_time']:.2f}s: {results['successful']}/{results['total_payments']} successful, {results['failed']} failed")
+
             return results
-            
+
         except Exception as e:
-            logger.error(f"💥 [BULK_CONFIRM] Critical error in bulk confirm payments: {str(e)}")
-            logger.error(f"💥 [BULK_CONFIRM] Exception type: {type(e).__name__}")
+            logger.error(f"💥 [BULK_CONFIRM] Critical error in bulk confirm payments: {type(e).__name__}: {str(e)}")
             await self.db.rollback()
             raise
     
@@ -779,93 +723,73 @@ class PaymentFlowService:
     
     # Métodos auxiliares para operaciones bulk
     
-    async def _validate_payment_for_confirmation(self, payment: Payment) -> List[str]:
-        """Validación async para confirmación de pagos DRAFT → POSTED"""
+    def _check_confirmable(
+        self,
+        payment: Payment,
+        force: bool = False,
+        applied: Optional[Dict[uuid.UUID, Decimal]] = None
+    ) -> None:
+        """Lanza BusinessRuleError si el pago no puede pasar de DRAFT a POSTED"""
+        if payment.status != PaymentStatus.DRAFT:
+            raise BusinessRuleError(f"Payment can only be confirmed from DRAFT status, current: {payment.status}")
+
+        if not force:
+            validation_errors = self._collect_confirmation_errors(payment, applied)
+            if validation_errors:
+                raise BusinessRuleError(f"Payment validation failed: {'; '.join(validation_errors)}")
+
+    def _collect_confirmation_errors(
+        self,
+        payment: Payment,
+        applied: Optional[Dict[uuid.UUID, Decimal]] = None
+    ) -> List[str]:
+        """
+        Validación para confirmación de pagos DRAFT → POSTED.
+
+        ``applied`` son los montos ya aplicados a cada factura por pagos
+        anteriores del mismo lote: una factura que esos pagos dejan saldada
+        cuenta como PAID, igual que si se hubieran confirmado uno a uno.
+        """
         errors = []
-        
-        logger.info(f"🔍 [VALIDATE_CONFIRM] Validating payment {payment.number} (ID: {payment.id}) for confirmation")
-        
+
         # Validaciones básicas
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking status: {payment.status}")
         if payment.status != PaymentStatus.DRAFT:
-            error_msg = f"Payment must be in DRAFT status to be confirmed, current: {payment.status}"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Status DRAFT is valid")
-        
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking amount: {payment.amount}")
+            errors.append(f"Payment must be in DRAFT status to be confirmed, current: {payment.status}")
+
         if not payment.amount or payment.amount <= 0:
-            error_msg = f"Payment must have a positive amount, current: {payment.amount}"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Amount {payment.amount} is valid")
-        
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking third party: {payment.third_party_id}")
+            errors.append(f"Payment must have a positive amount, current: {payment.amount}")
+
         if not payment.third_party_id:
-            error_msg = "Payment must have a third party assigned"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Third party {payment.third_party_id} is assigned")
-        
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking account: {payment.account_id}")
+            errors.append("Payment must have a third party assigned")
+
         if not payment.account_id:
-            error_msg = "Payment must have a bank/cash account assigned"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Account {payment.account_id} is assigned")
-        
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking payment date: {payment.payment_date}")
+            errors.append("Payment must have a bank/cash account assigned")
+
         if not payment.payment_date:
-            error_msg = "Payment must have a payment date"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Payment date {payment.payment_date} is valid")
-        
+            errors.append("Payment must have a payment date")
+
         # Validar tipo de pago
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking payment type: {payment.payment_type}")
         if not payment.payment_type:
-            error_msg = "Payment must have a payment type"
-            logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-            errors.append(error_msg)
-        else:
-            logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Payment type {payment.payment_type} is valid")
-        
+            errors.append("Payment must have a payment type")
+
         # Validar facturas relacionadas
-        logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Checking {len(payment.payment_invoices)} related invoices")
-        if payment.payment_invoices:
-            for payment_invoice in payment.payment_invoices:
-                invoice = payment_invoice.invoice
-                logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Invoice {invoice.number} status: {invoice.status}")
-                if invoice.status not in [InvoiceStatus.POSTED, InvoiceStatus.PARTIALLY_PAID]:
-                    error_msg = f"Invoice {invoice.number} has status {invoice.status} which does not allow payments"
-                    logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-                    errors.append(error_msg)
-                else:
-                    logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Invoice {invoice.number} status {invoice.status} is valid")
-        else:
-            logger.debug(f"ℹ️ [VALIDATE_CONFIRM] Payment {payment.number} - No invoices linked (allowed)")
-        
+        for payment_invoice in payment.payment_invoices:
+            invoice = payment_invoice.invoice
+            invoice_status = invoice.status
+            if applied and invoice.id in applied and invoice.outstanding_amount - applied[invoice.id] <= 0:
+                invoice_status = InvoiceStatus.PAID
+            if invoice_status not in [InvoiceStatus.POSTED, InvoiceStatus.PARTIALLY_PAID]:
+                errors.append(f"Invoice {invoice.number} has status {invoice_status} which does not allow payments")
+
         # Validar montos si hay facturas
         if payment.payment_invoices:
             total_allocated = sum(pi.amount for pi in payment.payment_invoices)
-            logger.debug(f"🔍 [VALIDATE_CONFIRM] Payment {payment.number} - Total allocated: {total_allocated}, Payment amount: {payment.amount}")
             if total_allocated > payment.amount:
-                error_msg = f"Allocated amount {total_allocated} exceeds payment amount {payment.amount}"
-                logger.warning(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} - {error_msg}")
-                errors.append(error_msg)
-            else:
-                logger.debug(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} - Amount allocation is valid")
-        
+                errors.append(f"Allocated amount {total_allocated} exceeds payment amount {payment.amount}")
+
         if errors:
-            logger.error(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} failed validation with {len(errors)} errors: {errors}")
-        else:
-            logger.info(f"✅ [VALIDATE_CONFIRM] Payment {payment.number} passed all validations successfully")
-        
+            logger.debug(f"❌ [VALIDATE_CONFIRM] Payment {payment.number} failed validation: {errors}")
+
         return errors
     
     async def _get_payment_warnings(self, payment: Payment) -> List[str]:
@@ -1016,6 +940,8 @@ class PaymentFlowService:
         logger.info(f"Original journal entry {original_entry.number} marked as cancelled")
         
         await self.db.flush()
+        await self.cost_center_actuals.apply_entries([reversal_entry.id])
+        await self.cost_center_actuals.apply_entries([original_entry.id], sign=-1)
         
         logger.info(f"Reversal journal entry process completed for payment {payment.number}")
         return reversal_entry
@@ -1043,25 +969,23 @@ class PaymentFlowService:
     ) -> Dict[str, Any]:
         """
         Contabiliza múltiples pagos en lote de forma optimizada
-        
+
         Args:
             payment_ids: Lista de IDs de pagos a contabilizar (máximo 1000)
             posted_by_id: ID del usuario que contabiliza
             posting_notes: Notas de contabilización
             batch_size: Tamaño del lote para procesamiento (default: 50)
-            
+
         Returns:
             Dict con resultados detallados de la operación bulk
         """
-        from datetime import datetime, timedelta
-        
         start_time = datetime.utcnow()
         total_payments = len(payment_ids)
-        
+
         # Validar límite máximo
         if total_payments > 1000:
             raise ValidationError("Maximum 1000 payments allowed for bulk posting")
-        
+
         results = {
             "total_payments": total_payments,
             "successful": 0,
@@ -1072,586 +996,483 @@ class PaymentFlowService:
             "batch_size": batch_size,
             "posting_notes": posting_notes
         }
-        
+
         logger.info(f"Starting bulk posting of {total_payments} payments by user {posted_by_id}")
-        
+
         try:
-            # Procesar en lotes para optimizar rendimiento
+            # Procesar en lotes: cada lote se contabiliza en una sola transacción
             for i in range(0, total_payments, batch_size):
-                batch_ids = payment_ids[i:i + batch_size]
-                batch_number = (i // batch_size) + 1
-                total_batches = (total_payments + batch_size - 1) // batch_size
-                
-                logger.info(f"Processing batch {batch_number}/{total_batches} with {len(batch_ids)} payments")
-                
-                # Obtener pagos del lote con relaciones necesarias
-                stmt = select(Payment).options(
-                    selectinload(Payment.payment_invoices).selectinload(PaymentInvoice.invoice),
-                    selectinload(Payment.third_party),
-                    selectinload(Payment.account),
-                    selectinload(Payment.bank_extract_lines)
-                ).where(Payment.id.in_(batch_ids))
-                
-                result = await self.db.execute(stmt)
-                payments = result.scalars().all()
-                
-                # Crear diccionario para búsqueda rápida
-                payments_dict = {payment.id: payment for payment in payments}
-                
-                # Procesar cada pago del lote
-                for payment_id in batch_ids:
-                    payment = payments_dict.get(payment_id)
-                    
-                    if not payment:
-                        results["results"][str(payment_id)] = {
+                posted, failed = await self._post_payment_chunk(
+                    payment_ids[i:i + batch_size],
+                    posted_by_id,
+                    confirm=False,
+                    notes=posting_notes
+                )
+
+                for payment_id, payment_number in posted:
+                    results["results"][str(payment_id)] = {
+                        "success": True,
+                        "message": f"Payment {payment_number} posted successfully",
+                        "payment_number": payment_number
+                    }
+                    results["successful"] += 1
+
+                for payment_id, payment_number, error in failed:
+                    if isinstance(error, NotFoundError):
+                        item = {
                             "success": False,
                             "message": "Payment not found",
                             "error": "Payment does not exist in database"
                         }
-                        results["failed"] += 1
-                        continue
-                    
-                    try:
-                        # Validar que el pago puede ser contabilizado
-                        validation_errors = await self._validate_payment_for_posting(payment)
-                        if validation_errors:
-                            results["results"][str(payment_id)] = {
-                                "success": False,
-                                "message": "Validation failed",
-                                "error": "; ".join(validation_errors),
-                                "payment_number": payment.number
-                            }
-                            results["failed"] += 1
-                            continue
-                        
-                        # Contabilizar el pago
-                        await self._post_single_payment(payment, posted_by_id, posting_notes)
-                        
-                        results["results"][str(payment_id)] = {
-                            "success": True,
-                            "message": f"Payment {payment.number} posted successfully",
-                            "payment_number": payment.number
+                    elif isinstance(error, ValidationError):
+                        item = {
+                            "success": False,
+                            "message": "Validation failed",
+                            "error": str(error),
+                            "payment_number": payment_number
                         }
-                        results["successful"] += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to post payment {payment_id}: {str(e)}")
-                        results["results"][str(payment_id)] = {
+                    else:
+                        item = {
                             "success": False,
-                            "error": str(e),
-                            "message": f"Failed to post payment: {str(e)}",
-                            "payment_number": getattr(payment, 'number', 'Unknown')
+                            "error": str(error),
+                            "message": f"Failed to post payment: {str(error)}",
+                            "payment_number": payment_number or 'Unknown'
                         }
-                        results["failed"] += 1
-                
-                # Commit intermedio para cada lote
-                await self.db.commit()
-            
+                    results["results"][str(payment_id)] = item
+                    results["failed"] += 1
+
             end_time = datetime.utcnow()
             results["processing_time"] = (end_time - start_time).total_seconds()
-            
+
             logger.info(f"Bulk posting completed: {results['successful']}/{results['total_payments']} successful")
             return results
-            
+
         except Exception as e:
             await self.db.rollback()
             logger.error(f"Error in bulk posting operation: {str(e)}")
             raise BusinessRuleError(f"Bulk posting failed: {str(e)}")
 
-    async def _validate_payment_for_posting(self, payment: Payment) -> List[str]:
+    async def _load_payments(self, payment_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Payment]:
+        """Pagos con tercero, diario y facturas asignadas, en una sola carga"""
+        result = await self.db.execute(
+            select(Payment).options(
+                joinedload(Payment.third_party),
+                joinedload(Payment.journal),
+                selectinload(Payment.payment_invoices).selectinload(PaymentInvoice.invoice)
+            ).where(Payment.id.in_(payment_ids))
+        )
+        return {payment.id: payment for payment in result.unique().scalars().all()}
+
+    async def _post_payment_chunk(
+        self,
+        chunk_ids: List[uuid.UUID],
+        user_id: uuid.UUID,
+        confirm: bool,
+        force: bool = False,
+        notes: Optional[str] = None
+    ) -> Tuple[List[Tuple[uuid.UUID, str]], List[Tuple[uuid.UUID, Optional[str], Exception]]]:
+        """
+        Contabiliza un bloque de pagos en una sola transacción.
+
+        Con ``confirm`` el bloque sigue el flujo DRAFT → POSTED de
+        ``confirm_payment`` (incluida la conciliación de facturas); sin él, el
+        de contabilización de pagos CONFIRMED. Los asientos y sus líneas se
+        construyen en memoria y se insertan en bloque, y los saldos de las
+        facturas se descuentan con un único UPDATE.
+
+        Returns:
+            (pagos contabilizados como (id, número), fallidos como (id, número, error))
+        """
+        posted: List[Tuple[uuid.UUID, str]] = []
+        failed: List[Tuple[uuid.UUID, Optional[str], Exception]] = []
+
+        # 1. Pagos del bloque con todo lo que consulta la contabilización
+        payments_by_id = await self._load_payments(chunk_ids)
+        snapshot = await company_settings_cache.get_snapshot(self.db)
+        default_journal_id: Optional[uuid.UUID] = None
+
+        # 2. Validar y construir asientos en memoria; los pagos con error quedan fuera
+        prepared: List[Tuple[Payment, Optional[uuid.UUID], Optional[List[JournalEntryLine]]]] = []
+        allocations: Dict[uuid.UUID, Decimal] = {}
+        for payment_id in chunk_ids:
+            payment = payments_by_id.get(payment_id)
+            if payment is None:
+                failed.append((payment_id, None, NotFoundError(f"Payment with id {payment_id} not found")))
+                continue
+
+            try:
+                if confirm:
+                    self._check_confirmable(payment, force, allocations)
+                    if not payment.journal_id:
+                        if default_journal_id is None:
+                            default_journal_id = await self._get_default_payment_journal(payment.payment_type)
+                        payment.journal_id = default_journal_id
+                else:
+                    validation_errors = self._collect_posting_errors(payment)
+                    if validation_errors:
+                        raise ValidationError("; ".join(validation_errors))
+
+                if not confirm and payment.journal_entry_id:
+                    # Ya tiene asiento: solo se actualiza el estado
+                    prepared.append((payment, None, None))
+                    continue
+                if not payment.journal_id:
+                    raise BusinessRuleError("Journal not found for payment")
+
+                entry_id = uuid.uuid4()
+                journal_lines = self._build_payment_journal_lines(entry_id, payment, snapshot)
+                prepared.append((payment, entry_id, journal_lines))
+
+                if confirm:
+                    for payment_invoice in payment.payment_invoices:
+                        allocations[payment_invoice.invoice_id] = (
+                            allocations.get(payment_invoice.invoice_id, Decimal('0')) + payment_invoice.amount
+                        )
+
+            except Exception as e:
+                logger.warning(f"Failed to post payment {payment.id}: {str(e)}")
+                failed.append((payment.id, payment.number, e))
+
+        if not prepared:
+            return posted, failed
+
+        # Capturar identificadores antes de escribir: si el bloque falla, el rollback
+        # expira las instancias cargadas y no se pueden recargar en diferido
+        prepared_refs = [(payment.id, payment.number) for payment, _, _ in prepared]
+
+        try:
+            # 3. Numerar los asientos en bloque sobre los diarios bloqueados hasta el commit
+            journal_ids = {payment.journal_id for payment, entry_id, _ in prepared if entry_id}
+            journals: Dict[uuid.UUID, Journal] = {}
+            if journal_ids:
+                journal_result = await self.db.execute(
+                    select(Journal).where(Journal.id.in_(journal_ids)).with_for_update()
+                )
+                journals = {journal.id: journal for journal in journal_result.scalars().all()}
+                if len(journals) != len(journal_ids):
+                    raise BusinessRuleError("Journal not found for payment")
+            sequences = await self._next_journal_entry_sequences(list(journals.values()))
+
+            entry_rows: List[Dict[str, Any]] = []
+            line_rows: List[Dict[str, Any]] = []
+            now = datetime.utcnow()
+            for payment, entry_id, journal_lines in prepared:
+                if entry_id:
+                    journal = journals[payment.journal_id]
+                    entry_number = f"{journal.code}{sequences[journal.id]:06d}"
+                    sequences[journal.id] += 1
+
+                    journal_entry = self._new_payment_journal_entry(payment, entry_number, user_id)
+                    journal_entry.id = entry_id
+                    journal_entry.total_debit = sum((line.debit_amount for line in journal_lines), Decimal('0'))
+                    journal_entry.total_credit = sum((line.credit_amount for line in journal_lines), Decimal('0'))
+                    entry_rows.append(_insert_row(journal_entry))
+                    line_rows.extend(_insert_row(line) for line in journal_lines)
+                    payment.journal_entry_id = entry_id
+
+                payment.status = PaymentStatus.POSTED
+                payment.posted_by_id = user_id
+                payment.posted_at = now
+                payment.updated_at = now
+                if confirm:
+                    payment.confirmed_by_id = user_id
+                    payment.confirmed_at = now
+                if notes:
+                    payment.notes = f"{payment.notes or ''}\n[POSTING] {notes}".strip()
+
+            # 4. Inserción masiva de asientos y líneas, y saldos de facturas en un UPDATE
+            if entry_rows:
+                await self.db.execute(insert(JournalEntry), entry_rows)
+                await self.db.execute(insert(JournalEntryLine), line_rows)
+                await self.cost_center_actuals.apply_entries(row["id"] for row in entry_rows)
+            await self._apply_invoice_allocations(allocations)
+            await self.open_items.sync(
+                invoice_ids=allocations,
+                payment_ids=[payment_id for payment_id, _ in prepared_refs]
+            )
+            await self.db.commit()
+
+        except Exception as e:
+            await self.db.rollback()
+            failed.extend((payment_id, payment_number, e) for payment_id, payment_number in prepared_refs)
+            logger.error(f"Failed to post block of {len(prepared_refs)} payments: {str(e)}")
+            return posted, failed
+
+        posted.extend(prepared_refs)
+
+        # Liberar el mapa de identidad entre bloques
+        self.db.expunge_all()
+        return posted, failed
+
+    def _collect_posting_errors(self, payment: Payment) -> List[str]:
         """Valida que un pago puede ser contabilizado"""
         errors = []
-        
+
         # Verificar estado del pago
         if payment.status != PaymentStatus.CONFIRMED:
             errors.append(f"Payment must be CONFIRMED to be posted (current: {payment.status})")
-        
+
         # Verificar que no esté ya contabilizado
         if payment.status == PaymentStatus.POSTED:
             errors.append("Payment is already posted")
-        
+
         # Verificar monto válido
         if payment.amount <= 0:
             errors.append("Payment amount must be greater than zero")
-        
+
         # Verificar cuenta contable
         if not payment.account_id:
             errors.append("Payment must have an account assigned")
-        
+
         # Verificar tercero
         if not payment.third_party_id:
             errors.append("Payment must have a third party assigned")
-        
+
         # Verificar fecha no muy antigua (advertencia convertida en error)
         if payment.payment_date < (datetime.now().date() - timedelta(days=365)):
             errors.append("Payment date is more than 1 year old")
-        
-        return errors
 
-    async def _post_single_payment(
-        self,
-        payment: Payment,
-        posted_by_id: uuid.UUID,
-        posting_notes: Optional[str] = None
-    ) -> None:
-        """Contabiliza un solo pago"""
-        try:
-            # Marcar como contabilizado
-            payment.status = PaymentStatus.POSTED
-            payment.posted_at = datetime.utcnow()
-            payment.posted_by_id = posted_by_id
-            if posting_notes:
-                payment.notes = f"{payment.notes or ''}\n[POSTING] {posting_notes}".strip()
-            
-            # Crear asiento contable si no existe
-            if not payment.journal_entry_id:
-                journal_entry = await self._create_payment_journal_entry(payment, posted_by_id)
-                payment.journal_entry_id = journal_entry.id
-            
-            await self.db.flush()
-            logger.info(f"Payment {payment.number} posted successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to post payment {payment.id}: {str(e)}")
-            raise
+        return errors
 
     async def _create_payment_journal_entry(
         self,
         payment: Payment,
         created_by_id: uuid.UUID
-    ) -> "JournalEntry":
+    ) -> JournalEntry:
         """
         Crear asiento contable para el pago siguiendo el patrón contable estándar
-        
+
         Lógica contable:
-        - Pago de cliente (CUSTOMER_PAYMENT): 
+        - Pago de cliente (CUSTOMER_PAYMENT):
           * DEBE: Cuenta bancaria/caja
           * HABER: Cuenta por cobrar cliente
         - Pago a proveedor (SUPPLIER_PAYMENT):
-          * DEBE: Cuenta por pagar proveedor  
+          * DEBE: Cuenta por pagar proveedor
           * HABER: Cuenta bancaria/caja
         """
-        from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus, JournalEntryType, TransactionOrigin
-        from app.models.journal import Journal
-        from datetime import timezone
-        
         try:
-            logger.info(f"Creating journal entry for payment {payment.number} (type: {payment.payment_type}, amount: {payment.amount})")
-            
-            # Obtener el journal
-            logger.debug(f"Loading journal {payment.journal_id} for payment {payment.number}")
-            stmt = select(Journal).where(Journal.id == payment.journal_id)
-            result = await self.db.execute(stmt)
-            journal = result.scalar_one_or_none()
-            
+            journal = await self.db.get(Journal, payment.journal_id) if payment.journal_id else None
             if not journal:
-                error_msg = f"Journal not found for payment"
-                logger.error(f"Payment {payment.number} - {error_msg} (journal_id: {payment.journal_id})")
-                raise BusinessRuleError(error_msg)
-            
-            logger.info(f"Payment {payment.number} - Using journal: {journal.name} (code: {journal.code})")
-            
-            # Generar número del asiento
-            logger.debug(f"Generating journal entry number for payment {payment.number}")
-            entry_number = await self._generate_journal_entry_number(journal)
-            logger.info(f"Payment {payment.number} - Generated journal entry number: {entry_number}")
-            
-            # Determinar origen de transacción
-            if payment.payment_type == PaymentType.CUSTOMER_PAYMENT:
-                transaction_origin = TransactionOrigin.COLLECTION
-            elif payment.payment_type == PaymentType.SUPPLIER_PAYMENT:
-                transaction_origin = TransactionOrigin.PAYMENT
-            else:
-                transaction_origin = TransactionOrigin.PAYMENT
-            
-            logger.debug(f"Payment {payment.number} - Transaction origin: {transaction_origin}")
-            
-            # Crear asiento principal
-            logger.debug(f"Creating main journal entry for payment {payment.number}")
-            journal_entry = JournalEntry(
-                number=entry_number,
-                entry_type=JournalEntryType.AUTOMATIC,
-                status=JournalEntryStatus.POSTED,
-                entry_date=datetime.combine(payment.payment_date, datetime.min.time()).replace(tzinfo=timezone.utc),
-                description=f"Payment {payment.number} - {payment.third_party.name if payment.third_party else 'Unknown'}",
-                reference=payment.reference or payment.number,
-                transaction_origin=transaction_origin,
-                journal_id=payment.journal_id,
-                created_by_id=created_by_id
-            )
-            
+                raise BusinessRuleError("Journal not found for payment")
+
+            sequences = await self._next_journal_entry_sequences([journal])
+            entry_number = f"{journal.code}{sequences[journal.id]:06d}"
+
+            journal_entry = self._new_payment_journal_entry(payment, entry_number, created_by_id)
             self.db.add(journal_entry)
             await self.db.flush()
-            
-            logger.info(f"Payment {payment.number} - Journal entry {entry_number} created, now creating lines")
-            
-            # Crear líneas del asiento
-            await self._create_journal_entry_lines_for_payment(journal_entry, payment)
-            
-            # Calcular totales del journal entry manualmente (async)
-            await self._calculate_journal_entry_totals(journal_entry)
-            
-            logger.info(f"Payment {payment.number} - Journal entry {entry_number} completed with totals calculated")
+
+            # Crear líneas del asiento y totales (sin recorrer journal_entry.lines, que no está cargada)
+            journal_lines = await self._create_journal_entry_lines_for_payment(journal_entry, payment)
+            journal_entry.total_debit = sum((line.debit_amount for line in journal_lines), Decimal('0'))
+            journal_entry.total_credit = sum((line.credit_amount for line in journal_lines), Decimal('0'))
+            await self.db.flush()
+            await self.cost_center_actuals.apply_entries([journal_entry.id])
+
+            logger.debug(f"Payment {payment.number} - Journal entry {entry_number} created")
             return journal_entry
-            
+
         except Exception as e:
             logger.error(f"Error creating journal entry for payment {payment.number}: {str(e)}")
             raise
 
-    async def _generate_journal_entry_number(self, journal: "Journal") -> str:
-        """Generar número secuencial para el asiento contable"""
-        # Obtener el último número del journal
-        from app.models.journal_entry import JournalEntry
-        
-        stmt = select(func.max(JournalEntry.number)).where(
-            JournalEntry.journal_id == journal.id,
-            JournalEntry.number.like(f"{journal.code}%")
-        )
-        result = await self.db.execute(stmt)
-        last_number = result.scalar()
-        
-        if last_number:
-            # Extraer el número secuencial
-            try:
-                sequence_part = last_number.replace(journal.code, "").lstrip("0")
-                next_sequence = int(sequence_part) + 1 if sequence_part else 1
-            except ValueError:
-                next_sequence = 1
+    def _new_payment_journal_entry(
+        self,
+        payment: Payment,
+        entry_number: str,
+        created_by_id: uuid.UUID
+    ) -> JournalEntry:
+        """Asiento principal (transitorio) del pago, sin líneas"""
+        if payment.payment_type == PaymentType.CUSTOMER_PAYMENT:
+            transaction_origin = TransactionOrigin.COLLECTION
         else:
-            next_sequence = 1
-        
-        return f"{journal.code}{next_sequence:06d}"
+            transaction_origin = TransactionOrigin.PAYMENT
+
+        return JournalEntry(
+            number=entry_number,
+            entry_type=JournalEntryType.AUTOMATIC,
+            status=JournalEntryStatus.POSTED,
+            entry_date=datetime.combine(payment.payment_date, datetime.min.time()).replace(tzinfo=timezone.utc),
+            description=f"Payment {payment.number} - {payment.third_party.name if payment.third_party else 'Unknown'}",
+            reference=payment.reference or payment.number,
+            transaction_origin=transaction_origin,
+            journal_id=payment.journal_id,
+            created_by_id=created_by_id
+        )
+
+    async def _next_journal_entry_sequences(self, journals: List[Journal]) -> Dict[uuid.UUID, int]:
+        """
+        Siguiente secuencia de asiento de cada diario, con una consulta agrupada.
+        Los números tienen formato <código><secuencia>; se compara la secuencia
+        como número (como texto "BNK999999" quedaría por encima de "BNK1000000").
+        """
+        if not journals:
+            return {}
+
+        sequence_part = func.substr(JournalEntry.number, func.length(Journal.code) + 1)
+        result = await self.db.execute(
+            select(JournalEntry.journal_id, func.max(cast(sequence_part, BigInteger)))
+            .join(Journal, Journal.id == JournalEntry.journal_id)
+            .where(
+                JournalEntry.journal_id.in_([journal.id for journal in journals]),
+                JournalEntry.number.like(Journal.code + '%'),
+                sequence_part.regexp_match('^[0-9]+$')
+            )
+            .group_by(JournalEntry.journal_id)
+        )
+        last_sequences = dict(result.all())
+        return {
+            journal.id: (last_sequences.get(journal.id) or 0) + 1
+            for journal in journals
+        }
 
     async def _create_journal_entry_lines_for_payment(
         self,
-        journal_entry: "JournalEntry",
+        journal_entry: JournalEntry,
         payment: Payment
-    ) -> None:
+    ) -> List[JournalEntryLine]:
         """Crear las líneas del asiento contable para el pago"""
-        from app.models.journal_entry import JournalEntryLine
-        
-        logger.info(f"📝 [JOURNAL_LINES] Creating journal entry lines for payment {payment.number} (type: {payment.payment_type})")
-        
-        line_counter = 1
-        
+        snapshot = await company_settings_cache.get_snapshot(self.db)
+        journal_lines = self._build_payment_journal_lines(journal_entry.id, payment, snapshot)
+        self.db.add_all(journal_lines)
+        return journal_lines
+
+    def _build_payment_journal_lines(
+        self,
+        journal_entry_id: uuid.UUID,
+        payment: Payment,
+        snapshot: CompanySettingsSnapshot
+    ) -> List[JournalEntryLine]:
+        """
+        Construye en memoria las líneas del asiento del pago. Las cuentas se
+        resuelven sobre la foto de configuración, sin consultas.
+        """
+        third_party_name = payment.third_party.name if payment.third_party else None
+
         if payment.payment_type == PaymentType.CUSTOMER_PAYMENT:
-            # Pago de cliente: entrada de dinero
-            logger.info(f"💰 [JOURNAL_LINES] Creating CUSTOMER_PAYMENT lines for {payment.number}")
-            
-            # 1. DEBE: Cuenta bancaria/caja (entrada de dinero)
-            logger.debug(f"📝 [JOURNAL_LINES] Line 1 - DEBIT: Bank account {payment.account.code} - {payment.account.name}")
-            bank_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=payment.account_id,
-                third_party_id=payment.third_party_id,
-                debit_amount=payment.amount,
-                credit_amount=Decimal('0'),
-                description=f"Payment received from {payment.third_party.name if payment.third_party else 'customer'}",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(bank_line)
-            line_counter += 1
-            
-            # 2. HABER: Cuenta por cobrar
-            receivable_account = await self._get_customer_receivable_account(payment)
-            logger.debug(f"📝 [JOURNAL_LINES] Line 2 - CREDIT: Receivable account {receivable_account.code} - {receivable_account.name}")
-            credit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=receivable_account.id,
-                third_party_id=payment.third_party_id,
-                debit_amount=Decimal('0'),
-                credit_amount=payment.amount,
-                description=f"Payment application to customer receivables",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(credit_line)
-            
+            # Pago de cliente: DEBE banco/caja, HABER cuenta por cobrar
+            receivable_account = self._resolve_customer_receivable_account(payment, snapshot)
+            postings = [
+                (payment.account_id, payment.third_party_id, True,
+                 f"Payment received from {third_party_name or 'customer'}"),
+                (receivable_account.id, payment.third_party_id, False,
+                 "Payment application to customer receivables"),
+            ]
+
         elif payment.payment_type == PaymentType.SUPPLIER_PAYMENT:
-            # Pago a proveedor: salida de dinero
-            logger.info(f"💸 [JOURNAL_LINES] Creating SUPPLIER_PAYMENT lines for {payment.number}")
-            
-            # 1. DEBE: Cuenta por pagar
-            payable_account = await self._get_supplier_payable_account(payment)
-            logger.debug(f"📝 [JOURNAL_LINES] Line 1 - DEBIT: Payable account {payable_account.code} - {payable_account.name}")
-            debit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=payable_account.id,
-                third_party_id=payment.third_party_id,
-                debit_amount=payment.amount,
-                credit_amount=Decimal('0'),
-                description=f"Payment to supplier payables",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(debit_line)
-            line_counter += 1
-            
-            # 2. HABER: Cuenta bancaria/caja (salida de dinero)
-            logger.debug(f"📝 [JOURNAL_LINES] Line 2 - CREDIT: Bank account {payment.account.code} - {payment.account.name}")
-            bank_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=payment.account_id,
-                third_party_id=payment.third_party_id,
-                debit_amount=Decimal('0'),
-                credit_amount=payment.amount,
-                description=f"Payment made to {payment.third_party.name if payment.third_party else 'supplier'}",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(bank_line)
+            # Pago a proveedor: DEBE cuenta por pagar, HABER banco/caja
+            payable_account = self._resolve_supplier_payable_account(payment, snapshot)
+            postings = [
+                (payable_account.id, payment.third_party_id, True,
+                 "Payment to supplier payables"),
+                (payment.account_id, payment.third_party_id, False,
+                 f"Payment made to {third_party_name or 'supplier'}"),
+            ]
         #todo:add falta comprobar
-            
+
         elif payment.payment_type == PaymentType.INTERNAL_TRANSFER:
-            # Transferencia interna: entre cuentas bancarias
-            logger.info(f"🔄 [JOURNAL_LINES] Creating INTERNAL_TRANSFER lines for {payment.number}")
-            
-            # Para transferencias internas usar cuenta de transferencias pendientes de la configuración
-            from app.models.company_settings import CompanySettings
-            from app.models.account import Account, AccountType
-            
-            stmt = select(CompanySettings).where(CompanySettings.is_active == True)
-            result = await self.db.execute(stmt)
-            company_settings = result.scalar_one_or_none()
-            
-            transfer_account = None
-            if company_settings and company_settings.internal_transfer_account_id:
-                stmt = select(Account).where(Account.id == company_settings.internal_transfer_account_id)
-                result = await self.db.execute(stmt)
-                transfer_account = result.scalar_one_or_none()
-            
-            if not transfer_account:
-                # Fallback: usar una cuenta de transferencias pendientes por tipo
-                from app.models.account import AccountType
-                stmt = select(Account).where(
-                    Account.account_type == AccountType.ASSET,
-                    Account.name.ilike('%transfer%'),
-                    Account.is_active == True
-                ).order_by(Account.code).limit(1)
-                result = await self.db.execute(stmt)
-                transfer_account = result.scalar_one_or_none()
-            
-            if not transfer_account:
-                raise BusinessRuleError("No transfer destination account configured for internal transfer")
-            
-            # 1. DEBE: Cuenta destino/transferencias pendientes
-            debit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=transfer_account.id,
-                debit_amount=payment.amount,
-                credit_amount=Decimal('0'),
-                description=f"Internal transfer - destination",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(debit_line)
-            line_counter += 1
-            
-            # 2. HABER: Cuenta origen (banco/caja del pago)
-            credit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=payment.account_id,
-                debit_amount=Decimal('0'),
-                credit_amount=payment.amount,
-                description=f"Internal transfer - origin",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(credit_line)
-            
+            # Transferencia interna: DEBE transferencias pendientes, HABER cuenta origen
+            transfer_account = self._resolve_transfer_account(snapshot)
+            postings = [
+                (transfer_account.id, None, True, "Internal transfer - destination"),
+                (payment.account_id, None, False, "Internal transfer - origin"),
+            ]
+
         else:
-            # Otros tipos de pago (ADVANCE_PAYMENT, REFUND)
-            logger.warning(f"⚠️ [JOURNAL_LINES] Payment type {payment.payment_type} needs specific accounting logic")
-            
-            # Por ahora, usar lógica simple: débito cuenta genérica, crédito banco
-            # DEBE: Cuenta de gastos varios o anticipos
-            from app.models.account import Account, AccountType
-            stmt = select(Account).where(
-                Account.account_type == AccountType.EXPENSE,
-                Account.is_active == True
-            ).order_by(Account.code).limit(1)
-            result = await self.db.execute(stmt)
-            expense_account = result.scalar_one_or_none()
-            
+            # Otros tipos de pago (ADVANCE_PAYMENT, REFUND): por ahora débito a la
+            # primera cuenta de gastos, crédito a banco/caja
+            expense_account = snapshot.first_account(AccountType.EXPENSE)
             if not expense_account:
                 raise BusinessRuleError(f"No expense account found for payment type {payment.payment_type}")
-            
-            # 1. DEBE: Cuenta de gastos/anticipos
-            debit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=expense_account.id,
-                third_party_id=payment.third_party_id,
-                debit_amount=payment.amount,
-                credit_amount=Decimal('0'),
-                description=f"Payment - {payment.payment_type.value}",
-                reference=payment.reference or payment.number
-            )
-            self.db.add(debit_line)
-            line_counter += 1
-            
-            # 2. HABER: Cuenta bancaria/caja
-            credit_line = JournalEntryLine(
-                journal_entry_id=journal_entry.id,
-                line_number=line_counter,
-                account_id=payment.account_id,
-                third_party_id=payment.third_party_id,
-                debit_amount=Decimal('0'),
-                credit_amount=payment.amount,
-                description=f"Payment - {payment.payment_type.value}",
-                reference=payment.reference or payment.number
+            description = f"Payment - {payment.payment_type.value}"
+            postings = [
+                (expense_account.id, payment.third_party_id, True, description),
+                (payment.account_id, payment.third_party_id, False, description),
+            ]
+
+        reference = payment.reference or payment.number
+        return [
+            JournalEntryLine(
+                journal_entry_id=journal_entry_id,
+                line_number=line_number,
+                account_id=account_id,
+                third_party_id=third_party_id,
+                debit_amount=payment.amount if is_debit else Decimal('0'),
+                credit_amount=Decimal('0') if is_debit else payment.amount,
+                description=description,
+                reference=reference
             )
-            self.db.add(credit_line)
-        logger.info(f"✅ [JOURNAL_LINES] Created {line_counter} journal entry lines for payment {payment.number}")
-        #hasta aqui
+            for line_number, (account_id, third_party_id, is_debit, description) in enumerate(postings, start=1)
+        ]
 
-    async def _get_customer_receivable_account(self, payment: Payment) -> "Account":
+    def _resolve_customer_receivable_account(
+        self,
+        payment: Payment,
+        snapshot: CompanySettingsSnapshot
+    ) -> AccountRef:
         """
         Obtener cuenta por cobrar del cliente usando jerarquía de búsqueda:
         1. Cuenta específica del tercero (cliente)
         2. Cuenta específica del diario
         3. Cuenta por defecto de la empresa
         4. Búsqueda por tipo/categoría (fallback)
+
+        La jerarquía se resuelve sobre la foto en memoria de la configuración.
         """
-        from app.models.account import Account, AccountType, AccountCategory
-        from app.models.journal import Journal
-        from app.models.company_settings import CompanySettings
-        
-        logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Getting receivable account for payment {payment.number}")
-        
-        # 1. Buscar cuenta específica del tercero
-        if payment.third_party and payment.third_party.receivable_account_id:
-            logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Third party has specific receivable account: {payment.third_party.receivable_account_id}")
-            stmt = select(Account).where(Account.id == payment.third_party.receivable_account_id)
-            result = await self.db.execute(stmt)
-            account = result.scalar_one_or_none()
-            if account and account.is_active:
-                logger.info(f"✅ [RECEIVABLE_ACCOUNT] Using third party specific account: {account.code} - {account.name}")
-                return account
-        
-        # 2. Buscar cuenta específica del diario
-        if payment.journal_id:
-            logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Checking journal specific receivable account")
-            stmt = select(Journal).where(Journal.id == payment.journal_id)
-            result = await self.db.execute(stmt)
-            journal = result.scalar_one_or_none()
-            
-            if journal and journal.customer_receivable_account_id:
-                logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Journal has specific receivable account: {journal.customer_receivable_account_id}")
-                stmt = select(Account).where(Account.id == journal.customer_receivable_account_id)
-                result = await self.db.execute(stmt)
-                account = result.scalar_one_or_none()
-                if account and account.is_active:
-                    logger.info(f"✅ [RECEIVABLE_ACCOUNT] Using journal specific account: {account.code} - {account.name}")
-                    return account
-        
-        # 3. Buscar cuenta por defecto de la empresa
-        logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Checking company default receivable account")
-        stmt = select(CompanySettings).where(CompanySettings.is_active == True)
-        result = await self.db.execute(stmt)
-        company_settings = result.scalar_one_or_none()
-        
-        if company_settings and company_settings.default_customer_receivable_account_id:
-            logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Company has default receivable account: {company_settings.default_customer_receivable_account_id}")
-            stmt = select(Account).where(Account.id == company_settings.default_customer_receivable_account_id)
-            result = await self.db.execute(stmt)
-            account = result.scalar_one_or_none()
-            if account and account.is_active:
-                logger.info(f"✅ [RECEIVABLE_ACCOUNT] Using company default account: {account.code} - {account.name}")
-                return account
-        
-        # 4. Fallback: Cuenta por defecto de activo corriente (cuentas por cobrar) - usar la primera
-        logger.debug(f"🔍 [RECEIVABLE_ACCOUNT] Using fallback search by type/category")
-        stmt = select(Account).where(
-            Account.account_type == AccountType.ASSET,
-            Account.category == AccountCategory.CURRENT_ASSET,
-            Account.is_active == True
-        ).order_by(Account.code).limit(1)
-        result = await self.db.execute(stmt)
-        account = result.scalar_one_or_none()
-        
+        account = snapshot.customer_receivable_account(
+            third_party_account_id=payment.third_party.receivable_account_id if payment.third_party else None,
+            journal_id=payment.journal_id
+        )
+
         if not account:
-            error_msg = "No receivable account found"
-            logger.error(f"❌ [RECEIVABLE_ACCOUNT] {error_msg}")
-            raise BusinessRuleError(error_msg)
-        
-        logger.info(f"✅ [RECEIVABLE_ACCOUNT] Using fallback account: {account.code} - {account.name}")
+            raise BusinessRuleError("No receivable account found")
         return account
 
-    async def _get_supplier_payable_account(self, payment: Payment) -> "Account":
+    def _resolve_supplier_payable_account(
+        self,
+        payment: Payment,
+        snapshot: CompanySettingsSnapshot
+    ) -> AccountRef:
         """
         Obtener cuenta por pagar del proveedor usando jerarquía de búsqueda:
         1. Cuenta específica del tercero (proveedor)
         2. Cuenta específica del diario
         3. Cuenta por defecto de la empresa
         4. Búsqueda por tipo/categoría (fallback)
+
+        La jerarquía se resuelve sobre la foto en memoria de la configuración.
         """
-        from app.models.account import Account, AccountType, AccountCategory
-        from app.models.journal import Journal
-        from app.models.company_settings import CompanySettings
-        
-        logger.debug(f"🔍 [PAYABLE_ACCOUNT] Getting payable account for payment {payment.number}")
-        
-        # 1. Buscar cuenta específica del tercero
-        if payment.third_party and payment.third_party.payable_account_id:
-            logger.debug(f"🔍 [PAYABLE_ACCOUNT] Third party has specific payable account: {payment.third_party.payable_account_id}")
-            stmt = select(Account).where(Account.id == payment.third_party.payable_account_id)
-            result = await self.db.execute(stmt)
-            account = result.scalar_one_or_none()
-            if account and account.is_active:
-                logger.info(f"✅ [PAYABLE_ACCOUNT] Using third party specific account: {account.code} - {account.name}")
-                return account
-        
-        # 2. Buscar cuenta específica del diario
-        if payment.journal_id:
-            logger.debug(f"🔍 [PAYABLE_ACCOUNT] Checking journal specific payable account")
-            stmt = select(Journal).where(Journal.id == payment.journal_id)
-            result = await self.db.execute(stmt)
-            journal = result.scalar_one_or_none()
-            
-            if journal and journal.supplier_payable_account_id:
-                logger.debug(f"🔍 [PAYABLE_ACCOUNT] Journal has specific payable account: {journal.supplier_payable_account_id}")
-                stmt = select(Account).where(Account.id == journal.supplier_payable_account_id)
-                result = await self.db.execute(stmt)
-                account = result.scalar_one_or_none()
-                if account and account.is_active:
-                    logger.info(f"✅ [PAYABLE_ACCOUNT] Using journal specific account: {account.code} - {account.name}")
-                    return account
-        
-        # 3. Buscar cuenta por defecto de la empresa
-        logger.debug(f"🔍 [PAYABLE_ACCOUNT] Checking company default payable account")
-        stmt = select(CompanySettings).where(CompanySettings.is_active == True)
-        result = await self.db.execute(stmt)
-        company_settings = result.scalar_one_or_none()
-        
-        if company_settings and company_settings.default_supplier_payable_account_id:
-            logger.debug(f"🔍 [PAYABLE_ACCOUNT] Company has default payable account: {company_settings.default_supplier_payable_account_id}")
-            stmt = select(Account).where(Account.id == company_settings.default_supplier_payable_account_id)
-            result = await self.db.execute(stmt)
-            account = result.scalar_one_or_none()
-            if account and account.is_active:
-                logger.info(f"✅ [PAYABLE_ACCOUNT] Using company default account: {account.code} - {account.name}")
-                return account
-        
-        # 4. Fallback: Cuenta por defecto de pasivo corriente (cuentas por pagar) - usar la primera
-        logger.debug(f"🔍 [PAYABLE_ACCOUNT] Using fallback search by type/category")
-        stmt = select(Account).where(
-            Account.account_type == AccountType.LIABILITY,
-            Account.category == AccountCategory.CURRENT_LIABILITY,
-            Account.is_active == True
-        ).order_by(Account.code).limit(1)
-        result = await self.db.execute(stmt)
-        account = result.scalar_one_or_none()
-        
+        account = snapshot.supplier_payable_account(
+            third_party_account_id=payment.third_party.payable_account_id if payment.third_party else None,
+            journal_id=payment.journal_id
+        )
+
         if not account:
-            error_msg = "No payable account found"
-            logger.error(f"❌ [PAYABLE_ACCOUNT] {error_msg}")
-            raise BusinessRuleError(error_msg)
-        
-        logger.info(f"✅ [PAYABLE_ACCOUNT] Using fallback account: {account.code} - {account.name}")
+            raise BusinessRuleError("No payable account found")
         return account
 
+    def _resolve_transfer_account(self, snapshot: CompanySettingsSnapshot) -> AccountRef:
+        """Cuenta de transferencias pendientes: la configurada o una de activo por nombre"""
+        transfer_account = snapshot.account(
+            snapshot.settings.internal_transfer_account_id if snapshot.settings else None
+        )
+
+        if not transfer_account:
+            # Fallback: usar una cuenta de transferencias pendientes por tipo
+            transfer_account = next(
+                (
+                    account for account in snapshot.accounts.values()
+                    if account.is_active
+                    and account.account_type == AccountType.ASSET
+                    and 'transfer' in account.name.lower()
+                ),
+                None
+            )
+
+        if not transfer_account:
+            raise BusinessRuleError("No transfer destination account configured for internal transfer")
+        return transfer_account
+
     async def _get_default_payment_journal(self, payment_type: PaymentType) -> uuid.UUID:
         """
         Determina el journal apropiado para el pago basado en:
@@ -1664,60 +1485,59 @@ class PaymentFlowService:
                 Journal.type.in_([JournalType.BANK, JournalType.CASH]),
                 Journal.is_active == True
             )
-        ).order_by(Journal.created_at)
-        
+        ).order_by(Journal.created_at, Journal.id).limit(1)
+
         result = await self.db.execute(stmt)
         journal = result.scalar_one_or_none()
-        
+
         if not journal:
             raise BusinessRuleError("No default payment journal found")
-        
+
         return journal.id
 
     async def _reconcile_payment_invoices(self, payment: Payment) -> None:
         """Reconcilia las facturas asignadas al pago"""
         if not payment.payment_invoices:
             return
-        
+
         for payment_invoice in payment.payment_invoices:
             invoice = payment_invoice.invoice
-            
+
             # Actualizar monto pendiente de la factura
             invoice.outstanding_amount -= payment_invoice.amount
-            
+
             # Actualizar estado de la factura
             if invoice.outstanding_amount <= 0:
                 invoice.status = InvoiceStatus.PAID
             elif invoice.outstanding_amount < invoice.total_amount:
                 invoice.status = InvoiceStatus.PARTIALLY_PAID
-            
+
             # Validar que no quede monto negativo
             if invoice.outstanding_amount < 0:
                 invoice.outstanding_amount = Decimal('0')
 
         await self.db.flush()
-    async def _calculate_journal_entry_totals(self, journal_entry: "JournalEntry") -> None:
-        """Calcula los totales de débito y crédito del asiento contable de forma asíncrona"""
-        from app.models.journal_entry import JournalEntryLine
-        from sqlalchemy import func
-        
-        # Calcular totales usando consulta asíncrona
-        stmt = select(
-            func.sum(JournalEntryLine.debit_amount).label('total_debit'),
-            func.sum(JournalEntryLine.credit_amount).label('total_credit')
-        ).where(JournalEntryLine.journal_entry_id == journal_entry.id)
-        
-        result = await self.db.execute(stmt)
-        totals = result.first()
-        
-        if totals:
-            journal_entry.total_debit = totals.total_debit or Decimal('0')
-            journal_entry.total_credit = totals.total_credit or Decimal('0')
-            logger.debug(f"📊 [JOURNAL_TOTALS] Journal entry {journal_entry.number} - Debit: {journal_entry.total_debit}, Credit: {journal_entry.total_credit}")
-        else:
-            journal_entry.total_debit = Decimal('0')
-            journal_entry.total_credit = Decimal('0')
-            logger.warning(f"⚠️ [JOURNAL_TOTALS] No lines found for journal entry {journal_entry.number}")
-        
-        # Guardar los totales calculados
-        await self.db.flush()
\ No newline at end of file
+
+    async def _apply_invoice_allocations(self, allocations: Dict[uuid.UUID, Decimal]) -> None:
+        """
+        Versión por conjuntos de ``_reconcile_payment_invoices`` para un lote:
+        descuenta de cada factura la suma de lo aplicado por los pagos del lote y
+        recalcula su estado en una sola sentencia UPDATE.
+        """
+        if not allocations:
+            return
+
+        remaining = Invoice.outstanding_amount - case(allocations, value=Invoice.id)
+        await self.db.execute(
+            update(Invoice)
+            .where(Invoice.id.in_(list(allocations)))
+            .values(
+                outstanding_amount=func.greatest(remaining, 0),
+                status=case(
+                    (remaining <= 0, literal(InvoiceStatus.PAID, Invoice.status.type)),
+                    (remaining < Invoice.total_amount, literal(InvoiceStatus.PARTIALLY_PAID, Invoice.status.type)),
+                    else_=Invoice.status
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
@@ -23,9 +23,13 @@ from app.schemas.payment import (
 from app.utils.exceptions import NotFoundError, ValidationError, BusinessRuleError
 from app.utils.logging import get_logger
 from app.utils.codes import generate_code
+from app.utils.pagination import KeysetPaginator, SortKey, estimate_total
 
 logger = get_logger(__name__)
 
+# Orden del listado paginado por cursor (el mismo del listado por página)
+PAYMENT_KEYSET = KeysetPaginator(SortKey(Payment.payment_date, descending=True))
+
 
 class PaymentService:
     """
@@ -179,9 +183,15 @@ class PaymentService:
         date_from: Optional[date] = None,
         date_to: Optional[date] = None,
         page: int = 1,
-        size: int = 50
+        size: int = 50,
+        cursor: Optional[str] = None
     ) -> PaymentListResponse:
-        """Obtener lista de pagos con filtros"""
+        """
+        Obtener lista de pagos con filtros.
+
+        Con ``cursor`` ("" para la primera página) pagina por clave en lugar de
+        ``page`` y el total es una estimación del planificador.
+        """
         # Build base query with filters
         conditions = []
         
@@ -202,6 +212,20 @@ class PaymentService:
         if conditions:
             base_query = base_query.where(and_(*conditions))
 
+        if cursor is not None:
+            payments_result = await self.db.execute(PAYMENT_KEYSET.apply(base_query, cursor, size))
+            payments = payments_result.scalars().all()
+            total = await estimate_total(self.db, base_query)
+            return PaymentListResponse(
+                data=[PaymentResponse.from_orm(p) for p in payments],
+                total=total,
+                page=1,
+                per_page=size,
+                pages=(total + size - 1) // size,
+                next_cursor=PAYMENT_KEYSET.next_cursor(payments, size),
+                total_is_estimate=True
+            )
+
         # Count total
         count_query = select(func.count(Payment.id))
         if conditions:
@@ -7,7 +7,9 @@ import uuid
 from datetime import datetime, date, timedelta
 from decimal import Decimal
 from typing import List, Dict, Tuple, Optional
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.models.invoice import Invoice
 from app.models.payment_terms import PaymentTerms, PaymentSchedule
@@ -25,10 +27,35 @@ class PaymentTermsProcessor:
     Maneja la división de importes en múltiples vencimientos según Odoo
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
     
-    def process_invoice_payment_terms(
+    async def _get_payment_terms(self, payment_terms_id: uuid.UUID, active_only: bool = False) -> Optional[PaymentTerms]:
+        """Obtiene condiciones de pago con sus cronogramas cargados"""
+        query = select(PaymentTerms).options(
+            selectinload(PaymentTerms.payment_schedules)
+        ).where(PaymentTerms.id == payment_terms_id)
+        if active_only:
+            query = query.where(PaymentTerms.is_active == True)
+        result = await self.db.execute(query)
+        return result.scalar_one_or_none()
+    
+    async def load_payment_terms(self, payment_terms_ids) -> Dict[uuid.UUID, PaymentTerms]:
+        """
+        Carga en una consulta las condiciones de pago indicadas con sus cronogramas,
+        para resolver los vencimientos de un lote de facturas en memoria
+        """
+        ids = {terms_id for terms_id in payment_terms_ids if terms_id}
+        if not ids:
+            return {}
+        result = await self.db.execute(
+            select(PaymentTerms).options(
+                selectinload(PaymentTerms.payment_schedules)
+            ).where(PaymentTerms.id.in_(ids))
+        )
+        return {terms.id: terms for terms in result.scalars().all()}
+    
+    async def process_invoice_payment_terms(
         self, 
         invoice: Invoice, 
         receivable_account: Account,
@@ -46,7 +73,23 @@ class PaymentTermsProcessor:
         Returns:
             Tuple con (lista_de_lineas_generadas, nuevo_contador_lineas)
         """
-        logger.info(f"Processing payment terms for invoice {invoice.number}")
+        payment_terms = None
+        if invoice.payment_terms_id:
+            payment_terms = await self._get_payment_terms(invoice.payment_terms_id)
+        return self.build_due_lines(invoice, payment_terms, receivable_account, line_counter)
+    
+    def build_due_lines(
+        self,
+        invoice: Invoice,
+        payment_terms: Optional[PaymentTerms],
+        receivable_account: Account,
+        line_counter: int
+    ) -> Tuple[List[JournalEntryLine], int]:
+        """
+        Genera en memoria las líneas de vencimiento de una factura con sus
+        condiciones de pago ya cargadas (``None`` si no tiene o no existen)
+        """
+        logger.debug(f"Processing payment terms for invoice {invoice.number}")
         
         # Si no hay condiciones de pago, generar una sola línea
         if not invoice.payment_terms_id:
@@ -54,11 +97,6 @@ class PaymentTermsProcessor:
                 invoice, receivable_account, line_counter
             )
         
-        # Obtener las condiciones de pago
-        payment_terms = self.db.query(PaymentTerms).filter(
-            PaymentTerms.id == invoice.payment_terms_id
-        ).first()
-        
         if not payment_terms:
             logger.warning(f"Payment terms {invoice.payment_terms_id} not found, creating single line")
             return self._create_single_due_line(
@@ -113,7 +151,7 @@ class PaymentTermsProcessor:
             line_number=line_counter
         )
         
-        logger.info(f"Created single due line for invoice {invoice.number}: {debit + credit}")
+        logger.debug(f"Created single due line for invoice {invoice.number}: {debit + credit}")
         return [line], line_counter + 1
     
     def _create_multiple_due_lines(
@@ -129,7 +167,7 @@ class PaymentTermsProcessor:
         due_lines = []
         base_date = invoice.invoice_date
         
-        logger.info(f"Creating {len(payment_terms.payment_schedules)} due lines for invoice {invoice.number}")
+        logger.debug(f"Creating {len(payment_terms.payment_schedules)} due lines for invoice {invoice.number}")
         
         for schedule in payment_terms.payment_schedules:
             # Calcular monto para este vencimiento
@@ -219,7 +257,7 @@ class PaymentTermsProcessor:
             else:
                 last_line.credit_amount += difference
     
-    def get_payment_schedule_preview(
+    async def get_payment_schedule_preview(
         self, 
         invoice_amount: Decimal,
         payment_terms_id: uuid.UUID,
@@ -236,9 +274,7 @@ class PaymentTermsProcessor:
               Returns:
             Lista con información de cada vencimiento
         """
-        payment_terms = self.db.query(PaymentTerms).filter(
-            PaymentTerms.id == payment_terms_id
-        ).first()
+        payment_terms = await self._get_payment_terms(payment_terms_id)
         
         if not payment_terms:
             raise ValidationError(f"Payment terms {payment_terms_id} not found")
@@ -274,7 +310,7 @@ class PaymentTermsProcessor:
         
         return preview
     
-    def validate_payment_terms_for_invoice(
+    async def validate_payment_terms_for_invoice(
         self, 
         payment_terms_id: uuid.UUID
     ) -> Tuple[bool, List[str]]:
@@ -286,10 +322,7 @@ class PaymentTermsProcessor:
         """
         errors = []
         
-        payment_terms = self.db.query(PaymentTerms).filter(
-            PaymentTerms.id == payment_terms_id,
-            PaymentTerms.is_active == True
-        ).first()
+        payment_terms = await self._get_payment_terms(payment_terms_id, active_only=True)
         
         if not payment_terms:
             errors.append("Payment terms not found or inactive")
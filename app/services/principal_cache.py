@@ -0,0 +1,93 @@
+"""
+Caché en memoria del usuario autenticado (principal) para ``get_current_user``.
+
+Guarda, por ID de usuario, los valores de columna que necesitan la
+autorización y los endpoints (id, rol, is_active, email...), sin el hash de la
+contraseña. Un acierto reconstruye un ``User`` transitorio sin tocar la base
+de datos, de modo que los usuarios activos no añaden consultas por petición.
+
+Es un LRU acotado con TTL corto. Las escrituras sobre el usuario o sus
+sesiones hechas desde este proceso lo invalidan de inmediato (ver
+``AuthService``); las de otros workers se recogen al vencer
+``AUTH_PRINCIPAL_CACHE_TTL_SECONDS``.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import inspect
+
+from app.core.settings import settings
+from app.models.user import User
+
+# Columnas que nunca se guardan en memoria
+_EXCLUDED_COLUMNS = frozenset({"hashed_password"})
+
+
+class PrincipalCache:
+    """LRU por proceso de usuarios autenticados con TTL"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else settings.AUTH_PRINCIPAL_CACHE_TTL_SECONDS
+        )
+        self.max_entries = (
+            max_entries if max_entries is not None
+            else settings.AUTH_PRINCIPAL_CACHE_MAX_ENTRIES
+        )
+        self._entries: "OrderedDict[uuid.UUID, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._generation = 0
+
+    @property
+    def generation(self) -> int:
+        """Contador de invalidaciones; capturarlo antes de leer el usuario de BD"""
+        return self._generation
+
+    def get(self, user_id: uuid.UUID) -> Optional[User]:
+        """Usuario transitorio con los valores en caché, o None si no está o venció"""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+
+        loaded_at, values = entry
+        if time.monotonic() - loaded_at >= self.ttl_seconds:
+            self._entries.pop(user_id, None)
+            return None
+
+        self._entries.move_to_end(user_id)
+        return User(**values)
+
+    def put(self, user: User, generation: Optional[int] = None) -> None:
+        """
+        Guarda el usuario leído de BD. Si desde ``generation`` hubo una
+        invalidación, el valor leído puede ser anterior a ella y se descarta.
+        """
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        if generation is not None and generation != self._generation:
+            return
+
+        state = inspect(user)
+        values = {
+            attr.key: state.dict[attr.key]
+            for attr in state.mapper.column_attrs
+            if attr.key in state.dict and attr.key not in _EXCLUDED_COLUMNS
+        }
+        self._entries[user.id] = (time.monotonic(), values)
+        self._entries.move_to_end(user.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: Optional[uuid.UUID] = None) -> None:
+        """Descarta un usuario (o todos si no se indica)"""
+        self._generation += 1
+        if user_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(user_id, None)
+
+
+# Instancia compartida por proceso
+principal_cache = PrincipalCache()
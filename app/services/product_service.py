@@ -1,40 +1,35 @@
 import uuid
 from decimal import Decimal
 from typing import Optional, List, Dict, Any
-from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from datetime import date, datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_, desc, asc, func
+from sqlalchemy.orm import joinedload
+from sqlalchemy import and_, desc, asc, func, select
 
-from app.models.product import Product, ProductStatus, ProductType, MeasurementUnit, TaxCategory
+from app.models.product import (
+    Product, ProductStatus, ProductType, MeasurementUnit, TaxCategory, StockMovement, StockMovementType
+)
 from app.models.journal_entry import JournalEntryLine
 from app.models.account import Account
 from app.schemas.product import (
     ProductCreate, ProductUpdate, ProductFilter, BulkProductOperation,
-    BulkProductOperationResult, ProductStats
+    BulkProductOperationResult, ProductStats, BulkStockAdjustment
 )
+from app.services.stats_builder import StatsQuery
+from app.services.stock_movement_service import StockDelta, StockMovementService
+from app.utils.search import PRODUCT_SEARCH
 from app.utils.exceptions import (
-    AccountingSystemException, ValidationError, DuplicateError
+    AccountingSystemException, ValidationError
 )
 
 
-import uuid
-from decimal import Decimal
-from typing import Optional, List, Dict, Any
-from datetime import datetime, timezone
-from sqlalchemy.orm import Session
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy import and_, or_, desc, asc, func
-
-from app.models.product import Product, ProductStatus, ProductType, MeasurementUnit, TaxCategory
-from app.models.journal_entry import JournalEntryLine
-from app.models.account import Account
-from app.schemas.product import (
-    ProductCreate, ProductUpdate, ProductFilter, BulkProductOperation,
-    BulkProductOperationResult, ProductStats
-)
-from app.utils.exceptions import (
-    AccountingSystemException, ValidationError
+# Cuentas contables del producto que muestran las vistas de detalle
+PRODUCT_ACCOUNT_OPTIONS = (
+    joinedload(Product.sales_account),
+    joinedload(Product.purchase_account),
+    joinedload(Product.inventory_account),
+    joinedload(Product.cogs_account),
 )
 
 
@@ -43,10 +38,11 @@ class ProductService:
     Servicio para gestión de productos y servicios
     """
     
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.stock_movements = StockMovementService(db)
 
-    def _generate_product_code(self, name: str, product_type: Optional[ProductType] = None) -> str:
+    async def _generate_product_code(self, name: str, product_type: Optional[ProductType] = None) -> str:
         """
         Genera un código único para el producto basado en el nombre y tipo
         
@@ -57,7 +53,7 @@ class ProductService:
         Returns:
             Código único generado
         """
-        from app.utils.codes import generate_product_code
+        from app.utils.codes import generate_product_code_async
         
         # Convertir ProductType enum a string para la función de códigos
         product_type_str = "product"  # valor por defecto
@@ -69,13 +65,22 @@ class ProductService:
             product_type_str = "product"
         
         # Usar la nueva función de generación de códigos mejorada
-        return generate_product_code(self.db, name, product_type_str)
+        return await generate_product_code_async(self.db, name, product_type_str)
 
-    def get_by_id(self, product_id: uuid.UUID) -> Optional[Product]:
-        """Obtiene un producto por ID"""
-        return self.db.query(Product).filter(Product.id == product_id).first()
+    async def get_by_id(self, product_id: uuid.UUID, load_accounts: bool = False) -> Optional[Product]:
+        """Obtiene un producto por ID (opcionalmente con sus cuentas contables cargadas)"""
+        query = select(Product).where(Product.id == product_id)
+        if load_accounts:
+            query = query.options(*PRODUCT_ACCOUNT_OPTIONS)
+        result = await self.db.execute(query)
+        return result.unique().scalar_one_or_none()
 
-    def create_product(self, product_data: ProductCreate, created_by_id: uuid.UUID) -> Product:
+    async def _exists(self, *conditions) -> bool:
+        """True si existe algún producto que cumpla las condiciones"""
+        result = await self.db.execute(select(Product.id).where(*conditions).limit(1))
+        return result.first() is not None
+
+    async def create_product(self, product_data: ProductCreate, created_by_id: uuid.UUID) -> Product:
         """
         Crea un nuevo producto
         
@@ -90,31 +95,28 @@ class ProductService:
             ValidationError: Si los datos no son válidos o ya existe un producto con el mismo nombre
         """
         # Verificar que no exista un producto con el mismo nombre (case-sensitive)
-        existing_name = self.db.query(Product).filter(Product.name == product_data.name).first()
-        if existing_name:
+        if await self._exists(Product.name == product_data.name):
             raise ValidationError(f"Ya existe un producto con nombre '{product_data.name}' (los nombres son case-sensitive)")
         
         # Verificar que no exista un producto con el mismo código de barras (si se especifica)
         if product_data.barcode:
-            existing_barcode = self.db.query(Product).filter(Product.barcode == product_data.barcode).first()
-            if existing_barcode:
+            if await self._exists(Product.barcode == product_data.barcode):
                 raise ValidationError(f"Ya existe un producto con código de barras '{product_data.barcode}'")
         
         # Verificar que no exista un producto con el mismo SKU (si se especifica)
         if product_data.sku:
-            existing_sku = self.db.query(Product).filter(Product.sku == product_data.sku).first()
-            if existing_sku:
+            if await self._exists(Product.sku == product_data.sku):
                 raise ValidationError(f"Ya existe un producto con SKU '{product_data.sku}'")
         
         # Validar cuentas contables si se especifican
-        self._validate_accounting_accounts(product_data)
+        await self._validate_accounting_accounts(product_data)
         
         # Crear diccionario con datos del producto
         product_dict = product_data.model_dump(exclude_unset=True)
         
         # Generar código automáticamente
         product_type = product_dict.get('product_type', ProductType.PRODUCT)
-        generated_code = self._generate_product_code(product_data.name, product_type)
+        generated_code = await self._generate_product_code(product_data.name, product_type)
         product_dict['code'] = generated_code
         
         # Aplicar valores por defecto
@@ -143,6 +145,12 @@ class ProductService:
         # Crear el producto
         product = Product(**product_dict)
         
+        # El stock inicial de productos inventariables entra por el libro de movimientos
+        initial_stock = Decimal("0")
+        if product.requires_inventory_control:
+            initial_stock = product.current_stock
+            product.current_stock = Decimal("0")
+        
         # Validar el producto
         errors = product.validate_product()
         if errors:
@@ -150,14 +158,19 @@ class ProductService:
         
         try:
             self.db.add(product)
-            self.db.commit()
-            self.db.refresh(product)
+            if initial_stock:
+                await self.db.flush()
+                await self.stock_movements.record([
+                    self._adjustment(product, initial_stock, reference="Stock inicial")
+                ])
+            await self.db.commit()
+            await self.db.refresh(product)
             return product
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise ValidationError(f"Error de integridad al crear producto: {str(e)}")
 
-    def update_product(self, product_id: uuid.UUID, product_data: ProductUpdate, 
+    async def update_product(self, product_id: uuid.UUID, product_data: ProductUpdate, 
                       updated_by_id: uuid.UUID) -> Product:
         """
         Actualiza un producto existente
@@ -173,39 +186,28 @@ class ProductService:
         Raises:
             ValidationError: Si el producto no existe o los datos no son válidos
         """
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         update_data = product_data.model_dump(exclude_unset=True)
+        new_stock = update_data.pop("current_stock", None)
           # Verificar códigos únicos solo si se están actualizando
         if "code" in update_data and update_data["code"] != product.code:
-            existing_code = self.db.query(Product).filter(
-                and_(Product.code == update_data["code"], Product.id != product_id)
-            ).first()
-            if existing_code:
+            if await self._exists(Product.code == update_data["code"], Product.id != product_id):
                 raise ValidationError(f"Ya existe un producto con código '{update_data['code']}'")
         
         # Verificar nombre único solo si se está actualizando (case-sensitive)
         if "name" in update_data and update_data["name"] != product.name:
-            existing_name = self.db.query(Product).filter(
-                and_(Product.name == update_data["name"], Product.id != product_id)
-            ).first()
-            if existing_name:
+            if await self._exists(Product.name == update_data["name"], Product.id != product_id):
                 raise ValidationError(f"Ya existe un producto con nombre '{update_data['name']}' (los nombres son case-sensitive)")
         
         if "barcode" in update_data and update_data["barcode"] and update_data["barcode"] != product.barcode:
-            existing_barcode = self.db.query(Product).filter(
-                and_(Product.barcode == update_data["barcode"], Product.id != product_id)
-            ).first()
-            if existing_barcode:
+            if await self._exists(Product.barcode == update_data["barcode"], Product.id != product_id):
                 raise ValidationError(f"Ya existe un producto con código de barras '{update_data['barcode']}'")
         
         if "sku" in update_data and update_data["sku"] and update_data["sku"] != product.sku:
-            existing_sku = self.db.query(Product).filter(
-                and_(Product.sku == update_data["sku"], Product.id != product_id)
-            ).first()
-            if existing_sku:
+            if await self._exists(Product.sku == update_data["sku"], Product.id != product_id):
                 raise ValidationError(f"Ya existe un producto con SKU '{update_data['sku']}'")
         
         # Validar cuentas contables si se están actualizando
@@ -213,7 +215,7 @@ class ProductService:
                                              "inventory_account_id", "cogs_account_id"]):
             # Crear un objeto temporal para validación
             temp_data = ProductUpdate(**{**product.__dict__, **update_data})
-            self._validate_accounting_accounts(temp_data)
+            await self._validate_accounting_accounts(temp_data)
         
         # Aplicar actualizaciones
         for field, value in update_data.items():
@@ -225,27 +227,43 @@ class ProductService:
             raise ValidationError(f"Error de validación: {'; '.join(errors)}")
         
         try:
-            self.db.commit()
-            self.db.refresh(product)
+            # Un cambio de stock se registra como ajuste en el libro de movimientos
+            if new_stock is not None:
+                if product.requires_inventory_control:
+                    await self.db.flush()
+                    difference = new_stock - (product.current_stock or Decimal("0"))
+                    if difference:
+                        await self.stock_movements.record([
+                            self._adjustment(product, difference, reference="Ajuste por edición")
+                        ])
+                else:
+                    product.current_stock = new_stock
+            await self.db.commit()
+            await self.db.refresh(product)
             return product
         except IntegrityError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise ValidationError(f"Error de integridad al actualizar producto: {str(e)}")
 
-    def get_product_by_code(self, code: str) -> Optional[Product]:
+    async def get_product_by_code(self, code: str) -> Optional[Product]:
         """Obtiene un producto por su código"""
-        return self.db.query(Product).filter(Product.code == code).first()
+        result = await self.db.execute(
+            select(Product).options(*PRODUCT_ACCOUNT_OPTIONS).where(Product.code == code)
+        )
+        return result.unique().scalar_one_or_none()
 
-    def get_active_products(self, limit: Optional[int] = None) -> List[Product]:
+    async def get_active_products(self, limit: Optional[int] = None) -> List[Product]:
         """Obtiene productos activos"""
-        query = self.db.query(Product).filter(Product.status == ProductStatus.ACTIVE)
+        query = select(Product).where(Product.status == ProductStatus.ACTIVE)
         if limit:
             query = query.limit(limit)
-        return query.all()
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
 
-    def search_products(self, search_term: str, limit: Optional[int] = 100) -> List[Product]:
+    async def search_products(self, search_term: str, limit: Optional[int] = 100) -> List[Product]:
         """
-        Busca productos por código, nombre o descripción
+        Busca productos por código, nombre, descripción, código de barras o SKU,
+        ordenados por relevancia (índice de trigramas)
         
         Args:
             search_term: Término de búsqueda
@@ -254,23 +272,11 @@ class ProductService:
         Returns:
             Lista de productos que coinciden con la búsqueda
         """
-        search_pattern = f"%{search_term}%"
-        query = self.db.query(Product).filter(
-            or_(
-                Product.code.ilike(search_pattern),
-                Product.name.ilike(search_pattern),
-                Product.description.ilike(search_pattern),
-                Product.barcode.ilike(search_pattern),
-                Product.sku.ilike(search_pattern)
-            )
-        )
-        
-        if limit:
-            query = query.limit(limit)
-            
-        return query.all()
+        query = PRODUCT_SEARCH.ranked(select(Product), search_term, limit)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
 
-    def filter_products(self, filters: ProductFilter, page: int = 1, 
+    async def filter_products(self, filters: ProductFilter, page: int = 1, 
                        size: int = 50) -> Dict[str, Any]:
         """
         Filtra productos según criterios especificados
@@ -283,42 +289,35 @@ class ProductService:
         Returns:
             Diccionario con productos filtrados y metadatos de paginación
         """
-        query = self.db.query(Product)
+        query = select(Product)
         
         # Aplicar filtros
         if filters.search:
-            search_pattern = f"%{filters.search}%"
-            query = query.filter(
-                or_(
-                    Product.code.ilike(search_pattern),
-                    Product.name.ilike(search_pattern),
-                    Product.description.ilike(search_pattern)
-                )
-            )
+            query = query.where(PRODUCT_SEARCH.condition(filters.search))
         
         if filters.product_type:
-            query = query.filter(Product.product_type == filters.product_type)
+            query = query.where(Product.product_type == filters.product_type)
         
         if filters.status:
-            query = query.filter(Product.status == filters.status)
+            query = query.where(Product.status == filters.status)
         
         if filters.category:
-            query = query.filter(Product.category.ilike(f"%{filters.category}%"))
+            query = query.where(Product.category.ilike(f"%{filters.category}%"))
         
         if filters.subcategory:
-            query = query.filter(Product.subcategory.ilike(f"%{filters.subcategory}%"))
+            query = query.where(Product.subcategory.ilike(f"%{filters.subcategory}%"))
         
         if filters.brand:
-            query = query.filter(Product.brand.ilike(f"%{filters.brand}%"))
+            query = query.where(Product.brand.ilike(f"%{filters.brand}%"))
         
         if filters.tax_category:
-            query = query.filter(Product.tax_category == filters.tax_category)
+            query = query.where(Product.tax_category == filters.tax_category)
         
         if filters.manage_inventory is not None:
-            query = query.filter(Product.manage_inventory == filters.manage_inventory)
+            query = query.where(Product.manage_inventory == filters.manage_inventory)
         
         if filters.low_stock:
-            query = query.filter(
+            query = query.where(
                 and_(
                     Product.manage_inventory == True,
                     Product.current_stock <= Product.min_stock
@@ -326,7 +325,7 @@ class ProductService:
             )
         
         if filters.needs_reorder:
-            query = query.filter(
+            query = query.where(
                 and_(
                     Product.manage_inventory == True,
                     Product.current_stock <= Product.reorder_point
@@ -334,17 +333,18 @@ class ProductService:
             )
         
         if filters.min_price:
-            query = query.filter(Product.sale_price >= filters.min_price)
+            query = query.where(Product.sale_price >= filters.min_price)
         
         if filters.max_price:
-            query = query.filter(Product.sale_price <= filters.max_price)
+            query = query.where(Product.sale_price <= filters.max_price)
         
         # Obtener total
-        total = query.count()
+        total = await self.db.scalar(select(func.count()).select_from(query.subquery())) or 0
         
         # Aplicar paginación
         offset = (page - 1) * size
-        products = query.offset(offset).limit(size).all()
+        result = await self.db.execute(query.offset(offset).limit(size))
+        products = list(result.scalars().all())
         
         # Calcular número de páginas
         pages = (total + size - 1) // size
@@ -357,40 +357,40 @@ class ProductService:
             "pages": pages
         }
 
-    def activate_product(self, product_id: uuid.UUID) -> Product:
+    async def activate_product(self, product_id: uuid.UUID) -> Product:
         """Activa un producto"""
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         product.activate()
-        self.db.commit()
-        self.db.refresh(product)
+        await self.db.commit()
+        await self.db.refresh(product)
         return product
 
-    def deactivate_product(self, product_id: uuid.UUID) -> Product:
+    async def deactivate_product(self, product_id: uuid.UUID) -> Product:
         """Desactiva un producto"""
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         product.deactivate()
-        self.db.commit()
-        self.db.refresh(product)
+        await self.db.commit()
+        await self.db.refresh(product)
         return product
 
-    def discontinue_product(self, product_id: uuid.UUID) -> Product:
+    async def discontinue_product(self, product_id: uuid.UUID) -> Product:
         """Descontinúa un producto"""
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         product.discontinue()
-        self.db.commit()
-        self.db.refresh(product)
+        await self.db.commit()
+        await self.db.refresh(product)
         return product
 
-    def update_stock(self, product_id: uuid.UUID, quantity: Decimal, 
+    async def update_stock(self, product_id: uuid.UUID, quantity: Decimal, 
                     operation: str = "add") -> Product:
         """
         Actualiza el stock de un producto
@@ -406,45 +406,112 @@ class ProductService:
         Raises:
             ValidationError: Si el producto no existe o la operación no es válida
         """
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         if not product.requires_inventory_control:
             raise ValidationError("El producto no maneja control de inventario")
         
-        success = product.update_stock(quantity, operation)
-        if not success:
-            if operation == "subtract":
-                raise ValidationError(f"Stock insuficiente. Stock actual: {product.current_stock}, cantidad solicitada: {quantity}")
-            else:
-                raise ValidationError("Error al actualizar stock")
+        if operation == "add":
+            signed_quantity = quantity
+        elif operation == "subtract":
+            signed_quantity = -quantity
+        else:
+            raise ValidationError("Error al actualizar stock")
         
-        self.db.commit()
-        self.db.refresh(product)
+        await self.stock_movements.record([self._adjustment(product, signed_quantity)])
+        await self.db.commit()
+        await self.db.refresh(product)
         return product
 
-    def get_low_stock_products(self) -> List[Product]:
+    async def bulk_update_stock(self, adjustment: BulkStockAdjustment) -> BulkProductOperationResult:
+        """
+        Ajusta el stock de varios productos en un único lote del libro de
+        movimientos (una actualización de productos y una inserción) y un commit.
+        Si algún ajuste deja stock negativo no se aplica ninguno.
+        
+        Args:
+            adjustment: Ajustes con cantidad con signo por producto
+            
+        Returns:
+            Resultado con los productos ajustados y los rechazados
+            
+        Raises:
+            ValidationError: Si algún ajuste deja stock negativo
+        """
+        product_ids = {item.product_id for item in adjustment.items}
+        result = await self.db.execute(select(Product).where(Product.id.in_(product_ids)))
+        products = {product.id: product for product in result.scalars().all()}
+        
+        deltas = []
+        successful_ids = []
+        errors = []
+        for item in adjustment.items:
+            product = products.get(item.product_id)
+            if not product:
+                errors.append({"id": str(item.product_id), "error": "Producto no encontrado"})
+            elif not product.requires_inventory_control:
+                errors.append({"id": str(item.product_id), "error": "El producto no maneja control de inventario"})
+            else:
+                deltas.append(self._adjustment(product, item.quantity, item.unit_cost, adjustment.reason))
+                successful_ids.append(item.product_id)
+        
+        if deltas:
+            await self.stock_movements.record(deltas)
+            await self.db.commit()
+        
+        return BulkProductOperationResult(
+            total_requested=len(adjustment.items),
+            total_processed=len(successful_ids),
+            total_errors=len(errors),
+            successful_ids=successful_ids,
+            errors=errors
+        )
+
+    async def get_stock_movements(self, product_id: uuid.UUID,
+                                  limit: Optional[int] = None) -> List[StockMovement]:
+        """Obtiene el historial del libro de inventario de un producto"""
+        return await self.stock_movements.get_movements(product_id, limit)
+
+    def _adjustment(self, product: Product, quantity: Decimal, unit_cost: Optional[Decimal] = None,
+                    reference: Optional[str] = None) -> StockDelta:
+        """Ajuste manual: las entradas al costo indicado o al precio de compra, las salidas al promedio"""
+        if quantity > 0 and unit_cost is None:
+            unit_cost = product.purchase_price or Decimal("0")
+        return StockDelta(
+            product_id=product.id,
+            quantity=quantity,
+            unit_cost=unit_cost if quantity > 0 else None,
+            movement_type=StockMovementType.ADJUSTMENT,
+            movement_date=date.today(),
+            reference=reference,
+            check_stock=True
+        )
+
+    async def get_low_stock_products(self) -> List[Product]:
         """Obtiene productos con stock bajo"""
-        return self.db.query(Product).filter(
+        result = await self.db.execute(select(Product).where(
             and_(
                 Product.manage_inventory == True,
                 Product.current_stock <= Product.min_stock,
                 Product.status == ProductStatus.ACTIVE
             )
-        ).all()
+        ).order_by(Product.name))
+        return list(result.scalars().all())
 
-    def get_products_need_reorder(self) -> List[Product]:
+    async def get_products_need_reorder(self) -> List[Product]:
         """Obtiene productos que necesitan reabastecimiento"""
-        return self.db.query(Product).filter(
+        result = await self.db.execute(select(Product).where(
             and_(
                 Product.manage_inventory == True,
                 Product.current_stock <= Product.reorder_point,
                 Product.status == ProductStatus.ACTIVE
             )
-        ).all()
+        ).order_by(Product.name))
+        return list(result.scalars().all())
 
-    def get_product_movements(self, product_id: uuid.UUID, 
+    async def get_product_movements(self, product_id: uuid.UUID, 
                             limit: Optional[int] = None) -> List[JournalEntryLine]:
         """
         Obtiene los movimientos contables de un producto
@@ -456,23 +523,22 @@ class ProductService:
         Returns:
             Lista de líneas de asientos contables relacionadas con el producto
         """
-        from sqlalchemy.orm import joinedload
-        
-        query = self.db.query(JournalEntryLine).options(
+        query = select(JournalEntryLine).options(
             joinedload(JournalEntryLine.journal_entry),
             joinedload(JournalEntryLine.account),
             joinedload(JournalEntryLine.product),
             joinedload(JournalEntryLine.third_party)
-        ).filter(
+        ).where(
             JournalEntryLine.product_id == product_id
         ).order_by(desc(JournalEntryLine.created_at))
         
         if limit:
             query = query.limit(limit)
-            
-        return query.all()
+        
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
 
-    def bulk_operation(self, operation_data: BulkProductOperation) -> BulkProductOperationResult:
+    async def bulk_operation(self, operation_data: BulkProductOperation) -> BulkProductOperationResult:
         """
         Ejecuta operaciones masivas en productos
         
@@ -488,11 +554,11 @@ class ProductService:
         for product_id in operation_data.product_ids:
             try:
                 if operation_data.operation == "activate":
-                    self.activate_product(product_id)
+                    await self.activate_product(product_id)
                 elif operation_data.operation == "deactivate":
-                    self.deactivate_product(product_id)
+                    await self.deactivate_product(product_id)
                 elif operation_data.operation == "discontinue":
-                    self.discontinue_product(product_id)
+                    await self.discontinue_product(product_id)
                 else:
                     errors.append({
                         "id": str(product_id),
@@ -516,81 +582,56 @@ class ProductService:
             errors=errors
         )
 
-    def get_product_stats(self) -> ProductStats:
+    async def get_product_stats(self) -> ProductStats:
         """
         Obtiene estadísticas generales de productos
         
         Returns:
             Estadísticas de productos
         """
-        # Contar productos por estado
-        total_products = self.db.query(Product).count()
-        active_products = self.db.query(Product).filter(Product.status == ProductStatus.ACTIVE).count()
-        inactive_products = self.db.query(Product).filter(Product.status == ProductStatus.INACTIVE).count()
-        discontinued_products = self.db.query(Product).filter(Product.status == ProductStatus.DISCONTINUED).count()
-        
-        # Productos con inventario
-        products_with_inventory = self.db.query(Product).filter(Product.manage_inventory == True).count()
-        
-        # Productos con stock bajo
-        low_stock_products = self.db.query(Product).filter(
-            and_(
+        stats = await (
+            StatsQuery(Product)
+            .count("total")
+            .count("active", Product.status == ProductStatus.ACTIVE)
+            .count("inactive", Product.status == ProductStatus.INACTIVE)
+            .count("discontinued", Product.status == ProductStatus.DISCONTINUED)
+            .count("with_inventory", Product.manage_inventory == True)
+            .count(
+                "low_stock",
                 Product.manage_inventory == True,
                 Product.current_stock <= Product.min_stock
             )
-        ).count()
-        
-        # Productos que necesitan reorden
-        products_need_reorder = self.db.query(Product).filter(
-            and_(
+            .count(
+                "need_reorder",
                 Product.manage_inventory == True,
                 Product.current_stock <= Product.reorder_point
             )
-        ).count()
-        
-        # Valor total del stock
-        total_stock_value = self.db.query(
-            func.sum(Product.current_stock * Product.purchase_price)
-        ).filter(
-            and_(
-                Product.manage_inventory == True,
-                Product.current_stock.isnot(None),
-                Product.purchase_price.isnot(None)
-            )
-        ).scalar() or Decimal('0')
-        
-        # Categorías
-        categories = self.db.query(
-            Product.category, func.count(Product.id)
-        ).filter(
-            Product.category.isnot(None)
-        ).group_by(Product.category).all()
-        
-        category_stats = [{"category": cat[0], "count": cat[1]} for cat in categories]
-        
-        # Marcas
-        brands = self.db.query(
-            Product.brand, func.count(Product.id)
-        ).filter(
-            Product.brand.isnot(None)
-        ).group_by(Product.brand).all()
-        
-        brand_stats = [{"brand": brand[0], "count": brand[1]} for brand in brands]
-        
+            .sum("stock_value", Product.inventory_value, Product.manage_inventory == True)
+            .count_by("categories", Product.category)
+            .count_by("brands", Product.brand)
+            .execute(self.db, cache_key="products")
+        )
+
         return ProductStats(
-            total_products=total_products,
-            active_products=active_products,
-            inactive_products=inactive_products,
-            discontinued_products=discontinued_products,
-            products_with_inventory=products_with_inventory,
-            low_stock_products=low_stock_products,
-            products_need_reorder=products_need_reorder,
-            total_stock_value=total_stock_value,
-            categories=category_stats,
-            brands=brand_stats
+            total_products=stats["total"],
+            active_products=stats["active"],
+            inactive_products=stats["inactive"],
+            discontinued_products=stats["discontinued"],
+            products_with_inventory=stats["with_inventory"],
+            low_stock_products=stats["low_stock"],
+            products_need_reorder=stats["need_reorder"],
+            total_stock_value=stats["stock_value"] or Decimal('0'),
+            categories=[
+                {"category": category, "count": count}
+                for category, count in stats["categories"].items()
+            ],
+            brands=[
+                {"brand": brand, "count": count}
+                for brand, count in stats["brands"].items()
+            ]
         )
 
-    def delete_product(self, product_id: uuid.UUID) -> bool:
+    async def delete_product(self, product_id: uuid.UUID) -> bool:
         """
         Elimina un producto (solo si no tiene movimientos contables)
         
@@ -603,23 +644,23 @@ class ProductService:
         Raises:
             ValidationError: Si el producto no existe o tiene movimientos contables
         """
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
         # Verificar que no tenga movimientos contables
-        movements = self.db.query(JournalEntryLine).filter(
-            JournalEntryLine.product_id == product_id
-        ).count()
+        movements = await self.db.scalar(
+            select(func.count(JournalEntryLine.id)).where(JournalEntryLine.product_id == product_id)
+        ) or 0
         
         if movements > 0:
             raise ValidationError("No se puede eliminar un producto que tiene movimientos contables asociados")
         
-        self.db.delete(product)
-        self.db.commit()
+        await self.db.delete(product)
+        await self.db.commit()
         return True
 
-    def _validate_accounting_accounts(self, product_data) -> None:
+    async def _validate_accounting_accounts(self, product_data) -> None:
         """
         Valida que las cuentas contables especificadas existan y sean válidas
         
@@ -639,32 +680,34 @@ class ProductService:
         for field, description in account_fields.items():
             account_id = getattr(product_data, field, None)
             if account_id:
-                account = self.db.query(Account).filter(Account.id == account_id).first()
+                account = await self.db.get(Account, account_id)
                 if not account:
                     raise ValidationError(f"La cuenta de {description} especificada no existe")
                 
                 if not account.can_receive_movements:
                     raise ValidationError(f"La cuenta de {description} no puede recibir movimientos")
 
-    def get_products_by_category(self, category: str) -> List[Product]:
+    async def get_products_by_category(self, category: str) -> List[Product]:
         """Obtiene productos por categoría"""
-        return self.db.query(Product).filter(
+        result = await self.db.execute(select(Product).where(
             and_(
                 Product.category.ilike(f"%{category}%"),
                 Product.status == ProductStatus.ACTIVE
             )
-        ).all()
+        ))
+        return list(result.scalars().all())
 
-    def get_products_by_brand(self, brand: str) -> List[Product]:
+    async def get_products_by_brand(self, brand: str) -> List[Product]:
         """Obtiene productos por marca"""
-        return self.db.query(Product).filter(
+        result = await self.db.execute(select(Product).where(
             and_(
                 Product.brand.ilike(f"%{brand}%"),
                 Product.status == ProductStatus.ACTIVE
             )
-        ).all()
+        ))
+        return list(result.scalars().all())
 
-    def validate_product_for_transaction(self, product_id: uuid.UUID, 
+    async def validate_product_for_transaction(self, product_id: uuid.UUID, 
                                        transaction_type: str) -> bool:
         """
         Valida que un producto pueda ser usado en una transacción específica
@@ -679,7 +722,7 @@ class ProductService:
         Raises:
             ValidationError: Si el producto no existe, no está activo o no tiene configuración contable adecuada
         """
-        product = self.get_by_id(product_id)
+        product = await self.get_by_id(product_id)
         if not product:
             raise ValidationError(f"Producto con ID {product_id} no encontrado")
         
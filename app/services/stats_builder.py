@@ -0,0 +1,171 @@
+"""
+Estadísticas de una tabla en una sola consulta.
+
+Los endpoints ``*_stats`` contaban cada indicador con su propio
+``SELECT count(*)``. ``StatsQuery`` recibe la lista declarativa de métricas de
+una tabla y las compila en un único SELECT: los conteos y sumas condicionales
+como agregados ``FILTER (WHERE ...)`` y los desgloses por columna como
+``GROUPING SETS``, de modo que la tabla se recorre una sola vez.
+
+El resultado puede guardarse en ``stats_cache`` (TTL corto, por proceso): el
+tablero principal pide todas las estadísticas a la vez y unos segundos de
+desfase son aceptables. Con ``STATS_CACHE_TTL_SECONDS = 0`` no se guarda nada.
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import Select, and_, func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.core.settings import settings
+
+
+def _filtered(aggregate: ColumnElement, conditions: Tuple[ColumnElement, ...]) -> ColumnElement:
+    """Agregado con ``FILTER (WHERE ...)`` si hay condiciones"""
+    if not conditions:
+        return aggregate
+    return aggregate.filter(and_(*conditions))
+
+
+class StatsQuery:
+    """Métricas declarativas de una tabla compiladas en una sola consulta"""
+
+    def __init__(self, source: Any):
+        self.source = source
+        self._metrics: Dict[str, ColumnElement] = {}
+        self._breakdowns: Dict[str, Tuple[ColumnElement, ColumnElement]] = {}
+        self._counts: set = set()
+
+    def count(self, name: str, *conditions: ColumnElement) -> "StatsQuery":
+        """Número de filas que cumplen las condiciones"""
+        self._metrics[name] = _filtered(func.count(), conditions)
+        self._counts.add(name)
+        return self
+
+    def sum(self, name: str, expression: ColumnElement, *conditions: ColumnElement) -> "StatsQuery":
+        """Suma de la expresión sobre las filas que cumplen las condiciones (None si no hay)"""
+        self._metrics[name] = _filtered(func.sum(expression), conditions)
+        return self
+
+    def value(self, name: str, expression: ColumnElement) -> "StatsQuery":
+        """Agregado o subconsulta escalar arbitraria (p. ej. sobre otra tabla)"""
+        self._metrics[name] = expression
+        return self
+
+    def count_by(self, name: str, column: ColumnElement, *conditions: ColumnElement) -> "StatsQuery":
+        """Conteo por valor de la columna (los valores nulos se omiten)"""
+        self._breakdowns[name] = (
+            column,
+            _filtered(func.count(), conditions + (column.is_not(None),))
+        )
+        return self
+
+    def statement(self) -> Select:
+        """SELECT único: métricas escalares y, si hay desgloses, GROUPING SETS"""
+        columns: List[ColumnElement] = [
+            expression.label(name) for name, expression in self._metrics.items()
+        ]
+        for index, (column, aggregate) in enumerate(self._breakdowns.values()):
+            columns.extend([
+                column.label(f"_key_{index}"),
+                func.grouping(column).label(f"_grouping_{index}"),
+                aggregate.label(f"_count_{index}"),
+            ])
+
+        query = select(*columns).select_from(self.source)
+        if self._breakdowns:
+            query = query.group_by(func.grouping_sets(
+                tuple_(),
+                *(tuple_(column) for column, _ in self._breakdowns.values())
+            ))
+        return query
+
+    async def execute(self, db: AsyncSession, cache_key: Optional[Hashable] = None) -> Dict[str, Any]:
+        """
+        Ejecuta la consulta y devuelve ``{métrica: valor}``; cada desglose es un
+        ``{valor de la columna: conteo}``. Con ``cache_key`` se usa ``stats_cache``.
+        """
+        if cache_key is not None:
+            cached = stats_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        result = await db.execute(self.statement())
+        stats = self._collect(result.mappings().all())
+
+        if cache_key is not None:
+            stats_cache.put(cache_key, stats)
+        return stats
+
+    def _collect(self, rows: List[Any]) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {name: None for name in self._metrics}
+        stats.update({name: {} for name in self._breakdowns})
+
+        for row in rows:
+            breakdown = next(
+                (
+                    index for index in range(len(self._breakdowns))
+                    if row[f"_grouping_{index}"] == 0
+                ),
+                None
+            )
+            if breakdown is None:
+                # Fila del conjunto vacío: totales de la tabla
+                stats.update({name: row[name] for name in self._metrics})
+                continue
+
+            name = list(self._breakdowns)[breakdown]
+            key = row[f"_key_{breakdown}"]
+            if key is not None and row[f"_count_{breakdown}"]:
+                stats[name][key] = row[f"_count_{breakdown}"]
+
+        for name in self._counts:
+            stats[name] = stats[name] or 0
+        return stats
+
+
+class StatsCache:
+    """Resultados de estadísticas por clave con TTL corto (LRU por proceso)"""
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None):
+        self.ttl_seconds = (
+            ttl_seconds if ttl_seconds is not None
+            else settings.STATS_CACHE_TTL_SECONDS
+        )
+        self.max_entries = (
+            max_entries if max_entries is not None
+            else settings.STATS_CACHE_MAX_ENTRIES
+        )
+        self._entries: "OrderedDict[Hashable, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        loaded_at, stats = entry
+        if time.monotonic() - loaded_at >= self.ttl_seconds:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return stats
+
+    def put(self, key: Hashable, stats: Dict[str, Any]) -> None:
+        if self.ttl_seconds <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic(), stats)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        """Descarta una clave (o todas si no se indica)"""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+
+# Instancia compartida por proceso
+stats_cache = StatsCache()
@@ -0,0 +1,377 @@
+"""
+Stock Movement Service: libro de movimientos de inventario.
+Registra las entradas y salidas (append-only) de los asientos contabilizados
+con líneas de producto y de los ajustes manuales, y mantiene en el producto el
+stock, el costo promedio ponderado y el valor del inventario de forma incremental.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import Boolean, Numeric, column, func, insert, or_, select, update, values
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.journal_entry import JournalEntry, JournalEntryLine, TransactionOrigin
+from app.models.product import Product, ProductType, StockMovement, StockMovementType
+from app.utils.exceptions import ValidationError
+
+_QUANTUM = Decimal('0.0001')
+
+
+class StockDelta(NamedTuple):
+    """Movimiento pendiente de registrar"""
+    product_id: uuid.UUID
+    quantity: Decimal  # Con signo: positiva entra, negativa sale
+    unit_cost: Optional[Decimal]  # None: al costo promedio vigente
+    movement_type: StockMovementType
+    movement_date: date
+    journal_entry_id: Optional[uuid.UUID] = None
+    journal_entry_line_id: Optional[uuid.UUID] = None
+    reference: Optional[str] = None
+    check_stock: bool = False  # Rechazar si deja el stock en negativo
+
+
+# (código, stock, costo promedio) de cada producto
+StockLevel = Tuple[str, Decimal, Decimal]
+
+
+def shortage_message(code: str, stock: Decimal, required: Decimal) -> str:
+    """Mensaje de stock insuficiente de un producto"""
+    return (
+        f"Stock insuficiente para producto {code}. "
+        f"Stock actual: {stock}, Cantidad requerida: {required}"
+    )
+
+
+def is_reservation(deltas: List[StockDelta]) -> bool:
+    """Si el lote solo tiene salidas al costo promedio (no cambian el promedio)"""
+    return all(delta.quantity < 0 and delta.unit_cost is None for delta in deltas)
+
+
+def line_direction(origin: Optional[TransactionOrigin], debit_amount: Decimal) -> int:
+    """
+    Sentido de una línea de producto: las ventas sacan y las compras meten
+    stock; en el resto de asientos el debe es entrada y el haber salida
+    """
+    if origin == TransactionOrigin.SALE:
+        return -1
+    if origin == TransactionOrigin.PURCHASE:
+        return 1
+    return 1 if debit_amount and debit_amount > 0 else -1
+
+
+def valuate_movements(
+    levels: Dict[uuid.UUID, StockLevel],
+    deltas: List[StockDelta]
+) -> Tuple[List[dict], List[str]]:
+    """
+    Aplica en orden los movimientos sobre los niveles (que actualiza) y
+    devuelve las filas del libro y los faltantes de stock.
+
+    Las entradas recalculan el promedio ponderado con el stock positivo
+    previo; las salidas sin costo usan el promedio vigente y no lo cambian.
+    Una salida con costo propio (compensación de una entrada) retira ese
+    valor, de modo que anular una compra restaura el promedio anterior.
+    """
+    rows: List[dict] = []
+    shortages: List[str] = []
+    for delta in deltas:
+        code, stock, average = levels[delta.product_id]
+        unit_cost = average if delta.unit_cost is None else delta.unit_cost
+        new_stock = stock + delta.quantity
+
+        if delta.check_stock and delta.quantity < 0 and new_stock < 0:
+            shortages.append(shortage_message(code, stock, -delta.quantity))
+        if delta.quantity > 0:
+            base = max(stock, Decimal('0'))
+            average = (base * average + delta.quantity * unit_cost) / (base + delta.quantity)
+        elif delta.unit_cost is not None and new_stock > 0:
+            average = (stock * average + delta.quantity * unit_cost) / new_stock
+        average = max(average, Decimal('0')).quantize(_QUANTUM)
+
+        levels[delta.product_id] = (code, new_stock, average)
+        rows.append({
+            'product_id': delta.product_id,
+            'movement_type': delta.movement_type,
+            'movement_date': delta.movement_date,
+            'journal_entry_id': delta.journal_entry_id,
+            'journal_entry_line_id': delta.journal_entry_line_id,
+            'quantity': delta.quantity,
+            'unit_cost': unit_cost,
+            'total_cost': (delta.quantity * unit_cost).quantize(_QUANTUM),
+            'balance_quantity': new_stock,
+            'average_cost': average,
+            'reference': delta.reference
+        })
+    return rows, shortages
+
+
+class StockMovementService:
+    """Servicio del libro de movimientos de inventario"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def apply_entries(self, entry_ids: Iterable[uuid.UUID], sign: int = 1) -> None:
+        """
+        Registrar los movimientos de asientos que pasan a contabilizados
+        (sign=1) o compensar los ya registrados de asientos que se anulan,
+        vuelven a borrador o se eliminan (sign=-1). Las líneas deben estar ya
+        en la base; corre dentro de la transacción del llamador.
+        """
+        entry_ids = list(dict.fromkeys(entry_ids))
+        if not entry_ids:
+            return
+        if sign > 0:
+            deltas = await self._entry_deltas(entry_ids)
+        else:
+            deltas = await self._compensation_deltas(entry_ids)
+        await self.record(deltas)
+
+    async def record(self, deltas: List[StockDelta]) -> Dict[uuid.UUID, StockLevel]:
+        """
+        Registrar movimientos y actualizar stock, costo promedio y valor de los
+        productos. Los lotes de solo salidas (ventas) reservan el stock con un
+        UPDATE condicional; el resto se valora con los productos bloqueados.
+        Devuelve los niveles resultantes.
+
+        Raises:
+            ValidationError: Si algún movimiento controlado deja stock negativo
+        """
+        if not deltas:
+            return {}
+        if is_reservation(deltas):
+            return await self._record_reserved(deltas)
+        return await self._record_locked(deltas)
+
+    async def _record_reserved(self, deltas: List[StockDelta]) -> Dict[uuid.UUID, StockLevel]:
+        """
+        Reserva atómica: un único UPDATE ... FROM (VALUES ...) RETURNING resta
+        la cantidad total de cada producto solo si alcanza el stock, así dos
+        contabilizaciones concurrentes no pueden vender la misma unidad (la
+        segunda reevalúa la condición sobre la fila ya actualizada). Los
+        productos se bloquean en orden de id dentro de la misma sentencia para
+        que los lotes con varios productos no se bloqueen mutuamente.
+
+        Si algún producto no alcanza, se devuelven los ya descontados antes de
+        fallar, de modo que el lote no deja cambios aunque el llamador continúe.
+        """
+        totals: Dict[uuid.UUID, Decimal] = {}
+        checked = set()
+        for delta in deltas:
+            totals[delta.product_id] = totals.get(delta.product_id, Decimal('0')) + delta.quantity
+            if delta.check_stock:
+                checked.add(delta.product_id)
+        product_ids = sorted(totals)
+
+        reservations = self._quantities(
+            (product_id, totals[product_id], product_id in checked) for product_id in product_ids
+        )
+        locked = (
+            select(Product.id)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update(key_share=True)
+            .cte('locked_products')
+        )
+        new_stock = Product.current_stock + reservations.c.quantity
+        result = await self.db.execute(
+            update(Product)
+            .where(
+                Product.id == reservations.c.product_id,
+                Product.id == locked.c.id,
+                or_(~reservations.c.check_stock, new_stock >= 0)
+            )
+            .values(current_stock=new_stock, inventory_value=new_stock * Product.average_cost)
+            .returning(Product.id, Product.current_stock, Product.average_cost)
+            .execution_options(synchronize_session=False)
+        )
+        reserved = {product_id: (stock, average) for product_id, stock, average in result.all()}
+
+        failed = [product_id for product_id in product_ids if product_id not in reserved]
+        if failed:
+            await self._release(
+                (product_id, -totals[product_id], False) for product_id in reserved
+            )
+            result = await self.db.execute(
+                select(Product.id, Product.code, Product.current_stock).where(Product.id.in_(failed))
+            )
+            found = {product_id: (code, stock) for product_id, code, stock in result.all()}
+            raise ValidationError("; ".join(
+                shortage_message(found[product_id][0] or "", found[product_id][1], -totals[product_id])
+                if product_id in found else f"Producto con ID {product_id} no encontrado"
+                for product_id in failed
+            ))
+
+        # Niveles previos al lote: las filas del libro se valoran sobre ellos
+        levels = {
+            product_id: ("", stock - totals[product_id], average)
+            for product_id, (stock, average) in reserved.items()
+        }
+        rows, _ = valuate_movements(dict(levels), deltas)
+        await self.db.execute(insert(StockMovement), rows)
+        return {
+            product_id: ("", stock, average)
+            for product_id, (stock, average) in reserved.items()
+        }
+
+    async def _release(self, quantities: Iterable[Tuple[uuid.UUID, Decimal, bool]]) -> None:
+        """Deshacer una reserva parcial sumando de nuevo las cantidades"""
+        quantities = list(quantities)
+        if not quantities:
+            return
+        released = self._quantities(quantities)
+        new_stock = Product.current_stock + released.c.quantity
+        await self.db.execute(
+            update(Product)
+            .where(Product.id == released.c.product_id)
+            .values(current_stock=new_stock, inventory_value=new_stock * Product.average_cost)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _quantities(rows: Iterable[Tuple[uuid.UUID, Decimal, bool]]):
+        """Tabla VALUES (producto, cantidad con signo, controlar stock)"""
+        return values(
+            column('product_id', UUID(as_uuid=True)),
+            column('quantity', Numeric(15, 4)),
+            column('check_stock', Boolean),
+            name='stock_quantities'
+        ).data(list(rows))
+
+    async def _record_locked(self, deltas: List[StockDelta]) -> Dict[uuid.UUID, StockLevel]:
+        """
+        Lotes con entradas: bloquea los productos (en orden de id, FOR NO KEY
+        UPDATE para no frenar las líneas que solo los referencian), valora en
+        memoria el promedio ponderado, actualiza todos los productos en una
+        sentencia e inserta el libro en otra.
+        """
+        product_ids = sorted({delta.product_id for delta in deltas})
+        result = await self.db.execute(
+            select(Product.id, Product.code, Product.current_stock, Product.average_cost)
+            .where(Product.id.in_(product_ids))
+            .order_by(Product.id)
+            .with_for_update(key_share=True)
+        )
+        levels = {
+            product_id: (code or "", stock or Decimal('0'), average or Decimal('0'))
+            for product_id, code, stock, average in result.all()
+        }
+        missing = [product_id for product_id in product_ids if product_id not in levels]
+        if missing:
+            raise ValidationError(f"Producto con ID {missing[0]} no encontrado")
+
+        rows, shortages = valuate_movements(levels, deltas)
+        if shortages:
+            raise ValidationError("; ".join(shortages))
+
+        await self.db.execute(
+            update(Product),
+            [
+                {
+                    'id': product_id,
+                    'current_stock': stock,
+                    'average_cost': average,
+                    'inventory_value': (stock * average).quantize(_QUANTUM)
+                }
+                for product_id, (_, stock, average) in levels.items()
+            ]
+        )
+        await self.db.execute(insert(StockMovement), rows)
+        return levels
+
+    async def get_movements(self, product_id: uuid.UUID, limit: Optional[int] = None) -> List[StockMovement]:
+        """Historial de movimientos de un producto, del más reciente al más antiguo"""
+        query = (
+            select(StockMovement)
+            .where(StockMovement.product_id == product_id)
+            .order_by(StockMovement.created_at.desc(), StockMovement.id.desc())
+        )
+        if limit:
+            query = query.limit(limit)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+
+    async def _entry_deltas(self, entry_ids: List[uuid.UUID]) -> List[StockDelta]:
+        """Movimientos de las líneas de producto con cantidad de productos inventariables"""
+        result = await self.db.execute(
+            select(
+                JournalEntryLine.id,
+                JournalEntryLine.journal_entry_id,
+                JournalEntryLine.product_id,
+                JournalEntryLine.quantity,
+                JournalEntryLine.unit_price,
+                JournalEntryLine.debit_amount,
+                JournalEntry.transaction_origin,
+                JournalEntry.entry_date,
+                JournalEntry.number,
+                Product.purchase_price
+            )
+            .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
+            .join(Product, JournalEntryLine.product_id == Product.id)
+            .where(
+                JournalEntryLine.journal_entry_id.in_(entry_ids),
+                JournalEntryLine.quantity > 0,
+                Product.manage_inventory == True,
+                Product.product_type != ProductType.SERVICE
+            )
+            .order_by(JournalEntry.entry_date, JournalEntry.number, JournalEntryLine.line_number)
+        )
+
+        deltas = []
+        for line_id, entry_id, product_id, quantity, unit_price, debit, origin, entry_date, number, purchase_price in result.all():
+            direction = line_direction(origin, debit)
+            deltas.append(StockDelta(
+                product_id=product_id,
+                quantity=quantity * direction,
+                # Las entradas se valoran al precio de la línea; las salidas al promedio
+                unit_cost=(unit_price or purchase_price or Decimal('0')) if direction > 0 else None,
+                movement_type=StockMovementType.IN if direction > 0 else StockMovementType.OUT,
+                movement_date=entry_date.date() if hasattr(entry_date, 'date') else entry_date,
+                journal_entry_id=entry_id,
+                journal_entry_line_id=line_id,
+                reference=number,
+                check_stock=origin == TransactionOrigin.SALE
+            ))
+        return deltas
+
+    async def _compensation_deltas(self, entry_ids: List[uuid.UUID]) -> List[StockDelta]:
+        """Contrapartida del saldo neto que el libro tiene registrado por línea"""
+        quantity = func.sum(StockMovement.quantity)
+        result = await self.db.execute(
+            select(
+                StockMovement.product_id,
+                StockMovement.journal_entry_id,
+                StockMovement.journal_entry_line_id,
+                quantity,
+                func.sum(StockMovement.total_cost),
+                JournalEntry.number
+            )
+            .join(JournalEntry, StockMovement.journal_entry_id == JournalEntry.id)
+            .where(StockMovement.journal_entry_id.in_(entry_ids))
+            .group_by(
+                StockMovement.product_id,
+                StockMovement.journal_entry_id,
+                StockMovement.journal_entry_line_id,
+                JournalEntry.number
+            )
+            .having(quantity != 0)
+            .order_by(JournalEntry.number)
+        )
+
+        today = date.today()
+        return [
+            StockDelta(
+                product_id=product_id,
+                quantity=-net_quantity,
+                unit_cost=(net_cost / net_quantity).quantize(_QUANTUM),
+                movement_type=StockMovementType.REVERSAL,
+                movement_date=today,
+                journal_entry_id=entry_id,
+                journal_entry_line_id=line_id,
+                reference=number
+            )
+            for product_id, entry_id, line_id, net_quantity, net_cost, number in result.all()
+        ]
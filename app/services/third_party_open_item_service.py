@@ -0,0 +1,320 @@
+"""
+Third Party Open Item Service: partidas abiertas por cobrar y por pagar.
+Mantiene third_party_open_items y sus totales por tercero sincronizados con
+facturas y pagos, y sirve el análisis de antigüedad y el crédito disponible.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal, InvalidOperation
+from typing import Iterable, List, Optional, Set
+
+from sqlalchemy import and_, case, delete, func, literal, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.invoice import Invoice, InvoiceStatus, InvoiceType
+from app.models.payment import Payment, PaymentInvoice, PaymentStatus, PaymentType
+from app.models.third_party import (
+    OpenItemType, ThirdParty, ThirdPartyOpenBalance, ThirdPartyOpenItem, ThirdPartyType
+)
+from app.schemas.third_party import ThirdPartyAging
+
+# Estados en los que una factura o un pago tiene efecto contable
+OPEN_INVOICE_STATUSES = [
+    InvoiceStatus.POSTED, InvoiceStatus.PARTIALLY_PAID, InvoiceStatus.OVERDUE, InvoiceStatus.PAID
+]
+OPEN_PAYMENT_STATUSES = [PaymentStatus.POSTED, PaymentStatus.RECONCILED]
+
+_INVOICE_ITEM_COLUMNS = [
+    'id', 'third_party_id', 'item_type', 'invoice_id', 'document_number',
+    'document_date', 'due_date', 'residual_amount', 'created_at', 'updated_at'
+]
+_PAYMENT_ITEM_COLUMNS = [
+    'id', 'third_party_id', 'item_type', 'payment_id', 'document_number',
+    'document_date', 'due_date', 'residual_amount', 'created_at', 'updated_at'
+]
+
+
+def _item_type(value: OpenItemType):
+    return literal(value, ThirdPartyOpenItem.item_type.type)
+
+
+def parse_credit_limit(value: Optional[str]) -> Optional[Decimal]:
+    """Límite de crédito del tercero (se guarda como texto) o None si no es válido"""
+    if not value:
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+
+
+class ThirdPartyOpenItemService:
+    """Servicio para partidas abiertas de terceros"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _invoice_items_query(self, invoice_ids: Optional[List[uuid.UUID]] = None):
+        """Facturas contabilizadas con saldo pendiente (las notas de crédito restan)"""
+        sign = case((Invoice.invoice_type == InvoiceType.CREDIT_NOTE, -1), else_=1)
+        query = select(
+            func.gen_random_uuid(),
+            Invoice.third_party_id,
+            case(
+                (Invoice.invoice_type == InvoiceType.SUPPLIER_INVOICE, _item_type(OpenItemType.PAYABLE)),
+                else_=_item_type(OpenItemType.RECEIVABLE)
+            ),
+            Invoice.id,
+            Invoice.number,
+            Invoice.invoice_date,
+            Invoice.due_date,
+            Invoice.outstanding_amount * sign,
+            func.now(),
+            func.now()
+        ).where(
+            Invoice.status.in_(OPEN_INVOICE_STATUSES),
+            Invoice.outstanding_amount > 0
+        )
+        if invoice_ids is not None:
+            query = query.where(Invoice.id.in_(invoice_ids))
+        return query
+
+    def _payment_items_query(self, payment_ids: Optional[List[uuid.UUID]] = None):
+        """Pagos contabilizados con importe sin aplicar a facturas (con signo negativo)"""
+        allocated = (
+            select(func.coalesce(func.sum(PaymentInvoice.amount), 0))
+            .where(PaymentInvoice.payment_id == Payment.id)
+            .scalar_subquery()
+        )
+        unallocated = Payment.amount - allocated
+        query = select(
+            func.gen_random_uuid(),
+            Payment.third_party_id,
+            case(
+                (Payment.payment_type == PaymentType.SUPPLIER_PAYMENT, _item_type(OpenItemType.PAYABLE)),
+                else_=_item_type(OpenItemType.RECEIVABLE)
+            ),
+            Payment.id,
+            Payment.number,
+            Payment.payment_date,
+            Payment.payment_date,
+            -unallocated,
+            func.now(),
+            func.now()
+        ).where(
+            Payment.payment_type.in_([PaymentType.CUSTOMER_PAYMENT, PaymentType.SUPPLIER_PAYMENT]),
+            Payment.status.in_(OPEN_PAYMENT_STATUSES),
+            Payment.third_party_id.is_not(None),
+            unallocated > 0
+        )
+        if payment_ids is not None:
+            query = query.where(Payment.id.in_(payment_ids))
+        return query
+
+    async def sync(
+        self,
+        invoice_ids: Iterable[uuid.UUID] = (),
+        payment_ids: Iterable[uuid.UUID] = ()
+    ) -> None:
+        """
+        Recalcular las partidas de las facturas y pagos indicados a partir de su
+        estado actual (contabilización, anulación, reseteo o conciliación) y los
+        totales de sus terceros. Idempotente; se ejecuta en la transacción del llamador.
+        """
+        invoice_ids = list(dict.fromkeys(invoice_ids))
+        payment_ids = list(dict.fromkeys(payment_ids))
+        if not invoice_ids and not payment_ids:
+            return
+
+        await self.db.flush()
+
+        # Bloquear los terceros afectados para que los totales se calculen en
+        # orden cuando dos transacciones tocan el mismo tercero
+        third_party_ids = set((await self.db.execute(
+            select(ThirdParty.id)
+            .where(
+                or_(
+                    ThirdParty.id.in_(select(Invoice.third_party_id).where(Invoice.id.in_(invoice_ids))),
+                    ThirdParty.id.in_(select(Payment.third_party_id).where(Payment.id.in_(payment_ids)))
+                )
+            )
+            .order_by(ThirdParty.id)
+            .with_for_update(key_share=True)
+        )).scalars())
+
+        removed = await self.db.execute(
+            delete(ThirdPartyOpenItem)
+            .where(
+                or_(
+                    ThirdPartyOpenItem.invoice_id.in_(invoice_ids),
+                    ThirdPartyOpenItem.payment_id.in_(payment_ids)
+                )
+            )
+            .returning(ThirdPartyOpenItem.third_party_id)
+        )
+        third_party_ids.update(removed.scalars())
+
+        if invoice_ids:
+            await self.db.execute(
+                pg_insert(ThirdPartyOpenItem).from_select(
+                    _INVOICE_ITEM_COLUMNS, self._invoice_items_query(invoice_ids)
+                )
+            )
+        if payment_ids:
+            await self.db.execute(
+                pg_insert(ThirdPartyOpenItem).from_select(
+                    _PAYMENT_ITEM_COLUMNS, self._payment_items_query(payment_ids)
+                )
+            )
+
+        await self._refresh_balances(third_party_ids)
+
+    async def _refresh_balances(self, third_party_ids: Optional[Set[uuid.UUID]]) -> None:
+        """Recalcular los totales de los terceros (todos si es None) desde sus partidas"""
+        if third_party_ids is not None and not third_party_ids:
+            return
+
+        def _total(item_type: OpenItemType):
+            return func.coalesce(
+                func.sum(ThirdPartyOpenItem.residual_amount).filter(
+                    ThirdPartyOpenItem.item_type == item_type
+                ),
+                0
+            )
+
+        totals = (
+            select(
+                func.gen_random_uuid(),
+                ThirdParty.id,
+                _total(OpenItemType.RECEIVABLE),
+                _total(OpenItemType.PAYABLE),
+                func.now(),
+                func.now()
+            )
+            .select_from(ThirdParty)
+            .outerjoin(ThirdPartyOpenItem, ThirdPartyOpenItem.third_party_id == ThirdParty.id)
+            .group_by(ThirdParty.id)
+        )
+        if third_party_ids is not None:
+            totals = totals.where(ThirdParty.id.in_(third_party_ids))
+
+        statement = pg_insert(ThirdPartyOpenBalance).from_select(
+            ['id', 'third_party_id', 'receivable_amount', 'payable_amount', 'created_at', 'updated_at'],
+            totals
+        )
+        await self.db.execute(
+            statement.on_conflict_do_update(
+                index_elements=['third_party_id'],
+                set_={
+                    'receivable_amount': statement.excluded.receivable_amount,
+                    'payable_amount': statement.excluded.payable_amount,
+                    'updated_at': func.now()
+                }
+            )
+        )
+
+    async def rebuild(self) -> None:
+        """Recalcular todas las partidas y totales desde facturas y pagos (reparación o carga inicial)"""
+        await self.db.execute(delete(ThirdPartyOpenItem))
+        await self.db.execute(
+            pg_insert(ThirdPartyOpenItem).from_select(_INVOICE_ITEM_COLUMNS, self._invoice_items_query())
+        )
+        await self.db.execute(
+            pg_insert(ThirdPartyOpenItem).from_select(_PAYMENT_ITEM_COLUMNS, self._payment_items_query())
+        )
+        await self._refresh_balances(None)
+
+    async def get_open_balance(self, third_party_id: uuid.UUID) -> Optional[ThirdPartyOpenBalance]:
+        """Totales abiertos del tercero (búsqueda por clave única)"""
+        result = await self.db.execute(
+            select(ThirdPartyOpenBalance).where(ThirdPartyOpenBalance.third_party_id == third_party_id)
+        )
+        return result.scalar_one_or_none()
+
+    async def get_overdue_amount(self, third_party_id: uuid.UUID, as_of_date: Optional[date] = None) -> Decimal:
+        """Saldo vencido por cobrar del tercero (solo recorre sus partidas abiertas)"""
+        overdue = await self.db.scalar(
+            select(func.sum(ThirdPartyOpenItem.residual_amount)).where(
+                ThirdPartyOpenItem.third_party_id == third_party_id,
+                ThirdPartyOpenItem.item_type == OpenItemType.RECEIVABLE,
+                ThirdPartyOpenItem.due_date < (as_of_date or date.today())
+            )
+        )
+        return overdue or Decimal('0')
+
+    async def get_available_credit(self, third_party_id: uuid.UUID) -> Optional[Decimal]:
+        """
+        Crédito disponible (límite menos saldo por cobrar abierto) en una sola
+        búsqueda por clave; None si el tercero no tiene límite de crédito.
+        """
+        row = (await self.db.execute(
+            select(ThirdParty.credit_limit, ThirdPartyOpenBalance.receivable_amount)
+            .outerjoin(ThirdPartyOpenBalance, ThirdPartyOpenBalance.third_party_id == ThirdParty.id)
+            .where(ThirdParty.id == third_party_id)
+        )).first()
+        if row is None:
+            return None
+        credit_limit = parse_credit_limit(row.credit_limit)
+        if credit_limit is None:
+            return None
+        return credit_limit - (row.receivable_amount or Decimal('0'))
+
+    async def get_aging_report(
+        self,
+        as_of_date: Optional[date] = None,
+        item_type: Optional[OpenItemType] = None,
+        third_party_type: Optional[ThirdPartyType] = None
+    ) -> List[ThirdPartyAging]:
+        """
+        Antigüedad de saldos de todos los terceros con partidas abiertas en una
+        sola consulta. Los días se cuentan desde el vencimiento; lo no vencido
+        cae en el tramo 0-30.
+        """
+        as_of_date = as_of_date or date.today()
+        days = literal(as_of_date) - ThirdPartyOpenItem.due_date
+
+        def _bucket(*conditions):
+            residual = func.sum(ThirdPartyOpenItem.residual_amount)
+            if conditions:
+                residual = residual.filter(and_(*conditions))
+            return func.coalesce(residual, 0)
+
+        query = (
+            select(
+                ThirdParty.id,
+                ThirdParty.code,
+                ThirdParty.name,
+                ThirdParty.third_party_type,
+                ThirdPartyOpenItem.item_type,
+                _bucket(days <= 30).label('current'),
+                _bucket(days > 30, days <= 60).label('days_31_60'),
+                _bucket(days > 60, days <= 90).label('days_61_90'),
+                _bucket(days > 90).label('over_90_days'),
+                _bucket().label('total_balance')
+            )
+            .join(ThirdParty, ThirdPartyOpenItem.third_party_id == ThirdParty.id)
+            .group_by(ThirdParty.id, ThirdPartyOpenItem.item_type)
+            .order_by(ThirdParty.code, ThirdPartyOpenItem.item_type)
+        )
+        if item_type:
+            query = query.where(ThirdPartyOpenItem.item_type == item_type)
+        if third_party_type:
+            query = query.where(ThirdParty.third_party_type == third_party_type)
+
+        result = await self.db.execute(query)
+        return [
+            ThirdPartyAging(
+                third_party_id=row.id,
+                third_party_code=row.code,
+                third_party_name=row.name,
+                third_party_type=row.third_party_type,
+                item_type=row.item_type,
+                current=row.current,
+                days_31_60=row.days_31_60,
+                days_61_90=row.days_61_90,
+                over_90_days=row.over_90_days,
+                total_balance=row.total_balance
+            )
+            for row in result
+        ]
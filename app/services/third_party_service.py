@@ -12,8 +12,8 @@ from sqlalchemy import select, func, and_, or_, desc, asc, text
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload, joinedload
 
-from app.models.third_party import ThirdParty, ThirdPartyType, DocumentType
-from app.models.journal_entry import JournalEntryLine, JournalEntry
+from app.models.third_party import ThirdParty, ThirdPartyType, DocumentType, OpenItemType
+from app.models.journal_entry import JournalEntryLine, JournalEntry, JournalEntryStatus
 from app.models.account import Account
 from app.schemas.third_party import (
     ThirdPartyCreate, ThirdPartyUpdate, ThirdPartySummary, ThirdPartyList,
@@ -22,9 +22,17 @@ from app.schemas.third_party import (
     ThirdPartyImport, ThirdPartyRead, BulkThirdPartyDelete, BulkThirdPartyDeleteResult,
     ThirdPartyDeleteValidation
 )
+from app.services.stats_builder import StatsQuery
+from app.services.third_party_open_item_service import ThirdPartyOpenItemService, parse_credit_limit
 from app.utils.exceptions import (
     ValidationError, NotFoundError, ConflictError, BusinessLogicError
 )
+from app.utils.pagination import KeysetPaginator, SortKey, estimate_total
+from app.utils.search import THIRD_PARTY_SEARCH
+
+
+# Orden del listado paginado por cursor (el mismo del listado por offset)
+THIRD_PARTY_KEYSET = KeysetPaginator(SortKey(ThirdParty.name))
 
 
 class ThirdPartyService:
@@ -32,6 +40,7 @@ class ThirdPartyService:
     
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.open_items = ThirdPartyOpenItemService(db)
 
     async def create_third_party(self, third_party_data: ThirdPartyCreate) -> ThirdParty:
         """Crear un nuevo tercero"""
@@ -204,9 +213,15 @@ class ThirdPartyService:
         self, 
         filter_params: ThirdPartyFilter,
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: Optional[str] = None
     ) -> ThirdPartyList:
-        """Obtener lista paginada de terceros"""
+        """
+        Obtener lista paginada de terceros.
+
+        Con ``cursor`` ("" para la primera página) pagina por clave en lugar de
+        ``skip`` y el total es una estimación del planificador.
+        """
         
         # Construir query base
         query = select(ThirdParty)
@@ -215,15 +230,7 @@ class ThirdPartyService:
         conditions = []
         
         if filter_params.search:
-            search_term = f"%{filter_params.search}%"
-            conditions.append(
-                or_(
-                    ThirdParty.code.ilike(search_term),
-                    ThirdParty.name.ilike(search_term),
-                    ThirdParty.commercial_name.ilike(search_term),
-                    ThirdParty.document_number.ilike(search_term)
-                )
-            )
+            conditions.append(THIRD_PARTY_SEARCH.condition(filter_params.search))
         
         if filter_params.third_party_type is not None:
             conditions.append(ThirdParty.third_party_type == filter_params.third_party_type)
@@ -243,16 +250,20 @@ class ThirdPartyService:
         if conditions:
             query = query.where(and_(*conditions))
         
-        # Contar total
-        count_query = select(func.count(ThirdParty.id))
-        if conditions:
-            count_query = count_query.where(and_(*conditions))
-        
-        total_result = await self.db.execute(count_query)
-        total = total_result.scalar() or 0
-        
-        # Aplicar paginación y ordenamiento
-        query = query.order_by(ThirdParty.name).offset(skip).limit(limit)
+        if cursor is None:
+            # Contar total
+            count_query = select(func.count(ThirdParty.id))
+            if conditions:
+                count_query = count_query.where(and_(*conditions))
+            
+            total_result = await self.db.execute(count_query)
+            total = total_result.scalar() or 0
+            
+            # Aplicar paginación y ordenamiento
+            query = query.order_by(ThirdParty.name).offset(skip).limit(limit)
+        else:
+            total = await estimate_total(self.db, query)
+            query = THIRD_PARTY_KEYSET.apply(query, cursor, limit)
         
         result = await self.db.execute(query)
         third_parties = result.scalars().all()
@@ -282,7 +293,9 @@ class ThirdPartyService:
             total=total,
             page=page,
             size=len(third_party_summaries),
-            pages=pages
+            pages=pages,
+            next_cursor=THIRD_PARTY_KEYSET.next_cursor(third_parties, limit) if cursor is not None else None,
+            total_is_estimate=cursor is not None
         )
 
     async def get_third_party_movements(
@@ -307,7 +320,10 @@ class ThirdPartyService:
             )
             .join(JournalEntry, JournalEntryLine.journal_entry_id == JournalEntry.id)
             .join(Account, JournalEntryLine.account_id == Account.id)
-            .where(JournalEntryLine.third_party_id == third_party_id)
+            .where(
+                JournalEntryLine.third_party_id == third_party_id,
+                JournalEntry.status == JournalEntryStatus.POSTED
+            )
             .order_by(desc(JournalEntry.entry_date), JournalEntry.number)
         )
         
@@ -364,6 +380,7 @@ class ThirdPartyService:
             .where(
                 and_(
                     JournalEntryLine.third_party_id == third_party_id,
+                    JournalEntry.status == JournalEntryStatus.POSTED,
                     JournalEntry.entry_date < start_date
                 )
             )
@@ -400,26 +417,15 @@ class ThirdPartyService:
         if not third_party:
             raise NotFoundError("Tercero no encontrado")
         
-        # Calcular saldo actual
-        balance_query = (
-            select(
-                func.coalesce(func.sum(JournalEntryLine.debit_amount), 0) -
-                func.coalesce(func.sum(JournalEntryLine.credit_amount), 0)
-            )
-            .where(JournalEntryLine.third_party_id == third_party_id)
-        )
-        
-        balance_result = await self.db.execute(balance_query)
-        current_balance = balance_result.scalar() or Decimal('0')
-          # Convertir límite de crédito si existe
-        credit_limit = None
-        available_credit = None
-        if third_party.credit_limit:
-            try:
-                credit_limit = Decimal(third_party.credit_limit)
-                available_credit = credit_limit - abs(current_balance)
-            except (ValueError, TypeError):
-                pass
+        # Saldo desde los totales de partidas abiertas: una búsqueda por clave
+        # en lugar de sumar todo el historial de líneas del tercero
+        open_balance = await self.open_items.get_open_balance(third_party_id)
+        receivable = open_balance.receivable_amount if open_balance else Decimal('0')
+        payable = open_balance.payable_amount if open_balance else Decimal('0')
+        current_balance = receivable - payable
+
+        credit_limit = parse_credit_limit(third_party.credit_limit)
+        available_credit = credit_limit - receivable if credit_limit is not None else None
         
         return ThirdPartyBalance(
             third_party_id=third_party_id,
@@ -427,10 +433,20 @@ class ThirdPartyService:
             third_party_name=third_party.name,
             third_party_type=third_party.third_party_type,
             current_balance=current_balance,
+            overdue_balance=await self.open_items.get_overdue_amount(third_party_id),
             credit_limit=credit_limit,
             available_credit=available_credit
         )
 
+    async def get_aging_report(
+        self,
+        as_of_date: Optional[date] = None,
+        item_type: Optional[OpenItemType] = None,
+        third_party_type: Optional[ThirdPartyType] = None
+    ) -> List[ThirdPartyAging]:
+        """Antigüedad de saldos (0-30, 31-60, 61-90, 90+) de todos los terceros"""
+        return await self.open_items.get_aging_report(as_of_date, item_type, third_party_type)
+
     async def get_third_parties_by_type(self, third_party_type: ThirdPartyType) -> List[ThirdParty]:
         """Obtener terceros por tipo"""
         result = await self.db.execute(
@@ -445,6 +461,23 @@ class ThirdPartyService:
         )
         return list(result.scalars().all())
 
+    async def search_third_parties(
+        self,
+        search_term: str,
+        limit: int = 20,
+        third_party_type: Optional[ThirdPartyType] = None,
+        active_only: bool = True
+    ) -> List[ThirdParty]:
+        """Búsqueda por código, nombre o documento ordenada por relevancia (autocompletado)"""
+        query = select(ThirdParty)
+        if third_party_type:
+            query = query.where(ThirdParty.third_party_type == third_party_type)
+        if active_only:
+            query = query.where(ThirdParty.is_active == True)
+
+        result = await self.db.execute(THIRD_PARTY_SEARCH.ranked(query, search_term, limit))
+        return list(result.scalars().all())
+
     async def validate_third_party(self, third_party_id: uuid.UUID) -> ThirdPartyValidation:
         """Validar un tercero"""
         
@@ -505,66 +538,25 @@ class ThirdPartyService:
 
     async def get_third_party_stats(self) -> ThirdPartyStats:
         """Obtener estadísticas de terceros"""
-        
-        # Contar totales
-        total_query = select(func.count(ThirdParty.id))
-        total_result = await self.db.execute(total_query)
-        total_third_parties = total_result.scalar() or 0
-        
-        # Contar activos
-        active_query = select(func.count(ThirdParty.id)).where(ThirdParty.is_active == True)
-        active_result = await self.db.execute(active_query)
-        active_third_parties = active_result.scalar() or 0
-        
-        # Contar por tipo
-        customers_query = select(func.count(ThirdParty.id)).where(
-            ThirdParty.third_party_type == ThirdPartyType.CUSTOMER
-        )
-        customers_result = await self.db.execute(customers_query)
-        customers = customers_result.scalar() or 0
-        
-        suppliers_query = select(func.count(ThirdParty.id)).where(
-            ThirdParty.third_party_type == ThirdPartyType.SUPPLIER
+        stats = await (
+            StatsQuery(ThirdParty)
+            .count("total")
+            .count("active", ThirdParty.is_active == True)
+            .count("customers", ThirdParty.third_party_type == ThirdPartyType.CUSTOMER)
+            .count("suppliers", ThirdParty.third_party_type == ThirdPartyType.SUPPLIER)
+            .count("employees", ThirdParty.third_party_type == ThirdPartyType.EMPLOYEE)
+            .count("with_email", ThirdParty.email.is_not(None))
+            .count("with_phone", or_(ThirdParty.phone.is_not(None), ThirdParty.mobile.is_not(None)))
+            .count_by("by_country", ThirdParty.country)
+            .execute(self.db, cache_key="third_parties")
         )
-        suppliers_result = await self.db.execute(suppliers_query)
-        suppliers = suppliers_result.scalar() or 0
-        
-        employees_query = select(func.count(ThirdParty.id)).where(
-            ThirdParty.third_party_type == ThirdPartyType.EMPLOYEE
-        )
-        employees_result = await self.db.execute(employees_query)
-        employees = employees_result.scalar() or 0
-        
+        total_third_parties = stats["total"]
+        active_third_parties = stats["active"]
+        customers = stats["customers"]
+        suppliers = stats["suppliers"]
+        employees = stats["employees"]
         others = total_third_parties - customers - suppliers - employees
-        
-        # Contar con email
-        email_query = select(func.count(ThirdParty.id)).where(
-            ThirdParty.email.is_not(None)
-        )
-        email_result = await self.db.execute(email_query)
-        with_email = email_result.scalar() or 0
-        
-        # Contar con teléfono
-        phone_query = select(func.count(ThirdParty.id)).where(
-            or_(
-                ThirdParty.phone.is_not(None),
-                ThirdParty.mobile.is_not(None)
-            )
-        )
-        phone_result = await self.db.execute(phone_query)
-        with_phone = phone_result.scalar() or 0
-        
-        # Contar por país
-        country_query = select(
-            ThirdParty.country,
-            func.count(ThirdParty.id)
-        ).where(
-            ThirdParty.country.is_not(None)
-        ).group_by(ThirdParty.country)
-        
-        country_result = await self.db.execute(country_query)
-        by_country = {row[0]: row[1] for row in country_result}
-        
+
         return ThirdPartyStats(
             total_third_parties=total_third_parties,
             active_third_parties=active_third_parties,
@@ -573,9 +565,9 @@ class ThirdPartyService:
             suppliers=suppliers,
             employees=employees,
             others=others,
-            with_email=with_email,
-            with_phone=with_phone,
-            by_country=by_country
+            with_email=stats["with_email"],
+            with_phone=stats["with_phone"],
+            by_country=stats["by_country"]
         )
 
     async def bulk_operation(self, operation_data: BulkThirdPartyOperation) -> Dict[str, Any]:
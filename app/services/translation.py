@@ -10,22 +10,25 @@ DetectorFactory.seed = 0
 
 logger = logging.getLogger(__name__)
 
-# Try to import transformers components
-try:
-    from transformers.pipelines import pipeline
-    from transformers.pipelines.base import Pipeline
-    import torch
-    TRANSFORMERS_AVAILABLE = True
-    PipelineType = Pipeline
-except ImportError:
-    TRANSFORMERS_AVAILABLE = False
-    logger.warning("⚠️ Transformers no está disponible. Solo se usará detección de idioma.")
-    # Define dummy types for when transformers is not available
-    PipelineType = Any
-    pipeline = None
-    torch = None
 
-# Try to import sentencepiece (opcional, T5 tiene su propio tokenizer integrado)
+def _import_transformers() -> Tuple[Any, Any]:
+    """
+    Importa transformers y torch bajo demanda.
+    
+    Son dependencias opcionales (install_ai_deps.py) y pesadas: importarlas al
+    cargar el módulo añade segundos y cientos de MB a cada worker aunque nunca
+    se use la traducción.
+    
+    Returns:
+        Tupla (pipeline, torch) o (None, None) si no están instalados
+    """
+    try:
+        from transformers.pipelines import pipeline
+        import torch
+        return pipeline, torch
+    except ImportError:
+        logger.warning("⚠️ Transformers no está disponible. Solo se usará detección de idioma.")
+        return None, None
 
 
 class TranslationService:
@@ -59,7 +62,8 @@ class TranslationService:
     def _load_translation_pipelines(self):
         """Carga todos los pipelines de traducción al inicializar"""
         try:
-            if not TRANSFORMERS_AVAILABLE or torch is None or pipeline is None:
+            pipeline, torch = _import_transformers()
+            if torch is None or pipeline is None:
                 logger.warning("⚠️ transformers o torch no están disponibles.")
                 return
             
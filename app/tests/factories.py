@@ -0,0 +1,18 @@
+"""
+Shared builders for unit test fixtures.
+"""
+import uuid
+
+from app.services.company_settings_cache import AccountRef
+
+
+def account_ref(code, account_type, category=None, is_active=True, allows_movements=True, name=None):
+    return AccountRef(
+        id=uuid.uuid4(),
+        code=code,
+        name=name or f"Cuenta {code}",
+        account_type=account_type,
+        category=category,
+        is_active=is_active,
+        allows_movements=allows_movements
+    )
@@ -0,0 +1,60 @@
+"""
+Unit tests for the compiled account determination rule table.
+"""
+from app.models.account import AccountType
+from app.models.invoice import InvoiceType
+from app.services.account_rule_table import AccountRuleTable, match_account_patterns
+from app.services.company_settings_cache import CompanySettingsSnapshot
+from app.tests.factories import account_ref
+
+
+class TestAccountRuleTable:
+
+    def setup_method(self):
+        self.customers = account_ref("130505", AccountType.ASSET)
+        self.customers_exact = account_ref("1105", AccountType.ASSET)
+        self.suppliers = account_ref("220505", AccountType.LIABILITY)
+        self.income = account_ref("4135", AccountType.INCOME)
+        self.income_configured = account_ref("4175", AccountType.INCOME)
+        self.expense = account_ref("5105", AccountType.EXPENSE)
+        self.product_income = account_ref("4140", AccountType.INCOME)
+        self.inactive_income = account_ref("4100", AccountType.INCOME, is_active=False)
+        self.accounts = [
+            self.customers, self.customers_exact, self.suppliers, self.income,
+            self.income_configured, self.expense, self.product_income, self.inactive_income
+        ]
+
+    def _table(self, settings_values=None):
+        return AccountRuleTable(CompanySettingsSnapshot(settings_values, self.accounts, {}))
+
+    def test_pattern_prefers_exact_code_then_prefix(self):
+        accounts = sorted(self.accounts, key=lambda a: a.code)
+        assert match_account_patterns(accounts, ['1105', '1300'], AccountType.ASSET) == self.customers_exact
+        assert match_account_patterns(accounts, ['2200'], AccountType.LIABILITY) == self.suppliers
+        # Inactive accounts never match; falls back to first account of the type
+        assert match_account_patterns(accounts, ['4100'], AccountType.INCOME) == self.income
+
+    def test_line_account_hierarchy(self):
+        table = self._table({"default_sales_income_account_id": self.income_configured.id})
+
+        account, source = table.line_account(InvoiceType.CUSTOMER_INVOICE, self.income.id, None)
+        assert (account, source) == (self.income, 'line_override')
+
+        account, source = table.line_account(
+            InvoiceType.CUSTOMER_INVOICE, None, (self.product_income.id, self.expense.id)
+        )
+        assert (account, source) == (self.product_income, 'product_account')
+
+        account, source = table.line_account(InvoiceType.CUSTOMER_INVOICE, None, (None, None))
+        assert (account, source) == (self.income_configured, 'default_by_type')
+
+        account, source = table.line_account(InvoiceType.SUPPLIER_INVOICE, None, None)
+        assert (account, source) == (self.expense, 'default_by_type')
+
+    def test_third_party_defaults_by_invoice_side(self):
+        table = self._table()
+        assert table.third_party_account(InvoiceType.CREDIT_NOTE) == (self.customers_exact, 'default_by_type')
+        assert table.third_party_account(InvoiceType.SUPPLIER_INVOICE) == (self.suppliers, 'default_by_type')
+
+    def test_generic_tax_account_requires_settings(self):
+        assert self._table().generic_tax_account(InvoiceType.CUSTOMER_INVOICE) is None
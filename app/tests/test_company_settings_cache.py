@@ -0,0 +1,90 @@
+"""
+Unit tests for the in-memory company settings snapshot and its cache.
+"""
+import uuid
+from unittest.mock import AsyncMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import AccountCategory, AccountType
+from app.services.company_settings_cache import (
+    CompanySettingsCache, CompanySettingsSnapshot
+)
+from app.tests.factories import account_ref
+
+
+class TestCompanySettingsSnapshot:
+    """Account resolution hierarchy over the snapshot"""
+
+    def setup_method(self):
+        self.receivable_default = account_ref("1305", AccountType.ASSET, AccountCategory.CURRENT_ASSET)
+        self.receivable_fallback = account_ref("1105", AccountType.ASSET, AccountCategory.CURRENT_ASSET)
+        self.receivable_journal = account_ref("1310", AccountType.ASSET, AccountCategory.CURRENT_ASSET)
+        self.receivable_inactive = account_ref("1315", AccountType.ASSET, AccountCategory.CURRENT_ASSET, is_active=False)
+        self.payable_fallback = account_ref("2205", AccountType.LIABILITY, AccountCategory.CURRENT_LIABILITY)
+        self.icms = account_ref("2408", AccountType.LIABILITY, AccountCategory.TAXES)
+        self.journal_id = uuid.uuid4()
+
+        self.snapshot = CompanySettingsSnapshot(
+            {
+                "settings_version": 3,
+                "default_customer_receivable_account_id": self.receivable_default.id,
+                "default_supplier_payable_account_id": None,
+                "default_icms_payable_account_id": self.icms.id,
+            },
+            [
+                self.receivable_default, self.receivable_fallback, self.receivable_journal,
+                self.receivable_inactive, self.payable_fallback, self.icms
+            ],
+            {self.journal_id: {"customer_receivable_account_id": self.receivable_journal.id}}
+        )
+
+    def test_third_party_then_journal_then_company(self):
+        resolve = self.snapshot.customer_receivable_account
+        assert resolve(third_party_account_id=self.receivable_fallback.id, journal_id=self.journal_id) == self.receivable_fallback
+        assert resolve(journal_id=self.journal_id) == self.receivable_journal
+        assert resolve() == self.receivable_default
+
+    def test_inactive_accounts_are_skipped(self):
+        resolve = self.snapshot.customer_receivable_account
+        assert resolve(third_party_account_id=self.receivable_inactive.id) == self.receivable_default
+
+    def test_fallback_is_first_account_by_code(self):
+        assert self.snapshot.supplier_payable_account() == self.payable_fallback
+        assert self.snapshot.first_account(AccountType.ASSET, AccountCategory.CURRENT_ASSET) == self.receivable_fallback
+
+    def test_tax_account_map(self):
+        assert self.snapshot.settings_version == 3
+        assert self.snapshot.tax_account("icms", is_payable=True) == self.icms
+        assert self.snapshot.tax_account("ICMS", is_payable=False) is None
+
+
+class TestCompanySettingsCache:
+    """Freshness rules of the per-process cache"""
+
+    async def test_fresh_snapshot_does_not_query(self):
+        cache = CompanySettingsCache(ttl_seconds=300, version_check_seconds=60)
+        snapshot = CompanySettingsSnapshot({"settings_version": 1}, [], {})
+        cache.load(snapshot)
+        db = AsyncMock(spec=AsyncSession)
+
+        assert await cache.get_snapshot(db) is snapshot
+        db.execute.assert_not_called()
+        db.scalar.assert_not_called()
+
+    async def test_unchanged_version_keeps_snapshot(self):
+        cache = CompanySettingsCache(ttl_seconds=300, version_check_seconds=0)
+        snapshot = CompanySettingsSnapshot({"settings_version": 1}, [], {})
+        cache.load(snapshot)
+        db = AsyncMock(spec=AsyncSession)
+        db.scalar.return_value = 1
+
+        assert await cache.get_snapshot(db) is snapshot
+        db.scalar.assert_awaited_once()
+        db.execute.assert_not_called()
+
+    def test_invalidate_drops_snapshot(self):
+        cache = CompanySettingsCache()
+        cache.load(CompanySettingsSnapshot(None, [], {}))
+        cache.invalidate()
+        assert cache.snapshot is None
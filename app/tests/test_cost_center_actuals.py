@@ -0,0 +1,41 @@
+"""
+Unit tests for the cost center monthly actuals snapshot.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import AccountType
+from app.services.cost_center_actuals_service import add_months, covers_whole_months
+from app.services.cost_center_reporting_service import CostCenterReportingService
+
+
+def test_month_helpers():
+    assert add_months(date(2026, 1, 15), -1) == date(2025, 12, 1)
+    assert add_months(date(2026, 11, 1), 3) == date(2027, 2, 1)
+    assert covers_whole_months(date(2026, 1, 1), date(2026, 2, 28))
+    assert not covers_whole_months(date(2026, 1, 1), date(2026, 2, 27))
+    assert not covers_whole_months(date(2026, 1, 2), date(2026, 1, 31))
+
+
+async def test_ranking_trends_compare_closing_month_with_previous():
+    growing, shrinking, flat = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    march, april = date(2026, 3, 1), date(2026, 4, 1)
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = [
+        (growing, march, AccountType.INCOME, Decimal("0"), Decimal("100")),
+        (growing, april, AccountType.INCOME, Decimal("0"), Decimal("300")),
+        (shrinking, march, AccountType.INCOME, Decimal("0"), Decimal("500")),
+        (shrinking, april, AccountType.EXPENSE, Decimal("50"), Decimal("0")),
+    ]
+    db.execute.return_value = result
+    service = CostCenterReportingService(db)
+
+    trends = await service._ranking_trends([growing, shrinking, flat], "revenue", date(2026, 4, 30))
+
+    db.execute.assert_awaited_once()
+    assert trends == {growing: "up", shrinking: "down", flat: "stable"}
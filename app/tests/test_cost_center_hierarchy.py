@@ -0,0 +1,76 @@
+"""
+Unit tests for cost center hierarchy properties resolved from the closure table.
+"""
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.generic_import import _create_entity_with_auto_fields
+from app.models.cost_center import CostCenter
+from app.services.cost_center_service import CostCenterService
+
+
+def _result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+async def test_hierarchy_properties_for_many_centers_in_two_queries():
+    root = CostCenter(id=uuid.uuid4(), code="ADM", name="Administración")
+    leaf = CostCenter(id=uuid.uuid4(), code="RRHH", name="Recursos humanos", parent_id=root.id)
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.side_effect = [
+        _result([(root.id, 0, "ADM"), (leaf.id, 1, "ADM.RRHH")]),
+        _result([(root.id, 1)]),
+    ]
+
+    await CostCenterService(db)._calculate_hierarchy_properties([root, leaf])
+
+    assert db.execute.await_count == 2
+    assert (root.level, root.full_code, root.is_leaf) == (0, "ADM", False)
+    assert (leaf.level, leaf.full_code, leaf.is_leaf) == (1, "ADM.RRHH", True)
+
+
+async def test_cycle_detection_is_a_single_lookup():
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.scalar.return_value = 1
+    db.execute.return_value = result
+
+    assert await CostCenterService(db)._would_create_cycle(uuid.uuid4(), uuid.uuid4())
+    db.execute.assert_awaited_once()
+
+
+async def test_imported_cost_centers_get_closure_rows():
+    db = AsyncMock(spec=AsyncSession)
+    added = []
+    db.add.side_effect = added.append
+
+    async def assign_ids():
+        for record in added:
+            record.id = record.id or uuid.uuid4()
+
+    db.flush.side_effect = assign_ids
+    db.execute.return_value = _result([])
+
+    parent = await _create_entity_with_auto_fields(
+        CostCenter, {"code": "ADM", "name": "Administración"}, db, "system"
+    )
+    parent_rows = db.execute.await_args.args[1]
+
+    lookup = MagicMock()
+    lookup.scalar_one_or_none.return_value = parent
+    db.execute.side_effect = [lookup, _result([(parent.id, 0)]), MagicMock()]
+    child = await _create_entity_with_auto_fields(
+        CostCenter, {"code": "RRHH", "name": "Recursos humanos", "parent_code": "ADM"}, db, "system"
+    )
+    child_rows = db.execute.await_args.args[1]
+
+    assert child.parent_id == parent.id
+    assert parent_rows == [{"ancestor_id": parent.id, "descendant_id": parent.id, "depth": 0}]
+    assert child_rows == [
+        {"ancestor_id": child.id, "descendant_id": child.id, "depth": 0},
+        {"ancestor_id": parent.id, "descendant_id": child.id, "depth": 1},
+    ]
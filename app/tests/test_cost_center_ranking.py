@@ -0,0 +1,52 @@
+"""
+Unit tests for set-based cost center ranking.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import AccountType
+from app.services.cost_center_reporting_service import CostCenterReportingService
+
+
+def _db_with_rows(rows):
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = rows
+    db.execute.return_value = result
+    return db
+
+
+async def test_metrics_for_all_cost_centers_in_one_query():
+    sales, support, idle = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    db = _db_with_rows([
+        (sales, AccountType.INCOME, Decimal("0"), Decimal("1000")),
+        (sales, AccountType.EXPENSE, Decimal("400"), Decimal("0")),
+        (support, AccountType.EXPENSE, Decimal("200"), Decimal("0")),
+    ])
+    service = CostCenterReportingService(db)
+
+    metrics = await service._calculate_profitability_metrics_bulk(
+        [sales, support, idle], date(2026, 1, 1), date(2026, 1, 31), False
+    )
+
+    db.execute.assert_awaited_once()
+    assert metrics[sales].revenue == Decimal("1000")
+    assert metrics[sales].net_profit == Decimal("600")
+    assert metrics[support].net_profit == Decimal("-200")
+    assert metrics[idle].revenue == Decimal("0")
+
+
+def test_metric_statistics_use_true_median():
+    service = CostCenterReportingService(AsyncMock(spec=AsyncSession))
+    values = [Decimal("10"), Decimal("40"), Decimal("20"), Decimal("30")]
+
+    stats = service._metric_statistics(values)
+
+    assert stats["median"] == Decimal("25.0")
+    assert stats["average"] == Decimal("25")
+    assert (stats["max"], stats["min"]) == (Decimal("40"), Decimal("10"))
+    assert stats["std"] > 0
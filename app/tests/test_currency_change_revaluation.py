@@ -0,0 +1,104 @@
+"""
+Unit tests for revaluation line generation from aggregated foreign balances.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.currency_change_service import CurrencyChangeService
+from app.services.exchange_rate_cache import exchange_rate_table
+
+
+class TestRevaluationLines:
+    """_build_revaluation_lines works purely on the grouped balances"""
+
+    @pytest.fixture(autouse=True)
+    def loaded_table(self):
+        exchange_rate_table.load_rows(
+            [("EUR", date(2024, 1, 1), Decimal("1.200000"), uuid.uuid4())],
+            "USD"
+        )
+        yield
+        exchange_rate_table.load_rows([], None)
+        exchange_rate_table.invalidate()
+
+    def _balance(self, book, foreign, currency="EUR"):
+        return {
+            "account_id": uuid.uuid4(),
+            "account_code": "1105",
+            "account_name": "Bancos",
+            "currency_id": uuid.uuid4(),
+            "currency_code": currency,
+            "book_balance": Decimal(book),
+            "foreign_balance": Decimal(foreign),
+            "line_count": 3,
+            "lines_without_amount_currency": 0
+        }
+
+    async def test_generates_balanced_lines_with_offset(self):
+        progress = []
+        service = CurrencyChangeService(
+            AsyncMock(spec=AsyncSession),
+            progress_callback=lambda stage, done, total: progress.append((done, total))
+        )
+        diff_account_id = uuid.uuid4()
+        balances = [
+            self._balance("100.00", "100.00"),   # revalued 120.00 -> +20.00
+            self._balance("-50.00", "-50.00"),   # revalued -60.00 -> -10.00
+            self._balance("60.00", "50.00"),     # already at current rate
+            self._balance("10.00", "10.00", currency="JPY"),  # no rate
+        ]
+
+        lines = await service._build_revaluation_lines(balances, date(2024, 6, 30), diff_account_id)
+
+        assert len(lines) == 3
+        assert lines[0]["debit_amount"] == Decimal("20.00")
+        assert lines[1]["credit_amount"] == Decimal("10.00")
+        assert lines[2]["account_id"] == diff_account_id
+        assert lines[2]["credit_amount"] == Decimal("10.00")
+        assert sum(l["debit_amount"] for l in lines) == sum(l["credit_amount"] for l in lines)
+        assert progress[-1] == (4, 4)
+
+    async def test_no_lines_when_nothing_to_revalue(self):
+        service = CurrencyChangeService(AsyncMock(spec=AsyncSession))
+
+        lines = await service._build_revaluation_lines(
+            [self._balance("120.00", "100.00")], date(2024, 6, 30), uuid.uuid4()
+        )
+
+        assert lines == []
+
+
+async def test_lines_without_amount_currency_fall_back_to_the_base_amount():
+    # Una línea de 100.00 en EUR sin amount_currency: cuenta como 100.00 EUR, no como 0
+    db = AsyncMock(spec=AsyncSession)
+    row = MagicMock(
+        account_id=uuid.uuid4(), account_code="1105", account_name="Bancos",
+        currency_id=uuid.uuid4(), currency_code="EUR", book_balance=Decimal("100.00"),
+        foreign_balance=Decimal("100.00"), line_count=1, lines_without_amount_currency=1
+    )
+    result = MagicMock()
+    result.all.return_value = [row]
+    db.execute.return_value = result
+    service = CurrencyChangeService(db)
+
+    balances = await service._aggregate_foreign_currency_balances()
+
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "coalesce(journal_entry_lines.amount_currency, journal_entry_lines.debit_amount)" in sql
+    assert "coalesce(journal_entry_lines.amount_currency, journal_entry_lines.credit_amount)" in sql
+    assert balances[0]["lines_without_amount_currency"] == 1
+
+    exchange_rate_table.load_rows([("EUR", date(2024, 1, 1), Decimal("1.200000"), uuid.uuid4())], "USD")
+    try:
+        lines = await service._build_revaluation_lines(balances, date(2024, 6, 30), uuid.uuid4())
+    finally:
+        exchange_rate_table.load_rows([], None)
+        exchange_rate_table.invalidate()
+
+    assert lines[0]["debit_amount"] == Decimal("20.00")
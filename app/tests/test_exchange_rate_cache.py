@@ -0,0 +1,120 @@
+"""
+Unit tests for the in-memory exchange rate table and cached conversions.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.currency import BatchCurrencyConversionRequest, CurrencyConversionRequest
+from app.services.currency_service import CurrencyConversionService
+from app.services.exchange_rate_cache import ExchangeRateTable, exchange_rate_table
+from app.utils.exceptions import NotFoundError
+
+
+@pytest.fixture(autouse=True)
+def reset_shared_table():
+    # La tabla compartida es global del proceso: vaciarla para no filtrar tasas a otros tests
+    yield
+    exchange_rate_table.load_rows([], None)
+    exchange_rate_table.invalidate()
+
+
+def _rows():
+    return [
+        ("EUR", date(2024, 1, 10), Decimal("1.100000"), uuid.uuid4()),
+        ("EUR", date(2024, 1, 1), Decimal("1.050000"), uuid.uuid4()),
+        ("BRL", date(2024, 1, 5), Decimal("0.200000"), uuid.uuid4()),
+    ]
+
+
+class TestExchangeRateTable:
+    """Bisect-based lookups on the rate table"""
+
+    def test_lookup_uses_latest_rate_on_or_before_date(self):
+        table = ExchangeRateTable(ttl_seconds=60)
+        table.load_rows(_rows(), "USD")
+
+        assert table.get_rate("eur", date(2024, 1, 1)).rate == Decimal("1.050000")
+        assert table.get_rate("EUR", date(2024, 1, 9)).rate == Decimal("1.050000")
+        assert table.get_rate("EUR", date(2024, 1, 10)).rate == Decimal("1.100000")
+        assert table.get_rate("EUR", date(2025, 1, 1)).rate_date == date(2024, 1, 10)
+
+    def test_lookup_before_first_rate_or_unknown_currency(self):
+        table = ExchangeRateTable(ttl_seconds=60)
+        table.load_rows(_rows(), "USD")
+
+        assert table.get_rate("EUR", date(2023, 12, 31)) is None
+        assert table.get_rate("JPY", date(2024, 1, 10)) is None
+
+    def test_invalidate_marks_table_for_reload(self):
+        table = ExchangeRateTable(ttl_seconds=60)
+        table.load_rows(_rows(), "USD")
+        assert table.is_loaded
+
+        table.invalidate()
+        assert not table.is_loaded
+
+
+class TestCachedConversion:
+    """convert_currency resolves rates without touching the database"""
+
+    @pytest.fixture(autouse=True)
+    def loaded_table(self):
+        exchange_rate_table.load_rows(_rows(), "USD")
+
+    @pytest.fixture
+    def service(self):
+        return CurrencyConversionService(AsyncMock(spec=AsyncSession))
+
+    async def test_convert_between_foreign_currencies(self, service):
+        result = await service.convert_currency(CurrencyConversionRequest(
+            amount=Decimal("100"),
+            from_currency_code="EUR",
+            to_currency_code="BRL",
+            conversion_date=date(2024, 1, 10)
+        ))
+
+        assert result.converted_amount == Decimal("550")
+        assert result.exchange_rate == Decimal("5.5")
+        service.db.execute.assert_not_called()
+
+    async def test_convert_without_rate_raises_not_found(self, service):
+        with pytest.raises(NotFoundError):
+            await service.convert_currency(CurrencyConversionRequest(
+                amount=Decimal("100"),
+                from_currency_code="USD",
+                to_currency_code="BRL",
+                conversion_date=date(2024, 1, 1)
+            ))
+
+    async def test_batch_conversion_matches_single_conversions(self, service):
+        requests = [
+            CurrencyConversionRequest(amount=Decimal("100"), from_currency_code="EUR",
+                                      to_currency_code="BRL", conversion_date=date(2024, 1, 10)),
+            CurrencyConversionRequest(amount=Decimal("10"), from_currency_code="USD",
+                                      to_currency_code="BRL", conversion_date=date(2024, 1, 6)),
+            CurrencyConversionRequest(amount=Decimal("10"), from_currency_code="EUR",
+                                      to_currency_code="USD", conversion_date=date(2024, 1, 2)),
+            CurrencyConversionRequest(amount=Decimal("7"), from_currency_code="EUR",
+                                      to_currency_code="EUR", conversion_date=date(2024, 1, 2)),
+            CurrencyConversionRequest(amount=Decimal("10"), from_currency_code="USD",
+                                      to_currency_code="BRL", conversion_date=date(2024, 1, 1)),
+        ]
+
+        batch = await service.convert_currency_batch(BatchCurrencyConversionRequest(items=requests))
+
+        assert batch.total == 5
+        assert batch.failed_count == 1
+        for request, result in zip(requests[:4], batch.results[:4]):
+            single = await service.convert_currency(request)
+            assert result.converted_amount == single.converted_amount
+            assert result.exchange_rate == single.exchange_rate
+            assert result.rate_source == single.rate_source
+        assert batch.results[0].from_rate_date == date(2024, 1, 10)
+        assert batch.results[1].from_rate_id is None
+        assert "BRL" in batch.results[4].error
+        service.db.execute.assert_not_called()
@@ -0,0 +1,120 @@
+"""
+Unit tests for the in-memory pieces of batched invoice posting.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import AccountType
+from app.models.invoice import Invoice, InvoiceLine, InvoiceStatus, InvoiceType
+from app.models.journal_entry import JournalEntry, JournalEntryLine
+from app.models.third_party import ThirdParty
+from app.services.account_rule_table import AccountRuleTable
+from app.services.company_settings_cache import CompanySettingsSnapshot
+from app.services.invoice_service import InvoiceService, _insert_row
+from app.utils.codes import generate_code_block_async
+from app.tests.factories import account_ref
+
+
+def _invoice(line_tax=Decimal("0")):
+    invoice = Invoice(
+        id=uuid.uuid4(),
+        number="INV000001",
+        invoice_type=InvoiceType.CUSTOMER_INVOICE,
+        invoice_date=date(2026, 10, 1),
+        third_party_id=uuid.uuid4(),
+        paid_amount=Decimal("0"),
+    )
+    invoice.third_party = ThirdParty(name="Cliente")
+    invoice.lines = [
+        InvoiceLine(
+            id=uuid.uuid4(), sequence=1, description="Servicio", quantity=Decimal("2"),
+            unit_price=Decimal("50"), discount_percentage=Decimal("0"), tax_amount=line_tax
+        ),
+        InvoiceLine(
+            id=uuid.uuid4(), sequence=2, description="Producto", quantity=Decimal("1"),
+            unit_price=Decimal("200"), discount_percentage=Decimal("10"), tax_amount=Decimal("0")
+        ),
+    ]
+    return invoice
+
+
+class TestBuildJournalEntryLines:
+
+    def setup_method(self):
+        self.receivable = account_ref("130505", AccountType.ASSET)
+        self.income = account_ref("4135", AccountType.INCOME)
+        self.tax_payable = account_ref("2408", AccountType.LIABILITY)
+        snapshot = CompanySettingsSnapshot(
+            {"default_sales_tax_payable_account_id": self.tax_payable.id},
+            [self.receivable, self.income, self.tax_payable],
+            {}
+        )
+        self.rules = AccountRuleTable(snapshot)
+        self.service = InvoiceService(AsyncMock(spec=AsyncSession))
+
+    def test_entry_is_balanced_without_queries(self):
+        invoice = _invoice()
+        self.service._apply_line_totals(invoice, invoice.lines)
+        entry_id = uuid.uuid4()
+
+        lines = self.service._build_journal_entry_lines(entry_id, invoice, self.rules, None, None)
+
+        assert invoice.total_amount == Decimal("280")
+        assert sum(line.debit_amount for line in lines) == sum(line.credit_amount for line in lines) == Decimal("280")
+        assert [line.account_id for line in lines] == [self.income.id, self.income.id, self.receivable.id]
+        assert all(line.journal_entry_id == entry_id for line in lines)
+        self.service.db.execute.assert_not_called()
+
+    def test_tax_lines_get_consecutive_numbers(self):
+        invoice = _invoice(line_tax=Decimal("20"))
+        self.service._apply_line_totals(invoice, invoice.lines)
+
+        lines = self.service._build_journal_entry_lines(uuid.uuid4(), invoice, self.rules, None, None)
+
+        tax_lines = [line for line in lines if line.account_id == self.tax_payable.id]
+        assert sum(line.credit_amount for line in tax_lines) == Decimal("20")
+        assert [line.line_number for line in lines] == list(range(1, len(lines) + 1))
+
+
+def test_insert_row_keeps_only_assigned_columns():
+    entry_id = uuid.uuid4()
+    row = _insert_row(JournalEntryLine(journal_entry_id=entry_id, debit_amount=Decimal("5"), line_number=1))
+    assert row == {"journal_entry_id": entry_id, "debit_amount": Decimal("5"), "line_number": 1}
+
+
+async def test_code_block_continues_from_highest_number():
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = [("JE000007",), ("JE000002",), ("JE-MANUAL",)]
+    db.execute.return_value = result
+
+    codes = await generate_code_block_async(db, JournalEntry, "number", 3, "JE")
+
+    assert codes == ["JE000008", "JE000009", "JE000010"]
+    db.execute.assert_awaited_once()
+
+
+async def test_bulk_post_skips_on_recalculated_total():
+    invoice = _invoice()
+    invoice.status = InvoiceStatus.DRAFT
+    invoice.total_amount = Decimal("280")
+    for line in invoice.lines:
+        line.unit_price = Decimal("0")
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = [invoice]
+    db.execute.return_value = result
+    skipped = []
+
+    stopped = await InvoiceService(db)._bulk_post_chunk(
+        [invoice.id], uuid.uuid4(), None, False, [], [], skipped
+    )
+
+    assert not stopped
+    assert invoice.total_amount == Decimal("0")
+    assert [item["id"] for item in skipped] == [str(invoice.id)]
+    db.execute.assert_awaited_once()
@@ -0,0 +1,96 @@
+"""
+Tests for the synthetic ledger generator and the month-end benchmark suite.
+
+The entry templates, the CSV builder and the baseline comparison run here;
+the end-to-end run (COPY load, rolled-back samples, baseline JSON) needs a
+disposable PostgreSQL database in ``TEST_DATABASE_URL`` and is skipped otherwise.
+"""
+import csv
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import uuid
+
+import pytest
+from sqlalchemy.engine import make_url
+
+from scripts.benchmarks import ledger_benchmark_suite as suite
+from scripts.benchmarks import synthetic_ledger as ledger
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(ledger.__file__))
+
+
+def _catalog():
+    catalog = ledger.Catalog()
+    for *_, role in ledger.BASE_ACCOUNTS:
+        catalog.accounts.setdefault(role, []).append(uuid.uuid4())
+    catalog.customers = [uuid.uuid4() for _ in range(3)]
+    catalog.suppliers = [uuid.uuid4() for _ in range(3)]
+    return catalog
+
+
+def test_every_template_produces_balanced_lines():
+    catalog = _catalog()
+    rng = random.Random(42)
+    for template, _, _ in ledger.ENTRY_TEMPLATES:
+        for _ in range(20):
+            lines = ledger.template_lines(template, rng, catalog)
+            assert sum(debit for _, debit, _, _ in lines) == sum(credit for _, _, credit, _ in lines)
+            assert all((debit > 0) != (credit > 0) for _, debit, credit, _ in lines)
+
+
+def test_import_csv_has_one_row_per_third_party():
+    rows = list(csv.DictReader(io.StringIO(suite.build_import_csv(5).decode("utf-8"))))
+    assert len(rows) == 5
+    assert len({row["code"] for row in rows}) == 5
+
+
+def test_baseline_comparison_is_a_ratio_of_medians():
+    results = {"operations": {
+        "balance_sheet": {"median_seconds": 0.3},
+        "trial_balance": {"median_seconds": 0.1},
+        "cash_flow": {"error": "boom"},
+    }}
+    baseline = {"operations": {"balance_sheet": {"median_seconds": 0.2}, "cash_flow": {"median_seconds": 1.0}}}
+
+    assert suite.compare(results, baseline) == {"balance_sheet": 1.5, "trial_balance": None, "cash_flow": None}
+
+
+@pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL (PostgreSQL) not set")
+def test_smallest_scale_generate_and_benchmark_against_baseline(tmp_path):
+    url = make_url(DATABASE_URL)
+    env = dict(
+        os.environ,
+        DB_HOST=url.host or "localhost", DB_PORT=str(url.port or 5432), DB_USER=url.username or "",
+        DB_PASSWORD=url.password or "", DB_NAME=url.database, DEBUG="False", SEED_ON_STARTUP="False"
+    )
+
+    def run(script, *args):
+        completed = subprocess.run(
+            [sys.executable, os.path.join(SCRIPTS_DIR, script), *args],
+            env=env, capture_output=True, text=True, check=False
+        )
+        assert completed.returncode == 0, completed.stderr
+        return completed.stdout
+
+    baseline_path = tmp_path / "base.json"
+    options = ["--repeat", "2", "--bulk-size", "5", "--import-rows", "50"]
+    try:
+        summary = json.loads(run(
+            "synthetic_ledger.py", "generate", "--replace", "--json", "--journal-lines", "2000",
+            "--accounts", "20", "--pending-entries", "20", "--reconcile-lines", "20"
+        ))
+        assert summary["journal_lines"] >= 2000
+
+        run("ledger_benchmark_suite.py", *options, "--output", str(baseline_path))
+        results = json.loads(run("ledger_benchmark_suite.py", *options, "--baseline", str(baseline_path), "--json"))
+    finally:
+        run("synthetic_ledger.py", "drop", "--json")
+
+    assert set(results["operations"]) == set(suite.OPERATIONS)
+    assert not [name for name, result in results["operations"].items() if "error" in result]
+    assert set(results["baseline"]["ratios"]) == set(suite.OPERATIONS)
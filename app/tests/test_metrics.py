@@ -0,0 +1,95 @@
+"""
+Unit tests for the request instrumentation middleware and metrics registry.
+"""
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.utils.metrics import (
+    InstrumentationMiddleware, MetricsRegistry, RequestStats, collect_request_stats,
+    current_request_stats, instrument_engine, instrumented_pool_class, pool_stats, registry
+)
+
+
+def test_middleware_counts_sql_per_request_and_reports_server_timing():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    instrument_engine(engine)  # idempotente
+
+    app = FastAPI()
+    app.add_middleware(InstrumentationMiddleware, server_timing=True, slow_query_seconds=0.0)
+
+    @app.get("/items/{item_id}")
+    async def read_item(item_id: int):
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+        return {"id": item_id}
+
+    response = TestClient(app).get("/items/7")
+
+    assert response.status_code == 200
+    assert 'desc="2 queries"' in response.headers["server-timing"]
+    rendered = registry.render()
+    assert 'http_requests_total{method="GET",route="/items/{item_id}",status="200"} 1' in rendered
+    assert 'sql_slow_queries_total{route="/items/{item_id}"} 2' in rendered
+
+
+def test_registry_renders_histograms_and_stats_gauges():
+    metrics = MetricsRegistry()
+    latency = metrics.histogram("demo_seconds", "Demo", ("route",), buckets=(0.1, 1.0))
+    latency.observe(0.05, "/a")
+    latency.observe(0.5, "/a")
+    metrics.register_stats("pool", "Pool", lambda: {"size": 10, "name": "async"})
+
+    rendered = metrics.render()
+
+    assert 'demo_seconds_bucket{route="/a",le="0.1"} 1' in rendered
+    assert 'demo_seconds_bucket{route="/a",le="+Inf"} 2' in rendered
+    assert 'demo_seconds_count{route="/a"} 2' in rendered
+    assert "pool_size 10" in rendered and "pool_name" not in rendered
+
+
+def test_request_stats_keeps_slowest_statements_and_counts_all_slow_ones():
+    stats = RequestStats(slow_query_seconds=0.2)
+    for index, seconds in enumerate([0.01, 0.5, 0.02, 0.3, 0.4, 0.25]):
+        stats.record_query(f"SELECT {index}", seconds)
+
+    assert stats.queries == 6
+    assert stats.slow_queries == 4
+    assert [statement for _, statement in stats.slowest_statements()] == ["SELECT 1", "SELECT 4", "SELECT 3"]
+
+
+def test_collect_request_stats_counts_sql_outside_http():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+
+    with collect_request_stats() as stats:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 2"))
+
+    assert stats.queries == 1
+    assert current_request_stats() is None
+
+
+def test_instrumented_pool_reports_saturation_and_checkout_timeouts():
+    engine = create_engine(
+        "sqlite://", poolclass=instrumented_pool_class(QueuePool, "test_pool"),
+        pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+
+    with collect_request_stats() as stats:
+        connection = engine.connect()
+        assert pool_stats(engine.pool)["saturation"] == 1.0
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        connection.close()
+
+    assert stats.pool_wait_seconds >= 0.05
+    assert pool_stats(engine.pool)["idle"] == 1
+    assert 'db_pool_checkout_timeouts_total{pool="test_pool"} 1' in registry.render()
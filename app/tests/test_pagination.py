@@ -0,0 +1,89 @@
+"""
+Unit tests for the keyset pagination primitives.
+"""
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.payment import Payment
+from app.utils.exceptions import ValidationError
+from app.utils.pagination import (
+    KeysetPaginator, SortKey, create_paged_response, decode_cursor, encode_cursor, estimate_total
+)
+
+
+def _sql(statement) -> str:
+    return str(statement.compile(dialect=postgresql.dialect()))
+
+
+def test_cursor_roundtrip_keeps_types():
+    values = [
+        date(2024, 3, 1), datetime(2024, 3, 1, 10, 30, tzinfo=timezone.utc),
+        Decimal("1500.25"), uuid.uuid4(), InvoiceStatus.POSTED, "FAC-001", 7, True
+    ]
+
+    decoded = decode_cursor(encode_cursor(values, "sig"), "sig")
+
+    assert decoded[:4] == values[:4]
+    assert decoded[4] == "POSTED"
+    assert decoded[5:] == values[5:]
+    assert decode_cursor("", "sig") is None
+
+
+def test_cursor_rejects_other_sort_or_garbage():
+    by_date = KeysetPaginator(SortKey(Invoice.invoice_date, descending=True))
+    by_number = KeysetPaginator(SortKey(Invoice.number))
+    cursor = encode_cursor([date(2024, 1, 1), uuid.uuid4()], by_date.signature)
+
+    with pytest.raises(ValidationError):
+        decode_cursor(cursor, by_number.signature)
+    with pytest.raises(ValidationError):
+        decode_cursor("not-a-cursor!", by_date.signature)
+
+
+def test_keyset_query_uses_row_comparison_and_id_tiebreaker():
+    paginator = KeysetPaginator(SortKey(Payment.payment_date, descending=True))
+    cursor = encode_cursor([date(2024, 1, 1), uuid.uuid4()], paginator.signature)
+
+    sql = _sql(paginator.apply(select(Payment).order_by(Payment.amount), cursor, 50))
+
+    assert "(payments.payment_date, payments.id) < (" in sql
+    assert "ORDER BY payments.payment_date DESC, payments.id DESC" in sql
+    assert "OFFSET" not in sql and "payments.amount" not in sql.split("ORDER BY")[1]
+
+
+def test_next_cursor_only_for_full_pages():
+    paginator = KeysetPaginator(SortKey(Payment.payment_date, descending=True))
+    rows = [
+        {"payment_date": date(2024, 1, day), "id": uuid.uuid4()}
+        for day in (3, 2, 1)
+    ]
+
+    assert paginator.next_cursor(rows, 4) is None
+    cursor = paginator.next_cursor(rows, 3)
+    assert decode_cursor(cursor, paginator.signature) == [rows[-1]["payment_date"], rows[-1]["id"]]
+
+    page = create_paged_response(rows, total=3, skip=0, limit=3, next_cursor=cursor, total_is_estimate=True)
+    assert page.has_next and page.next_cursor == cursor
+
+
+async def test_estimate_total_keeps_filters_as_bound_parameters():
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.scalar.return_value = [{"Plan": {"Plan Rows": 42}}]
+    db.execute.return_value = result
+    query = select(Invoice.id).where(Invoice.number == "x' OR '1'='1").order_by(Invoice.id).limit(10)
+
+    assert await estimate_total(db, query) == 42
+
+    compiled = db.execute.await_args.args[0].compile(dialect=postgresql.dialect())
+    assert str(compiled).startswith("EXPLAIN (FORMAT JSON) SELECT")
+    assert "OR '1'='1" not in str(compiled)
+    assert list(compiled.params.values()) == ["x' OR '1'='1"]
@@ -0,0 +1,48 @@
+"""
+Unit tests for password hashing off the event loop.
+"""
+import asyncio
+import time
+from types import SimpleNamespace
+
+from app.utils.password_hasher import PasswordHasher
+
+
+def _slow_context(seconds):
+    def work(*args):
+        time.sleep(seconds)
+        return args[0]
+    return SimpleNamespace(hash=work, verify=lambda plain, hashed: work(plain) == hashed)
+
+
+async def test_hashing_does_not_block_the_loop():
+    hasher = PasswordHasher(_slow_context(0.05), max_workers=1, slow_wait_seconds=10)
+    ticks = 0
+
+    async def probe():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.005)
+            ticks += 1
+
+    probe_task = asyncio.create_task(probe())
+    results = await asyncio.gather(*(hasher.verify("secret", "secret") for _ in range(4)))
+    probe_task.cancel()
+    hasher.shutdown()
+
+    assert results == [True] * 4
+    # 4 operaciones serializadas (~200 ms): el loop siguió atendiendo al probe
+    assert ticks >= 10
+
+
+async def test_queue_wait_is_recorded():
+    hasher = PasswordHasher(_slow_context(0.02), max_workers=1, slow_wait_seconds=10)
+
+    await asyncio.gather(*(hasher.hash("secret") for _ in range(3)))
+    hasher.shutdown()
+
+    stats = hasher.stats()
+    assert stats["operations"] == 3
+    assert stats["waiting"] == 0
+    # La tercera operación espera a las dos anteriores
+    assert stats["wait_max_seconds"] >= 0.03
@@ -0,0 +1,90 @@
+"""
+Unit tests for the in-memory pieces of batched payment confirmation.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.account import AccountType
+from app.models.invoice import Invoice, InvoiceStatus
+from app.models.journal import Journal
+from app.models.payment import Payment, PaymentInvoice, PaymentStatus, PaymentType
+from app.models.third_party import ThirdParty
+from app.services.company_settings_cache import CompanySettingsSnapshot
+from app.services.payment_flow_service import PaymentFlowService
+from app.tests.factories import account_ref
+
+
+def _payment(payment_type, amount, invoice=None):
+    payment = Payment(
+        id=uuid.uuid4(),
+        number="PAY000001",
+        payment_type=payment_type,
+        status=PaymentStatus.DRAFT,
+        amount=Decimal(amount),
+        payment_date=date(2026, 10, 1),
+        third_party_id=uuid.uuid4(),
+        account_id=uuid.uuid4(),
+    )
+    payment.third_party = ThirdParty(name="Proveedor")
+    payment.payment_invoices = []
+    if invoice is not None:
+        payment.payment_invoices.append(
+            PaymentInvoice(invoice_id=invoice.id, invoice=invoice, amount=Decimal(amount))
+        )
+    return payment
+
+
+class TestPaymentBatchPosting:
+
+    def setup_method(self):
+        self.payable = account_ref("220505", AccountType.LIABILITY)
+        self.receivable = account_ref("130505", AccountType.ASSET)
+        self.snapshot = CompanySettingsSnapshot(
+            {"default_supplier_payable_account_id": self.payable.id},
+            [self.receivable, self.payable],
+            {}
+        )
+        self.service = PaymentFlowService(AsyncMock(spec=AsyncSession))
+
+    def test_supplier_payment_lines_are_balanced_without_queries(self):
+        payment = _payment(PaymentType.SUPPLIER_PAYMENT, "150")
+        entry_id = uuid.uuid4()
+
+        lines = self.service._build_payment_journal_lines(entry_id, payment, self.snapshot)
+
+        assert [line.account_id for line in lines] == [self.payable.id, payment.account_id]
+        assert [line.debit_amount for line in lines] == [Decimal("150"), Decimal("0")]
+        assert [line.credit_amount for line in lines] == [Decimal("0"), Decimal("150")]
+        assert [line.line_number for line in lines] == [1, 2]
+        assert all(line.journal_entry_id == entry_id for line in lines)
+        self.service.db.execute.assert_not_called()
+
+    def test_invoice_settled_earlier_in_batch_counts_as_paid(self):
+        invoice = Invoice(
+            id=uuid.uuid4(), number="INV000001", status=InvoiceStatus.POSTED,
+            outstanding_amount=Decimal("100"), total_amount=Decimal("100")
+        )
+        payment = _payment(PaymentType.SUPPLIER_PAYMENT, "40", invoice)
+
+        assert self.service._collect_confirmation_errors(payment, {invoice.id: Decimal("60")}) == []
+        errors = self.service._collect_confirmation_errors(payment, {invoice.id: Decimal("100")})
+        assert errors == [f"Invoice INV000001 has status {InvoiceStatus.PAID} which does not allow payments"]
+
+
+async def test_next_sequences_compare_the_numeric_suffix():
+    bank, cash = Journal(id=uuid.uuid4(), code="BNK"), Journal(id=uuid.uuid4(), code="CSH")
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.all.return_value = [(bank.id, 1000000)]
+    db.execute.return_value = result
+
+    sequences = await PaymentFlowService(db)._next_journal_entry_sequences([bank, cash])
+
+    assert sequences == {bank.id: 1000001, cash.id: 1}
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert "max(CAST(substr(journal_entries.number" in sql
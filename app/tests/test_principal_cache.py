@@ -0,0 +1,102 @@
+"""
+Unit tests for the authenticated user (principal) cache.
+"""
+import uuid
+from unittest.mock import AsyncMock, MagicMock
+
+import jwt
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api import deps
+from app.core.settings import settings
+from app.models.user import User, UserRole
+from app.services import auth_service
+from app.services.principal_cache import PrincipalCache
+
+
+def _user(role=UserRole.CONTADOR):
+    return User(
+        id=uuid.uuid4(),
+        email="contador@example.com",
+        full_name="Contador",
+        hashed_password="hash",
+        role=role,
+        is_active=True
+    )
+
+
+class TestPrincipalCache:
+
+    def test_hit_returns_copy_without_password(self):
+        cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+        user = _user()
+        cache.put(user)
+
+        cached = cache.get(user.id)
+
+        assert cached is not user
+        assert (cached.id, cached.role, cached.is_active) == (user.id, UserRole.CONTADOR, True)
+        assert cached.can_create_entries
+        assert cached.hashed_password is None
+
+    def test_least_recently_used_is_evicted(self):
+        cache = PrincipalCache(ttl_seconds=30, max_entries=2)
+        first, second, third = _user(), _user(), _user()
+        cache.put(first)
+        cache.put(second)
+        cache.get(first.id)
+        cache.put(third)
+
+        assert cache.get(second.id) is None
+        assert cache.get(first.id) is not None
+        assert cache.get(third.id) is not None
+
+    def test_read_before_invalidation_is_not_stored(self):
+        cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+        user = _user()
+        generation = cache.generation
+        cache.invalidate(user.id)
+        cache.put(user, generation)
+        assert cache.get(user.id) is None
+
+    def test_zero_ttl_disables_cache(self):
+        cache = PrincipalCache(ttl_seconds=0, max_entries=10)
+        user = _user()
+        cache.put(user)
+        assert cache.get(user.id) is None
+
+
+async def test_get_current_user_queries_once(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    monkeypatch.setattr(deps, "principal_cache", cache)
+    user = _user()
+    token = jwt.encode({"sub": str(user.id)}, settings.SECRET_KEY, algorithm="HS256")
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.scalar_one_or_none.return_value = user
+    db.execute.return_value = result
+
+    assert await deps.get_current_user(db, credentials) is user
+    cached = await deps.get_current_user(db, credentials)
+
+    assert cached.id == user.id
+    db.execute.assert_awaited_once()
+
+
+async def test_failed_login_counts_attempt_and_drops_cached_user(monkeypatch):
+    cache = PrincipalCache(ttl_seconds=30, max_entries=10)
+    monkeypatch.setattr(auth_service, "principal_cache", cache)
+    user = _user()
+    user.login_attempts = 0
+    cache.put(user)
+    service = auth_service.AuthService(AsyncMock(spec=AsyncSession))
+    monkeypatch.setattr(service, "get_user_by_email", AsyncMock(return_value=user))
+    monkeypatch.setattr(service, "_verify_password", AsyncMock(return_value=False))
+
+    assert await service.authenticate_user(user.email, "incorrecta") is None
+
+    assert user.login_attempts == 1
+    assert cache.get(user.id) is None
+    service.db.commit.assert_awaited_once()
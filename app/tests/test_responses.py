@@ -0,0 +1,53 @@
+"""
+Unit tests for the orjson response layer.
+"""
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.reports import TrialBalance, TrialBalanceItem
+from app.utils.responses import ORJSONResponse, dumps, model_response
+
+
+def _trial_balance() -> TrialBalance:
+    amount = Decimal("1234.50")
+    item = TrialBalanceItem(
+        account_id=uuid.uuid4(),
+        account_code="1105",
+        account_name="Caja",
+        opening_balance=Decimal("0.00"),
+        debit_movements=amount,
+        credit_movements=amount,
+        closing_balance=Decimal("0.00"),
+        normal_balance_side="debit"
+    )
+    return TrialBalance(
+        report_date=date(2024, 12, 31),
+        company_name="ACME",
+        accounts=[item],
+        total_debits=amount,
+        total_credits=amount,
+        is_balanced=True
+    )
+
+
+def test_model_response_matches_default_serialization():
+    report = _trial_balance()
+
+    body = json.loads(model_response(report).body)
+
+    assert body == jsonable_encoder(report)
+    assert body["total_debits"] == "1234.50"
+
+
+def test_orjson_dumps_decimal_as_string_and_passes_bytes_through():
+    moment = datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+    key = uuid.uuid4()
+
+    payload = json.loads(dumps({"amount": Decimal("0.10"), "at": moment, key: 1}))
+
+    assert payload == {"amount": "0.10", "at": "2024-01-02T03:04:05Z", str(key): 1}
+    assert ORJSONResponse(content=b'{"a":1}').body == b'{"a":1}'
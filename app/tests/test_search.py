@@ -0,0 +1,49 @@
+"""
+Unit tests for the trigram-indexed search documents.
+"""
+import importlib.util
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+
+from app.models.third_party import ThirdParty
+from app.utils.search import JOURNAL_ENTRY_SEARCH, THIRD_PARTY_SEARCH, normalize_term
+
+
+def _compile(statement):
+    return statement.compile(dialect=postgresql.dialect())
+
+
+def _migration():
+    path = next(Path("alembic/versions").glob("f5c1d9e3a720_*.py"))
+    spec = importlib.util.spec_from_file_location("trigram_migration", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_document_expression_matches_migration_index():
+    migration = _migration()
+    _, columns = migration.SEARCH_INDEXES["ix_journal_entries_search_trgm"]
+    expected = migration._document(f"journal_entries.{column}" for column in columns)
+
+    assert str(_compile(JOURNAL_ENTRY_SEARCH.expression)) == expected
+
+
+def test_condition_escapes_like_wildcards():
+    compiled = _compile(THIRD_PARTY_SEARCH.condition("  ACME_10%  "))
+
+    assert "LIKE" in str(compiled) and "ESCAPE '/'" in str(compiled)
+    assert "acme/_10/%" in compiled.params.values()
+    assert normalize_term("  Foo   BAR ") == "foo bar"
+
+
+def test_ranked_orders_prefix_matches_first_and_limits():
+    compiled = _compile(THIRD_PARTY_SEARCH.ranked(select(ThirdParty), "ac", limit=5))
+    sql = str(compiled)
+
+    assert "CASE WHEN" in sql
+    assert "similarity(" in sql
+    assert sql.index("CASE WHEN") < sql.index("similarity(")
+    assert 5 in compiled.params.values()
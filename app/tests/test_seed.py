@@ -0,0 +1,26 @@
+"""
+Unit tests for the startup seed version check.
+"""
+from unittest.mock import AsyncMock
+
+from sqlalchemy.exc import ProgrammingError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.seed import SEED_VERSION, is_seed_current
+
+
+async def test_fresh_database_without_tables_is_not_current():
+    db = AsyncMock(spec=AsyncSession)
+    db.scalar.side_effect = ProgrammingError(
+        "SELECT ...", {}, Exception('relation "system_configuration" does not exist')
+    )
+
+    assert await is_seed_current(db) is False
+    db.rollback.assert_awaited_once()
+
+
+async def test_applied_version_is_current():
+    db = AsyncMock(spec=AsyncSession)
+    db.scalar.return_value = {"version": SEED_VERSION}
+
+    assert await is_seed_current(db) is True
@@ -0,0 +1,70 @@
+"""
+Unit tests for the single-scan statistics builder.
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.third_party import ThirdParty, ThirdPartyType
+from app.services.stats_builder import StatsCache, StatsQuery, stats_cache
+
+
+def _query():
+    return (
+        StatsQuery(ThirdParty)
+        .count("total")
+        .count("customers", ThirdParty.third_party_type == ThirdPartyType.CUSTOMER)
+        .count("with_email", ThirdParty.email.is_not(None))
+        .count_by("by_country", ThirdParty.country)
+    )
+
+
+def test_metrics_compile_into_one_grouping_sets_select():
+    sql = str(_query().statement().compile(dialect=postgresql.dialect()))
+
+    assert sql.count("SELECT") == 1
+    assert "FILTER (WHERE" in sql
+    assert "GROUPING SETS((), (third_parties.country))" in sql
+
+
+async def test_execute_reads_totals_and_breakdowns_and_caches_them():
+    total_row = {
+        "total": 5, "customers": 3, "with_email": None,
+        "_key_0": None, "_grouping_0": 1, "_count_0": 4,
+    }
+    country_rows = [
+        {"total": 3, "customers": 2, "with_email": 1, "_key_0": "CO", "_grouping_0": 0, "_count_0": 3},
+        {"total": 1, "customers": 1, "with_email": 0, "_key_0": "PE", "_grouping_0": 0, "_count_0": 1},
+        {"total": 1, "customers": 0, "with_email": 0, "_key_0": None, "_grouping_0": 0, "_count_0": 0},
+    ]
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.mappings.return_value.all.return_value = country_rows + [total_row]
+    db.execute.return_value = result
+    stats_cache.invalidate()
+
+    stats = await _query().execute(db, cache_key="test")
+    cached = await _query().execute(db, cache_key="test")
+
+    db.execute.assert_awaited_once()
+    assert stats == {"total": 5, "customers": 3, "with_email": 0, "by_country": {"CO": 3, "PE": 1}}
+    assert cached is stats
+    stats_cache.invalidate()
+
+
+def test_cache_disabled_with_zero_ttl():
+    cache = StatsCache(ttl_seconds=0)
+    cache.put("key", {"total": 1})
+    assert cache.get("key") is None
+
+
+def test_cache_evicts_least_recently_used_key():
+    cache = StatsCache(ttl_seconds=60, max_entries=2)
+    cache.put("a", {"total": 1})
+    cache.put("b", {"total": 2})
+    cache.get("a")
+    cache.put("c", {"total": 3})
+    assert cache.get("b") is None
+    assert cache.get("a") == {"total": 1}
+    assert cache.get("c") == {"total": 3}
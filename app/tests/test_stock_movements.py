@@ -0,0 +1,140 @@
+"""
+Unit tests for the stock movement ledger: weighted average cost and batched stock checks.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.journal_entry import JournalEntry, JournalEntryLine, JournalEntryStatus, TransactionOrigin
+from app.models.product import StockMovementType
+from app.services.journal_entry_service import JournalEntryService
+from app.services.stock_movement_service import (
+    StockDelta, StockMovementService, line_direction, valuate_movements
+)
+from app.utils.exceptions import ValidationError
+
+
+def _delta(product_id, quantity, unit_cost=None, check_stock=False):
+    quantity = Decimal(quantity)
+    movement_type = StockMovementType.IN if quantity > 0 else StockMovementType.OUT
+    return StockDelta(product_id, quantity, unit_cost, movement_type, date(2026, 1, 15),
+                      check_stock=check_stock)
+
+
+def test_line_direction_by_origin_and_side():
+    assert line_direction(TransactionOrigin.SALE, Decimal("100")) == -1
+    assert line_direction(TransactionOrigin.PURCHASE, Decimal("0")) == 1
+    assert line_direction(TransactionOrigin.ADJUSTMENT, Decimal("10")) == 1
+    assert line_direction(TransactionOrigin.ADJUSTMENT, Decimal("0")) == -1
+
+
+def test_weighted_average_and_reversal_restore_previous_cost():
+    product_id = uuid.uuid4()
+    levels = {product_id: ("P001", Decimal("10"), Decimal("5"))}
+
+    rows, shortages = valuate_movements(levels, [
+        _delta(product_id, "10", Decimal("7")),  # entrada: promedio (50 + 70) / 20 = 6
+        _delta(product_id, "-5"),                # salida al promedio vigente
+        _delta(product_id, "-10", Decimal("7")),  # compensación de la entrada
+    ])
+
+    assert shortages == []
+    assert [row["balance_quantity"] for row in rows] == [Decimal("20"), Decimal("15"), Decimal("5")]
+    assert rows[0]["average_cost"] == Decimal("6.0000")
+    assert rows[1]["unit_cost"] == Decimal("6.0000") and rows[1]["total_cost"] == Decimal("-30.0000")
+    assert rows[2]["average_cost"] == Decimal("4.0000")
+    assert levels[product_id] == ("P001", Decimal("5"), Decimal("4.0000"))
+
+
+def _result(rows):
+    result = MagicMock()
+    result.all.return_value = rows
+    return result
+
+
+async def test_locked_batch_rejects_shortage_before_writing():
+    product_id, other_id = uuid.uuid4(), uuid.uuid4()
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.return_value = _result([
+        (product_id, "P001", Decimal("3"), Decimal("2")),
+        (other_id, "P002", Decimal("0"), Decimal("0")),
+    ])
+
+    with pytest.raises(ValidationError, match="Stock insuficiente para producto P001"):
+        await StockMovementService(db).record([
+            _delta(other_id, "4", Decimal("1")),
+            _delta(product_id, "-5", check_stock=True),
+        ])
+
+    # Solo el bloqueo de los productos: ni actualización ni inserción
+    db.execute.assert_awaited_once()
+
+
+async def test_sale_batch_reserves_with_one_conditional_update():
+    product_id = uuid.uuid4()
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.side_effect = [_result([(product_id, Decimal("7"), Decimal("2.5"))]), MagicMock()]
+
+    levels = await StockMovementService(db).record([
+        _delta(product_id, "-2", check_stock=True),
+        _delta(product_id, "-1", check_stock=True),
+    ])
+
+    reservation = str(db.execute.await_args_list[0].args[0].compile(dialect=postgresql.dialect()))
+    assert "FOR NO KEY UPDATE" in reservation and "RETURNING" in reservation
+    rows = db.execute.await_args_list[1].args[1]
+    assert [row["balance_quantity"] for row in rows] == [Decimal("8"), Decimal("7")]
+    assert rows[0]["unit_cost"] == Decimal("2.5")
+    assert levels[product_id][1:] == (Decimal("7"), Decimal("2.5"))
+
+
+async def test_partial_reservation_is_released_on_shortage():
+    reserved_id, short_id = uuid.uuid4(), uuid.uuid4()
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.side_effect = [
+        _result([(reserved_id, Decimal("4"), Decimal("1"))]),
+        MagicMock(),
+        _result([(short_id, "P002", Decimal("1"))]),
+    ]
+
+    with pytest.raises(ValidationError, match="Stock insuficiente para producto P002"):
+        await StockMovementService(db).record([
+            _delta(reserved_id, "-1", check_stock=True),
+            _delta(short_id, "-3", check_stock=True),
+        ])
+
+    release = str(db.execute.await_args_list[1].args[0].compile(dialect=postgresql.dialect()))
+    assert release.startswith("UPDATE products") and "RETURNING" not in release
+    assert db.execute.await_count == 3
+
+
+async def test_reversal_compensates_the_original_stock_movements():
+    product_id = uuid.uuid4()
+    original = JournalEntry(id=uuid.uuid4(), number="JE-000010", description="Venta")
+    original.lines = [
+        JournalEntryLine(
+            account_id=uuid.uuid4(), credit_amount=Decimal("150"), debit_amount=Decimal("0"),
+            description="Venta producto", product_id=product_id, quantity=Decimal("3"),
+            unit_price=Decimal("50"), line_number=1
+        )
+    ]
+    db = AsyncMock(spec=AsyncSession)
+    account_result = MagicMock()
+    account_result.scalar_one_or_none.return_value = None
+    db.execute.return_value = account_result
+    service = JournalEntryService(db)
+    service.generate_entry_number = AsyncMock(return_value="REV-000001")
+    service.cost_center_actuals = AsyncMock()
+    service.stock_movements = AsyncMock()
+
+    reversal = await service._create_reversal_entry(original, uuid.uuid4(), "Devolución")
+
+    line = next(item for item in db.add.call_args_list if isinstance(item.args[0], JournalEntryLine)).args[0]
+    assert (line.product_id, line.quantity, line.debit_amount) == (product_id, Decimal("3"), Decimal("150"))
+    assert reversal.status == JournalEntryStatus.POSTED
+    service.stock_movements.apply_entries.assert_awaited_once_with([original.id], sign=-1)
@@ -0,0 +1,114 @@
+"""
+Concurrency tests for the stock reservation path against a real PostgreSQL.
+
+The locking (``FOR NO KEY UPDATE`` in id order, conditional ``UPDATE ...
+RETURNING`` and ``_release`` on shortage) cannot be exercised with mocks, so
+these tests run only when ``TEST_DATABASE_URL`` points to a disposable
+PostgreSQL database (``postgresql+asyncpg://...``); otherwise they are skipped.
+"""
+import asyncio
+import os
+import random
+import uuid
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+import app.models  # noqa: F401  (registra todas las tablas en Base.metadata)
+from app.models.base import Base
+from app.models.product import Product, ProductType, StockMovement, StockMovementType
+from app.services.stock_movement_service import StockDelta, StockMovementService
+from app.utils.exceptions import ValidationError
+
+DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+CODE_PREFIX = "TEST-RSV-"
+
+pytestmark = pytest.mark.skipif(not DATABASE_URL, reason="TEST_DATABASE_URL (PostgreSQL) not set")
+
+
+@pytest.fixture
+async def sessions():
+    engine = create_async_engine(DATABASE_URL, pool_size=20)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, expire_on_commit=False)
+    yield factory
+    async with factory() as session:
+        await session.execute(delete(Product).where(Product.code.like(f"{CODE_PREFIX}%")))
+        await session.commit()
+    await engine.dispose()
+
+
+async def _products(sessions, *stocks):
+    run_id = uuid.uuid4().hex[:8]
+    products = [
+        Product(
+            code=f"{CODE_PREFIX}{run_id}-{index}",
+            name=f"{CODE_PREFIX}{run_id}-{index}",
+            product_type=ProductType.PRODUCT,
+            manage_inventory=True,
+            current_stock=Decimal(stock),
+            average_cost=Decimal("10"),
+            inventory_value=Decimal(stock) * Decimal("10"),
+            purchase_price=Decimal("10")
+        )
+        for index, stock in enumerate(stocks)
+    ]
+    async with sessions() as session:
+        session.add_all(products)
+        await session.commit()
+    return [product.id for product in products]
+
+
+def _sale(*product_ids):
+    return [
+        StockDelta(product_id, Decimal("-1"), None, StockMovementType.OUT, date.today(),
+                   reference="TEST", check_stock=True)
+        for product_id in product_ids
+    ]
+
+
+async def _post(sessions, deltas) -> bool:
+    async with sessions() as session:
+        try:
+            await StockMovementService(session).record(deltas)
+        except ValidationError:
+            await session.rollback()
+            return False
+        await session.commit()
+        return True
+
+
+async def test_concurrent_sales_never_oversell(sessions):
+    product_ids = await _products(sessions, 10, 10, 10)
+    rng = random.Random(7)
+    # Cada venta toma dos productos en orden aleatorio: sin el orden por id se bloquearían mutuamente
+    postings = [_sale(*rng.sample(product_ids, 2)) for _ in range(40)]
+
+    accepted = await asyncio.gather(*(_post(sessions, deltas) for deltas in postings))
+
+    async with sessions() as session:
+        stocks = dict((await session.execute(
+            select(Product.id, Product.current_stock).where(Product.id.in_(product_ids))
+        )).all())
+        moved = dict((await session.execute(
+            select(StockMovement.product_id, func.sum(StockMovement.quantity))
+            .where(StockMovement.product_id.in_(product_ids))
+            .group_by(StockMovement.product_id)
+        )).all())
+
+    assert all(stock >= 0 for stock in stocks.values())
+    assert sum(accepted) * 2 == sum(Decimal("10") - stock for stock in stocks.values())
+    assert all(moved.get(product_id, 0) == stocks[product_id] - 10 for product_id in product_ids)
+
+
+async def test_shortage_releases_the_products_already_reserved(sessions):
+    available, sold_out = await _products(sessions, 5, 0)
+
+    assert not await _post(sessions, _sale(available, sold_out))
+
+    async with sessions() as session:
+        assert await session.scalar(select(Product.current_stock).where(Product.id == available)) == 5
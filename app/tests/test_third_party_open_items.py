@@ -0,0 +1,53 @@
+"""
+Unit tests for third party open items: available credit and aging buckets.
+"""
+import uuid
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.third_party import OpenItemType, ThirdPartyType
+from app.services.third_party_open_item_service import ThirdPartyOpenItemService, parse_credit_limit
+
+
+def test_parse_credit_limit():
+    assert parse_credit_limit("1500.50") == Decimal("1500.50")
+    assert parse_credit_limit("") is None
+    assert parse_credit_limit("sin límite") is None
+
+
+async def test_available_credit_is_a_single_lookup():
+    db = AsyncMock(spec=AsyncSession)
+    result = MagicMock()
+    result.first.return_value = SimpleNamespace(credit_limit="1000", receivable_amount=Decimal("350.25"))
+    db.execute.return_value = result
+
+    available = await ThirdPartyOpenItemService(db).get_available_credit(uuid.uuid4())
+
+    db.execute.assert_awaited_once()
+    assert available == Decimal("649.75")
+
+
+async def test_aging_report_for_all_third_parties_in_one_query():
+    customer_id = uuid.uuid4()
+    db = AsyncMock(spec=AsyncSession)
+    db.execute.return_value = [
+        SimpleNamespace(
+            id=customer_id, code="C001", name="Cliente", third_party_type=ThirdPartyType.CUSTOMER,
+            item_type=OpenItemType.RECEIVABLE, current=Decimal("100"), days_31_60=Decimal("0"),
+            days_61_90=Decimal("20"), over_90_days=Decimal("5"), total_balance=Decimal("125")
+        )
+    ]
+
+    report = await ThirdPartyOpenItemService(db).get_aging_report(date(2026, 6, 30))
+
+    db.execute.assert_awaited_once()
+    sql = str(db.execute.await_args.args[0].compile(dialect=postgresql.dialect()))
+    assert sql.count("FILTER (WHERE") == 4
+    assert [(row.third_party_id, row.over_90_days, row.total_balance) for row in report] == [
+        (customer_id, Decimal("5"), Decimal("125"))
+    ]
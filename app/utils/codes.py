@@ -3,8 +3,9 @@ Code generation utilities for creating sequential codes.
 """
 import uuid
 from datetime import datetime
-from typing import Type, Optional
-from sqlalchemy import func
+from typing import List, Type, Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.models.base import Base
@@ -68,6 +69,64 @@ def generate_code(
     return f"{pattern_prefix}{numeric_part}"
 
 
+async def generate_code_async(
+    db: AsyncSession,
+    model_class: Type[Base],
+    field_name: str,
+    prefix: str = "",
+    length: int = 6,
+    date_format: Optional[str] = None
+) -> str:
+    """
+    Async version of generate_code.
+    
+    Only the codes matching the pattern are read and the numeric suffix is
+    parsed the same way, so both versions produce the same sequence.
+    """
+    codes = await generate_code_block_async(db, model_class, field_name, 1, prefix, length, date_format)
+    return codes[0]
+
+
+async def generate_code_block_async(
+    db: AsyncSession,
+    model_class: Type[Base],
+    field_name: str,
+    count: int,
+    prefix: str = "",
+    length: int = 6,
+    date_format: Optional[str] = None
+) -> List[str]:
+    """
+    Generate ``count`` consecutive codes with a single lookup of the current maximum.
+    
+    Example:
+        await generate_code_block_async(db, JournalEntry, "number", 3, "JE")
+        # ['JE000008', 'JE000009', 'JE000010']
+    """
+    if count <= 0:
+        return []
+    
+    date_part = ""
+    if date_format:
+        date_part = datetime.now().strftime(date_format.replace("YYYY", "%Y").replace("MM", "%m").replace("DD", "%d"))
+    
+    pattern_prefix = f"{prefix}{date_part}"
+    
+    field = getattr(model_class, field_name)
+    result = await db.execute(select(field).where(field.like(f"{pattern_prefix}%")))
+    
+    max_number = 0
+    for (code,) in result.all():
+        numeric_part = str(code)[len(pattern_prefix):] if code else ""
+        if numeric_part.isdigit():
+            max_number = max(max_number, int(numeric_part))
+    
+    return [
+        f"{pattern_prefix}{str(number).zfill(length)}"
+        for number in range(max_number + 1, max_number + 1 + count)
+    ]
+
+
 def generate_uuid_code() -> str:
     """Generate a UUID-based code"""
     return str(uuid.uuid4())
@@ -158,6 +217,51 @@ def generate_product_code(
     return f"{prefix}-{clean_name}-{timestamp}"
 
 
+async def generate_product_code_async(
+    db: AsyncSession,
+    name: str,
+    product_type: str = "product"
+) -> str:
+    """
+    Async version of generate_product_code (same format and collision handling).
+    """
+    from app.models.product import Product
+    import random
+    import string
+    
+    if product_type == 'service':
+        prefix = "SRV"
+    elif product_type == 'both':
+        prefix = "MIX"
+    else:
+        prefix = "PRD"
+    
+    clean_name = ''.join(c.upper() for c in name if c.isalnum())[:6]
+    if len(clean_name) < 3:
+        clean_name = clean_name.ljust(3, 'X')
+    
+    base_pattern = f"{prefix}-{clean_name}-"
+    result = await db.execute(select(Product.code).where(Product.code.like(f"{base_pattern}%")))
+    
+    max_number = 0
+    for (code,) in result.all():
+        if code and code.startswith(base_pattern):
+            number_part = code[len(base_pattern):].split('-')[0]
+            if number_part.isdigit():
+                max_number = max(max_number, int(number_part))
+    
+    next_number = max_number + 1
+    for _ in range(10):
+        random_suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
+        final_code = f"{prefix}-{clean_name}-{next_number:03d}-{random_suffix}"
+        existing = await db.scalar(select(Product.id).where(Product.code == final_code).limit(1))
+        if not existing:
+            return final_code
+    
+    timestamp = str(int(datetime.now().timestamp()))[-6:]
+    return f"{prefix}-{clean_name}-{timestamp}"
+
+
 def generate_reference(prefix: str = "REF", separator: str = "-") -> str:
     """
     Generate a reference code with timestamp.
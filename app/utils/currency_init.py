@@ -13,6 +13,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database import get_async_db
 from app.models.currency import Currency, ExchangeRate
+from app.services.exchange_rate_cache import exchange_rate_table
 from app.models.company_settings import CompanySettings
 from app.utils.logging import get_logger
 
@@ -311,6 +312,7 @@ class CurrencyInitializer:
         
         if created_rates:
             await self.db.commit()
+            exchange_rate_table.invalidate()
             
             # Refresh all created rates
             for rate in created_rates:
@@ -0,0 +1,494 @@
+"""
+Instrumentación por request y métricas en formato de texto de Prometheus.
+
+``InstrumentationMiddleware`` abre un ``RequestStats`` por request en una
+``ContextVar``; los eventos ``before_cursor_execute`` / ``after_cursor_execute``
+de los engines instrumentados (``instrument_engine``) le suman el tiempo y el
+número de sentencias SQL y conservan las más lentas. La ContextVar llega a las
+sentencias del engine asíncrono (los greenlets de SQLAlchemy comparten el
+contexto de la tarea) y a las del síncrono en el threadpool (Starlette copia
+el contexto al hilo).
+
+``EventLoopMonitor`` mide el retraso de un latido periódico del event loop: el
+tiempo bloqueado que se atribuye a un request es el acumulado mientras estuvo
+en curso, así que incluye bloqueos de requests concurrentes.
+
+Los pools creados con ``instrumented_pool_class`` registran la espera de cada
+checkout (también en el request en curso) y ``pool_stats`` expone su ocupación.
+
+Las métricas son por proceso; con varios workers cada uno expone las suyas.
+"""
+import asyncio
+import heapq
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Type
+
+from sqlalchemy import event
+from sqlalchemy import exc as sa_exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+SLOWEST_STATEMENTS = 3
+_STATEMENT_PREVIEW = 300
+
+
+# ================================
+# REGISTRO DE MÉTRICAS
+# ================================
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def samples(self) -> Iterable[str]:
+        for label_values, value in self._values.items():
+            yield f"{self.name}{_labels(self.labels, label_values)} {_number(value)}"
+
+
+class Histogram:
+    """Histograma acumulado con buckets fijos"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.description = description
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Por etiquetas: [conteo por bucket..., conteo en +Inf, suma]
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._values.get(label_values)
+        if series is None:
+            series = self._values[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def samples(self) -> Iterable[str]:
+        for label_values, series in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                bucket_label = f'le="{le}"'
+                yield f"{self.name}_bucket{_labels(self.labels, label_values, bucket_label)} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, label_values)} {_number(series[-1])}"
+            yield f"{self.name}_count{_labels(self.labels, label_values)} {cumulative}"
+
+
+class StatsGauges:
+    """Gauges leídos al exportar de una función ``stats()`` que devuelve un dict"""
+
+    type_name = "gauge"
+
+    def __init__(self, prefix: str, description: str, collect: Callable[[], Dict[str, Any]]):
+        self.name = prefix
+        self.description = description
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        try:
+            stats = self.collect()
+        except Exception as exc:
+            logger.warning(f"No se pudieron leer las métricas de {self.name}: {exc}")
+            return
+        for key, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.name}_{key}"
+            yield f"# HELP {name} {self.description}: {key}"
+            yield f"# TYPE {name} gauge"
+            yield f"{name} {_number(value)}"
+
+
+class MetricsRegistry:
+    """Métricas del proceso en el formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metrics: List[Any] = []
+
+    def counter(self, name: str, description: str, labels: Sequence[str] = ()) -> Counter:
+        metric = Counter(name, description, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> Histogram:
+        metric = Histogram(name, description, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_stats(self, prefix: str, description: str, collect: Callable[[], Dict[str, Any]]) -> None:
+        """Exporta cada valor numérico de ``collect()`` como gauge ``<prefix>_<clave>``"""
+        self._metrics = [
+            metric for metric in self._metrics
+            if not (isinstance(metric, StatsGauges) and metric.name == prefix)
+        ]
+        self._metrics.append(StatsGauges(prefix, description, collect))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            if isinstance(metric, StatsGauges):
+                lines.extend(metric.render())
+                continue
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "http_requests_total", "Requests atendidos", ("method", "route", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Tiempo total del request", ("method", "route")
+)
+REQUEST_SQL_SECONDS = registry.histogram(
+    "http_request_sql_duration_seconds", "Tiempo en SQL por request", ("method", "route")
+)
+REQUEST_SQL_QUERIES = registry.histogram(
+    "http_request_sql_queries", "Sentencias SQL por request", ("method", "route"), QUERY_COUNT_BUCKETS
+)
+REQUEST_LOOP_BLOCKED = registry.histogram(
+    "http_request_event_loop_blocked_seconds",
+    "Bloqueo del event loop observado durante el request",
+    ("method", "route")
+)
+SLOW_QUERIES = registry.counter(
+    "sql_slow_queries_total", "Sentencias SQL sobre el umbral de lentitud", ("route",)
+)
+DB_POOL_CHECKOUT_SECONDS = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Espera para obtener una conexión del pool", ("pool",),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+)
+DB_POOL_TIMEOUTS = registry.counter(
+    "db_pool_checkout_timeouts_total", "Checkouts que agotaron pool_timeout", ("pool",)
+)
+EVENT_LOOP_LAG = registry.histogram(
+    "event_loop_lag_seconds", "Retraso del latido del event loop",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+
+# ================================
+# ESTADÍSTICAS POR REQUEST Y SQL
+# ================================
+
+class RequestStats:
+    """Contadores de un request en curso"""
+
+    __slots__ = (
+        "started", "sql_seconds", "queries", "pool_wait_seconds", "slowest", "loop_blocked_start",
+        "slow_query_seconds", "slow_queries"
+    )
+
+    def __init__(self, loop_blocked_start: float = 0.0, slow_query_seconds: float = float("inf")):
+        self.started = time.perf_counter()
+        self.sql_seconds = 0.0
+        self.queries = 0
+        # Todas las sentencias sobre el umbral; el heap solo guarda una muestra para el log
+        self.slow_query_seconds = slow_query_seconds
+        self.slow_queries = 0
+        self.pool_wait_seconds = 0.0
+        # Min-heap de (segundos, sentencia) con las más lentas
+        self.slowest: List[Tuple[float, str]] = []
+        self.loop_blocked_start = loop_blocked_start
+
+    def record_query(self, statement: str, seconds: float) -> None:
+        self.queries += 1
+        self.sql_seconds += seconds
+        if seconds >= self.slow_query_seconds:
+            self.slow_queries += 1
+        if len(self.slowest) < SLOWEST_STATEMENTS:
+            heapq.heappush(self.slowest, (seconds, statement))
+        elif seconds > self.slowest[0][0]:
+            heapq.heapreplace(self.slowest, (seconds, statement))
+
+    def slowest_statements(self) -> List[Tuple[float, str]]:
+        return sorted(self.slowest, reverse=True)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, loop_blocked: float) -> str:
+        return (
+            f"app;dur={self.elapsed() * 1000:.1f}, "
+            f'db;dur={self.sql_seconds * 1000:.1f};desc="{self.queries} queries", '
+            f"pool;dur={self.pool_wait_seconds * 1000:.1f}, "
+            f"loop;dur={loop_blocked * 1000:.1f}"
+        )
+
+
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestStats]:
+    """Estadísticas del request en curso (None fuera de un request)"""
+    return _current_request.get()
+
+
+@contextmanager
+def collect_request_stats() -> Iterator[RequestStats]:
+    """
+    Abre un ``RequestStats`` fuera de HTTP (scripts, benchmarks) para contar el
+    SQL de los engines instrumentados ejecutado dentro del bloque.
+    """
+    stats = RequestStats(loop_monitor.blocked_seconds)
+    token = _current_request.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_request.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    stats = _current_request.get()
+    started = getattr(context, "_metrics_started", None)
+    if stats is not None and started is not None:
+        stats.record_query(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Registra los eventos de tiempo SQL en un engine síncrono (o ``async_engine.sync_engine``)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ================================
+# POOL DE CONEXIONES
+# ================================
+
+def instrumented_pool_class(base: Type[QueuePool], label: str) -> Type[QueuePool]:
+    """
+    Subclase de ``base`` (``QueuePool`` o ``AsyncAdaptedQueuePool``) que mide la
+    espera de cada checkout y cuenta los que agotan ``pool_timeout``. La
+    etiqueta va en la clase porque ``dispose()`` recrea el pool con la misma.
+    """
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return base._do_get(self)
+        except sa_exc.TimeoutError:
+            DB_POOL_TIMEOUTS.inc(label)
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            DB_POOL_CHECKOUT_SECONDS.observe(waited, label)
+            stats = _current_request.get()
+            if stats is not None:
+                stats.pool_wait_seconds += waited
+
+    # Mismo módulo que la base para conservar el logger de sqlalchemy.pool
+    return type(
+        f"Instrumented{base.__name__}",
+        (base,),
+        {"_do_get": _do_get, "metrics_label": label, "__module__": base.__module__}
+    )
+
+
+def pool_stats(pool: Pool) -> Dict[str, Any]:
+    """Ocupación de un ``QueuePool``: conexiones abiertas, en uso, libres y saturación"""
+    if not isinstance(pool, QueuePool):
+        return {}
+    # overflow() parte de -pool_size hasta que el pool se llena
+    max_overflow = pool._max_overflow
+    capacity = pool.size() + max_overflow if max_overflow >= 0 else 0
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "max_overflow": max_overflow,
+        "open": pool.checkedin() + checked_out,
+        "checked_out": checked_out,
+        "idle": pool.checkedin(),
+        "overflow": max(0, pool.overflow()),
+        "saturation": checked_out / capacity if capacity else 0.0,
+    }
+
+
+# ================================
+# EVENT LOOP
+# ================================
+
+class EventLoopMonitor:
+    """Mide cuánto se retrasa un latido periódico del event loop"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.blocked_seconds = 0.0
+        self.max_lag_seconds = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            EVENT_LOOP_LAG.observe(lag)
+            self.blocked_seconds += lag
+            self.max_lag_seconds = max(self.max_lag_seconds, lag)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "blocked_seconds_total": self.blocked_seconds,
+            "lag_max_seconds": self.max_lag_seconds,
+        }
+
+
+loop_monitor = EventLoopMonitor()
+registry.register_stats("event_loop", "Monitor del event loop", loop_monitor.stats)
+
+
+# ================================
+# MIDDLEWARE
+# ================================
+
+class InstrumentationMiddleware:
+    """
+    Middleware ASGI que mide cada request HTTP: tiempo total, tiempo y número
+    de sentencias SQL y bloqueo del event loop. Registra como warning las
+    sentencias sobre ``slow_query_seconds`` y, si ``server_timing``, añade la
+    cabecera ``Server-Timing`` a la respuesta.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        server_timing: bool = False,
+        slow_query_seconds: float = 0.2,
+        exclude_paths: Sequence[str] = ("/metrics",)
+    ):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_query_seconds = slow_query_seconds
+        self.exclude_paths = frozenset(exclude_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude_paths:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(loop_monitor.blocked_seconds, self.slow_query_seconds)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if self.server_timing:
+                    blocked = loop_monitor.blocked_seconds - stats.loop_blocked_start
+                    MutableHeaders(scope=message).append("Server-Timing", stats.server_timing(blocked))
+            await send(message)
+
+        token = _current_request.set(stats)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_request.reset(token)
+            self._record(scope, stats, status_code)
+
+    def _record(self, scope: Scope, stats: RequestStats, status_code: int) -> None:
+        # Plantilla de la ruta (no el path concreto) para acotar las series
+        route = getattr(scope.get("route"), "path", None) or "unmatched"
+        method = scope["method"]
+        elapsed = stats.elapsed()
+
+        REQUESTS.inc(method, route, str(status_code))
+        REQUEST_SECONDS.observe(elapsed, method, route)
+        REQUEST_SQL_SECONDS.observe(stats.sql_seconds, method, route)
+        REQUEST_SQL_QUERIES.observe(stats.queries, method, route)
+        REQUEST_LOOP_BLOCKED.observe(loop_monitor.blocked_seconds - stats.loop_blocked_start, method, route)
+
+        if stats.slow_queries:
+            SLOW_QUERIES.inc(route, amount=stats.slow_queries)
+            slow = [
+                (seconds, statement) for seconds, statement in stats.slowest_statements()
+                if seconds >= self.slow_query_seconds
+            ]
+            details = "\n".join(
+                f"  {seconds * 1000:.1f} ms: {' '.join(statement.split())[:_STATEMENT_PREVIEW]}"
+                for seconds, statement in slow
+            )
+            logger.warning(
+                f"SQL lento en {method} {route}: {elapsed * 1000:.1f} ms en total, "
+                f"{stats.queries} sentencias ({stats.slow_queries} lentas), "
+                f"{stats.sql_seconds * 1000:.1f} ms en SQL\n{details}"
+            )
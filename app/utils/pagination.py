@@ -1,11 +1,33 @@
-from typing import Generic, TypeVar, List, Optional
+import base64
+import binascii
+import hashlib
+import json
+import uuid
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Generic, List, Mapping, NamedTuple, Optional, Sequence, TypeVar
+
 from pydantic import BaseModel, Field
 from math import ceil
+from sqlalchemy import Select, and_, or_, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.utils.exceptions import ValidationError
 
 T = TypeVar('T')
 
 
-class PagedResponse(BaseModel, Generic[T]):
+class CursorPageInfo(BaseModel):
+    """Metadatos de paginación por cursor (keyset) comunes a las respuestas de listado"""
+    next_cursor: Optional[str] = Field(None, description="Cursor opaco de la página siguiente (None si no hay más)")
+    total_is_estimate: bool = Field(False, description="Si el total es una estimación del planificador")
+
+
+class PagedResponse(CursorPageInfo, Generic[T]):
     """Respuesta paginada genérica"""
     items: List[T] = Field(..., description="Lista de elementos")
     total: int = Field(..., description="Total de elementos")
@@ -22,7 +44,9 @@ def create_paged_response(
     items: List[T],
     total: int,
     skip: int,
-    limit: int
+    limit: int,
+    next_cursor: Optional[str] = None,
+    total_is_estimate: bool = False
 ) -> PagedResponse[T]:
     """
     Crea una respuesta paginada
@@ -32,6 +56,8 @@ def create_paged_response(
         total: Total de elementos
         skip: Número de elementos omitidos
         limit: Límite de elementos por página
+        next_cursor: Cursor de la página siguiente (paginación por cursor)
+        total_is_estimate: Si ``total`` viene de ``estimate_total``
         
     Returns:
         PagedResponse con metadatos de paginación
@@ -43,7 +69,7 @@ def create_paged_response(
     total_pages = ceil(total / limit) if limit > 0 and total > 0 else 1
     
     # Calcular si hay páginas siguiente y anterior
-    has_next = page < total_pages
+    has_next = page < total_pages or next_cursor is not None
     has_prev = page > 1
     
     # Calcular números de página siguiente y anterior
@@ -59,5 +85,188 @@ def create_paged_response(
         has_next=has_next,
         has_prev=has_prev,
         next_page=next_page,
-        prev_page=prev_page
+        prev_page=prev_page,
+        next_cursor=next_cursor,
+        total_is_estimate=total_is_estimate
     )
+
+
+# ================================
+# PAGINACIÓN POR CURSOR (KEYSET)
+# ================================
+
+# Etiquetas de tipo del cursor: JSON no distingue fechas, UUID ni decimales
+_ENCODERS = (
+    (bool, "b", lambda value: value),
+    (int, "i", lambda value: value),
+    (Decimal, "n", str),
+    (uuid.UUID, "u", str),
+    (datetime, "t", lambda value: value.isoformat()),
+    (date, "d", lambda value: value.isoformat()),
+    (Enum, "e", lambda value: value.name),
+    (str, "s", lambda value: value),
+)
+
+_DECODERS = {
+    "b": bool,
+    "i": int,
+    "n": Decimal,
+    "u": uuid.UUID,
+    "t": datetime.fromisoformat,
+    "d": date.fromisoformat,
+    # Los SQLEnum aceptan el nombre del miembro al enlazar parámetros
+    "e": str,
+    "s": str,
+}
+
+
+def _encode_value(value: Any) -> List[Any]:
+    for value_type, tag, encoder in _ENCODERS:
+        if isinstance(value, value_type):
+            return [tag, encoder(value)]
+    raise TypeError(f"Tipo no soportado en cursor: {type(value).__name__}")
+
+
+def encode_cursor(values: Sequence[Any], signature: str = "") -> str:
+    """
+    Codifica los valores de la clave de ordenamiento de la última fila en un
+    cursor opaco (base64 url-safe de un JSON con etiquetas de tipo)
+    """
+    payload = {"k": signature, "v": [_encode_value(value) for value in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], signature: str = "") -> Optional[List[Any]]:
+    """
+    Decodifica un cursor de ``encode_cursor``. Un cursor vacío o None es la
+    primera página y devuelve None.
+
+    Raises:
+        ValidationError: Si el cursor está mal formado o se generó con otro ordenamiento
+    """
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_DECODERS[tag](value) for tag, value in payload["v"]]
+        cursor_signature = payload["k"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise ValidationError("Cursor de paginación inválido", field="cursor")
+    if cursor_signature != signature:
+        raise ValidationError(
+            "El cursor de paginación no corresponde al ordenamiento solicitado",
+            field="cursor"
+        )
+    return values
+
+
+class SortKey(NamedTuple):
+    """Columna de una clave de ordenamiento estable (debe ser NOT NULL)"""
+    column: InstrumentedAttribute
+    descending: bool = False
+
+
+class KeysetPaginator:
+    """
+    Paginación por clave sobre un ordenamiento multi-columna.
+
+    Se añade ``id`` como desempate final para que el orden sea total y el
+    cursor identifique una posición única. En lugar de ``OFFSET`` la consulta
+    filtra las filas posteriores a la clave de la última fila entregada, así
+    que el costo de cada página no crece con la profundidad.
+    """
+
+    def __init__(self, *keys: SortKey):
+        id_column = keys[0].column.class_.id
+        if not any(key.column is id_column for key in keys):
+            keys = keys + (SortKey(id_column, keys[-1].descending),)
+        self.keys = keys
+
+    @property
+    def signature(self) -> str:
+        """Huella del ordenamiento; invalida cursores de otro ``sort_by``"""
+        description = ",".join(
+            f"{key.column.class_.__tablename__}.{key.column.key}:{'desc' if key.descending else 'asc'}"
+            for key in self.keys
+        )
+        return hashlib.sha1(description.encode()).hexdigest()[:12]
+
+    def order_by(self) -> list:
+        return [key.column.desc() if key.descending else key.column.asc() for key in self.keys]
+
+    def after(self, values: Sequence[Any]):
+        """Condición de las filas posteriores a ``values`` en este ordenamiento"""
+        if len(values) != len(self.keys):
+            raise ValidationError("Cursor de paginación inválido", field="cursor")
+
+        if len({key.descending for key in self.keys}) == 1:
+            # Una sola dirección: comparación de tuplas, la resuelve el índice compuesto
+            columns = tuple_(*(key.column for key in self.keys))
+            bound = tuple_(*values)
+            return columns < bound if self.keys[0].descending else columns > bound
+
+        # Direcciones mixtas: (a > x) OR (a = x AND b < y) OR ...
+        branches = []
+        for position, key in enumerate(self.keys):
+            equal = [
+                previous.column == value
+                for previous, value in zip(self.keys[:position], values)
+            ]
+            step = key.column < values[position] if key.descending else key.column > values[position]
+            branches.append(and_(*equal, step))
+        return or_(*branches)
+
+    def apply(self, query: Select, cursor: Optional[str], limit: int) -> Select:
+        """Reemplaza el ORDER BY de ``query``, filtra tras el cursor y limita la página"""
+        values = decode_cursor(cursor, self.signature)
+        query = query.order_by(None).order_by(*self.order_by())
+        if values is not None:
+            query = query.where(self.after(values))
+        return query.limit(limit)
+
+    def cursor_for(self, item: Any) -> str:
+        """Cursor que apunta justo después de ``item`` (modelo o diccionario)"""
+        if isinstance(item, Mapping):
+            values = [item[key.column.key] for key in self.keys]
+        else:
+            values = [getattr(item, key.column.key) for key in self.keys]
+        return encode_cursor(values, self.signature)
+
+    def next_cursor(self, items: Sequence[Any], limit: int) -> Optional[str]:
+        """
+        Cursor de la página siguiente, o None si la página no se llenó.
+        Si el total es múltiplo exacto de ``limit`` la última página llega vacía.
+        """
+        if not items or len(items) < limit:
+            return None
+        return self.cursor_for(items[-1])
+
+
+class _ExplainJson(Executable, ClauseElement):
+    """``EXPLAIN (FORMAT JSON)`` de una consulta, con sus parámetros enlazados"""
+    inherit_cache = False
+
+    def __init__(self, query: Select):
+        self.query = query
+
+
+@compiles(_ExplainJson)
+def _compile_explain_json(element: _ExplainJson, compiler, **kw) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.query, **kw)
+
+
+async def estimate_total(db: AsyncSession, query: Select) -> int:
+    """
+    Total aproximado de filas de ``query`` según las estadísticas del
+    planificador (``EXPLAIN``), sin recorrer la tabla como ``COUNT(*)``.
+
+    Los filtros viajan como parámetros, igual que en la consulta original.
+    """
+    query = query.order_by(None).limit(None).offset(None)
+    result = await db.execute(_ExplainJson(query))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
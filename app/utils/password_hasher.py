@@ -0,0 +1,134 @@
+"""
+Hash y verificación de contraseñas fuera del event loop.
+
+bcrypt es CPU intensivo a propósito (decenas de ms por operación); ejecutado
+dentro de una corrutina congela el worker completo. ``PasswordHasher`` lo envía
+a un executor de hilos propio y acotado, y un semáforo limita cuántas
+operaciones están en curso: el resto espera en el semáforo sin ocupar hilos ni
+bloquear el loop. El tiempo de espera en la cola se registra para detectar
+ráfagas de logins (ver ``stats``).
+"""
+import asyncio
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from passlib.context import CryptContext
+
+from app.core.settings import settings
+from app.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Muestras recientes de espera usadas para los percentiles
+_WAIT_SAMPLE_SIZE = 1024
+
+
+class PasswordHasher:
+    """Executor acotado con semáforo y métrica de espera para operaciones de hash"""
+
+    def __init__(
+        self,
+        context: CryptContext,
+        max_workers: Optional[int] = None,
+        slow_wait_seconds: Optional[float] = None
+    ):
+        self.context = context
+        self.max_workers = max(
+            1, max_workers if max_workers is not None else settings.PASSWORD_HASH_WORKERS
+        )
+        self.slow_wait_seconds = (
+            slow_wait_seconds if slow_wait_seconds is not None
+            else settings.PASSWORD_HASH_SLOW_WAIT_SECONDS
+        )
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Un semáforo por event loop (asyncio.Semaphore queda ligado a su loop)
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._waits: Deque[float] = deque(maxlen=_WAIT_SAMPLE_SIZE)
+        self._operations = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._waiting = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix="password-hash"
+                    )
+        return self._executor
+
+    def _get_semaphore(self, loop: asyncio.AbstractEventLoop) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(loop)
+        if semaphore is None:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_workers)
+        return semaphore
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        queued_at = time.perf_counter()
+        acquired = False
+        self._waiting += 1
+        try:
+            async with self._get_semaphore(loop):
+                acquired = True
+                self._waiting -= 1
+                self._record_wait(time.perf_counter() - queued_at)
+                return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            if not acquired:
+                # Cancelada mientras esperaba turno
+                self._waiting -= 1
+
+    def _record_wait(self, wait: float) -> None:
+        self._operations += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
+        self._waits.append(wait)
+        if wait >= self.slow_wait_seconds:
+            logger.warning(
+                f"Password hashing queue wait {wait * 1000:.0f} ms "
+                f"({self._waiting} operaciones en espera)"
+            )
+
+    async def hash(self, password: str) -> str:
+        """Genera el hash de una contraseña"""
+        return await self._run(self.context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifica una contraseña contra su hash"""
+        return await self._run(self.context.verify, plain_password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        """Métrica de espera en la cola (segundos) sobre las muestras recientes"""
+        samples = sorted(self._waits)
+
+        def percentile(fraction: float) -> float:
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+        return {
+            "operations": self._operations,
+            "waiting": self._waiting,
+            "max_workers": self.max_workers,
+            "wait_avg_seconds": self._wait_total / self._operations if self._operations else 0.0,
+            "wait_p50_seconds": percentile(0.50),
+            "wait_p99_seconds": percentile(0.99),
+            "wait_max_seconds": self._wait_max,
+        }
+
+    def shutdown(self) -> None:
+        """Libera los hilos del executor (se recrea en el próximo uso)"""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
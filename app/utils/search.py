@@ -0,0 +1,73 @@
+"""
+Búsqueda de texto indexada con pg_trgm.
+
+Cada tabla buscable tiene un "documento de búsqueda": sus campos de texto en
+minúsculas, unidos por espacio. La migración ``f5c1d9e3a720`` crea un índice
+GIN ``gin_trgm_ops`` sobre exactamente la misma expresión, de modo que
+``documento LIKE '%término%'`` lo usa en lugar de recorrer la tabla con varios
+``ILIKE`` unidos por OR. Las constantes se escriben literales (no como
+parámetros) para que PostgreSQL reconozca la expresión del índice.
+
+Si cambian las columnas de un documento, hay que recrear su índice.
+"""
+from typing import Optional
+
+from sqlalchemy import Select, String, case, func, literal_column
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.journal_entry import JournalEntry
+from app.models.product import Product
+from app.models.third_party import ThirdParty
+
+_EMPTY = literal_column("''", String)
+_SEPARATOR = literal_column("' '", String)
+
+
+def normalize_term(term: str) -> str:
+    """Término en minúsculas con los espacios colapsados"""
+    return " ".join(term.lower().split())
+
+
+class SearchDocument:
+    """Expresión indexada de búsqueda de una tabla"""
+
+    def __init__(self, *columns: ColumnElement):
+        document = func.coalesce(columns[0], _EMPTY)
+        for column in columns[1:]:
+            document = document + _SEPARATOR + func.coalesce(column, _EMPTY)
+        self.expression = func.lower(document)
+
+    def condition(self, term: str) -> ColumnElement:
+        """Filtro por subcadena (mismo resultado que los ILIKE anteriores)"""
+        return self.expression.contains(normalize_term(term), autoescape=True)
+
+    def ranked(self, query: Select, term: str, limit: Optional[int] = 20) -> Select:
+        """
+        Filtra por el término y ordena por relevancia: primero los documentos
+        que empiezan por él, luego los que tienen una palabra que empieza por
+        él, y dentro de cada grupo por similitud de trigramas.
+        """
+        term = normalize_term(term)
+        prefix_rank = case(
+            (self.expression.startswith(term, autoescape=True), 2),
+            (self.expression.contains(" " + term, autoescape=True), 1),
+            else_=0
+        )
+        query = query.where(self.condition(term)).order_by(
+            prefix_rank.desc(),
+            func.similarity(self.expression, term).desc()
+        )
+        if limit:
+            query = query.limit(limit)
+        return query
+
+
+PRODUCT_SEARCH = SearchDocument(
+    Product.code, Product.name, Product.description, Product.barcode, Product.sku
+)
+THIRD_PARTY_SEARCH = SearchDocument(
+    ThirdParty.code, ThirdParty.name, ThirdParty.commercial_name, ThirdParty.document_number
+)
+JOURNAL_ENTRY_SEARCH = SearchDocument(
+    JournalEntry.number, JournalEntry.description, JournalEntry.reference
+)
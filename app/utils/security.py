@@ -7,9 +7,13 @@ from typing import Any, Union, Dict
 from passlib.context import CryptContext
 
 from app.core.settings import settings
+from app.utils.password_hasher import PasswordHasher
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Hash/verificación para código async: ejecutor acotado fuera del event loop
+password_hasher = PasswordHasher(pwd_context)
+
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta
@@ -27,6 +27,12 @@ if [ "${RUN_MIGRATIONS:-false}" = "true" ]; then
     alembic upgrade head
 fi
 
+# Cargar datos iniciales (idempotente y versionado: no hace nada si ya está al día)
+if [ "${RUN_SEED:-true}" = "true" ]; then
+    echo "🌱 Verificando datos iniciales..."
+    python -m app.core.seed
+fi
+
 # Crear usuario admin si es necesario
 if [ "${CREATE_ADMIN:-false}" = "true" ]; then
     echo "👤 Creando usuario administrador..."
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark de serialización JSON: libro mayor sintético de ``--movements``
+movimientos (por defecto 100k) repartidos en ``--accounts`` cuentas.
+
+Compara, para el mismo ``GeneralLedger`` ya validado:
+
+- ``fastapi_json``: camino por defecto de FastAPI (revalidación contra
+  ``response_model``, serialización y ``json.dumps`` de ``JSONResponse``)
+- ``fastapi_orjson``: el mismo camino con ``ORJSONResponse`` como clase por
+  defecto de la aplicación
+- ``orjson_model_dump``: pre-serialización con ``model_dump`` + orjson (cada
+  ``Decimal`` pasa por el ``default`` en Python)
+- ``model_response``: bytes pre-serializados con pydantic-core (sin revalidar),
+  el camino de los endpoints calientes
+
+Mide el tiempo (mejor y mediana de ``--repeat`` corridas) y el pico de memoria
+asignada con ``tracemalloc`` en una corrida aparte. No necesita base de datos.
+
+Uso:
+    python scripts/benchmarks/json_serialization_benchmark.py
+    python scripts/benchmarks/json_serialization_benchmark.py --movements 200000 --json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Any, Callable, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from app.schemas.reports import GeneralLedger, LedgerAccount, LedgerMovement  # noqa: E402
+from app.utils.responses import ORJSONResponse, dumps, model_response  # noqa: E402
+
+
+def build_ledger(movements: int, accounts: int) -> GeneralLedger:
+    """Libro mayor sintético con saldos corridos coherentes"""
+    start = date(2024, 1, 1)
+    per_account = max(1, movements // accounts)
+    ledger_accounts = []
+    for account_index in range(accounts):
+        balance = Decimal("0.00")
+        account_movements = []
+        debits = credits = Decimal("0.00")
+        for index in range(per_account):
+            amount = Decimal(f"{(index * 7919 + account_index) % 1000000}.{index % 100:02d}")
+            debit, credit = (amount, Decimal("0.00")) if index % 2 == 0 else (Decimal("0.00"), amount)
+            balance += debit - credit
+            debits += debit
+            credits += credit
+            account_movements.append(LedgerMovement(
+                date=start + timedelta(days=index % 365),
+                journal_entry_number=f"AS-2024-{account_index:03d}{index:06d}",
+                description=f"Movimiento {index} de la cuenta {account_index}",
+                debit_amount=debit,
+                credit_amount=credit,
+                running_balance=balance,
+                reference=f"REF-{index}" if index % 3 else None
+            ))
+        ledger_accounts.append(LedgerAccount(
+            account_id=uuid.uuid4(),
+            account_code=f"1{account_index:05d}",
+            account_name=f"Cuenta {account_index}",
+            opening_balance=Decimal("0.00"),
+            movements=account_movements,
+            closing_balance=balance,
+            total_debits=debits,
+            total_credits=credits
+        ))
+    return GeneralLedger(
+        start_date=start,
+        end_date=start + timedelta(days=364),
+        company_name="Benchmark S.A.S.",
+        accounts=ledger_accounts
+    )
+
+
+def variants(ledger: GeneralLedger) -> Dict[str, Callable[[], bytes]]:
+    field = create_model_field(name="Response_get_general_ledger", type_=GeneralLedger, mode="serialization")
+
+    def fastapi_path(response_class) -> bytes:
+        content = asyncio.run(serialize_response(field=field, response_content=ledger))
+        return response_class(content).body
+
+    return {
+        "fastapi_json": lambda: fastapi_path(JSONResponse),
+        "fastapi_orjson": lambda: fastapi_path(ORJSONResponse),
+        "orjson_model_dump": lambda: dumps(ledger.model_dump(by_alias=True)),
+        "model_response": lambda: model_response(ledger).body,
+    }
+
+
+def measure(name: str, run: Callable[[], bytes], repeat: int) -> Dict[str, Any]:
+    samples: List[float] = []
+    size = 0
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        size = len(run())
+        samples.append(time.perf_counter() - started)
+
+    gc.collect()
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "variant": name,
+        "best_ms": round(min(samples) * 1000, 1),
+        "median_ms": round(statistics.median(samples) * 1000, 1),
+        "peak_mb": round(peak / 1024 / 1024, 1),
+        "bytes": size,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movements", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    ledger = build_ledger(args.movements, args.accounts)
+    runs = variants(ledger)
+
+    # Todas las variantes deben producir el mismo documento
+    reference = json.loads(runs["fastapi_json"]())
+    for name, run in runs.items():
+        if json.loads(run()) != reference:
+            raise SystemExit(f"La variante {name} no produce el mismo JSON")
+
+    results = [measure(name, run, args.repeat) for name, run in runs.items()]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Libro mayor: {args.movements} movimientos en {args.accounts} cuentas")
+    baseline = results[0]["median_ms"]
+    for result in results:
+        speedup = baseline / result["median_ms"] if result["median_ms"] else 0.0
+        print(
+            f"{result['variant']:>20}: mejor {result['best_ms']:>8.1f} ms  "
+            f"mediana {result['median_ms']:>8.1f} ms  x{speedup:>4.1f}  "
+            f"pico {result['peak_mb']:>7.1f} MB  {result['bytes'] / 1024 / 1024:.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
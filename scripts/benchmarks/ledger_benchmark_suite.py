@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Suite de benchmarks de cierre de mes sobre el libro sintético de
+``synthetic_ledger.py``.
+
+Mide, llamando a los servicios (y a los endpoints de importación) con la base
+configurada en ``settings``:
+
+- ``post_entry``: contabilizar un asiento aprobado
+- ``bulk_post``: contabilización masiva de ``--bulk-size`` asientos
+- ``balance_sheet`` y ``trial_balance`` al cierre del periodo
+- ``general_ledger``: libro mayor de todas las cuentas en los últimos
+  ``--ledger-days`` días
+- ``cash_flow``: flujo de efectivo indirecto del último año
+- ``import_csv``: importación de un CSV de ``--import-rows`` terceros
+- ``export_csv``: exportación a CSV de líneas de asientos (máximo del servicio)
+- ``auto_reconcile``: conciliación automática del extracto en proceso
+
+Cada muestra corre en una transacción que se revierte al terminar (los
+``commit`` de los servicios pasan a ser savepoints), así que las operaciones que
+escriben se pueden repetir sobre los mismos datos y el libro no cambia entre
+corridas. El costo del ``COMMIT`` final no se incluye.
+
+El resultado es un JSON con el commit (y si el árbol tiene cambios), la versión
+de PostgreSQL, los conteos del conjunto y, por operación, el mejor tiempo, la
+mediana, las muestras y las sentencias SQL ejecutadas. Con ``--baseline`` se
+compara contra un JSON anterior (cociente de medianas; >1 es más lento).
+Conviene correrlo con ``DEBUG=False`` para que el eco de SQL no distorsione.
+
+Uso:
+    python scripts/benchmarks/synthetic_ledger.py generate --journal-lines 1000000
+    python scripts/benchmarks/ledger_benchmark_suite.py --output results/base.json
+    python scripts/benchmarks/ledger_benchmark_suite.py --baseline results/base.json --json
+    python scripts/benchmarks/ledger_benchmark_suite.py --operations balance_sheet general_ledger --repeat 5
+"""
+import argparse
+import asyncio
+import csv
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fastapi import BackgroundTasks, UploadFile  # noqa: E402
+from sqlalchemy import select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncSession  # noqa: E402
+from starlette.datastructures import Headers  # noqa: E402
+
+from app.database import async_engine  # noqa: E402
+from app.models.bank_extract import BankExtract, BankExtractStatus  # noqa: E402
+from app.models.journal_entry import JournalEntry, JournalEntryStatus  # noqa: E402
+from app.models.user import User  # noqa: E402
+from app.schemas.bank_reconciliation import AutoReconciliationRequest  # noqa: E402
+from app.schemas.export_generic import ExportFilter, ExportFormat, ExportRequest, TableName  # noqa: E402
+from app.schemas.generic_import import ColumnMapping  # noqa: E402
+from app.services.bank_reconciliation_service import BankReconciliationService  # noqa: E402
+from app.services.cash_flow_service import CashFlowMethod, CashFlowService  # noqa: E402
+from app.services.export_service import ExportService  # noqa: E402
+from app.services.journal_entry_service import JournalEntryService  # noqa: E402
+from app.services.report_service import ReportService  # noqa: E402
+from app.utils.metrics import collect_request_stats, instrument_engine  # noqa: E402
+
+from synthetic_ledger import SYNTHETIC_EMAIL, dataset_summary  # noqa: E402
+
+RESULTS_VERSION = 1
+IMPORT_PREFIX = "SYI-"
+EXPORT_LIMIT = 10_000  # Máximo que acepta ExportFilter.limit
+
+OPERATIONS = [
+    "post_entry", "bulk_post", "balance_sheet", "trial_balance", "general_ledger",
+    "cash_flow", "import_csv", "export_csv", "auto_reconcile",
+]
+
+
+@dataclass
+class SuiteContext:
+    """Datos del conjunto sintético que necesitan las operaciones"""
+    args: argparse.Namespace
+    user: User
+    end_date: date
+    pending_entry_ids: List[Any] = field(default_factory=list)
+    processing_extract_id: Optional[Any] = None
+    import_csv: bytes = b""
+
+
+@asynccontextmanager
+async def rollback_session() -> AsyncIterator[AsyncSession]:
+    """Sesión dentro de una transacción externa que siempre se revierte"""
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = AsyncSession(
+            bind=connection,
+            expire_on_commit=False,
+            autoflush=False,
+            join_transaction_mode="create_savepoint"
+        )
+        try:
+            yield session
+        finally:
+            await session.close()
+            await transaction.rollback()
+
+
+# ================================
+# OPERACIONES
+# ================================
+
+async def post_entry(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    entry = await JournalEntryService(db).post_journal_entry(ctx.pending_entry_ids[0], ctx.user.id)
+    return {"status": entry.status.value}
+
+
+async def bulk_post(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    entry_ids = ctx.pending_entry_ids[1:1 + ctx.args.bulk_size]
+    result = await JournalEntryService(db).bulk_post_journal_entries(entry_ids, ctx.user.id)
+    return {"entries": len(entry_ids), "posted": result.total_posted, "failed": result.total_failed}
+
+
+async def balance_sheet(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    report = await ReportService(db).generate_balance_sheet(ctx.end_date)
+    return {"is_balanced": report.is_balanced}
+
+
+async def trial_balance(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    report = await ReportService(db).generate_trial_balance(ctx.end_date)
+    return {"accounts": len(report.accounts), "is_balanced": report.is_balanced}
+
+
+async def general_ledger(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    start = ctx.end_date - timedelta(days=ctx.args.ledger_days - 1)
+    ledger = await ReportService(db).generate_general_ledger(start, ctx.end_date)
+    return {
+        "accounts": len(ledger.accounts),
+        "movements": sum(len(account.movements) for account in ledger.accounts),
+    }
+
+
+async def cash_flow(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    start = ctx.end_date - timedelta(days=364)
+    statement = await CashFlowService(db).generate_cash_flow_statement(
+        start, ctx.end_date, method=CashFlowMethod.INDIRECT
+    )
+    return {"net_change_in_cash": str(statement.net_change_in_cash), "is_balanced": statement.is_balanced}
+
+
+async def import_csv(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    # Los endpoints llevan la lógica de importación; se llaman sin HTTP
+    from app.api.v1.generic_import import create_import_session, execute_import, set_column_mappings
+
+    upload = UploadFile(
+        file=io.BytesIO(ctx.import_csv),
+        filename="terceros.csv",
+        headers=Headers({"content-type": "text/csv"})
+    )
+    session = await create_import_session(
+        BackgroundTasks(), model_name="third_party", file=upload, db=db, current_user=ctx.user
+    )
+    token = session.import_session_token
+    mappings = [
+        ColumnMapping(column_name=column, field_name=column)
+        for column in ["code", "name", "document_type", "document_number", "email", "city", "third_party_type"]
+    ]
+    await set_column_mappings(token, mappings, current_user=ctx.user)
+    result = await execute_import(
+        token,
+        mappings=None,
+        import_policy="create_only",
+        skip_errors=True,
+        batch_size=2000,
+        async_processing=False,
+        background_tasks=BackgroundTasks(),
+        db=db,
+        current_user=ctx.user
+    )
+    return {
+        "rows": ctx.args.import_rows,
+        "successful": result.summary.successful,
+        "failed": result.summary.failed,
+    }
+
+
+async def export_csv(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    response = await ExportService(db).export_data(
+        ExportRequest(
+            table_name=TableName.JOURNAL_ENTRY_LINES,
+            export_format=ExportFormat.CSV,
+            filters=ExportFilter(limit=EXPORT_LIMIT)
+        ),
+        ctx.user.id
+    )
+    return {"records": response.metadata.exported_records, "bytes": response.metadata.file_size_bytes}
+
+
+async def auto_reconcile(db: AsyncSession, ctx: SuiteContext) -> Dict[str, Any]:
+    result = await BankReconciliationService(db).auto_reconcile_extract(
+        ctx.processing_extract_id,
+        AutoReconciliationRequest(tolerance_amount=Decimal("0.01"), tolerance_days=3),
+        ctx.user.id
+    )
+    return {
+        "processed_lines": result.processed_lines,
+        "reconciled_lines": result.reconciled_lines,
+        "errors": len(result.errors),
+    }
+
+
+OPERATION_FUNCTIONS: Dict[str, Callable[[AsyncSession, SuiteContext], Awaitable[Dict[str, Any]]]] = {
+    "post_entry": post_entry,
+    "bulk_post": bulk_post,
+    "balance_sheet": balance_sheet,
+    "trial_balance": trial_balance,
+    "general_ledger": general_ledger,
+    "cash_flow": cash_flow,
+    "import_csv": import_csv,
+    "export_csv": export_csv,
+    "auto_reconcile": auto_reconcile,
+}
+
+
+# ================================
+# EJECUCIÓN
+# ================================
+
+def build_import_csv(rows: int) -> bytes:
+    """CSV de terceros nuevos (prefijo ``SYI-``) para la importación"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["code", "name", "document_type", "document_number", "email", "city", "third_party_type"])
+    for index in range(rows):
+        writer.writerow([
+            f"{IMPORT_PREFIX}{index:08d}",
+            f"{IMPORT_PREFIX}Tercero importado {index:08d}",
+            "nit",
+            f"8{index:09d}",
+            f"importado{index}@sintetico.local",
+            "Bogotá",
+            "customer" if index % 3 else "supplier",
+        ])
+    return buffer.getvalue().encode("utf-8")
+
+
+async def load_context(args: argparse.Namespace, summary: Dict[str, Any]) -> SuiteContext:
+    async with async_engine.connect() as conn:
+        session = AsyncSession(bind=conn, expire_on_commit=False)
+        user = await session.scalar(select(User).where(User.email == SYNTHETIC_EMAIL))
+        pending = (await session.scalars(
+            select(JournalEntry.id)
+            .where(JournalEntry.created_by_id == user.id, JournalEntry.status == JournalEntryStatus.APPROVED)
+            .order_by(JournalEntry.number)
+        )).all()
+        extract_id = await session.scalar(
+            select(BankExtract.id).where(
+                BankExtract.created_by_id == user.id,
+                BankExtract.status == BankExtractStatus.PROCESSING
+            )
+        )
+        session.expunge_all()
+        await session.close()
+
+    return SuiteContext(
+        args=args,
+        user=user,
+        end_date=date.fromisoformat(summary["end_date"]),
+        pending_entry_ids=list(pending),
+        processing_extract_id=extract_id,
+        import_csv=build_import_csv(args.import_rows) if "import_csv" in args.operations else b""
+    )
+
+
+async def measure(name: str, ctx: SuiteContext) -> Dict[str, Any]:
+    """Corre ``--repeat`` muestras de una operación, cada una revertida al terminar"""
+    run = OPERATION_FUNCTIONS[name]
+    samples: List[float] = []
+    queries: List[int] = []
+    sql_seconds: List[float] = []
+    details: Dict[str, Any] = {}
+    for _ in range(ctx.args.repeat):
+        try:
+            async with rollback_session() as db:
+                with collect_request_stats() as stats:
+                    started = time.perf_counter()
+                    details = await run(db, ctx)
+                    samples.append(time.perf_counter() - started)
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}", "samples": [round(s, 4) for s in samples]}
+        queries.append(stats.queries)
+        sql_seconds.append(stats.sql_seconds)
+
+    return {
+        "best_seconds": round(min(samples), 4),
+        "median_seconds": round(statistics.median(samples), 4),
+        "samples": [round(sample, 4) for sample in samples],
+        "sql_queries": int(statistics.median(queries)),
+        "sql_seconds": round(statistics.median(sql_seconds), 4),
+        "details": details,
+    }
+
+
+def git_info() -> Dict[str, Any]:
+    def git(*command: str) -> str:
+        return subprocess.run(
+            ["git", *command], cwd=ROOT_DIR, capture_output=True, text=True, check=False
+        ).stdout.strip()
+
+    return {
+        "commit": git("rev-parse", "HEAD") or None,
+        "subject": git("log", "-1", "--format=%s") or None,
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Optional[float]]:
+    """Cociente de medianas contra la corrida base (>1 es más lento)"""
+    ratios: Dict[str, Optional[float]] = {}
+    for name, result in results["operations"].items():
+        previous = baseline.get("operations", {}).get(name, {})
+        if "median_seconds" in result and previous.get("median_seconds"):
+            ratios[name] = round(result["median_seconds"] / previous["median_seconds"], 3)
+        else:
+            ratios[name] = None
+    return ratios
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    # Sin eco de SQL y con el conteo de sentencias aunque METRICS_ENABLED=False
+    async_engine.echo = False
+    instrument_engine(async_engine.sync_engine)
+    try:
+        summary = await dataset_summary()
+        if not summary:
+            raise SystemExit("No hay conjunto sintético; ejecute synthetic_ledger.py generate")
+        if summary["pending_entries"] < args.bulk_size + 1 and {"post_entry", "bulk_post"} & set(args.operations):
+            raise SystemExit(f"Se necesitan al menos {args.bulk_size + 1} asientos aprobados pendientes")
+
+        async with async_engine.connect() as conn:
+            postgres = await conn.scalar(text("SHOW server_version"))
+
+        ctx = await load_context(args, summary)
+        results: Dict[str, Any] = {
+            "version": RESULTS_VERSION,
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git": git_info(),
+            "environment": {
+                "python": platform.python_version(),
+                "postgres": postgres,
+                "machine": platform.machine(),
+            },
+            "parameters": {
+                "repeat": args.repeat,
+                "bulk_size": args.bulk_size,
+                "ledger_days": args.ledger_days,
+                "import_rows": args.import_rows,
+            },
+            "dataset": summary,
+            "operations": {},
+        }
+        for name in args.operations:
+            if not args.json:
+                print(f"{name}...", file=sys.stderr, flush=True)
+            results["operations"][name] = await measure(name, ctx)
+        return results
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--bulk-size", type=int, default=200, help="Asientos por contabilización masiva")
+    parser.add_argument("--ledger-days", type=int, default=31, help="Días del libro mayor")
+    parser.add_argument("--import-rows", type=int, default=100_000, help="Filas del CSV de importación")
+    parser.add_argument("--output", help="Guardar el JSON de resultados en este archivo")
+    parser.add_argument("--baseline", help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+        results["baseline"] = {"commit": baseline.get("git", {}).get("commit"), "ratios": compare(results, baseline)}
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(results, output_file, indent=2, default=str)
+
+    if args.json:
+        print(json.dumps(results, indent=2, default=str))
+        return
+
+    git = results["git"]
+    dataset = results["dataset"]
+    print(f"Commit {(git['commit'] or '?')[:10]}{' (con cambios)' if git['dirty'] else ''}, "
+          f"PostgreSQL {results['environment']['postgres']}, "
+          f"{dataset['journal_lines']:,} líneas de asientos, {dataset['third_parties']:,} terceros")
+    ratios = results.get("baseline", {}).get("ratios", {})
+    for name, result in results["operations"].items():
+        if "error" in result:
+            print(f"{name:>16}: ERROR {result['error']}")
+            continue
+        ratio = ratios.get(name)
+        print(
+            f"{name:>16}: mejor {result['best_seconds'] * 1000:>9.1f} ms  "
+            f"mediana {result['median_seconds'] * 1000:>9.1f} ms  "
+            f"SQL {result['sql_queries']:>6} sentencias {result['sql_seconds'] * 1000:>9.1f} ms"
+            + (f"  x{ratio:.2f} vs base" if ratio is not None else "")
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark de ráfaga de logins: throughput de verificación de contraseñas y
+latencia del resto de peticiones del worker mientras dura la ráfaga.
+
+Lanza ``--logins`` verificaciones bcrypt concurrentes (el trabajo de CPU de
+``AuthService.authenticate_user``) y, en paralelo, un probe que simula un
+endpoint liviano cada ``--probe-interval-ms``. Compara dos modos:
+
+- ``inline``: verificación síncrona dentro de la corrutina (comportamiento anterior)
+- ``offload``: ``PasswordHasher`` con executor acotado y semáforo
+
+Uso:
+    python scripts/benchmarks/login_storm_benchmark.py
+    python scripts/benchmarks/login_storm_benchmark.py --logins 200 --workers 4 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from passlib.context import CryptContext  # noqa: E402
+
+from app.utils.password_hasher import PasswordHasher  # noqa: E402
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_storm(
+    mode: str,
+    context: CryptContext,
+    hashed: str,
+    logins: int,
+    workers: int,
+    probe_interval: float
+) -> Dict[str, Any]:
+    """Ejecuta una ráfaga en el modo indicado y mide logins/s y latencia del probe"""
+    hasher = PasswordHasher(context, max_workers=workers, slow_wait_seconds=float("inf"))
+    probe_latencies: List[float] = []
+    done = asyncio.Event()
+
+    async def probe() -> None:
+        # Latencia de un endpoint trivial: cuánto tarda en volver a ejecutarse
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(probe_interval)
+            probe_latencies.append(time.perf_counter() - started - probe_interval)
+
+    async def login() -> bool:
+        if mode == "inline":
+            return context.verify("Secreta123!", hashed)
+        return await hasher.verify("Secreta123!", hashed)
+
+    probe_task = asyncio.create_task(probe())
+    await asyncio.sleep(probe_interval)  # el probe arranca antes que la ráfaga
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+
+    done.set()
+    await probe_task
+    hasher.shutdown()
+
+    assert all(results)
+    return {
+        "mode": mode,
+        "logins": logins,
+        "workers": workers if mode == "offload" else 1,
+        "elapsed_seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 1),
+        "probe_samples": len(probe_latencies),
+        "probe_p50_ms": round(percentile(probe_latencies, 0.50) * 1000, 2),
+        "probe_p99_ms": round(percentile(probe_latencies, 0.99) * 1000, 2),
+        "probe_max_ms": round(max(probe_latencies, default=0.0) * 1000, 2),
+        "probe_mean_ms": round(statistics.fmean(probe_latencies) * 1000, 2) if probe_latencies else 0.0,
+        "queue_wait_p99_ms": round(hasher.stats()["wait_p99_seconds"] * 1000, 2) if mode == "offload" else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=50, help="Logins concurrentes de la ráfaga")
+    parser.add_argument("--workers", type=int, default=2, help="Hilos del executor de hash")
+    parser.add_argument("--rounds", type=int, default=12, help="Coste bcrypt (rounds)")
+    parser.add_argument("--probe-interval-ms", type=float, default=5.0, help="Intervalo del probe")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=args.rounds)
+    hashed = context.hash("Secreta123!")
+    probe_interval = args.probe_interval_ms / 1000
+
+    results = [
+        asyncio.run(run_storm(mode, context, hashed, args.logins, args.workers, probe_interval))
+        for mode in ("inline", "offload")
+    ]
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"Ráfaga de {args.logins} logins (bcrypt rounds={args.rounds})")
+    print(f"{'modo':<10}{'logins/s':>10}{'probe p50':>12}{'probe p99':>12}{'probe max':>12}{'espera p99':>12}")
+    for row in results:
+        queue_wait = f"{row['queue_wait_p99_ms']:.1f}ms" if row["queue_wait_p99_ms"] is not None else "-"
+        print(
+            f"{row['mode']:<10}{row['logins_per_second']:>10.1f}"
+            f"{row['probe_p50_ms']:>10.1f}ms{row['probe_p99_ms']:>10.1f}ms"
+            f"{row['probe_max_ms']:>10.1f}ms{queue_wait:>12}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark de arranque: tiempo de importación por módulo y memoria del worker.
+
+Importa ``app.main`` en un proceso limpio con ``python -X importtime`` y agrupa
+los tiempos por paquete para ver qué dependencias pesan en el arranque.
+
+Uso:
+    python scripts/benchmarks/startup_benchmark.py
+    python scripts/benchmarks/startup_benchmark.py --top 30 --depth 2 --json
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Código ejecutado en el proceso hijo: importa el módulo y reporta RSS máximo
+_CHILD_CODE = """
+import resource, sys, time, json
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+heavy = [m for m in ("torch", "transformers", "openai", "pandas", "numpy") if m in sys.modules]
+print("__BENCH__" + json.dumps({{"elapsed": elapsed, "max_rss_kb": rss_kb, "heavy_modules": heavy}}))
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    Parsea la salida de -X importtime.
+
+    Returns:
+        Lista de (módulo, self_us, cumulative_us)
+    """
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        self_us, cumulative_us, name = parts
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def group_by_package(rows: List[Tuple[str, int, int]], depth: int) -> Dict[str, int]:
+    """Suma el tiempo propio de importación por prefijo de paquete"""
+    totals: Dict[str, int] = defaultdict(int)
+    for name, self_us, _ in rows:
+        package = ".".join(name.split(".")[:depth])
+        totals[package] += self_us
+    return dict(totals)
+
+
+def run(module: str) -> Tuple[List[Tuple[str, int, int]], Dict]:
+    """Importa el módulo en un subproceso y devuelve tiempos y métricas"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _CHILD_CODE.format(module=module)],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONPATH": ROOT_DIR}
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr[-4000:])
+        raise SystemExit(f"Error importando {module}")
+
+    metrics = {}
+    for line in result.stdout.splitlines():
+        if line.startswith("__BENCH__"):
+            metrics = json.loads(line[len("__BENCH__"):])
+    return parse_importtime(result.stderr), metrics
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tiempo de importación por módulo al arrancar la API")
+    parser.add_argument("--module", default="app.main", help="Módulo a importar (por defecto app.main)")
+    parser.add_argument("--top", type=int, default=20, help="Número de paquetes a mostrar")
+    parser.add_argument("--depth", type=int, default=1, help="Nivel de agrupación por paquete")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    rows, metrics = run(args.module)
+    packages = sorted(group_by_package(rows, args.depth).items(), key=lambda item: item[1], reverse=True)
+    slowest_modules = sorted(rows, key=lambda row: row[1], reverse=True)[:args.top]
+
+    report = {
+        "module": args.module,
+        "import_seconds": round(metrics.get("elapsed", 0.0), 3),
+        "max_rss_mb": round(metrics.get("max_rss_kb", 0) / 1024, 1),
+        "heavy_modules_loaded": metrics.get("heavy_modules", []),
+        "modules_imported": len(rows),
+        "packages": [
+            {"package": name, "self_ms": round(us / 1000, 1)} for name, us in packages[:args.top]
+        ],
+        "slowest_modules": [
+            {"module": name, "self_ms": round(self_us / 1000, 1), "cumulative_ms": round(cum_us / 1000, 1)}
+            for name, self_us, cum_us in slowest_modules
+        ]
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"Módulo: {report['module']}")
+    print(f"Tiempo de importación: {report['import_seconds']} s")
+    print(f"RSS máximo: {report['max_rss_mb']} MB")
+    print(f"Módulos importados: {report['modules_imported']}")
+    print(f"Dependencias pesadas cargadas: {', '.join(report['heavy_modules_loaded']) or 'ninguna'}")
+    print()
+    print(f"{'Paquete':<40} {'ms':>10}")
+    for item in report["packages"]:
+        print(f"{item['package']:<40} {item['self_ms']:>10}")
+    print()
+    print(f"{'Módulo':<60} {'propio ms':>10} {'acum. ms':>10}")
+    for item in report["slowest_modules"]:
+        print(f"{item['module']:<60} {item['self_ms']:>10} {item['cumulative_ms']:>10}")
+
+
+if __name__ == "__main__":
+    main()
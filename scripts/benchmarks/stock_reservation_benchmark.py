@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Benchmark de reserva de stock concurrente: throughput de contabilización de
+ventas con varios workers compitiendo por pocos productos "populares".
+
+Cada contabilización descuenta ``--lines`` productos elegidos del conjunto
+caliente, en su propia sesión y transacción, como ``post_journal_entry``.
+Compara cuatro modos sobre la base configurada en ``settings``:
+
+- ``naive``: lee el stock sin bloqueo, valida en Python y escribe (comportamiento
+  anterior; puede sobrevender)
+- ``serialized``: la reserva atómica detrás de un lock global (el workaround
+  de serializar las contabilizaciones)
+- ``locked``: ``SELECT ... FOR NO KEY UPDATE`` y valoración en memoria
+- ``reserve``: ``UPDATE ... FROM (VALUES ...) RETURNING`` condicional por lote
+
+Los productos se crean con prefijo ``BENCH-RSV-`` y se eliminan al terminar
+(sus movimientos se borran en cascada).
+
+Uso:
+    python scripts/benchmarks/stock_reservation_benchmark.py
+    python scripts/benchmarks/stock_reservation_benchmark.py --workers 16 --postings 2000 --json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+from datetime import date
+from decimal import Decimal
+from typing import Any, Dict, List
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import delete, func, select, update  # noqa: E402
+from sqlalchemy.exc import DBAPIError  # noqa: E402
+
+from app.database import AsyncSessionLocal, async_engine  # noqa: E402
+from app.models.product import Product, ProductType, StockMovementType  # noqa: E402
+from app.services.stock_movement_service import StockDelta, StockMovementService  # noqa: E402
+from app.utils.exceptions import ValidationError  # noqa: E402
+
+CODE_PREFIX = "BENCH-RSV-"
+MODES = ["naive", "serialized", "locked", "reserve"]
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def create_products(count: int, stock: Decimal) -> List[uuid.UUID]:
+    """Crea los productos del conjunto caliente con el stock inicial"""
+    run_id = uuid.uuid4().hex[:8]
+    products = [
+        Product(
+            code=f"{CODE_PREFIX}{run_id}-{index:04d}",
+            name=f"{CODE_PREFIX}{run_id}-{index:04d}",
+            product_type=ProductType.PRODUCT,
+            manage_inventory=True,
+            current_stock=stock,
+            average_cost=Decimal("10"),
+            inventory_value=stock * Decimal("10"),
+            purchase_price=Decimal("10")
+        )
+        for index in range(count)
+    ]
+    async with AsyncSessionLocal() as session:
+        session.add_all(products)
+        await session.commit()
+        return [product.id for product in products]
+
+
+async def drop_products() -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(Product).where(Product.code.like(f"{CODE_PREFIX}%")))
+        await session.commit()
+
+
+async def post_naive(session, deltas: List[StockDelta]) -> None:
+    """Comportamiento anterior: lectura sin bloqueo y escritura del valor calculado"""
+    for delta in deltas:
+        stock = await session.scalar(select(Product.current_stock).where(Product.id == delta.product_id))
+        if stock + delta.quantity < 0:
+            raise ValidationError("Stock insuficiente")
+        await session.execute(
+            update(Product)
+            .where(Product.id == delta.product_id)
+            .values(current_stock=stock + delta.quantity)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def run_mode(mode: str, product_ids: List[uuid.UUID], args: argparse.Namespace) -> Dict[str, Any]:
+    """Ejecuta ``--postings`` contabilizaciones con ``--workers`` workers concurrentes"""
+    remaining = args.postings
+    serial_lock = asyncio.Lock()
+    latencies: List[float] = []
+    counters = {"accepted": 0, "rejected": 0, "retries": 0, "units": 0}
+    rng = random.Random(args.seed)
+
+    def next_posting() -> List[StockDelta]:
+        chosen = rng.sample(product_ids, min(args.lines, len(product_ids)))
+        return [
+            StockDelta(
+                product_id=product_id,
+                quantity=Decimal("-1"),
+                unit_cost=None,
+                movement_type=StockMovementType.OUT,
+                movement_date=date.today(),
+                reference="BENCH",
+                check_stock=True
+            )
+            for product_id in chosen
+        ]
+
+    async def post(deltas: List[StockDelta]) -> None:
+        async with AsyncSessionLocal() as session:
+            service = StockMovementService(session)
+            try:
+                if mode == "naive":
+                    await post_naive(session, deltas)
+                elif mode == "locked":
+                    await service._record_locked(deltas)
+                else:
+                    await service.record(deltas)
+                await session.commit()
+                counters["accepted"] += 1
+                counters["units"] += len(deltas)
+            except ValidationError:
+                await session.rollback()
+                counters["rejected"] += 1
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            deltas = next_posting()
+            started = time.perf_counter()
+            for _attempt in range(5):
+                try:
+                    if mode == "serialized":
+                        async with serial_lock:
+                            await post(deltas)
+                    else:
+                        await post(deltas)
+                    break
+                except DBAPIError:
+                    # Deadlock o serialización: se reintenta como haría un worker real
+                    counters["retries"] += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.workers)))
+    elapsed = time.perf_counter() - started
+
+    async with AsyncSessionLocal() as session:
+        final_stock = await session.scalar(
+            select(func.sum(Product.current_stock)).where(Product.id.in_(product_ids))
+        )
+        negative = await session.scalar(
+            select(func.count()).where(Product.id.in_(product_ids), Product.current_stock < 0)
+        )
+    initial_stock = Decimal(args.stock) * len(product_ids)
+
+    return {
+        "mode": mode,
+        "postings": args.postings,
+        "workers": args.workers,
+        "seconds": round(elapsed, 3),
+        "postings_per_second": round(args.postings / elapsed, 1) if elapsed else 0.0,
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2) if latencies else 0.0,
+        "latency_p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "accepted": counters["accepted"],
+        "rejected": counters["rejected"],
+        "retries": counters["retries"],
+        # Unidades vendidas que el stock final no refleja (actualizaciones perdidas)
+        "lost_updates": int(counters["units"] - (initial_stock - final_stock)),
+        "negative_stock_products": negative
+    }
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    results = []
+    try:
+        for mode in args.modes:
+            product_ids = await create_products(args.products, Decimal(args.stock))
+            results.append(await run_mode(mode, product_ids, args))
+            await drop_products()
+    finally:
+        await drop_products()
+        await async_engine.dispose()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--products", type=int, default=5, help="Productos del conjunto caliente")
+    parser.add_argument("--stock", type=int, default=200, help="Stock inicial de cada producto")
+    parser.add_argument("--lines", type=int, default=3, help="Productos por contabilización")
+    parser.add_argument("--postings", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.postings} contabilizaciones, {args.workers} workers, "
+          f"{args.products} productos x {args.stock} unidades, {args.lines} líneas")
+    for result in results:
+        print(
+            f"{result['mode']:>10}: {result['postings_per_second']:>8.1f} cont/s  "
+            f"p50 {result['latency_p50_ms']:>7.2f} ms  p95 {result['latency_p95_ms']:>7.2f} ms  "
+            f"aceptadas {result['accepted']:>5}  rechazadas {result['rejected']:>5}  "
+            f"reintentos {result['retries']:>3}  perdidas {result['lost_updates']:>4}  "
+            f"negativos {result['negative_stock_products']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,776 @@
+#!/usr/bin/env python3
+"""
+Generador de un libro contable sintético para benchmarks.
+
+Crea en la base configurada en ``settings`` un conjunto de datos realista y
+determinista (misma ``--seed`` y escala, mismos datos) sobre el que
+``ledger_benchmark_suite.py`` mide las operaciones de cierre de mes:
+
+- plan de cuentas (caja y bancos, cartera, inventario, activos fijos,
+  proveedores, impuestos, préstamos, capital, ingresos, gastos y costos) con
+  su categoría de flujo de efectivo
+- terceros (clientes, proveedores y empleados) y diarios
+- ``--journal-lines`` líneas de asientos contabilizados (de 10^5 a 10^7)
+  repartidas en el periodo: ventas, compras, cobros, pagos, costo de ventas,
+  compras de activos, préstamos y gastos con varias líneas
+- asientos aprobados pendientes de contabilizar (posting y posting masivo)
+- facturas, pagos y un extracto bancario mensual; el último extracto está en
+  proceso de conciliación y sus líneas coinciden con pagos confirmados
+
+Los asientos y sus líneas se cargan con ``COPY`` (asyncpg): se rellenan
+explícitamente ``id``, ``created_at``/``updated_at`` y los valores que el
+modelo pone por defecto en Python. El resto de tablas usa ``insert()`` de Core
+por lotes, que sí aplica esos defaults. Al terminar se recalculan los saldos de
+las cuentas y se ejecuta ``ANALYZE``.
+
+Todo queda marcado con el prefijo ``SYN-`` y el usuario
+``synthetic-ledger@benchmark.local``; ``drop`` lo elimina.
+
+Uso:
+    python scripts/benchmarks/synthetic_ledger.py generate
+    python scripts/benchmarks/synthetic_ledger.py generate --journal-lines 10000000 --replace
+    python scripts/benchmarks/synthetic_ledger.py info --json
+    python scripts/benchmarks/synthetic_ledger.py drop
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, ROOT_DIR)
+
+from sqlalchemy import delete, func, insert, select, text  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncConnection  # noqa: E402
+
+from app.database import async_engine  # noqa: E402
+from app.models.account import Account, AccountType, CashFlowCategory  # noqa: E402
+from app.models.bank_extract import (  # noqa: E402
+    BankExtract, BankExtractLine, BankExtractLineType, BankExtractStatus
+)
+from app.models.bank_reconciliation import BankReconciliation  # noqa: E402
+from app.models.invoice import Invoice, InvoiceStatus, InvoiceType  # noqa: E402
+from app.models.journal import Journal, JournalType  # noqa: E402
+from app.models.journal_entry import (  # noqa: E402
+    JournalEntry, JournalEntryLine, JournalEntryStatus, JournalEntryType, TransactionOrigin
+)
+from app.models.payment import Payment, PaymentMethod, PaymentStatus, PaymentType  # noqa: E402
+from app.models.third_party import DocumentType, ThirdParty, ThirdPartyType  # noqa: E402
+from app.models.user import User, UserRole  # noqa: E402
+
+CODE_PREFIX = "SYN-"
+SYNTHETIC_EMAIL = "synthetic-ledger@benchmark.local"
+PENDING_PREFIX = f"{CODE_PREFIX}APR-"
+
+# Filas por sentencia INSERT / por COPY
+INSERT_BATCH = 5_000
+COPY_BATCH = 50_000
+
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+TAX_RATE = Decimal("0.19")
+
+
+@dataclass
+class DatasetSpec:
+    """Escala del conjunto sintético; los conteos en 0 se derivan de ``journal_lines``"""
+    journal_lines: int = 100_000
+    accounts: int = 300
+    third_parties: int = 0
+    invoices: int = 0
+    payments: int = 0
+    pending_entries: int = 500
+    reconcile_lines: int = 200
+    start_date: date = date(2023, 1, 1)
+    end_date: date = date(2024, 12, 31)
+    seed: int = 42
+
+    def resolved(self) -> "DatasetSpec":
+        return DatasetSpec(
+            journal_lines=self.journal_lines,
+            accounts=max(self.accounts, len(BASE_ACCOUNTS)),
+            third_parties=self.third_parties or max(200, self.journal_lines // 200),
+            invoices=self.invoices or max(100, self.journal_lines // 20),
+            payments=max(self.payments or self.journal_lines // 40, self.reconcile_lines),
+            pending_entries=self.pending_entries,
+            reconcile_lines=self.reconcile_lines,
+            start_date=self.start_date,
+            end_date=self.end_date,
+            seed=self.seed
+        )
+
+
+# (código, nombre, tipo, categoría de flujo de efectivo, rol en las plantillas)
+BASE_ACCOUNTS: List[Tuple[str, str, AccountType, Optional[CashFlowCategory], str]] = [
+    ("1105", "Caja general", AccountType.ASSET, CashFlowCategory.CASH_EQUIVALENTS, "cash"),
+    ("1110", "Bancos", AccountType.ASSET, CashFlowCategory.CASH_EQUIVALENTS, "bank"),
+    ("1305", "Clientes nacionales", AccountType.ASSET, CashFlowCategory.OPERATING, "receivable"),
+    ("1435", "Mercancías", AccountType.ASSET, CashFlowCategory.OPERATING, "inventory"),
+    ("1520", "Maquinaria y equipo", AccountType.ASSET, CashFlowCategory.INVESTING, "fixed_asset"),
+    ("2105", "Obligaciones financieras", AccountType.LIABILITY, CashFlowCategory.FINANCING, "loan"),
+    ("2205", "Proveedores nacionales", AccountType.LIABILITY, CashFlowCategory.OPERATING, "payable"),
+    ("2408", "IVA por pagar", AccountType.LIABILITY, CashFlowCategory.OPERATING, "tax"),
+    ("3105", "Capital suscrito y pagado", AccountType.EQUITY, CashFlowCategory.FINANCING, "capital"),
+    ("4135", "Comercio al por mayor y menor", AccountType.INCOME, CashFlowCategory.OPERATING, "income"),
+    ("5105", "Gastos de personal", AccountType.EXPENSE, CashFlowCategory.OPERATING, "expense"),
+    ("6135", "Costo de ventas", AccountType.COST, CashFlowCategory.OPERATING, "cost"),
+]
+
+# Roles que reciben las cuentas adicionales hasta completar ``--accounts``
+EXTRA_ACCOUNT_ROLES = ["expense", "income", "cost", "expense", "receivable", "payable"]
+
+# (nombre, peso, origen) de las plantillas de asiento
+ENTRY_TEMPLATES = [
+    ("sale", 30, TransactionOrigin.SALE),
+    ("purchase", 20, TransactionOrigin.PURCHASE),
+    ("collection", 18, TransactionOrigin.COLLECTION),
+    ("supplier_payment", 14, TransactionOrigin.PAYMENT),
+    ("cost_of_sales", 8, TransactionOrigin.OTHER),
+    ("expenses", 6, TransactionOrigin.OTHER),
+    ("asset_purchase", 2, TransactionOrigin.PURCHASE),
+    ("loan", 2, TransactionOrigin.TRANSFER),
+]
+
+JOURNAL_ENTRY_COLUMNS = [
+    "id", "number", "reference", "description", "journal_id", "entry_type", "transaction_origin",
+    "entry_date", "posting_date", "status", "total_debit", "total_credit", "created_by_id",
+    "approved_by_id", "posted_by_id", "approved_at", "posted_at", "created_at", "updated_at",
+]
+JOURNAL_LINE_COLUMNS = [
+    "id", "journal_entry_id", "account_id", "debit_amount", "credit_amount", "description",
+    "third_party_id", "line_number", "created_at", "updated_at",
+]
+
+
+class Catalog:
+    """Identificadores ya creados que usan las plantillas de asientos"""
+
+    def __init__(self):
+        self.user_id: uuid.UUID = uuid.uuid4()
+        self.accounts: Dict[str, List[uuid.UUID]] = {}
+        self.journals: Dict[JournalType, uuid.UUID] = {}
+        self.customers: List[uuid.UUID] = []
+        self.suppliers: List[uuid.UUID] = []
+
+    def account(self, rng: random.Random, role: str) -> uuid.UUID:
+        return rng.choice(self.accounts[role])
+
+    @property
+    def bank_account_id(self) -> uuid.UUID:
+        return self.accounts["bank"][0]
+
+
+# ================================
+# AUXILIARES
+# ================================
+
+def amount(rng: random.Random, low: int = 1_000, high: int = 5_000_000) -> Decimal:
+    """Importe aleatorio en centavos entre ``low`` y ``high``"""
+    return Decimal(rng.randint(low, high)) * CENT
+
+
+def chunks(rows: Sequence[Any], size: int) -> Iterator[Sequence[Any]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+def at_noon(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, 12, tzinfo=timezone.utc)
+
+
+def month_starts(start: date, end: date) -> List[date]:
+    months = []
+    current = start.replace(day=1)
+    while current <= end:
+        months.append(current)
+        current = (current + timedelta(days=32)).replace(day=1)
+    return months
+
+
+async def insert_rows(conn: AsyncConnection, model: Any, rows: List[Dict[str, Any]]) -> None:
+    """INSERT de Core por lotes (aplica los defaults de Python del modelo)"""
+    for batch in chunks(rows, INSERT_BATCH):
+        await conn.execute(insert(model), list(batch))
+
+
+async def copy_rows(conn: AsyncConnection, table: str, columns: List[str], records: List[tuple]) -> None:
+    """COPY binario con asyncpg"""
+    raw = await conn.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(table, records=records, columns=columns)
+
+
+def log(message: str, quiet: bool) -> None:
+    if not quiet:
+        print(message, file=sys.stderr, flush=True)
+
+
+# ================================
+# CATÁLOGOS
+# ================================
+
+async def create_user(conn: AsyncConnection, catalog: Catalog) -> None:
+    await conn.execute(insert(User).values(
+        id=catalog.user_id,
+        email=SYNTHETIC_EMAIL,
+        full_name="Benchmark libro sintético",
+        hashed_password="!",  # No permite iniciar sesión
+        role=UserRole.CONTADOR
+    ))
+
+
+async def create_accounts(conn: AsyncConnection, catalog: Catalog, spec: DatasetSpec) -> None:
+    rows = []
+    for code, name, account_type, category, role in BASE_ACCOUNTS:
+        account_id = uuid.uuid4()
+        catalog.accounts.setdefault(role, []).append(account_id)
+        rows.append({
+            "id": account_id,
+            "code": f"{CODE_PREFIX}{code}",
+            "name": name,
+            "account_type": account_type,
+            "cash_flow_category": category,
+            "allows_reconciliation": role == "bank",
+        })
+
+    types_by_role = {role: (account_type, category) for _, _, account_type, category, role in BASE_ACCOUNTS}
+    base_codes = {role: code for code, _, _, _, role in BASE_ACCOUNTS}
+    for index in range(spec.accounts - len(BASE_ACCOUNTS)):
+        role = EXTRA_ACCOUNT_ROLES[index % len(EXTRA_ACCOUNT_ROLES)]
+        account_type, category = types_by_role[role]
+        account_id = uuid.uuid4()
+        catalog.accounts[role].append(account_id)
+        rows.append({
+            "id": account_id,
+            "code": f"{CODE_PREFIX}{base_codes[role]}{index:05d}",
+            "name": f"Subcuenta {role} {index:05d}",
+            "account_type": account_type,
+            "cash_flow_category": category,
+            "allows_reconciliation": False,
+        })
+    await insert_rows(conn, Account, rows)
+
+
+async def create_journals(conn: AsyncConnection, catalog: Catalog) -> None:
+    rows = []
+    for journal_type, code in [
+        (JournalType.SALE, "VEN"), (JournalType.PURCHASE, "COM"),
+        (JournalType.BANK, "BAN"), (JournalType.MISCELLANEOUS, "MIS"),
+    ]:
+        journal_id = uuid.uuid4()
+        catalog.journals[journal_type] = journal_id
+        rows.append({
+            "id": journal_id,
+            "name": f"Diario sintético {code}",
+            "code": f"{CODE_PREFIX}{code}",
+            "type": journal_type,
+            "sequence_prefix": f"SY{code}",
+        })
+    await insert_rows(conn, Journal, rows)
+
+
+async def create_third_parties(conn: AsyncConnection, catalog: Catalog, spec: DatasetSpec, rng: random.Random) -> None:
+    rows = []
+    for index in range(spec.third_parties):
+        roll = rng.random()
+        if roll < 0.60:
+            third_party_type, target = ThirdPartyType.CUSTOMER, catalog.customers
+        elif roll < 0.95:
+            third_party_type, target = ThirdPartyType.SUPPLIER, catalog.suppliers
+        else:
+            third_party_type, target = ThirdPartyType.EMPLOYEE, None
+        third_party_id = uuid.uuid4()
+        if target is not None:
+            target.append(third_party_id)
+        rows.append({
+            "id": third_party_id,
+            "code": f"{CODE_PREFIX}{index:08d}",
+            "name": f"{CODE_PREFIX}Tercero {index:08d}",
+            "third_party_type": third_party_type,
+            "document_type": DocumentType.NIT,
+            "document_number": f"9{index:09d}",
+            "email": f"tercero{index}@sintetico.local",
+        })
+    # Garantiza al menos un cliente y un proveedor con escalas pequeñas
+    if not catalog.customers:
+        catalog.customers.append(rows[0]["id"])
+    if not catalog.suppliers:
+        catalog.suppliers.append(rows[-1]["id"])
+    await insert_rows(conn, ThirdParty, rows)
+
+
+# ================================
+# ASIENTOS
+# ================================
+
+def template_lines(
+    template: str, rng: random.Random, catalog: Catalog
+) -> List[Tuple[uuid.UUID, Decimal, Decimal, Optional[uuid.UUID]]]:
+    """Líneas balanceadas (cuenta, débito, crédito, tercero) de una plantilla"""
+    if template == "sale":
+        net = amount(rng)
+        tax = (net * TAX_RATE).quantize(CENT)
+        customer = rng.choice(catalog.customers)
+        return [
+            (catalog.account(rng, "receivable"), net + tax, ZERO, customer),
+            (catalog.account(rng, "income"), ZERO, net, None),
+            (catalog.account(rng, "tax"), ZERO, tax, None),
+        ]
+    if template == "purchase":
+        net = amount(rng)
+        tax = (net * TAX_RATE).quantize(CENT)
+        supplier = rng.choice(catalog.suppliers)
+        return [
+            (catalog.account(rng, "expense"), net, ZERO, None),
+            (catalog.account(rng, "tax"), tax, ZERO, None),
+            (catalog.account(rng, "payable"), ZERO, net + tax, supplier),
+        ]
+    if template == "collection":
+        value = amount(rng)
+        return [
+            (catalog.bank_account_id, value, ZERO, None),
+            (catalog.account(rng, "receivable"), ZERO, value, rng.choice(catalog.customers)),
+        ]
+    if template == "supplier_payment":
+        value = amount(rng)
+        return [
+            (catalog.account(rng, "payable"), value, ZERO, rng.choice(catalog.suppliers)),
+            (catalog.bank_account_id, ZERO, value, None),
+        ]
+    if template == "cost_of_sales":
+        value = amount(rng)
+        return [
+            (catalog.account(rng, "cost"), value, ZERO, None),
+            (catalog.account(rng, "inventory"), ZERO, value, None),
+        ]
+    if template == "expenses":
+        debits = [amount(rng, 1_000, 500_000) for _ in range(rng.randint(3, 7))]
+        lines = [(catalog.account(rng, "expense"), value, ZERO, None) for value in debits]
+        lines.append((catalog.account(rng, "cash"), ZERO, sum(debits, ZERO), None))
+        return lines
+    if template == "asset_purchase":
+        value = amount(rng, 1_000_000, 50_000_000)
+        return [
+            (catalog.account(rng, "fixed_asset"), value, ZERO, None),
+            (catalog.bank_account_id, ZERO, value, None),
+        ]
+    # loan
+    value = amount(rng, 5_000_000, 100_000_000)
+    return [
+        (catalog.bank_account_id, value, ZERO, None),
+        (catalog.account(rng, "loan"), ZERO, value, None),
+    ]
+
+
+TEMPLATE_JOURNALS = {
+    "sale": JournalType.SALE,
+    "purchase": JournalType.PURCHASE,
+    "collection": JournalType.BANK,
+    "supplier_payment": JournalType.BANK,
+    "asset_purchase": JournalType.BANK,
+    "loan": JournalType.BANK,
+}
+
+
+async def create_journal_entries(
+    catalog: Catalog, spec: DatasetSpec, rng: random.Random, quiet: bool
+) -> int:
+    """Asientos contabilizados con COPY hasta alcanzar ``journal_lines`` líneas"""
+    names = [name for name, _, _ in ENTRY_TEMPLATES]
+    weights = [weight for _, weight, _ in ENTRY_TEMPLATES]
+    origins = {name: origin for name, _, origin in ENTRY_TEMPLATES}
+    period_days = (spec.end_date - spec.start_date).days + 1
+    now = datetime.now(timezone.utc)
+
+    entries: List[tuple] = []
+    lines: List[tuple] = []
+    total_lines = 0
+    entry_index = 0
+    started = time.perf_counter()
+
+    async def flush() -> None:
+        async with async_engine.begin() as conn:
+            await copy_rows(conn, "journal_entries", JOURNAL_ENTRY_COLUMNS, entries)
+            await copy_rows(conn, "journal_entry_lines", JOURNAL_LINE_COLUMNS, lines)
+        entries.clear()
+        lines.clear()
+
+    while total_lines < spec.journal_lines:
+        template = rng.choices(names, weights)[0]
+        entry_lines = template_lines(template, rng, catalog)
+        # Fechas ordenadas a lo largo del periodo, como en la operación real
+        day = spec.start_date + timedelta(days=min(period_days - 1, total_lines * period_days // spec.journal_lines))
+        entry_date = at_noon(day)
+        entry_id = uuid.uuid4()
+        total = sum((debit for _, debit, _, _ in entry_lines), ZERO)
+        entries.append((
+            entry_id, f"{CODE_PREFIX}{entry_index:010d}", f"REF-{entry_index}",
+            f"Asiento sintético {template}",
+            catalog.journals[TEMPLATE_JOURNALS.get(template, JournalType.MISCELLANEOUS)],
+            JournalEntryType.MANUAL.name, origins[template].name,
+            entry_date, entry_date, JournalEntryStatus.POSTED.name, total, total, catalog.user_id,
+            catalog.user_id, catalog.user_id, entry_date, entry_date, now, now,
+        ))
+        for line_number, (account_id, debit, credit, third_party_id) in enumerate(entry_lines, start=1):
+            lines.append((
+                uuid.uuid4(), entry_id, account_id, debit, credit, None,
+                third_party_id, line_number, now, now,
+            ))
+        total_lines += len(entry_lines)
+        entry_index += 1
+
+        if len(lines) >= COPY_BATCH:
+            await flush()
+            rate = total_lines / (time.perf_counter() - started)
+            log(f"  {total_lines:>12,} líneas ({rate:,.0f} líneas/s)", quiet)
+    if entries:
+        await flush()
+    return entry_index
+
+
+async def create_pending_entries(catalog: Catalog, spec: DatasetSpec, rng: random.Random) -> None:
+    """Asientos aprobados (gasto contra banco) del último mes, listos para contabilizar"""
+    now = datetime.now(timezone.utc)
+    entries: List[tuple] = []
+    lines: List[tuple] = []
+    for index in range(spec.pending_entries):
+        entry_id = uuid.uuid4()
+        entry_date = at_noon(spec.end_date - timedelta(days=rng.randint(0, 27)))
+        value = amount(rng, 1_000, 1_000_000)
+        entries.append((
+            entry_id, f"{PENDING_PREFIX}{index:08d}", f"APR-{index}", "Asiento aprobado pendiente",
+            catalog.journals[JournalType.MISCELLANEOUS], JournalEntryType.MANUAL.name,
+            TransactionOrigin.OTHER.name, entry_date, None, JournalEntryStatus.APPROVED.name,
+            value, value, catalog.user_id, catalog.user_id, None, now, None, now, now,
+        ))
+        lines.append((uuid.uuid4(), entry_id, catalog.account(rng, "expense"), value, ZERO, None, None, 1, now, now))
+        lines.append((uuid.uuid4(), entry_id, catalog.bank_account_id, ZERO, value, None, None, 2, now, now))
+    async with async_engine.begin() as conn:
+        await copy_rows(conn, "journal_entries", JOURNAL_ENTRY_COLUMNS, entries)
+        await copy_rows(conn, "journal_entry_lines", JOURNAL_LINE_COLUMNS, lines)
+
+
+# ================================
+# FACTURAS, PAGOS Y EXTRACTOS
+# ================================
+
+async def create_invoices(conn: AsyncConnection, catalog: Catalog, spec: DatasetSpec, rng: random.Random) -> None:
+    period_days = (spec.end_date - spec.start_date).days + 1
+    rows = []
+    for index in range(spec.invoices):
+        is_sale = rng.random() < 0.65
+        invoice_date = spec.start_date + timedelta(days=index * period_days // spec.invoices)
+        subtotal = amount(rng)
+        tax = (subtotal * TAX_RATE).quantize(CENT)
+        total = subtotal + tax
+        paid = invoice_date < spec.end_date - timedelta(days=60)
+        rows.append({
+            "number": f"{CODE_PREFIX}INV-{index:08d}",
+            "invoice_type": InvoiceType.CUSTOMER_INVOICE if is_sale else InvoiceType.SUPPLIER_INVOICE,
+            "status": InvoiceStatus.PAID if paid else InvoiceStatus.POSTED,
+            "third_party_id": rng.choice(catalog.customers if is_sale else catalog.suppliers),
+            "invoice_date": invoice_date,
+            "due_date": invoice_date + timedelta(days=30),
+            "subtotal": subtotal,
+            "tax_amount": tax,
+            "total_amount": total,
+            "paid_amount": total if paid else ZERO,
+            "outstanding_amount": ZERO if paid else total,
+            "created_by_id": catalog.user_id,
+        })
+    await insert_rows(conn, Invoice, rows)
+
+
+async def create_payments_and_extracts(
+    conn: AsyncConnection, catalog: Catalog, spec: DatasetSpec, rng: random.Random
+) -> None:
+    """
+    Pagos por transferencia con un extracto mensual del banco. Los extractos de
+    meses cerrados están conciliados; el del último mes está en proceso y tiene
+    ``reconcile_lines`` líneas que coinciden con pagos confirmados.
+    """
+    months = month_starts(spec.start_date, spec.end_date)
+    last_month = months[-1]
+    settled = spec.payments - spec.reconcile_lines
+    settled_days = max(1, (last_month - spec.start_date).days)
+
+    payments: List[Dict[str, Any]] = []
+    for index in range(spec.payments):
+        confirmed = index >= settled
+        if confirmed:
+            payment_date = last_month + timedelta(days=rng.randint(0, (spec.end_date - last_month).days))
+            payment_type, third_party = PaymentType.CUSTOMER_PAYMENT, rng.choice(catalog.customers)
+        else:
+            payment_date = spec.start_date + timedelta(days=index * settled_days // max(1, settled))
+            if rng.random() < 0.55:
+                payment_type, third_party = PaymentType.CUSTOMER_PAYMENT, rng.choice(catalog.customers)
+            else:
+                payment_type, third_party = PaymentType.SUPPLIER_PAYMENT, rng.choice(catalog.suppliers)
+        value = amount(rng)
+        payments.append({
+            "id": uuid.uuid4(),
+            "number": f"{CODE_PREFIX}PAY-{index:08d}",
+            "reference": f"TRF{index:010d}",
+            "payment_type": payment_type,
+            "payment_method": PaymentMethod.BANK_TRANSFER,
+            "status": PaymentStatus.CONFIRMED if confirmed else PaymentStatus.POSTED,
+            "third_party_id": third_party,
+            "payment_date": payment_date,
+            "amount": value,
+            "allocated_amount": ZERO if confirmed else value,
+            "unallocated_amount": value if confirmed else ZERO,
+            "account_id": catalog.bank_account_id,
+            "journal_id": catalog.journals[JournalType.BANK],
+            "is_reconciled": not confirmed,
+            "created_by_id": catalog.user_id,
+        })
+    await insert_rows(conn, Payment, payments)
+
+    by_month: Dict[date, List[Dict[str, Any]]] = {month: [] for month in months}
+    for payment in payments:
+        by_month[payment["payment_date"].replace(day=1)].append(payment)
+
+    extracts: List[Dict[str, Any]] = []
+    extract_lines: List[Dict[str, Any]] = []
+    now = datetime.now(timezone.utc)
+    balance = ZERO
+    for month in months:
+        month_end = min((month + timedelta(days=32)).replace(day=1) - timedelta(days=1), spec.end_date)
+        processing = month == last_month
+        extract_id = uuid.uuid4()
+        starting_balance = balance
+        for sequence, payment in enumerate(by_month[month], start=1):
+            incoming = payment["payment_type"] == PaymentType.CUSTOMER_PAYMENT
+            value = payment["amount"]
+            balance += value if incoming else -value
+            extract_lines.append({
+                "bank_extract_id": extract_id,
+                "sequence": sequence,
+                "transaction_date": payment["payment_date"],
+                "value_date": payment["payment_date"],
+                "reference": payment["reference"],
+                "description": f"Transferencia {payment['reference']}",
+                "line_type": BankExtractLineType.CREDIT if incoming else BankExtractLineType.DEBIT,
+                "debit_amount": ZERO if incoming else value,
+                "credit_amount": value if incoming else ZERO,
+                "balance": balance,
+                "is_reconciled": not processing,
+                "reconciled_amount": ZERO if processing else value,
+                "pending_amount": value if processing else ZERO,
+                "payment_id": None if processing else payment["id"],
+                "created_by_id": catalog.user_id,
+                "reconciled_by_id": None if processing else catalog.user_id,
+                "reconciled_at": None if processing else now,
+            })
+        extracts.append({
+            "id": extract_id,
+            "name": f"{CODE_PREFIX}Extracto {month:%Y-%m}",
+            "reference": f"{CODE_PREFIX}EXT-{month:%Y%m}",
+            "account_id": catalog.bank_account_id,
+            "statement_date": month_end,
+            "start_date": month,
+            "end_date": month_end,
+            "starting_balance": starting_balance,
+            "ending_balance": balance,
+            "status": BankExtractStatus.PROCESSING if processing else BankExtractStatus.RECONCILED,
+            "created_by_id": catalog.user_id,
+        })
+    await insert_rows(conn, BankExtract, extracts)
+    await insert_rows(conn, BankExtractLine, extract_lines)
+
+
+async def refresh_account_balances(conn: AsyncConnection) -> None:
+    """Saldos de las cuentas sintéticas según sus líneas contabilizadas (``Account.update_balance``)"""
+    await conn.execute(text("""
+        UPDATE accounts AS a
+        SET debit_balance = totals.debit,
+            credit_balance = totals.credit,
+            balance = CASE WHEN a.account_type IN ('ASSET', 'EXPENSE', 'COST')
+                           THEN totals.debit - totals.credit
+                           ELSE totals.credit - totals.debit END
+        FROM (
+            SELECT l.account_id, SUM(l.debit_amount) AS debit, SUM(l.credit_amount) AS credit
+            FROM journal_entry_lines l
+            JOIN journal_entries e ON e.id = l.journal_entry_id
+            WHERE e.status = 'POSTED'
+            GROUP BY l.account_id
+        ) AS totals
+        WHERE a.id = totals.account_id AND a.code LIKE :prefix
+    """), {"prefix": f"{CODE_PREFIX}%"})
+
+
+# ================================
+# GENERAR / RESUMEN / ELIMINAR
+# ================================
+
+async def synthetic_user_id(conn: AsyncConnection) -> Optional[uuid.UUID]:
+    return await conn.scalar(select(User.id).where(User.email == SYNTHETIC_EMAIL))
+
+
+async def generate(spec: DatasetSpec, quiet: bool = False) -> Dict[str, Any]:
+    """Genera el conjunto sintético y devuelve su resumen"""
+    spec = spec.resolved()
+    rng = random.Random(spec.seed)
+    catalog = Catalog()
+    started = time.perf_counter()
+
+    log("Catálogos: usuario, cuentas, diarios y terceros", quiet)
+    async with async_engine.begin() as conn:
+        await create_user(conn, catalog)
+        await create_accounts(conn, catalog, spec)
+        await create_journals(conn, catalog)
+        await create_third_parties(conn, catalog, spec, rng)
+
+    log(f"Asientos contabilizados: {spec.journal_lines:,} líneas", quiet)
+    await create_journal_entries(catalog, spec, rng, quiet)
+    await create_pending_entries(catalog, spec, rng)
+
+    log("Facturas, pagos y extractos bancarios", quiet)
+    async with async_engine.begin() as conn:
+        await create_invoices(conn, catalog, spec, rng)
+        await create_payments_and_extracts(conn, catalog, spec, rng)
+        await refresh_account_balances(conn)
+
+    log("ANALYZE", quiet)
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in [
+            "accounts", "third_parties", "journals", "journal_entries", "journal_entry_lines",
+            "invoices", "payments", "bank_extracts", "bank_extract_lines",
+        ]:
+            await conn.execute(text(f"ANALYZE {table}"))
+
+    summary = await dataset_summary()
+    summary["spec"] = asdict(spec)
+    summary["generation_seconds"] = round(time.perf_counter() - started, 1)
+    return summary
+
+
+async def dataset_summary() -> Dict[str, Any]:
+    """Conteos del conjunto sintético presente en la base (vacío si no existe)"""
+    async with async_engine.connect() as conn:
+        user_id = await synthetic_user_id(conn)
+        if user_id is None:
+            return {}
+        entries = select(JournalEntry.id).where(JournalEntry.created_by_id == user_id)
+        counts = {
+            "accounts": select(func.count()).where(Account.code.like(f"{CODE_PREFIX}%")),
+            "third_parties": select(func.count()).where(ThirdParty.code.like(f"{CODE_PREFIX}%")),
+            "journal_entries": select(func.count()).where(JournalEntry.created_by_id == user_id),
+            "journal_lines": select(func.count()).where(JournalEntryLine.journal_entry_id.in_(entries)),
+            "pending_entries": select(func.count()).where(
+                JournalEntry.created_by_id == user_id,
+                JournalEntry.status == JournalEntryStatus.APPROVED
+            ),
+            "invoices": select(func.count()).where(Invoice.created_by_id == user_id),
+            "payments": select(func.count()).where(Payment.created_by_id == user_id),
+            "bank_extracts": select(func.count()).where(BankExtract.created_by_id == user_id),
+            "bank_extract_lines": select(func.count()).where(BankExtractLine.created_by_id == user_id),
+        }
+        summary: Dict[str, Any] = {name: await conn.scalar(query) for name, query in counts.items()}
+        first, last = (await conn.execute(
+            select(func.min(JournalEntry.entry_date), func.max(JournalEntry.entry_date))
+            .where(JournalEntry.created_by_id == user_id)
+        )).one()
+        summary["start_date"] = first.date().isoformat() if first else None
+        summary["end_date"] = last.date().isoformat() if last else None
+        return summary
+
+
+async def drop(quiet: bool = False) -> bool:
+    """Elimina el conjunto sintético; devuelve False si no existía"""
+    async with async_engine.begin() as conn:
+        user_id = await synthetic_user_id(conn)
+        if user_id is None:
+            return False
+        log("Eliminando el conjunto sintético", quiet)
+        extract_lines = select(BankExtractLine.id).where(BankExtractLine.created_by_id == user_id)
+        payments = select(Payment.id).where(Payment.created_by_id == user_id)
+        entries = select(JournalEntry.id).where(JournalEntry.created_by_id == user_id)
+        await conn.execute(delete(BankReconciliation).where(
+            BankReconciliation.extract_line_id.in_(extract_lines) | BankReconciliation.payment_id.in_(payments)
+        ))
+        await conn.execute(delete(BankExtractLine).where(BankExtractLine.created_by_id == user_id))
+        await conn.execute(delete(BankExtract).where(BankExtract.created_by_id == user_id))
+        await conn.execute(delete(Payment).where(Payment.created_by_id == user_id))
+        await conn.execute(delete(Invoice).where(Invoice.created_by_id == user_id))
+        await conn.execute(delete(JournalEntryLine).where(JournalEntryLine.journal_entry_id.in_(entries)))
+        await conn.execute(delete(JournalEntry).where(JournalEntry.created_by_id == user_id))
+        await conn.execute(delete(Journal).where(Journal.code.like(f"{CODE_PREFIX}%")))
+        await conn.execute(delete(ThirdParty).where(ThirdParty.code.like(f"{CODE_PREFIX}%")))
+        await conn.execute(delete(Account).where(Account.code.like(f"{CODE_PREFIX}%")))
+        await conn.execute(delete(User).where(User.id == user_id))
+    return True
+
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        if args.command == "drop":
+            return {"dropped": await drop(args.json)}
+        if args.command == "info":
+            return await dataset_summary()
+
+        if await dataset_summary():
+            if not args.replace:
+                raise SystemExit("Ya existe un conjunto sintético; use --replace o el comando drop")
+            await drop(args.json)
+        spec = DatasetSpec(
+            journal_lines=args.journal_lines,
+            accounts=args.accounts,
+            third_parties=args.third_parties,
+            invoices=args.invoices,
+            payments=args.payments,
+            pending_entries=args.pending_entries,
+            reconcile_lines=args.reconcile_lines,
+            start_date=date.fromisoformat(args.start),
+            end_date=date.fromisoformat(args.end),
+            seed=args.seed
+        )
+        return await generate(spec, quiet=args.json)
+    finally:
+        await async_engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["generate", "info", "drop"])
+    parser.add_argument("--journal-lines", type=int, default=100_000)
+    parser.add_argument("--accounts", type=int, default=300)
+    parser.add_argument("--third-parties", type=int, default=0, help="0: journal_lines / 200")
+    parser.add_argument("--invoices", type=int, default=0, help="0: journal_lines / 20")
+    parser.add_argument("--payments", type=int, default=0, help="0: journal_lines / 40")
+    parser.add_argument("--pending-entries", type=int, default=500, help="Asientos aprobados sin contabilizar")
+    parser.add_argument("--reconcile-lines", type=int, default=200, help="Líneas del extracto en proceso")
+    parser.add_argument("--start", default="2023-01-01")
+    parser.add_argument("--end", default="2024-12-31")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replace", action="store_true", help="Eliminar el conjunto existente antes de generar")
+    parser.add_argument("--json", action="store_true", help="Salida en JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(main_async(args))
+
+    if args.json:
+        print(json.dumps(result, indent=2, default=str))
+        return
+
+    if args.command == "drop":
+        print("Conjunto sintético eliminado" if result["dropped"] else "No hay conjunto sintético")
+        return
+    if not result:
+        print("No hay conjunto sintético")
+        return
+    for name, value in result.items():
+        if name != "spec":
+            print(f"{name:>20}: {value:,}" if isinstance(value, int) else f"{name:>20}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(
 
 from app.database import get_async_db
 from app.models.currency import Currency, ExchangeRate
+from app.services.exchange_rate_cache import exchange_rate_table
 from app.core.settings import get_settings
 from app.utils.logging import get_logger
 
@@ -388,6 +389,7 @@ async def import_world_currencies(force: bool = False):
             
             # Crear archivo de control solo si se crearon monedas
             if created_count > 0:
+                exchange_rate_table.invalidate()
                 await create_control_file()
             
             # Calcular exchange rates creados (todas menos la base si fue creada)